@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Time spent flashing with a pinned copy method and with "auto".
+
+Usage:
+    python benchmarks/bench_auto_method.py [--runs 100] [--scale 0.01]
+
+Three simulated copy methods take 8, 3 and 1 time units a run, and the fastest
+one fails a run in three. A failed run is retried with the same method. With
+"auto" the registry picks methods from the timings it records.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from htrun.host_tests_plugins.host_test_plugins import HostTestPluginBase
+from htrun.host_tests_plugins.host_test_registry import HostTestRegistry
+from htrun.host_tests_plugins.plugin_stats import PluginStats
+
+
+class SimulatedCopy(HostTestPluginBase):
+    """Copy method sleeping for a while, failing every nth run."""
+
+    type = "CopyMethod"
+    stable = True
+    required_parameters = ["image_path"]
+
+    def __init__(self, name, seconds, fail_every=0):
+        """Simulate a copy method."""
+        HostTestPluginBase.__init__(self)
+        self.name = name
+        self.capabilities = [name]
+        self.seconds = seconds
+        self.fail_every = fail_every
+        self.runs = 0
+
+    def setup(self, *args, **kwargs):
+        """Nothing to set up."""
+        return True
+
+    def execute(self, capability, *args, **kwargs):
+        """Sleep, then fail every fail_every runs."""
+        self.runs += 1
+        time.sleep(self.seconds)
+        return not self.fail_every or self.runs % self.fail_every != 0
+
+    def print_plugin_info(self, text, NL=True):
+        """Keep the output short."""
+
+
+def flash(registry, capability, runs):
+    """Return the time taken to flash successfully runs times."""
+    start = time.time()
+    for _ in range(runs):
+        while not registry.call_plugin(
+            "CopyMethod", capability, image_path="image.bin", mcu="K64F"
+        ):
+            pass
+    return time.time() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--scale", type=float, default=0.01, help="s per unit")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for capability in ("slow", "medium", "auto"):
+
+            class Registry(HostTestRegistry):
+                PLUGINS = {}
+                STATS = PluginStats(os.path.join(tmpdir, capability + ".json"))
+
+            registry = Registry()
+            plugins = [
+                SimulatedCopy("slow", 8 * args.scale),
+                SimulatedCopy("medium", 3 * args.scale),
+                SimulatedCopy("flaky", 1 * args.scale, fail_every=3),
+            ]
+            for plugin in plugins:
+                registry.register_plugin(plugin)
+            elapsed = flash(registry, capability, args.runs)
+            print(
+                "%-6s %6.2f s, %5.1f units per flash, runs: %s"
+                % (
+                    capability,
+                    elapsed,
+                    elapsed / args.scale / args.runs,
+                    ", ".join("%s %d" % (p.name, p.runs) for p in plugins),
+                )
+            )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
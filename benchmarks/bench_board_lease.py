@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Time jobs sharing a board spend waiting for it, polling or with leases.
+
+Usage:
+    python benchmarks/bench_board_lease.py [--jobs 6] [--hold 0.5]
+
+--jobs processes start one after the other and each uses the board for --hold
+seconds. Polling jobs try to take the board once a second, like opening a busy
+serial port, and get it in no particular order. Leased jobs wait in the order
+they started and get the board as soon as it is released.
+"""
+
+import argparse
+import fcntl
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from htrun.host_tests_runner.board_lease import BoardLease
+
+
+def poll_job(directory, hold, results):
+    """Use the board, retrying every second while it is busy."""
+    start = time.time()
+    fd = os.open(os.path.join(directory, "port"), os.O_RDWR | os.O_CREAT)
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(1)
+    results.put((start, time.time()))
+    time.sleep(hold)
+    os.close(fd)
+
+
+def lease_job(directory, hold, results):
+    """Use the board with a lease."""
+    start = time.time()
+    with BoardLease("0240000032044e45", directory):
+        results.put((start, time.time()))
+        time.sleep(hold)
+
+
+def run(job, args, directory):
+    """Return the total time and the wait times of the jobs, by start order."""
+    results = multiprocessing.Queue()
+    start = time.time()
+    jobs = []
+    for _ in range(args.jobs):
+        jobs.append(
+            multiprocessing.Process(target=job, args=(directory, args.hold, results))
+        )
+        jobs[-1].start()
+        time.sleep(0.05)
+    waits = sorted(results.get() for _ in jobs)
+    for process in jobs:
+        process.join()
+    return time.time() - start, waits
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--hold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, job in (("polling", poll_job), ("lease", lease_job)):
+            total, waits = run(job, args, tmpdir)
+            granted = sorted(range(len(waits)), key=lambda i: waits[i][1])
+            print(
+                "%-8s %5.2f s total, %5.2f s idle board, grant order %s"
+                % (
+                    name,
+                    total,
+                    total - args.jobs * args.hold,
+                    " ".join(str(i) for i in granted),
+                )
+            )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
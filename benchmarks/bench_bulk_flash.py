@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Time to flash a rack of boards with pyOCD, one by one and in bulk.
+
+Usage:
+    python benchmarks/bench_bulk_flash.py [--boards 8] [--size 256]
+        [--probe-rate 200]
+
+pyOCD sessions are simulated: programming takes as long as a probe writing
+--probe-rate KiB/s would. The image is an Intel HEX file of --size KiB, so the
+time taken to parse it is real. The boards are flashed one invocation at a time,
+each parsing the image, then with one flash_many() call.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+from intelhex import IntelHex
+
+from htrun.host_tests_plugins import module_copy_pyocd, pyocd_session
+from htrun.host_tests_plugins.module_copy_pyocd import (
+    HostTestPluginCopyMethod_pyOCD,
+    ImageCache,
+)
+
+
+class SimulatedSession(object):
+    """pyOCD session of a board, without hardware."""
+
+    def __init__(self, unique_id, **kwargs):
+        """Create the session of a board."""
+        self.board = mock.Mock(target_type="k64f")
+        self.probe = mock.Mock()
+        self.target = mock.Mock()
+        self.target.memory_map.get_boot_memory.return_value.start = 0
+
+    def open(self):
+        """Nothing to open."""
+        pass
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+
+def simulated_flash_loader(probe_rate):
+    """Return a FlashLoader class programming at probe_rate bytes per second."""
+
+    class SimulatedFlashLoader(object):
+        def __init__(self, session):
+            self.size = 0
+
+        def add_data(self, address, data):
+            self.size += len(data)
+
+        def commit(self):
+            time.sleep(self.size / probe_rate)
+
+    return SimulatedFlashLoader
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=8)
+    parser.add_argument("--size", type=int, default=256, help="KiB")
+    parser.add_argument("--probe-rate", type=float, default=200, help="KiB/s")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image_path = os.path.join(tmpdir, "image.hex")
+        ihex = IntelHex()
+        ihex.frombytes(os.urandom(args.size * 1024))
+        ihex.write_hex_file(image_path)
+        jobs = [("%04d" % board, image_path) for board in range(args.boards)]
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        plugin.print_plugin_info = lambda text, NL=True: None
+
+        with mock.patch.multiple(
+            module_copy_pyocd,
+            FlashLoader=simulated_flash_loader(args.probe_rate * 1024),
+            PYOCD_PRESENT=True,
+            create=True,
+        ), mock.patch.object(
+            pyocd_session,
+            "ConnectHelper",
+            mock.Mock(session_with_chosen_probe=SimulatedSession),
+            create=True,
+        ):
+            start = time.time()
+            for job in jobs:
+                # A new process per board parses the image again
+                plugin.flash_many([job], image_cache=ImageCache())
+                pyocd_session.PYOCD_SESSIONS.clear()
+            one_by_one = time.time() - start
+
+            start = time.time()
+            results = plugin.flash_many(jobs)
+            bulk = time.time() - start
+
+        assert all(result.ok for result in results)
+        for name, elapsed in (("one by one", one_by_one), ("flash_many", bulk)):
+            print(
+                "%-11s %6.2f s, %7.1f KiB/s total"
+                % (name, elapsed, args.boards * args.size / elapsed)
+            )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
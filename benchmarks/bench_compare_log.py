@@ -0,0 +1,134 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Benchmark --compare-log matching against a large golden log.
+
+Usage:
+    python benchmarks/bench_compare_log.py [--lines 100000] [--noise 3]
+
+Two golden logs are generated in a temporary directory: an ordered one (a mix of
+literal and regular expression lines) and one made of a single '@any-of' section.
+Target output is synthesised from them, with 'noise' lines which match nothing
+interleaved, and fed line by line to the matcher. The ordered log is also run
+through the line matcher htrun used before CompareLog, for reference.
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+
+from htrun.host_tests_runner.compare_log import CompareLog
+
+
+def legacy_match_log(compare_log, idx, line):
+    """Match a line the way DefaultTestSelector.match_log used to."""
+    if idx < len(compare_log):
+        regex = compare_log[idx]
+        try:
+            if regex in line or re.search(regex, line):
+                idx += 1
+        except re.error:
+            pass
+    return idx
+
+
+def with_noise(rnd, lines, noise):
+    """Interleave lines with noise lines."""
+    stream = []
+    for line in lines:
+        for _ in range(noise):
+            stream.append("noise %08x" % rnd.getrandbits(32))
+        stream.append(line)
+    return stream
+
+
+def ordered_log(rnd, lines, noise):
+    """Return golden and output lines for an ordered compare log."""
+    golden = []
+    output = []
+    for i in range(lines):
+        if i % 10 == 0:
+            golden.append(r"bench %06d:\s*\d+ Kb/s" % i)
+            output.append("bench %06d:   %d Kb/s" % (i, rnd.randint(1, 9999)))
+        else:
+            golden.append("step %06d finished" % i)
+            output.append("[%08d] step %06d finished" % (i, i))
+    return golden, with_noise(rnd, output, noise)
+
+
+def any_of_log(rnd, lines, noise):
+    """Return golden and output lines for an unordered compare log section."""
+    section = ["worker %06d done" % i for i in range(lines)]
+    output = list(section)
+    rnd.shuffle(output)
+    return ["@any-of"] + section + ["@end"], with_noise(rnd, output, noise)
+
+
+def run_compare_log(path, golden, stream):
+    """Match stream against golden with CompareLog, return elapsed seconds."""
+    with open(path, "w") as f:
+        f.write("\n".join(golden) + "\n")
+    start = time.perf_counter()
+    compare_log = CompareLog(path)
+    for line in stream:
+        if compare_log.match(line):
+            break
+    elapsed = time.perf_counter() - start
+    compare_log.close()
+    assert compare_log.complete, "golden log not matched"
+    return elapsed
+
+
+def run_legacy(golden, stream):
+    """Match stream against golden with the legacy matcher."""
+    start = time.perf_counter()
+    idx = 0
+    for line in stream:
+        idx = legacy_match_log(golden, idx, line)
+        if idx == len(golden):
+            break
+    elapsed = time.perf_counter() - start
+    assert idx == len(golden), "golden log not matched"
+    return elapsed
+
+
+def report(name, golden_lines, stream, elapsed):
+    """Print one benchmark result."""
+    print(
+        "%-28s %7d golden lines %8d output lines %7.3f s %9.0f lines/s"
+        % (name, golden_lines, len(stream), elapsed, len(stream) / elapsed)
+    )
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--noise", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "golden.log")
+
+        golden, stream = ordered_log(rnd, args.lines, args.noise)
+        elapsed = run_compare_log(path, golden, stream)
+        report("CompareLog ordered", args.lines, stream, elapsed)
+        elapsed = run_legacy(golden, stream)
+        report("legacy match_log ordered", args.lines, stream, elapsed)
+
+        golden, stream = any_of_log(rnd, args.lines, args.noise)
+        elapsed = run_compare_log(path, golden, stream)
+        report("CompareLog @any-of", args.lines, stream, elapsed)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
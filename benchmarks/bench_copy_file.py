@@ -0,0 +1,65 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Time to copy an image with cp and sync, and with copy_file().
+
+Usage:
+    python benchmarks/bench_copy_file.py [--size 512] [--copies 20] [--dest DIR]
+
+An image of --size KiB is copied --copies times to --dest, a temporary directory
+by default. Point --dest at the mount point of a board to time its mass storage
+device. The shell copy plugin used to run cp then sync -f, it now calls
+HostTestPluginBase.copy_file().
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from htrun.host_tests_plugins.host_test_plugins import HostTestPluginBase
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=512, help="KiB")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--dest", help="directory, a temporary one if not set")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image_path = os.path.join(tmpdir, "image.bin")
+        with open(image_path, "wb") as f:
+            f.write(os.urandom(args.size * 1024))
+        destination_path = os.path.join(args.dest or tmpdir, "copy.bin")
+        plugin = HostTestPluginBase()
+        plugin.print_plugin_info = lambda text, NL=True: None
+
+        def subprocesses():
+            subprocess.check_call(["cp", image_path, destination_path])
+            subprocess.check_call(["sync", "-f", destination_path])
+
+        def in_process():
+            assert plugin.copy_file(image_path, destination_path)
+
+        for name, copy in (("cp + sync -f", subprocesses), ("copy_file()", in_process)):
+            start = time.time()
+            for _ in range(args.copies):
+                copy()
+            elapsed = (time.time() - start) / args.copies
+            print(
+                "%-13s %7.2f ms per copy, %8.1f KiB/s"
+                % (name, elapsed * 1000, args.size / elapsed)
+            )
+        os.remove(destination_path)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""End to end htrun benchmarks against the virtual DUT.
+
+Usage:
+    python benchmarks/bench_end_to_end.py [--runs 5] [--echoes 1000]
+        [--lines 100000]
+
+Every run starts a virtual DUT on a pseudo-terminal and a complete htrun process
+connected to it, so the numbers include process start up, the sync handshake,
+the connection process and the event loop. Measured:
+
+- per test overhead: wall time of htrun for a test with one empty test case
+- sync latency: time from htrun start until the DUT receives the '__sync'
+- KV round trip: time between two echoes of the built-in 'echo' host test
+- output rate: target output lines per second htrun keeps up with
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_htrun(tmpdir, dut_args, htrun_args=()):
+    """Run htrun against a new virtual DUT.
+
+    Returns:
+        Tuple of (htrun start time, htrun wall time, htrun exit code, DUT stats).
+    """
+    stats_path = os.path.join(tmpdir, "stats.json")
+    dut = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "htrun.host_tests_toolbox.virtual_dut",
+            "--pty",
+            "--once",
+            "--stats",
+            stats_path,
+        ]
+        + list(dut_args),
+        stdout=subprocess.PIPE,
+    )
+    try:
+        port = dut.stdout.readline().decode().strip()
+        start = time.time()
+        with open(os.devnull, "w") as devnull:
+            code = subprocess.call(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys; from htrun.htrun import main; sys.exit(main())",
+                    "-p",
+                    port + ":115200",
+                    "-m",
+                    "K64F",
+                    "--skip-flashing",
+                    "--skip-reset",
+                ]
+                + list(htrun_args),
+                stdout=devnull,
+            )
+        elapsed = time.time() - start
+        dut.wait(timeout=10)
+    finally:
+        if dut.poll() is None:
+            dut.kill()
+            dut.wait()
+    with open(stats_path) as f:
+        stats = json.load(f)
+    return start, elapsed, code, stats
+
+
+def mean(values):
+    """Return the mean of a list of numbers."""
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main():
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--echoes", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    overheads = []
+    sync_latencies = []
+    for _ in range(args.runs):
+        start, elapsed, code, stats = run_htrun(tmpdir, ["--testcases", "1"])
+        assert code == 0, "htrun failed with %d" % code
+        overheads.append(elapsed)
+        sync_latencies.append(stats["sync_time"] - start)
+    print("per test overhead:   %8.1f ms" % (mean(overheads) * 1e3))
+    print("sync latency:        %8.1f ms" % (mean(sync_latencies) * 1e3))
+
+    _, _, code, stats = run_htrun(
+        tmpdir,
+        ["--host-test-name", "echo", "--echo-count", str(args.echoes)],
+        ["--kv-lane-size", str(args.echoes)],
+    )
+    assert code == 0, "htrun failed with %d" % code
+    print("KV round trip:       %8.3f ms" % (mean(stats["round_trips"]) * 1e3))
+
+    _, _, code, stats = run_htrun(
+        tmpdir,
+        ["--testcases", "1", "--lines-per-case", str(args.lines), "--timeout", "600"],
+    )
+    assert code == 0, "htrun failed with %d" % code
+    elapsed = stats["finish_time"] - stats["sync_time"]
+    print("output rate:         %8.0f lines/s" % (args.lines / elapsed))
+
+    os.remove(os.path.join(tmpdir, "stats.json"))
+    os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
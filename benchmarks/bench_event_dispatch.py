@@ -0,0 +1,129 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Benchmark the DefaultTestSelector.run_test event loop.
+
+Usage:
+    python benchmarks/bench_event_dispatch.py [--events 1000000]
+
+Pre-filled event lanes replace the lanes fed by the connection process, so only
+the event loop and event dispatch are measured. The replayed events are a mix of
+host test KV events, '__rxd_line' events and system events.
+
+The latency of a '__notify_conn_lost' event queued behind a flood of target
+output is also measured, for the event lanes and for a single FIFO queue.
+"""
+
+import argparse
+import multiprocessing
+import time
+
+import mock
+
+from htrun import BaseHostTest, init_host_test_cli_parser
+from htrun.host_tests_conn_proxy import EventLanes
+from htrun.host_tests_runner.host_test_default import DefaultTestSelector
+
+
+class DispatchHostTest(BaseHostTest):
+    """Host test counting the events it receives."""
+
+    def __init__(self):
+        """Initialise the host test."""
+        BaseHostTest.__init__(self)
+        self.count = 0
+
+    def setup(self):
+        """Register callbacks."""
+        self.register_callback("tick", self._callback_tick)
+
+    def _callback_tick(self, key, value, timestamp):
+        self.count += 1
+
+
+def make_options():
+    """Return options for a run without a real target."""
+    options, _ = init_host_test_cli_parser().parse_args([])
+    options.enum_host_tests = []
+    options.micro = "K64F"
+    options.process_start_timeout = 1
+    options.skip_reset = True
+    return options
+
+
+def make_events(count):
+    """Return a pre-filled event queue with about count events."""
+    now = time.time()
+    events = EventLanes(bulk_size=count)
+    events.put(("__conn_process_start", 1, now))
+    events.put(("__timeout", 3600, now))
+    events.put(("__version", "1.3.0", now))
+    events.put(("__host_test_name", "bench_dispatch", now))
+    cycle = [
+        ("tick", "1", now),
+        ("__rxd_line", "some target output", now),
+        ("tick", "2", now),
+        ("__testcase_start", "case", now),
+        ("tick", "3", now),
+        ("__rxd_line", "more target output", now),
+        ("__testcase_finish", "case;1;0", now),
+        ("tick", "4", now),
+    ]
+    for i in range(count):
+        events.put(cycle[i % len(cycle)])
+    events.put(("end", "success", now))
+    events.put(("__exit", 0, now))
+    return events
+
+
+def conn_lost_latency(event_queue, flood):
+    """Return the seconds until conn lost is received behind flood output lines."""
+    now = time.time()
+    for i in range(flood):
+        event_queue.put(("__rxd_line", "flood output line %d" % i, now))
+    event_queue.put(("__notify_conn_lost", "connection lost", now))
+    start = time.perf_counter()
+    while event_queue.get(timeout=10)[0] != "__notify_conn_lost":
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--flood", type=int, default=10000)
+    args = parser.parse_args()
+
+    selector = DefaultTestSelector(make_options())
+    host_test = DispatchHostTest()
+    selector.registry.register_host_test("bench_dispatch", host_test)
+
+    event_queue = make_events(args.events)
+    with mock.patch(
+        "htrun.host_tests_runner.host_test_default.EventLanes",
+        return_value=event_queue,
+    ), mock.patch("htrun.host_tests_runner.host_test_default.Process"):
+        start = time.perf_counter()
+        result = selector.run_test()
+        elapsed = time.perf_counter() - start
+
+    assert result is True, "unexpected result %s" % result
+    print(
+        "run_test: %d events in %.3f s, %.0f events/s, %.2f us/event"
+        % (args.events, elapsed, args.events / elapsed, elapsed / args.events * 1e6)
+    )
+
+    for name, event_queue in [
+        ("FIFO queue", multiprocessing.Queue()),
+        ("event lanes", EventLanes(bulk_size=args.flood)),
+    ]:
+        print(
+            "conn lost behind %d lines, %s: %.2f ms"
+            % (args.flood, name, conn_lost_latency(event_queue, args.flood) * 1e3)
+        )
+
+
+if __name__ == "__main__":
+    main()
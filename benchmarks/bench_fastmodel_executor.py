@@ -0,0 +1,108 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Wall time of a batch of FastModel tests run on several simulator instances.
+
+Usage:
+    python benchmarks/bench_fastmodel_executor.py [--instances 2] [--short 6]
+        [--short-time 1] [--long-time 4]
+
+htrun runs a batch of --short tests taking --short-time seconds each, followed
+by one test taking --long-time seconds, with --fm against the stand-in fm_agent
+module (htrun.host_tests_toolbox.fm_agent_stub). The batch runs on one simulator,
+then on --instances simulators with no recorded durations, so in batch order,
+and again with the durations recorded by that run, so longest first.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HTRUN = (
+    "import sys; "
+    "from htrun.host_tests_toolbox import fm_agent_stub; "
+    "sys.modules['fm_agent'] = fm_agent_stub; "
+    "from htrun.htrun import main; "
+    "sys.exit(main())"
+)
+
+
+def run_batch(batch_path, htrun_args):
+    """Run htrun on a batch file, return its wall time in seconds."""
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        code = subprocess.call(
+            [
+                sys.executable,
+                "-c",
+                HTRUN,
+                "-m",
+                "FVP_MPS2_M3",
+                "--fm",
+                "DEFAULT",
+                "--fm-keep-warm",
+                "30",
+                "--batch",
+                batch_path,
+            ]
+            + htrun_args,
+            stdout=devnull,
+        )
+    assert code == 0, "htrun failed with %d" % code
+    return time.time() - start
+
+
+def write_image(path, seconds):
+    """Write a virtual DUT image printing output for about seconds."""
+    with open(path, "w") as f:
+        json.dump({"lines_per_case": 20, "line_rate": 20 / seconds}, f)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--short", type=int, default=6)
+    parser.add_argument("--short-time", type=float, default=1)
+    parser.add_argument("--long-time", type=float, default=4)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        batch_path = os.path.join(tmpdir, "batch.txt")
+        durations_path = os.path.join(tmpdir, "durations.json")
+        with open(batch_path, "w") as batch:
+            for job in range(args.short):
+                image_path = os.path.join(tmpdir, "short%d.json" % job)
+                write_image(image_path, args.short_time)
+                batch.write(image_path + "\n")
+            image_path = os.path.join(tmpdir, "long.json")
+            write_image(image_path, args.long_time)
+            batch.write(image_path + "\n")
+
+        instances = ["--fm-instances", str(args.instances)]
+        modes = [
+            ("1 instance", []),
+            (
+                "%d, batch order" % args.instances,
+                instances + ["--fm-durations", durations_path],
+            ),
+            (
+                "%d, longest first" % args.instances,
+                instances + ["--fm-durations", durations_path],
+            ),
+        ]
+        for name, htrun_args in modes:
+            print("%-20s %6.2f s" % (name, run_batch(batch_path, htrun_args)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
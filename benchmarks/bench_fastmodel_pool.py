@@ -0,0 +1,90 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Wall time of a batch of FastModel tests, with and without a warm simulator.
+
+Usage:
+    python benchmarks/bench_fastmodel_pool.py [--jobs 6] [--launch-time 2]
+
+htrun runs a batch of --jobs tests with --fm against the stand-in fm_agent
+module (htrun.host_tests_toolbox.fm_agent_stub), whose simulated model takes
+--launch-time seconds to launch. The batch runs once launching a model for each
+test and once with --fm-keep-warm.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = [
+    ("launch per test", []),
+    ("keep warm", ["--fm-keep-warm", "30"]),
+]
+
+HTRUN = (
+    "import sys; "
+    "from htrun.host_tests_toolbox import fm_agent_stub; "
+    "fm_agent_stub.LAUNCH_TIME = %f; "
+    "sys.modules['fm_agent'] = fm_agent_stub; "
+    "from htrun.htrun import main; "
+    "sys.exit(main())"
+)
+
+
+def run_batch(batch_path, launch_time, htrun_args):
+    """Run htrun on a batch file, return its wall time in seconds."""
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        code = subprocess.call(
+            [
+                sys.executable,
+                "-c",
+                HTRUN % launch_time,
+                "-m",
+                "FVP_MPS2_M3",
+                "--fm",
+                "DEFAULT",
+                "--batch",
+                batch_path,
+            ]
+            + htrun_args,
+            stdout=devnull,
+        )
+    assert code == 0, "htrun failed with %d" % code
+    return time.time() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--launch-time", type=float, default=2)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    batch_path = os.path.join(tmpdir, "batch.txt")
+    try:
+        with open(batch_path, "w") as batch:
+            for job in range(args.jobs):
+                image_path = os.path.join(tmpdir, "job%d.json" % job)
+                with open(image_path, "w") as f:
+                    json.dump({"testcases": 2, "lines_per_case": 20}, f)
+                batch.write(image_path + "\n")
+        for name, htrun_args in MODES:
+            elapsed = run_batch(batch_path, args.launch_time, htrun_args)
+            print(
+                "%-16s %6.2f s, %6.2f s per test" % (name, elapsed, elapsed / args.jobs)
+            )
+    finally:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Latency and throughput of the reference resource server and client.
+
+Usage:
+    python benchmarks/bench_grm.py [--cycles 200] [--round-trips 200]
+        [--lines 100000]
+
+The server shares virtual DUTs on the loopback interface. Measured:
+
+- allocation cycle: allocate, open the connection, close it and release
+- KV round trip: write a KV pair until a DUT echoing its input sends it back
+- output rate: DUT output streamed to the client, in lines and MB per second
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from htrun.grm import client as grm_client
+from htrun.grm.backends import Resource, virtual_resources
+from htrun.grm.server import ResourceServer
+
+
+class EchoResource(Resource):
+    """DUT echoing everything written to it."""
+
+    def __init__(self, resource_id):
+        """Create the resource."""
+        Resource.__init__(self, resource_id, "ECHO")
+        self.buffer = bytearray()
+        self.condition = threading.Condition()
+
+    def open(self, baudrate):
+        """Nothing to open."""
+        pass
+
+    def close(self):
+        """Wake up a pending read()."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def read(self, timeout):
+        """Return the bytes written so far."""
+        with self.condition:
+            if not self.buffer:
+                self.condition.wait(timeout)
+            data = bytes(self.buffer)
+            del self.buffer[:]
+        return data
+
+    def write(self, data):
+        """Queue the bytes for read()."""
+        with self.condition:
+            self.buffer += data
+            self.condition.notify()
+
+
+def allocation_cycles(client, count):
+    """Return the mean time of an allocation cycle, in seconds."""
+    parameters = grm_client.SerialParameters(baudrate=115200)
+    start = time.time()
+    for _ in range(count):
+        resource = client.allocate({"platform_name": "ECHO"})
+        resource.open_connection(parameters)
+        resource.close_connection()
+        resource.release()
+    return (time.time() - start) / count
+
+
+def round_trips(client, count):
+    """Return the mean KV round trip time, in seconds."""
+    resource = client.allocate({"platform_name": "ECHO"})
+    resource.open_connection()
+    start = time.time()
+    for i in range(count):
+        expected = ("{{echo;%d}}" % i).encode()
+        resource.write("{{echo;%d}}\n" % i)
+        received = b""
+        while expected not in received:
+            data = resource.read(2304)
+            if not data:
+                resource.wait(0.01)
+            received += data
+    elapsed = time.time() - start
+    resource.close_connection()
+    resource.release()
+    return elapsed / count
+
+
+def output_rate(client, lines, tmpdir):
+    """Return the (lines, bytes) per second streamed from a virtual DUT."""
+    image_path = os.path.join(tmpdir, "image.json")
+    with open(image_path, "w") as f:
+        json.dump({"testcases": 1, "lines_per_case": lines}, f)
+    resource = client.allocate({"platform_name": "VIRTUAL"})
+    resource.flash(image_path)
+    resource.open_connection()
+    start = time.time()
+    resource.write("{{__sync;0}}")
+    received = 0
+    tail = b""
+    while b"{{end;success}}" not in tail:
+        data = resource.read(65536)
+        if not data:
+            resource.wait(0.01)
+        received += len(data)
+        tail = tail[-32:] + data
+    elapsed = time.time() - start
+    resource.close_connection()
+    resource.release()
+    return lines / elapsed, received / elapsed
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--round-trips", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=100000)
+    args = parser.parse_args()
+    # Silence the server log
+    logging.getLogger("GRMS").setLevel(logging.WARNING)
+
+    server = ResourceServer(
+        [EchoResource("echo")] + virtual_resources(1, "VIRTUAL"), "127.0.0.1", 0
+    )
+    server.start()
+    client = grm_client.create("127.0.0.1", server.address[1])
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print(
+            "allocation cycle: %8.3f ms"
+            % (allocation_cycles(client, args.cycles) * 1e3)
+        )
+        print(
+            "KV round trip:    %8.3f ms" % (round_trips(client, args.round_trips) * 1e3)
+        )
+        lines, size = output_rate(client, args.lines, tmpdir)
+        print("output rate:      %8.0f lines/s, %.1f MB/s" % (lines, size / 1e6))
+    finally:
+        client.close()
+        server.close()
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
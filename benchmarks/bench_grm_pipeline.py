@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Wall time of a batch of grm tests, with and without warm and prefetched DUTs.
+
+Usage:
+    python benchmarks/bench_grm_pipeline.py [--jobs 6] [--flash-time 1]
+        [--test-time 1]
+
+A local resource server shares two virtual DUTs which take --flash-time seconds
+to flash. htrun runs a batch of --jobs tests, each printing output for about
+--test-time seconds, in three modes: one allocation per test, with
+--grm-keep-warm, and with --grm-keep-warm --grm-prefetch.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = [
+    ("allocate per test", []),
+    ("keep warm", ["--grm-keep-warm", "30"]),
+    ("keep warm + prefetch", ["--grm-keep-warm", "30", "--grm-prefetch"]),
+]
+
+
+def free_port():
+    """Return a TCP port nobody listens on."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def wait_for_port(port, timeout=10):
+    """Wait until a server listens on port."""
+    end = time.time() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except (IOError, OSError):
+            if time.time() > end:
+                raise
+            time.sleep(0.05)
+
+
+def run_batch(port, batch_path, htrun_args):
+    """Run htrun on a batch file, return its wall time in seconds."""
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        code = subprocess.call(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from htrun.htrun import main; sys.exit(main())",
+                "-m",
+                "VIRTUAL",
+                "--grm",
+                "htrun.grm:127.0.0.1:%d" % port,
+                "-R",
+                "0",
+                "--batch",
+                batch_path,
+            ]
+            + htrun_args,
+            stdout=devnull,
+        )
+    assert code == 0, "htrun failed with %d" % code
+    return time.time() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--flash-time", type=float, default=1)
+    parser.add_argument("--test-time", type=float, default=1)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    batch_path = os.path.join(tmpdir, "batch.txt")
+    with open(batch_path, "w") as batch:
+        for job in range(args.jobs):
+            image_path = os.path.join(tmpdir, "job%d.json" % job)
+            with open(image_path, "w") as f:
+                json.dump({"lines_per_case": 20, "line_rate": 20 / args.test_time}, f)
+            batch.write(image_path + "\n")
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "htrun.grm.server",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--virtual",
+            "2",
+            "--flash-time",
+            str(args.flash_time),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        for name, htrun_args in MODES:
+            elapsed = run_batch(port, batch_path, htrun_args)
+            print(
+                "%-22s %6.2f s, %6.2f s per test" % (name, elapsed, elapsed / args.jobs)
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
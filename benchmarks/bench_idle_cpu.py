@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""CPU use of the connection process while the DUT is idle.
+
+Usage:
+    python benchmarks/bench_idle_cpu.py [--seconds 3]
+
+conn_process() runs against a connector whose read() returns at once, like
+those of the remote and FastModel connectors. The DUT replies to the sync and
+then stays silent. The benchmark compares the adaptive poll() with the previous
+tight read loop, which is poll() without waiting.
+"""
+
+import argparse
+import queue
+import threading
+import time
+
+import mock
+
+from htrun.host_tests_conn_proxy.conn_primitive import ConnectorPrimitive
+from htrun.host_tests_conn_proxy.conn_proxy import conn_process
+
+
+class IdleConnector(ConnectorPrimitive):
+    """Non-blocking connector of a DUT which only replies to the sync."""
+
+    def __init__(self):
+        """Create the connector."""
+        ConnectorPrimitive.__init__(self, "IDLE")
+        self.output = b""
+        self.reads = 0
+
+    def read(self, count):
+        """Return the pending output at once."""
+        self.reads += 1
+        data, self.output = self.output, b""
+        return data
+
+    def write(self, payload, log=False):
+        """Reply to the sync."""
+        if payload.startswith("{{__sync;"):
+            self.output = payload.encode("utf-8")
+        return True
+
+    def flush(self):
+        """Nothing to flush."""
+        pass
+
+    def reset(self):
+        """Nothing to reset."""
+        pass
+
+    def connected(self):
+        """Always connected."""
+        return True
+
+    def finish(self):
+        """Nothing to release."""
+        pass
+
+
+def idle_cpu(connector, seconds):
+    """Return the CPU use of conn_process() in percent and reads per second."""
+    event_queue = queue.Queue()
+    dut_event_queue = queue.Queue()
+    result = {}
+
+    def run():
+        start = time.thread_time()
+        conn_process(event_queue, dut_event_queue, {"sync_behavior": 1})
+        result["cpu"] = time.thread_time() - start
+
+    with mock.patch(
+        "htrun.host_tests_conn_proxy.conn_proxy.conn_primitive_factory",
+        return_value=connector,
+    ), mock.patch("htrun.host_tests_conn_proxy.conn_proxy.HtrunLogger"):
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(seconds)
+        dut_event_queue.put(("__host_test_finished", True, time.time()))
+        thread.join()
+    return result["cpu"] / seconds * 100, connector.reads / seconds
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    tight = IdleConnector()
+    tight.wait = lambda timeout: None
+    for name, connector in (("tight loop", tight), ("adaptive poll", IdleConnector())):
+        connector.logger = mock.Mock()
+        cpu, reads = idle_cpu(connector, args.seconds)
+        print("%-14s %5.1f%% CPU, %9.0f reads/s" % (name, cpu, reads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Host time spent parsing a hex image flashed to many boards.
+
+Usage:
+    python benchmarks/bench_image_cache.py [--size 1024] [--boards 24]
+
+An Intel HEX image of --size KiB is flashed to --boards boards. Without
+--convert-image, pyOCD parses it with intelhex for every board. With it, the
+first board converts it to a cached binary and the next ones only hash it.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from intelhex import IntelHex
+
+from htrun.host_tests_runner.image_cache import ParsedImageCache
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024, help="KiB")
+    parser.add_argument("--boards", type=int, default=24)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image_path = os.path.join(tmpdir, "image.hex")
+        ihex = IntelHex()
+        ihex.frombytes(os.urandom(args.size * 1024), offset=0x08000000)
+        ihex.write_hex_file(image_path)
+
+        start = time.time()
+        for _ in range(args.boards):
+            ihex = IntelHex(image_path)
+            ihex.tobinstr(start=ihex.minaddr(), size=len(ihex))
+        parsed = time.time() - start
+
+        cache = ParsedImageCache(os.path.join(tmpdir, "cache"))
+        start = time.time()
+        first = cache.convert(image_path)
+        converted_first = time.time() - start
+        for _ in range(args.boards - 1):
+            assert cache.convert(image_path).path == first.path
+        converted = time.time() - start
+
+        print(
+            "parsed per board  %6.2f s total, %6.1f ms per board"
+            % (parsed, parsed * 1000 / args.boards)
+        )
+        print(
+            "converted once    %6.2f s total, %6.1f ms per board, %.1f ms first"
+            % (converted, converted * 1000 / args.boards, converted_first * 1000)
+        )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Run many htrun instances in parallel against local process DUTs.
+
+Usage:
+    python benchmarks/bench_parallel.py [--suites 32] [--lines 1000]
+
+Every suite is an htrun --process run of the virtual DUT on stdin and stdout, so
+no hardware is needed. The suites are run with 1, 2, 4, ... parallel htrun
+instances up to the number of CPUs, showing how test throughput scales.
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+
+def start_suite(lines):
+    """Start an htrun run of one suite, return the Popen object."""
+    dut = '"%s" -m htrun.host_tests_toolbox.virtual_dut --stdio --once ' % (
+        sys.executable
+    ) + "--testcases 10 --lines-per-case %d" % (lines // 10)
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from htrun.htrun import main; sys.exit(main())",
+            "-m",
+            "K64F",
+            "--process",
+            dut,
+        ],
+        stdout=open(os.devnull, "w"),
+    )
+
+
+def run_suites(suites, jobs, lines):
+    """Run suites with up to 'jobs' htrun instances at a time, return wall time."""
+    start = time.time()
+    running = []
+    pending = suites
+    while pending or running:
+        while pending and len(running) < jobs:
+            running.append(start_suite(lines))
+            pending -= 1
+        running[0].wait()
+        for process in [p for p in running if p.poll() is not None]:
+            assert process.returncode == 0, "htrun failed"
+            running.remove(process)
+    return time.time() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", type=int, default=32)
+    parser.add_argument("--lines", type=int, default=1000)
+    args = parser.parse_args()
+
+    jobs = 1
+    while True:
+        elapsed = run_suites(args.suites, jobs, args.lines)
+        print(
+            "%3d parallel: %6.2f s, %6.2f suites/s"
+            % (jobs, elapsed, args.suites / elapsed)
+        )
+        if jobs >= multiprocessing.cpu_count():
+            break
+        jobs = min(jobs * 2, multiprocessing.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
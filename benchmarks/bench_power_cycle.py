@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Latency of power cycle resets through the Mbed TAS resource manager API.
+
+Usage:
+    python benchmarks/bench_power_cycle.py [--targets 8] [--switch-time 0.2]
+
+A local mock resource manager (htrun.host_tests_toolbox.tas_rm_mock) simulates
+targets whose power switch takes --switch-time seconds. The power cycle reset
+plugin resets one target with fixed 2 s polling like before and with back-off
+polling. It then resets --targets targets one after another and all together.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from htrun.host_tests_plugins.module_power_cycle_target import (
+    HostTestPluginPowerCycleResetMethod,
+)
+from htrun.host_tests_toolbox.tas_rm_mock import MockResourceManager
+
+
+def power_cycle(target_ids, switch_time, batch=True, fixed_poll=None):
+    """Power cycle targets, return the time taken and the server statistics."""
+    server = MockResourceManager(target_ids, switch_time=switch_time, mount_time=0)
+    server.start()
+    os.environ["MBED_TAS_RM_IP"], port = server.address
+    os.environ["MBED_TAS_RM_PORT"] = str(port)
+    plugin = HostTestPluginPowerCycleResetMethod()
+    if fixed_poll:
+        plugin.POLL_MIN_INTERVAL = plugin.POLL_MAX_INTERVAL = fixed_poll
+    try:
+        start = time.time()
+        if batch:
+            results = plugin.power_cycle_targets({t: {} for t in target_ids})
+        else:
+            results = {t: plugin.power_cycle_targets({t: {}})[t] for t in target_ids}
+        elapsed = time.time() - start
+    finally:
+        server.close()
+    assert all(results.values()), "power cycle failed"
+    return elapsed, server.stats
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=int, default=8)
+    parser.add_argument("--switch-time", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.getLogger("urllib3").setLevel(logging.WARNING)
+
+    many = ["T%d" % i for i in range(args.targets)]
+    runs = [
+        ("1 target, 2 s polling", ["T0"], True, 2),
+        ("1 target, back-off", ["T0"], True, None),
+        ("%d targets, one by one" % len(many), many, False, None),
+        ("%d targets, batched" % len(many), many, True, None),
+    ]
+    for name, target_ids, batch, fixed_poll in runs:
+        elapsed, stats = power_cycle(target_ids, args.switch_time, batch, fixed_poll)
+        print(
+            "%-24s %6.3f s, %3d requests, %d connections"
+            % (name, elapsed, stats["requests"], stats["connections"])
+        )
+
+
+if __name__ == "__main__":
+    main()
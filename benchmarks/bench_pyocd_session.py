@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Time spent opening pyOCD sessions to flash, verify and reset a target.
+
+Usage:
+    python benchmarks/bench_pyocd_session.py [--runs 10] [--open-time 0.3]
+
+pyOCD sessions are simulated: opening one takes --open-time seconds, like probe
+enumeration, target detection and clock setup do. Each run flashes, verifies and
+resets the target through the pyOCD plugins, with a session per operation like
+before, then with the sessions kept in the cache.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from htrun.host_tests_plugins import (
+    module_copy_pyocd,
+    module_reset_pyocd,
+    pyocd_session,
+)
+from htrun.host_tests_plugins.module_copy_pyocd import HostTestPluginCopyMethod_pyOCD
+from htrun.host_tests_plugins.module_reset_pyocd import HostTestPluginResetMethod_pyOCD
+
+
+def simulated_session(open_time, image):
+    """Return a session factory of probes taking open_time seconds to open."""
+
+    class SimulatedSession(object):
+        def __init__(self, unique_id, **kwargs):
+            self.board = mock.Mock(target_type="k64f")
+            self.probe = mock.Mock()
+            self.target = mock.Mock()
+            self.target.memory_map.get_boot_memory.return_value.start = 0
+            self.target.read_memory_block8.side_effect = lambda a, n: image[:n]
+            self.is_open = False
+
+        def open(self):
+            time.sleep(open_time)
+            self.is_open = True
+
+        def close(self):
+            self.is_open = False
+
+    return SimulatedSession
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--open-time", type=float, default=0.3, help="seconds")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image = os.urandom(4096)
+        image_path = os.path.join(tmpdir, "image.bin")
+        with open(image_path, "wb") as f:
+            f.write(image)
+        copy = HostTestPluginCopyMethod_pyOCD()
+        copy.print_plugin_info = lambda text, NL=True: None
+        reset = HostTestPluginResetMethod_pyOCD()
+
+        def run():
+            # As with -r pyocd, the copy keeps its session for the reset
+            ok = copy.execute(
+                "pyocd",
+                image_path=image_path,
+                target_id="0240",
+                format="bin",
+                verify=True,
+                keep_session=True,
+            )
+            return ok and reset.execute("pyocd", target_id="0240")
+
+        with mock.patch.multiple(
+            module_copy_pyocd,
+            FileProgrammer=mock.Mock(),
+            PYOCD_PRESENT=True,
+            create=True,
+        ), mock.patch.object(
+            module_reset_pyocd, "PYOCD_PRESENT", True
+        ), mock.patch.object(
+            pyocd_session,
+            "ConnectHelper",
+            mock.Mock(
+                session_with_chosen_probe=simulated_session(args.open_time, image)
+            ),
+            create=True,
+        ):
+            timings = []
+            for idle_timeout in (0, pyocd_session.PyOCDSessionCache.IDLE_TIMEOUT):
+                # Without idle time, sessions close after each operation
+                pyocd_session.PYOCD_SESSIONS.idle_timeout = idle_timeout
+                start = time.time()
+                for _ in range(args.runs):
+                    assert run(), "run failed"
+                timings.append((time.time() - start) / args.runs)
+                pyocd_session.PYOCD_SESSIONS.clear()
+
+        for name, elapsed in zip(("session per operation", "cached session"), timings):
+            print("%-21s %6.3f s per run" % (name, elapsed))
+        print("saved                 %6.3f s per run" % (timings[0] - timings[1]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
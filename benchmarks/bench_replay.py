@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Replay a recorded session through htrun as fast as possible.
+
+Usage:
+    python benchmarks/bench_replay.py [--session FILE] [--runs 5] [--lines 100000]
+
+Without --session a session is recorded first, with htrun --record against the
+virtual DUT printing --lines lines of output. The session is then replayed with
+htrun --replay, which runs the connection process, KV parsing, the event lanes
+and the host test exactly as with a target, so the replay rate is a
+deterministic measure of the throughput of that pipeline.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_end_to_end import run_htrun, mean
+
+from htrun.host_tests_conn_proxy.session_log import read_session_log, RX
+
+
+def replay(session):
+    """Replay a session, return the wall time and exit code of htrun."""
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        code = subprocess.call(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from htrun.htrun import main; sys.exit(main())",
+                "-m",
+                "K64F",
+                "--replay",
+                session,
+            ],
+            stdout=devnull,
+        )
+    return time.time() - start, code
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--session", help="Session log to replay.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lines", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        session = args.session
+        if not session:
+            session = os.path.join(tmpdir, "session.htrs")
+            _, elapsed, code, _ = run_htrun(
+                tmpdir,
+                [
+                    "--testcases",
+                    "10",
+                    "--lines-per-case",
+                    str(args.lines // 10),
+                    "--timeout",
+                    "600",
+                ],
+                ["--record", session],
+            )
+            assert code == 0, "htrun failed with %d" % code
+            print("recorded in:         %8.2f s" % elapsed)
+
+        records = read_session_log(session)
+        rx_bytes = sum(len(payload) for kind, _, payload in records if kind == RX)
+        lines = sum(payload.count(b"\n") for kind, _, payload in records if kind == RX)
+        elapsed = []
+        for _ in range(args.runs):
+            duration, code = replay(session)
+            assert code == 0, "htrun failed with %d" % code
+            elapsed.append(duration)
+        print("replayed in:         %8.2f s" % mean(elapsed))
+        print("replay rate:         %8.0f lines/s" % (lines / mean(elapsed)))
+        print("                     %8.0f KB/s" % (rx_bytes / 1024.0 / mean(elapsed)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Soak test memory use of the host and connection process event path.
+
+Usage:
+    python benchmarks/bench_soak.py [--duration 60] [--ordered-rxd]
+
+A producer process plays the connection process: it feeds chatty synthetic
+target output through KiViBufferWalker and queues the events on EventLanes. The
+host process consumes them with the built-in WaitusTest, pausing regularly so the
+lanes fill up, spill and drop. The resident memory of both processes is sampled
+every second and should stay flat once the lanes are full.
+"""
+
+import argparse
+import time
+from multiprocessing import Event, Process
+
+from htrun.host_tests.wait_us_auto import WaitusTest
+from htrun.host_tests_conn_proxy import EventLanes
+from htrun.host_tests_conn_proxy.conn_proxy import KiViBufferWalker
+from htrun.host_tests_runner.host_test_default import QueueEmpty
+from htrun.host_tests_runner.rss import get_rss
+
+
+def produce(event_queue, stop):
+    """Queue chatty target output until stopped."""
+    kv_buffer = KiViBufferWalker()
+    chunk = b"".join(
+        b"[%04d] some target output to be captured\n{{tick;%d}}\n" % (i, i)
+        for i in range(32)
+    )
+    while not stop.is_set():
+        for line in kv_buffer.append(chunk):
+            event_queue.put(("__rxd_line", line, time.time()))
+        while kv_buffer.search():
+            event_queue.put(kv_buffer.pop_kv())
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--ordered-rxd", action="store_true")
+    parser.add_argument("--lane-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    event_queue = EventLanes(
+        bulk_size=args.lane_size,
+        ordered_rxd=args.ordered_rxd,
+        kv_size=args.lane_size,
+    )
+    host_test = WaitusTest()
+    host_test.setup()
+    stop = Event()
+    producer = Process(target=produce, args=(event_queue, stop))
+    producer.start()
+
+    events = 0
+    samples = []
+    start = time.time()
+    next_sample = start
+    try:
+        while time.time() - start < args.duration:
+            now = time.time()
+            if now >= next_sample:
+                next_sample += 1
+                samples.append((now - start, get_rss(), get_rss(producer.pid)))
+                # Fall behind for a while, so events pile up
+                time.sleep(0.2)
+            try:
+                key, value, timestamp = event_queue.get(timeout=1)
+            except QueueEmpty:
+                continue
+            events += 1
+            if key == "tick":
+                host_test._callback_tick(key, value, timestamp)
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                event_queue.get(timeout=0.1)
+            except QueueEmpty:
+                pass
+        producer.join()
+        event_queue.close()
+
+    mb = 1024.0 * 1024.0
+    for elapsed, host_rss, conn_rss in samples[:: max(1, len(samples) // 10)]:
+        print(
+            "%6.1f s  host %7.1f MB  producer %7.1f MB"
+            % (elapsed, host_rss / mb, (conn_rss or 0) / mb)
+        )
+    # Lanes fill up during the first part of the run, compare the second half
+    middle, last = samples[len(samples) // 2], samples[-1]
+    print(
+        "%d events in %d s, %d ticks, growth over the second half: host %+.1f MB, "
+        "producer %+.1f MB"
+        % (
+            events,
+            args.duration,
+            host_test.tick_count,
+            (last[1] - middle[1]) / mb,
+            ((last[2] or 0) - (middle[2] or 0)) / mb,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
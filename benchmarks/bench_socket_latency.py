@@ -0,0 +1,98 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""KV round trip latency of the socket connector compared to the serial one.
+
+Usage:
+    python benchmarks/bench_socket_latency.py [--round-trips 200]
+
+Each connector writes a KV pair and reads until the pair is echoed back: the
+socket connector by a TCP echo server on the loopback interface, the serial
+connector by an echo loop on the other side of a pseudo-terminal (Linux and
+macOS only).
+"""
+
+import argparse
+import os
+import select
+import socket
+import threading
+import time
+
+from htrun.host_tests_conn_proxy.conn_primitive_socket import (
+    SocketConnectorPrimitive,
+)
+from htrun.host_tests_conn_proxy.conn_primitive_serial import (
+    SerialConnectorPrimitive,
+)
+
+CONFIG = {"skip_reset": True, "polling_timeout": 5}
+
+
+def echo_socket(listener):
+    """Echo everything received on the first connection."""
+    conn, _ = listener.accept()
+    while True:
+        data = conn.recv(4096)
+        if not data:
+            break
+        conn.sendall(data)
+
+
+def echo_fd(fd):
+    """Echo everything received on a pseudo-terminal master."""
+    while True:
+        select.select([fd], [], [])
+        try:
+            data = os.read(fd, 4096)
+        except OSError:
+            break
+        os.write(fd, data)
+
+
+def round_trips(connector, count):
+    """Return the mean KV round trip time of a connector, in seconds."""
+    start = time.time()
+    for i in range(count):
+        expected = ("{{echo;%d}}" % i).encode()
+        connector.write_kv("echo", i)
+        received = b""
+        while expected not in received:
+            received += connector.read(2304)
+    return (time.time() - start) / count
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--round-trips", type=int, default=200)
+    args = parser.parse_args()
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    thread = threading.Thread(target=echo_socket, args=(listener,))
+    thread.daemon = True
+    thread.start()
+    connector = SocketConnectorPrimitive(
+        "SOCK", "tcp://127.0.0.1:%d" % listener.getsockname()[1], 115200, CONFIG
+    )
+    print("socket: %8.3f ms" % (round_trips(connector, args.round_trips) * 1e3))
+    connector.finish()
+
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    thread = threading.Thread(target=echo_fd, args=(master,))
+    thread.daemon = True
+    thread.start()
+    connector = SerialConnectorPrimitive("SERI", os.ttyname(slave), 115200, CONFIG)
+    print("serial: %8.3f ms" % (round_trips(connector, args.round_trips) * 1e3))
+    connector.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Flash time of pyOCD at the default SWD clock and at tuned clocks.
+
+Usage:
+    python benchmarks/bench_swd_clock.py [--size 64] [--max-clocks 24,16,12,8]
+
+pyOCD sessions are simulated: each board handles SWD clocks up to its entry of
+--max-clocks in MHz. Faster, reads return garbage and programming fails.
+Programming moves a byte per 80 clock cycles. An image of --size KiB is flashed
+to every board at the default 10 MHz, then with --swd-clock auto, tuning the
+boards, and again with the tuned clocks read from the cache.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from htrun.host_tests_plugins import module_copy_pyocd, pyocd_clock
+from htrun.host_tests_plugins.module_copy_pyocd import HostTestPluginCopyMethod_pyOCD
+
+# Clock cycles per byte programmed
+CYCLES_PER_BYTE = 80
+
+
+class SimulatedSession(object):
+    """pyOCD session of a board, without hardware."""
+
+    max_clocks = {}
+
+    def __init__(self, unique_id, **kwargs):
+        """Create the session of a board."""
+        self.unique_id = unique_id
+        self.clock = None
+        self.board = mock.Mock(target_type="k64f")
+        self.probe = mock.Mock()
+        self.probe.set_clock.side_effect = lambda clock: setattr(self, "clock", clock)
+        self.target = mock.Mock()
+        self.target.memory_map.get_boot_memory.return_value.start = 0
+        self.target.read_memory_block8.side_effect = self.read
+        self.is_open = False
+
+    @property
+    def reliable(self):
+        """Whether the board handles the clock set."""
+        return self.clock <= self.max_clocks[self.unique_id]
+
+    def read(self, address, size):
+        """Read memory, garbage if the clock is too fast."""
+        time.sleep(size * CYCLES_PER_BYTE / 10.0 / self.clock)
+        return [0 if self.reliable else 0xFF] * size
+
+    def open(self):
+        """Nothing to open."""
+        self.is_open = True
+
+    def close(self):
+        """Nothing to close."""
+        self.is_open = False
+
+
+class SimulatedFlashLoader(object):
+    """Flash loader programming at the clock of the session."""
+
+    def __init__(self, session):
+        """Create a loader."""
+        self.session = session
+        self.size = 0
+
+    def add_data(self, address, data):
+        """Add data to program."""
+        self.size += len(data)
+
+    def commit(self):
+        """Program the data, failing if the clock is too fast."""
+        time.sleep(self.size * CYCLES_PER_BYTE / float(self.session.clock))
+        if not self.session.reliable:
+            raise IOError("transfer fault")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=64, help="KiB")
+    parser.add_argument("--max-clocks", default="24,16,12,8", help="MHz")
+    args = parser.parse_args()
+    max_clocks = [int(float(mhz) * 1000000) for mhz in args.max_clocks.split(",")]
+    target_ids = ["%04d" % board for board in range(len(max_clocks))]
+    SimulatedSession.max_clocks = dict(zip(target_ids, max_clocks))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image_path = os.path.join(tmpdir, "image.bin")
+        with open(image_path, "wb") as f:
+            f.write(os.urandom(args.size * 1024))
+        tuner = pyocd_clock.ClockTuner(os.path.join(tmpdir, "swd_clocks.json"))
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        plugin.print_plugin_info = lambda text, NL=True: None
+
+        with mock.patch.multiple(
+            module_copy_pyocd,
+            FlashLoader=SimulatedFlashLoader,
+            # pyOCD's transfer errors, simulated by IOError
+            LINK_ERRORS=(IOError,),
+            PYOCD_PRESENT=True,
+            create=True,
+        ), mock.patch.object(
+            module_copy_pyocd.PYOCD_SESSIONS, "open", lambda t, b: SimulatedSession(t)
+        ), mock.patch.object(
+            pyocd_clock, "CLOCK_TUNER", tuner
+        ):
+            for name, swd_clock in (
+                ("10 MHz", None),
+                ("auto, tuning", "auto"),
+                ("auto, cached", "auto"),
+            ):
+                print(name)
+                for target_id in target_ids:
+                    start = time.time()
+                    result = plugin.flash_many(
+                        [(target_id, image_path)], swd_clock=swd_clock
+                    )[0]
+                    print(
+                        "  %s (max %2d MHz) %s in %5.2f s"
+                        % (
+                            target_id,
+                            SimulatedSession.max_clocks[target_id] / 1000000,
+                            "flashed" if result.ok else "FAILED ",
+                            time.time() - start,
+                        )
+                    )
+        module_copy_pyocd.PYOCD_SESSIONS.clear()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Shared fixtures of the htrun microbenchmarks.
+
+The benchmarks replay target output captured from greentea test runs, stored in
+the data directory, through the code htrun runs for every byte or event.
+"""
+
+import logging
+import os
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # The benchmark fixture is provided by pytest-benchmark
+    collect_ignore_glob = ["test_*.py"]
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Captured target output, see data/
+CAPTURED_LOGS = ["ticker", "netsocket"]
+
+# Bytes read from the serial port at once by the connection process
+READ_SIZE = 2304
+
+
+def pytest_configure(config):
+    """Send the htrun log to /dev/null instead of the captured stdout.
+
+    HtrunLogger configures logging with logging.basicConfig(), which does
+    nothing once the root logger has a handler. The log records are still
+    formatted and emitted, so logging costs are part of the numbers.
+    """
+    logging.basicConfig(
+        stream=open(os.devnull, "w"),
+        format="[%(created).2f][%(name)s]%(message)s",
+        level=logging.DEBUG,
+    )
+
+
+def read_log(name):
+    """Return captured target output as bytes."""
+    with open(os.path.join(DATA_DIR, name + ".log"), "rb") as f:
+        return f.read()
+
+
+def read_chunks(data, size=READ_SIZE):
+    """Split target output the way the connection process reads it."""
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def log_events(data):
+    """Return the events the connection process queues for target output.
+
+    Args:
+        data: Captured target output.
+
+    Returns:
+        List of (key, value) tuples, '__rxd_line' events for lines of output and
+        KV events for KV pairs.
+    """
+    # Imported here, so collection does not set up logging before
+    # pytest_configure()
+    from htrun.host_tests_conn_proxy.conn_proxy import KiViBufferWalker
+
+    kv_buffer = KiViBufferWalker()
+    events = []
+    for chunk in read_chunks(data):
+        for line in kv_buffer.append(chunk):
+            events.append(("__rxd_line", line))
+        while kv_buffer.search():
+            key, value, _ = kv_buffer.pop_kv()
+            events.append((key, value))
+    return events
+
+
+@pytest.fixture(params=CAPTURED_LOGS)
+def captured_log(request):
+    """Captured target output of each greentea test run, as bytes."""
+    return read_log(request.param)
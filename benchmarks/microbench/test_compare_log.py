@@ -0,0 +1,31 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""DefaultTestSelector.match_log matching target output with --compare-log."""
+
+import os
+
+from conftest import DATA_DIR, log_events, read_log
+
+from htrun.host_tests_runner.compare_log import CompareLog
+
+
+def test_match_log(benchmark):
+    """Match the lines of a captured log until the compare log is complete."""
+    lines = [
+        value for key, value in log_events(read_log("netsocket")) if key == "__rxd_line"
+    ]
+    golden = os.path.join(DATA_DIR, "netsocket.golden")
+
+    def match_all():
+        compare_log = CompareLog(golden)
+        try:
+            for line in lines:
+                if compare_log.match(line):
+                    return True
+            return False
+        finally:
+            compare_log.close()
+
+    assert benchmark(match_all)
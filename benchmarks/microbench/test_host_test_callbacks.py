@@ -0,0 +1,71 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""BaseHostTest callback registration and dispatch."""
+
+from time import time
+
+from conftest import log_events
+
+from htrun import BaseHostTest, event_callback
+
+
+class TickerHostTest(BaseHostTest):
+    """Host test with callbacks for the events of the captured logs."""
+
+    def __init__(self):
+        """Initialise the host test."""
+        BaseHostTest.__init__(self)
+        self.count = 0
+
+    def setup(self):
+        """Register callbacks the way most host tests do."""
+        self.register_callback("tick", self._callback_tick)
+        self.register_callback("end", self._callback_end, force=True)
+        self.register_callback("timing_drift_check_start", self._callback_drift)
+
+    def _callback_tick(self, key, value, timestamp):
+        self.count += 1
+
+    def _callback_end(self, key, value, timestamp):
+        self.count += 1
+
+    def _callback_drift(self, key, value, timestamp):
+        self.count += 1
+
+    @event_callback("base_time")
+    def _callback_base_time(self, key, value, timestamp):
+        self.count += 1
+
+
+def test_register_callback(benchmark):
+    """Create and set up a host test, registering its callbacks."""
+
+    def create():
+        host_test = TickerHostTest()
+        host_test.setup()
+        return host_test
+
+    host_test = benchmark(create)
+    assert "tick" in host_test.get_consumed_keys()
+
+
+def test_callback_dispatch(benchmark, captured_log):
+    """Dispatch the KV events of a test run to the host test callbacks."""
+    host_test = TickerHostTest()
+    host_test.setup()
+    events = [
+        (key, value, time())
+        for key, value in log_events(captured_log)
+        if key != "__rxd_line"
+    ]
+
+    def dispatch_all():
+        callbacks = host_test.get_callbacks()
+        for key, value, timestamp in events:
+            if key in callbacks:
+                callbacks[key](key, value, timestamp)
+
+    benchmark(dispatch_all)
+    assert host_test.count > 0
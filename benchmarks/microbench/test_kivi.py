@@ -0,0 +1,33 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""KiViBufferWalker parsing target output into lines and KV pairs."""
+
+from conftest import read_chunks
+
+from htrun.host_tests_conn_proxy.conn_proxy import KiViBufferWalker
+
+
+def parse(chunks):
+    """Parse target output the way the connection process does."""
+    kv_buffer = KiViBufferWalker()
+    lines = kv_pairs = 0
+    for chunk in chunks:
+        lines += len(kv_buffer.append(chunk))
+        while kv_buffer.search():
+            kv_buffer.pop_kv()
+            kv_pairs += 1
+    return lines, kv_pairs
+
+
+def test_append_pop_kv(benchmark, captured_log):
+    """Parse target output read in serial port sized chunks."""
+    lines, kv_pairs = benchmark(parse, read_chunks(captured_log))
+    assert kv_pairs > 0 and lines > 0
+
+
+def test_append_pop_kv_small_reads(benchmark, captured_log):
+    """Parse target output trickling in a few bytes at a time."""
+    lines, kv_pairs = benchmark(parse, read_chunks(captured_log, 16))
+    assert kv_pairs > 0 and lines > 0
@@ -0,0 +1,35 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""HtrunLogger calls made for every line of target output."""
+
+from conftest import log_events
+
+from htrun.host_tests_logger import HtrunLogger
+
+
+def test_prn_rxd(benchmark, captured_log):
+    """Log every line of target output, like the connection process."""
+    logger = HtrunLogger("CONN")
+    lines = [value for key, value in log_events(captured_log) if key == "__rxd_line"]
+
+    def log_all():
+        for line in lines:
+            logger.prn_rxd(line)
+
+    benchmark(log_all)
+
+
+def test_prn_inf_kv(benchmark, captured_log):
+    """Log every KV pair found in target output."""
+    logger = HtrunLogger("CONN")
+    kv_pairs = [event for event in log_events(captured_log) if event[0] != "__rxd_line"]
+
+    def log_all():
+        for key, value in kv_pairs:
+            logger.prn_inf(
+                "found KV pair in stream: {{%s;%s}}, queued..." % (key, value)
+            )
+
+    benchmark(log_all)
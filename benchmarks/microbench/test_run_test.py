@@ -0,0 +1,50 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""DefaultTestSelector.run_test event loop fed from a pre-filled event queue."""
+
+import queue
+from time import time
+
+import mock
+from conftest import log_events
+
+from htrun import init_host_test_cli_parser
+from htrun.host_tests_conn_proxy import EventLanes
+from htrun.host_tests_runner.host_test_default import DefaultTestSelector
+
+
+def make_options():
+    """Return options of an htrun run without flashing or reset."""
+    options, _ = init_host_test_cli_parser().parse_args([])
+    options.enum_host_tests = []
+    options.micro = "K64F"
+    options.process_start_timeout = 1
+    options.skip_reset = True
+    return options
+
+
+def test_run_test(benchmark, captured_log):
+    """Run the event loop over the events of a captured test run."""
+    selector = DefaultTestSelector(make_options())
+    events = [("__conn_process_start", 1)] + log_events(captured_log)
+    prefilled = []
+
+    def fill():
+        event_queue = EventLanes()
+        for key, value in events:
+            event_queue.put((key, value, time()))
+        prefilled.append(event_queue)
+
+    with mock.patch(
+        "htrun.host_tests_runner.host_test_default.EventLanes",
+        side_effect=lambda **kwargs: prefilled.pop(),
+    ), mock.patch(
+        "htrun.host_tests_runner.host_test_default.Queue",
+        side_effect=queue.Queue,
+    ), mock.patch(
+        "htrun.host_tests_runner.host_test_default.Process"
+    ):
+        result = benchmark.pedantic(selector.run_test, setup=fill, rounds=50)
+    assert result is True
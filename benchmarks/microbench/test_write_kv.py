@@ -0,0 +1,29 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""ConnectorPrimitive.write_kv formatting KV pairs sent to the target."""
+
+from htrun.host_tests_conn_proxy.conn_primitive import ConnectorPrimitive
+
+
+class NullConnector(ConnectorPrimitive):
+    """Connector accepting every write."""
+
+    def write(self, payload, log=False):
+        """Accept the payload."""
+        return True
+
+
+def test_write_kv(benchmark):
+    """Send the KV pairs of a sync and an echo exchange."""
+    connector = NullConnector("CONN")
+    kv_pairs = [("__sync", "7b5b6f0e-5d2c-4e8e-9c1a-3f0d2b8a6c41")] + [
+        ("echo", "c2a9f1d4-88b0-4f6e-a7d3-51e0c9b27e%02d" % i) for i in range(100)
+    ]
+
+    def write_all():
+        for key, value in kv_pairs:
+            connector.write_kv(key, value)
+
+    benchmark(write_all)
@@ -36,13 +36,14 @@ def get_plugin_caps(methods=None):
     return result
 
 
-def init_host_test_cli_params():
-    """Create CLI parser object and return populated options object.
+def init_host_test_cli_parser():
+    """Create the CLI parser object of htrun.
 
-    Options object can be used to populate host test selector script.
+    Options parsed from an empty argument list hold the defaults of all
+    options, e.g. for benchmarks driving DefaultTestSelector.
 
     Returns:
-        'options' object returned from OptionParser class.
+        OptionParser object.
     """
     parser = OptionParser()
 
@@ -105,6 +106,17 @@ def init_host_test_cli_params():
         metavar="IMAGE_PATH",
     )
 
+    parser.add_option(
+        "",
+        "--batch",
+        dest="batch",
+        default=None,
+        metavar="FILE",
+        help="Run a test for each image path listed in FILE, one per line, in this "
+        "htrun process. The other options apply to every test. The exit code is "
+        "the one of the first test which did not pass.",
+    )
+
     copy_methods_str = "Plugin support: " + ", ".join(
         host_tests_plugins.get_plugin_caps("CopyMethod")
     )
@@ -113,7 +125,8 @@ def init_host_test_cli_params():
         "-c",
         "--copy",
         dest="copy_method",
-        help="Copy (flash the target) method selector. " + copy_methods_str,
+        help="Copy (flash the target) method selector, 'auto' for the method "
+        "fastest to succeed in earlier runs for this MCU. " + copy_methods_str,
         metavar="COPY_METHOD",
     )
 
@@ -148,7 +161,8 @@ def init_host_test_cli_params():
         "-r",
         "--reset",
         dest="forced_reset_type",
-        help="Forces different type of reset. " + reset_methods_str,
+        help="Forces different type of reset, 'auto' for the method fastest to "
+        "succeed in earlier runs for this MCU. " + reset_methods_str,
     )
 
     parser.add_option(
@@ -235,23 +249,114 @@ def init_host_test_cli_params():
         ),
     )
 
-    # Show --fm option only if "fm_agent" module installed
+    parser.add_option(
+        "",
+        "--grm-keep-warm",
+        dest="grm_keep_warm",
+        default=0,
+        type="float",
+        metavar="SECONDS",
+        help="Keep the --grm resource allocated and connected for up to SECONDS "
+        "after a test, so the next test run by this htrun process (see --batch) "
+        "skips allocation and connection. Default 0, release it after each test.",
+    )
+
+    parser.add_option(
+        "",
+        "--grm-prefetch",
+        dest="grm_prefetch",
+        default=False,
+        action="store_true",
+        help="With --batch, allocate, flash and connect the --grm resource of the "
+        "next test while the current test runs. Uses a second resource.",
+    )
+
+    # Show --fm options only if "fm_agent" module installed
     try:
         imp.find_module("fm_agent")
     except ImportError:
-        fm_help = SUPPRESS_HELP
+        fm_installed = False
     else:
-        fm_help = (
-            "Fast Model connection, This option requires mbed-fastmodel-agent "
-            'module installed, list CONFIGs via "mbedfm"'
-        )
+        fm_installed = True
+
+    def fm_help(text):
+        return text if fm_installed else SUPPRESS_HELP
+
     parser.add_option(
         "",
         "--fm",
         dest="fast_model_connection",
         metavar="CONFIG",
         default=None,
-        help=fm_help,
+        help=fm_help(
+            "Fast Model connection, This option requires mbed-fastmodel-agent "
+            'module installed, list CONFIGs via "mbedfm"'
+        ),
+    )
+
+    parser.add_option(
+        "",
+        "--fm-keep-warm",
+        dest="fm_keep_warm",
+        type="float",
+        default=0,
+        metavar="SECONDS",
+        help=fm_help(
+            "Keep the --fm simulator running for up to SECONDS after a test, so "
+            "the next test run by this htrun process (see --batch) resets it and "
+            "loads its image instead of launching a new model. Default 0, shut it "
+            "down after each test."
+        ),
+    )
+
+    parser.add_option(
+        "",
+        "--fm-instances",
+        dest="fm_instances",
+        type="int",
+        default=1,
+        metavar="N",
+        help=fm_help(
+            "With --batch, run the tests on N --fm simulators at once, each test "
+            "in its own worker process. 0 for one simulator per CPU core. "
+            "Default 1."
+        ),
+    )
+
+    parser.add_option(
+        "",
+        "--fm-memory-budget",
+        dest="fm_memory_budget",
+        type="int",
+        default=0,
+        metavar="MiB",
+        help=fm_help(
+            "Limit --fm-instances to the number of simulators fitting in MiB of "
+            "memory, see --fm-instance-memory. Default 0, no limit."
+        ),
+    )
+
+    parser.add_option(
+        "",
+        "--fm-instance-memory",
+        dest="fm_instance_memory",
+        type="int",
+        default=1024,
+        metavar="MiB",
+        help=fm_help("Memory used by one --fm simulator. Default 1024 MiB."),
+    )
+
+    parser.add_option(
+        "",
+        "--fm-durations",
+        dest="fm_durations",
+        default=None,
+        metavar="FILE",
+        help=fm_help(
+            "JSON file the test durations are recorded in with --fm-instances, "
+            "so the longest tests start first. Default "
+            "$XDG_CACHE_HOME/htrun/fm_durations.json."
+        ),
     )
 
     parser.add_option(
@@ -342,6 +447,95 @@ def init_host_test_cli_params():
         help="Log file to compare with the serial output from target.",
     )
 
+    parser.add_option(
+        "",
+        "--rxd-lane-size",
+        dest="rxd_lane_size",
+        default=10000,
+        type="int",
+        help="Maximum number of target output lines waiting to be handled by the "
+        "host test. Lines received while the limit is reached are dropped and "
+        "reported. Lines are never dropped with --serial-output-file or "
+        "--compare-log. Default 10000.",
+    )
+
+    parser.add_option(
+        "",
+        "--kv-lane-size",
+        dest="kv_lane_size",
+        default=10000,
+        type="int",
+        help="Maximum number of events waiting in memory to be handled by the host "
+        "test. Further events are written to temporary files until the host test "
+        "catches up. Default 10000.",
+    )
+
+    parser.add_option(
+        "",
+        "--socket",
+        dest="socket",
+        default=None,
+        metavar="URL",
+        help="Connect to the target serial port exported by a serial-over-Ethernet "
+        "server instead of a local serial port. URL is rfc2217://HOST:PORT for an "
+        "RFC 2217 server, which also resets the target with a break, or "
+        "tcp://HOST:PORT for a raw TCP server. The baud rate is taken from -p or "
+        "--baud-rate.",
+    )
+
+    parser.add_option(
+        "",
+        "--process",
+        dest="process",
+        default=None,
+        metavar="COMMAND",
+        help="Run the test binary as a local process and talk to it over its "
+        "stdin and stdout instead of a serial port, e.g. a test binary built for "
+        "the host or an emulator command line. {image_path} in COMMAND is "
+        "replaced with the image path given with -f. Flashing is skipped, reset "
+        "restarts the process.",
+    )
+
+    parser.add_option(
+        "",
+        "--record",
+        dest="record",
+        default=None,
+        metavar="FILE",
+        help="Record the traffic between htrun and the target to a session log, "
+        "which can be replayed with --replay.",
+    )
+
+    parser.add_option(
+        "",
+        "--replay",
+        dest="replay",
+        default=None,
+        metavar="FILE",
+        help="Replay a session log recorded with --record instead of connecting "
+        "to a target. Flashing and reset are skipped.",
+    )
+
+    parser.add_option(
+        "",
+        "--replay-speed",
+        dest="replay_speed",
+        default=0,
+        type="float",
+        help="Speed of --replay relative to the recorded session, e.g. 1 for the "
+        "recorded timing. Default 0, as fast as possible.",
+    )
+
+    parser.add_option(
+        "",
+        "--max-rss",
+        dest="max_rss",
+        default=None,
+        type="int",
+        help="Stop the test with an error when the resident memory of the host or "
+        "connection process exceeds this size, in megabytes.",
+    )
+
     parser.add_option(
         "",
         "--version",
@@ -358,13 +552,102 @@ def init_host_test_cli_params():
         help="Image file format passed to pyocd (elf, bin, hex, axf...).",
     )
 
+    parser.add_option(
+        "",
+        "--convert-image",
+        dest="convert_image",
+        default=False,
+        action="store_true",
+        help="Convert hex and elf images to binaries for copy methods taking "
+        "them (pyocd), once per image content",
+    )
+
+    parser.add_option(
+        "",
+        "--image-cache",
+        dest="image_cache_dir",
+        help="Directory of the binaries converted by --convert-image, "
+        "$XDG_CACHE_HOME/htrun/images by default",
+        metavar="DIR",
+    )
+
+    parser.add_option(
+        "",
+        "--image-cache-size",
+        dest="image_cache_size",
+        default=512,
+        type=int,
+        help="Size limit of the --image-cache directory in MiB, least recently "
+        "used binaries are removed first (default 512)",
+        metavar="MIB",
+    )
+
+    parser.add_option(
+        "",
+        "--swd-clock",
+        dest="swd_clock",
+        help="SWD clock in Hz used by the pyocd copy method, or 'auto' to find "
+        "the fastest reliable clock of each board and cache it",
+        metavar="SWD_CLOCK",
+    )
+
+    parser.add_option(
+        "",
+        "--lease",
+        dest="lease",
+        default=False,
+        action="store_true",
+        help="Wait for other htrun processes using the board (target ID, or "
+        "serial port) to finish, in the order they asked for it",
+    )
+
+    parser.add_option(
+        "",
+        "--lease-dir",
+        dest="lease_dir",
+        help="Directory of the board leases taken by --lease, shared by all "
+        "htrun processes using the boards, $XDG_CACHE_HOME/htrun/leases by "
+        "default",
+        metavar="DIR",
+    )
+
+    parser.add_option(
+        "",
+        "--lease-timeout",
+        dest="lease_timeout",
+        type=float,
+        help="Seconds to wait for the board with --lease (default no limit)",
+        metavar="SECONDS",
+    )
+
+    parser.add_option(
+        "",
+        "--lease-usage",
+        dest="lease_usage",
+        default=False,
+        action="store_true",
+        help="Prints how long boards were held and waited for with --lease "
+        "and exits",
+    )
+
     parser.description = (
         """Flash, reset and perform host supervised tests on Mbed enabled platforms"""
     )
     parser.epilog = (
         """Example: htrun -d E: -p COM5 -f "test.bin" -C 4 -c shell -m K64F"""
     )
+    return parser
 
+
+def init_host_test_cli_params():
+    """Create CLI parser object and return populated options object.
+
+    Options object can be used to populate host test selector script.
+
+    Returns:
+        'options' object returned from OptionParser class.
+    """
+    parser = init_host_test_cli_parser()
     (options, _) = parser.parse_args()
 
     if len(sys.argv) == 1:
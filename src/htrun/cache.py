@@ -0,0 +1,83 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Files htrun keeps between runs, in the user's cache directory."""
+
+import contextlib
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, files aren't locked
+    fcntl = None
+
+
+def cache_path(*parts):
+    """Return a path in the htrun cache directory.
+
+    The cache directory is $XDG_CACHE_HOME/htrun, ~/.cache/htrun if
+    XDG_CACHE_HOME isn't set.
+
+    Args:
+        parts: Path components under the cache directory.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_dir, "htrun", *parts)
+
+
+def atomic_write(path, data):
+    """Write a file, replacing it atomically.
+
+    The data is written to a temporary file in the same directory, which is then
+    renamed, so readers see the old or the new file but never a partial one. The
+    temporary file is removed if writing fails.
+
+    Args:
+        path: Path of the file, its directory is created if needed.
+        data: Content of the file, str or bytes.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive flock() of a lock file, waiting until it is free.
+
+    Used to read, update and write a cache file shared by htrun processes
+    without losing the updates of another process. Nothing is locked on OSes
+    without flock().
+
+    Args:
+        path: Path of the lock file, created with its directory if needed.
+    """
+    if fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
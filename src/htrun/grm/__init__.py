@@ -0,0 +1,12 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Reference global resource manager (grm) sharing DUTs with other hosts.
+
+Start the server on the host the boards are attached to with
+'python -m htrun.grm.server', then run htrun on any host with
+'--grm htrun.grm:SERVER_HOST:3334'.
+"""
+
+from .client import create, SerialParameters
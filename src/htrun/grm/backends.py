@@ -0,0 +1,290 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Resources shared by the resource server: local boards and virtual DUTs."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from ..host_tests_toolbox.virtual_dut import VirtualDut
+
+
+class Resource(object):
+    """A DUT shared by the resource server.
+
+    Subclasses implement the DUT specific operations. A resource is only used by
+    the client which allocated it, and only one thread reads from it.
+    """
+
+    # Largest chunk of output returned by read(), in bytes
+    READ_CHUNK = 65536
+
+    def __init__(self, resource_id, platform_name, tags=()):
+        """Describe the resource.
+
+        Args:
+            resource_id: Unique ID of the resource on the server.
+            platform_name: Platform name, e.g. 'K64F'.
+            tags: Tags clients can require when allocating a resource.
+        """
+        self.id = resource_id
+        self.platform_name = platform_name
+        self.tags = frozenset(tags)
+
+    def info(self):
+        """Return a JSON serializable description of the resource."""
+        return {
+            "id": self.id,
+            "platform_name": self.platform_name,
+            "tags": sorted(self.tags),
+        }
+
+    def open(self, baudrate):
+        """Open the connection to the DUT, or reuse the one left open."""
+        raise NotImplementedError
+
+    def close(self):
+        """End the use of the connection, it may be kept open for the next one.
+
+        Called while the output is read in another thread, a pending read()
+        should return early.
+        """
+        pass
+
+    def flash(self, image, filename, forceflash=False):
+        """Flash an image to the DUT.
+
+        Args:
+            image: Content of the image.
+            filename: Name of the image file on the client.
+            forceflash: Flash even if the image is already flashed.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Reset the DUT."""
+        raise NotImplementedError
+
+    def read(self, timeout):
+        """Return DUT output, waiting up to timeout seconds for it."""
+        raise NotImplementedError
+
+    def write(self, data):
+        """Write bytes to the DUT."""
+        raise NotImplementedError
+
+
+class VirtualResource(Resource):
+    """Stand-in DUT running a virtual DUT, for use without boards.
+
+    The flashed "image" is a JSON object of VirtualDut arguments, e.g.
+    {"testcases": 3, "lines_per_case": 100}. Any other image runs a virtual DUT
+    with default arguments.
+    """
+
+    def __init__(self, resource_id, platform_name, tags=(), flash_time=0):
+        """Create the resource, see Resource.
+
+        Args:
+            resource_id: Unique ID of the resource on the server.
+            platform_name: Platform name.
+            tags: Tags clients can require when allocating a resource.
+            flash_time: Time flashing takes, to stand in for a real board.
+        """
+        Resource.__init__(self, resource_id, platform_name, tags)
+        self.flash_time = flash_time
+        self.dut_config = {}
+        self.dut = None
+        self.condition = threading.Condition()
+
+    def open(self, baudrate):
+        """Start the virtual DUT if it is not running yet."""
+        with self.condition:
+            if self.dut is None:
+                self.dut = VirtualDut(**self.dut_config)
+
+    def flash(self, image, filename, forceflash=False):
+        """Load the virtual DUT arguments from the image."""
+        try:
+            config = json.loads(image.decode("utf-8"))
+        except ValueError:
+            config = None
+        self.dut_config = config if isinstance(config, dict) else {}
+        time.sleep(self.flash_time)
+        self.reset()
+
+    def reset(self):
+        """Restart the virtual DUT."""
+        with self.condition:
+            self.dut = VirtualDut(**self.dut_config)
+            self.condition.notify_all()
+
+    def close(self):
+        """Wake up a pending read()."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def read(self, timeout):
+        """Return output of the virtual DUT which is due."""
+        with self.condition:
+            data = self.dut.read(max_lines=1024) if self.dut else b""
+            if not data:
+                due = self.dut.next_output_time() if self.dut else None
+                if due is not None:
+                    timeout = min(timeout, max(0.0, due - time.time()))
+                self.condition.wait(timeout)
+                data = self.dut.read(max_lines=1024) if self.dut else b""
+            return data
+
+    def write(self, data):
+        """Feed bytes to the virtual DUT."""
+        with self.condition:
+            if self.dut is not None:
+                self.dut.feed(data)
+                self.condition.notify_all()
+
+
+class SerialResource(Resource):
+    """Board attached to the server host, as listed by mbed-ls.
+
+    The serial port is kept open between allocations, so the next client does not
+    wait for the port to be opened (and the board reset by some interface
+    firmware) again.
+    """
+
+    def __init__(self, resource_id, mbed):
+        """Create the resource.
+
+        Args:
+            resource_id: Unique ID of the resource on the server.
+            mbed: Board description from mbed-ls.
+        """
+        Resource.__init__(
+            self,
+            resource_id,
+            mbed.get("platform_name"),
+            [mbed.get("target_id")] if mbed.get("target_id") else [],
+        )
+        self.mbed = mbed
+        self.serial = None
+        self.baudrate = None
+
+    def info(self):
+        """Return the resource description, with the target ID."""
+        info = Resource.info(self)
+        info["target_id"] = self.mbed.get("target_id")
+        return info
+
+    def open(self, baudrate):
+        """Open the serial port, or reuse the port left open."""
+        from serial import Serial
+
+        if self.serial is not None and self.baudrate == baudrate:
+            # Output received while nobody was connected is stale
+            self.serial.reset_input_buffer()
+            return
+        self._close_serial()
+        self.serial = Serial(
+            self.mbed["serial_port"], baudrate=baudrate, timeout=0.05, write_timeout=5
+        )
+        self.baudrate = baudrate
+
+    def close(self):
+        """Wake up a pending read(), the port stays open."""
+        if self.serial is not None and hasattr(self.serial, "cancel_read"):
+            self.serial.cancel_read()
+
+    def _close_serial(self):
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.serial = None
+
+    def flash(self, image, filename, forceflash=False):
+        """Copy the image to the mount point of the board."""
+        from .. import host_tests_plugins
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, os.path.basename(filename))
+            with open(path, "wb") as f:
+                f.write(image)
+            result = host_tests_plugins.call_plugin(
+                "CopyMethod",
+                "default",
+                image_path=path,
+                mcu=self.platform_name,
+                destination_disk=self.mbed.get("mount_point"),
+                target_id=self.mbed.get("target_id"),
+            )
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        if not result:
+            raise Exception("flashing '%s' failed" % filename)
+
+    def reset(self):
+        """Reset the board with a serial break."""
+        from .. import host_tests_plugins
+
+        if not host_tests_plugins.call_plugin(
+            "ResetMethod",
+            "default",
+            serial=self.serial,
+            disk=self.mbed.get("mount_point"),
+            mcu=self.platform_name,
+            target_id=self.mbed.get("target_id"),
+        ):
+            raise Exception("reset failed")
+
+    def read(self, timeout):
+        """Return the output buffered by the serial port, in one chunk."""
+        from serial import SerialException
+
+        try:
+            data = self.serial.read(1)
+            if data:
+                data += self.serial.read(
+                    min(self.serial.in_waiting, self.READ_CHUNK - 1)
+                )
+        except SerialException:
+            # Reopened by the next open()
+            self._close_serial()
+            raise
+        return data
+
+    def write(self, data):
+        """Write bytes to the serial port."""
+        self.serial.write(data)
+
+
+def virtual_resources(count, platform_name, tags=(), flash_time=0):
+    """Return virtual DUT resources.
+
+    Args:
+        count: Number of resources.
+        platform_name: Platform name of the resources.
+        tags: Tags of the resources.
+        flash_time: Time flashing takes, in seconds.
+    """
+    return [
+        VirtualResource("%s-%d" % (platform_name, i), platform_name, tags, flash_time)
+        for i in range(count)
+    ]
+
+
+def serial_resources():
+    """Return resources for the boards attached to this host."""
+    from mbed_lstools.main import create
+
+    return [
+        SerialResource(mbed.get("target_id") or str(i), mbed)
+        for i, mbed in enumerate(create().list_mbeds())
+        if mbed.get("serial_port")
+    ]
@@ -0,0 +1,273 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Client of the reference resource server, as used by RemoteConnectorPrimitive."""
+
+import itertools
+import os
+import socket
+import threading
+
+from . import protocol
+
+
+class SerialParameters(object):
+    """Parameters of the serial connection to a resource."""
+
+    def __init__(self, baudrate=9600):
+        """Set the parameters.
+
+        Args:
+            baudrate: Baud rate of the serial port.
+        """
+        self.baudrate = baudrate
+
+
+class RemoteResource(object):
+    """Resource allocated on the server.
+
+    The server pushes the DUT output once the connection is open, read() takes it
+    from a local buffer without asking the server.
+    """
+
+    def __init__(self, client, info):
+        """Wrap an allocated resource.
+
+        Args:
+            client: GrmClient which allocated the resource.
+            info: Description of the resource returned by the server.
+        """
+        self.client = client
+        self.info = info
+        self.id = info["id"]
+        self.rx_buffer = bytearray()
+        self.condition = threading.Condition()
+        self.is_allocated = True
+        self.is_connected = False
+
+    def _call(self, method, blob=b"", **params):
+        params["resource"] = self.id
+        return self.client.call(method, params, blob)
+
+    def open_connection(self, parameters=None):
+        """Open the connection to the DUT.
+
+        Args:
+            parameters: SerialParameters.
+        """
+        parameters = parameters or SerialParameters()
+        self._call("open_connection", baudrate=parameters.baudrate)
+        self.is_connected = True
+
+    def close_connection(self):
+        """Close the connection to the DUT."""
+        self.is_connected = False
+        self._call("close_connection")
+        with self.condition:
+            del self.rx_buffer[:]
+
+    def flash(self, filename, forceflash=False):
+        """Send an image to the server and flash it to the DUT.
+
+        Args:
+            filename: Path to the image.
+            forceflash: Flash even if the image is already flashed.
+        """
+        with open(filename, "rb") as f:
+            image = f.read()
+        self._call(
+            "flash",
+            blob=image,
+            filename=os.path.basename(filename),
+            forceflash=forceflash,
+        )
+        return True
+
+    def reset(self):
+        """Reset the DUT."""
+        self._call("reset")
+        return True
+
+    def received(self, data):
+        """Take DUT output pushed by the server."""
+        with self.condition:
+            self.rx_buffer += data
+            self.condition.notify()
+
+    def read(self, count):
+        """Return up to count bytes of the DUT output received, without waiting."""
+        with self.condition:
+            if not self.rx_buffer and not self.client.connected:
+                raise Exception("connection to the resource server lost")
+            data = bytes(self.rx_buffer[:count])
+            del self.rx_buffer[:count]
+        return data
+
+    def wait(self, timeout):
+        """Wait until DUT output is received.
+
+        Args:
+            timeout: Longest wait, in seconds.
+
+        Returns:
+            True if there is output to read.
+        """
+        with self.condition:
+            if not self.rx_buffer and self.client.connected:
+                self.condition.wait(timeout)
+            return bool(self.rx_buffer)
+
+    def write(self, payload):
+        """Write text to the DUT, without waiting for the server."""
+        self.client.send(protocol.WRITE, {"resource": self.id}, payload.encode("utf-8"))
+
+    def release(self):
+        """Release the resource, it returns to the pool of the server."""
+        self.is_connected = False
+        self.is_allocated = False
+        self.client.resources.pop(self.id, None)
+        self._call("release")
+
+
+class GrmClient(object):
+    """Connection to the resource server.
+
+    One connection is shared by all calls and resources of the process. A reader
+    thread matches responses to calls and passes pushed DUT output to the
+    resources.
+    """
+
+    # Time a call waits for its response, in seconds
+    CALL_TIMEOUT = 120
+
+    def __init__(self, host, port=None):
+        """Connect to the server.
+
+        Args:
+            host: Server host name or address.
+            port: Server port.
+        """
+        self.address = (host, int(port or protocol.DEFAULT_PORT))
+        self.sock = socket.create_connection(self.address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile("rb")
+        self.send_lock = threading.Lock()
+        self.ids = itertools.count(1)
+        # Call ID -> [event, response]
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.resources = {}
+        self.connected = True
+        thread = threading.Thread(target=self._receive)
+        thread.daemon = True
+        thread.start()
+
+    def send(self, kind, document=None, blob=b""):
+        """Send a frame to the server."""
+        frame = protocol.encode_frame(kind, document, blob)
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def call(self, method, params=None, blob=b""):
+        """Call a method of the server and return its result.
+
+        Raises:
+            Exception: The method failed or the connection was lost.
+        """
+        call_id = next(self.ids)
+        waiter = [threading.Event(), None]
+        with self.pending_lock:
+            if not self.connected:
+                raise Exception("connection to the resource server lost")
+            self.pending[call_id] = waiter
+        self.send(
+            protocol.REQUEST,
+            {"id": call_id, "method": method, "params": params or {}},
+            blob,
+        )
+        if not waiter[0].wait(self.CALL_TIMEOUT):
+            with self.pending_lock:
+                self.pending.pop(call_id, None)
+            raise Exception("%s() timed out" % method)
+        response = waiter[1]
+        if response is None:
+            raise Exception("connection to the resource server lost")
+        if "error" in response:
+            raise Exception(response["error"])
+        return response.get("result")
+
+    def _receive(self):
+        try:
+            while True:
+                kind, document, blob = protocol.recv_frame(self.stream)
+                if kind == protocol.DATA:
+                    resource = self.resources.get(document["resource"])
+                    if resource is not None:
+                        resource.received(blob)
+                elif kind == protocol.RESPONSE:
+                    with self.pending_lock:
+                        waiter = self.pending.pop(document.get("id"), None)
+                    if waiter is not None:
+                        waiter[1] = document
+                        waiter[0].set()
+        except (IOError, OSError, ValueError, protocol.ProtocolError):
+            pass
+        with self.pending_lock:
+            self.connected = False
+            for waiter in self.pending.values():
+                waiter[0].set()
+            self.pending.clear()
+        for resource in list(self.resources.values()):
+            # Released by the server when the connection closed
+            resource.is_connected = False
+            resource.is_allocated = False
+            with resource.condition:
+                resource.condition.notify_all()
+
+    def get_resources(self):
+        """Return the descriptions of the resources of the server."""
+        return self.call("get_resources")
+
+    def allocate(self, requirements):
+        """Allocate a resource matching requirements.
+
+        Args:
+            requirements: Dict with optional 'platform_name' and 'tags', a dict of
+                tag to True (required) or False (excluded). Other keys are ignored.
+
+        Returns:
+            RemoteResource.
+        """
+        info = self.call("allocate", {"requirements": requirements})
+        resource = RemoteResource(self, info)
+        self.resources[resource.id] = resource
+        return resource
+
+    def close(self):
+        """Close the connection, the server releases the allocated resources."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+        self.sock.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def create(host, port=None):
+    """Return a client connected to the server, reusing an open connection.
+
+    Args:
+        host: Server host name or address.
+        port: Server port, DEFAULT_PORT if None.
+    """
+    address = (host, int(port or protocol.DEFAULT_PORT))
+    with _clients_lock:
+        client = _clients.get(address)
+        if client is None or not client.connected:
+            client = GrmClient(*address)
+            _clients[address] = client
+    return client
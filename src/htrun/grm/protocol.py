@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Wire protocol between the resource server and its clients.
+
+Messages are frames sent over a TCP connection. A frame has a header with its
+kind, the length of a JSON document and the length of a binary blob, followed by
+the JSON document and the blob:
+
+- REQUEST: client to server, JSON {"id": N, "method": NAME, "params": {...}}. The
+  blob carries bulk data, e.g. the image to flash.
+- RESPONSE: server to client, JSON {"id": N, "result": ...} or {"id": N,
+  "error": MESSAGE}.
+- DATA: DUT output pushed by the server as it is read, JSON {"resource": ID} and
+  the output as blob. Reads never need a round trip to the server.
+- WRITE: client to server, JSON {"resource": ID} and the bytes to write to the
+  DUT as blob. Writes are not answered, errors are reported with the next
+  response.
+"""
+
+import json
+import struct
+
+DEFAULT_PORT = 3334
+
+REQUEST = 1
+RESPONSE = 2
+DATA = 3
+WRITE = 4
+
+_FRAME_HEADER = struct.Struct("<BII")
+
+
+class ProtocolError(Exception):
+    """Malformed frame or closed connection."""
+
+    pass
+
+
+def encode_frame(kind, document=None, blob=b""):
+    """Return the bytes of a frame.
+
+    Args:
+        kind: Frame kind.
+        document: JSON serializable document.
+        blob: Binary data.
+    """
+    payload = json.dumps(document).encode("utf-8") if document is not None else b""
+    return _FRAME_HEADER.pack(kind, len(payload), len(blob)) + payload + blob
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ProtocolError("connection closed")
+    return data
+
+
+def recv_frame(stream):
+    """Receive a frame.
+
+    Args:
+        stream: Buffered binary file object of the connection, see
+            socket.makefile().
+
+    Returns:
+        Tuple of (kind, document, blob).
+
+    Raises:
+        ProtocolError: The connection was closed.
+    """
+    kind, doc_length, blob_length = _FRAME_HEADER.unpack(
+        _read_exactly(stream, _FRAME_HEADER.size)
+    )
+    document = None
+    if doc_length:
+        document = json.loads(_read_exactly(stream, doc_length).decode("utf-8"))
+    blob = _read_exactly(stream, blob_length) if blob_length else b""
+    return kind, document, blob
@@ -0,0 +1,352 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Reference resource server sharing the DUTs attached to this host.
+
+Usage:
+    python -m htrun.grm.server [--port PORT] [--virtual N --platform NAME]
+
+Without --virtual the boards detected by mbed-ls are shared. Clients run htrun
+with --grm htrun.grm:HOST:PORT.
+"""
+
+import argparse
+import socket
+import threading
+
+from . import protocol
+from .backends import serial_resources, virtual_resources
+from ..host_tests_logger import HtrunLogger
+
+
+class AllocationError(Exception):
+    """No free resource matches the requirements."""
+
+    pass
+
+
+class ResourceIndex(object):
+    """Free resources indexed by platform name and tag.
+
+    Allocation intersects the sets of resources with the required platform and
+    tags instead of scanning every resource.
+    """
+
+    def __init__(self, resources):
+        """Index resources, all of them free.
+
+        Args:
+            resources: List of Resource objects.
+        """
+        self.resources = dict((resource.id, resource) for resource in resources)
+        self.by_platform = {}
+        self.by_tag = {}
+        for resource in resources:
+            self.by_platform.setdefault(resource.platform_name, set()).add(resource.id)
+            for tag in resource.tags:
+                self.by_tag.setdefault(tag, set()).add(resource.id)
+        self.free = set(self.resources)
+        self.lock = threading.Lock()
+
+    def match(self, requirements):
+        """Return the IDs of the resources matching requirements, free or not.
+
+        Args:
+            requirements: Dict with optional 'platform_name' and 'tags', a dict of
+                tag to True (required) or False (excluded).
+        """
+        candidates = set(self.resources)
+        platform_name = requirements.get("platform_name")
+        if platform_name:
+            candidates = self.by_platform.get(platform_name, set())
+        for tag, required in (requirements.get("tags") or {}).items():
+            tagged = self.by_tag.get(tag, set())
+            candidates = candidates & tagged if required else candidates - tagged
+        return candidates
+
+    def allocate(self, requirements):
+        """Take a free resource matching requirements.
+
+        Raises:
+            AllocationError: No free resource matches.
+        """
+        with self.lock:
+            candidates = self.match(requirements) & self.free
+            if not candidates:
+                raise AllocationError(
+                    "no free resource matches %s" % sorted(requirements.items())
+                )
+            resource_id = min(candidates)
+            self.free.discard(resource_id)
+        return self.resources[resource_id]
+
+    def release(self, resource_id):
+        """Return a resource to the pool."""
+        with self.lock:
+            self.free.add(resource_id)
+
+
+class ClientSession(object):
+    """Connection of one client.
+
+    Writes are done in the order they are received, each request is served in its
+    own thread. A client waits for the response before sending the next request
+    for the same resource.
+    """
+
+    # Time the output pump waits for DUT output, in seconds
+    READ_TIMEOUT = 0.05
+
+    def __init__(self, server, sock):
+        """Start serving a client.
+
+        Args:
+            server: ResourceServer.
+            sock: Connected socket.
+        """
+        self.server = server
+        self.logger = server.logger
+        self.sock = sock
+        self.stream = sock.makefile("rb")
+        self.send_lock = threading.Lock()
+        # Guards allocated and pumps, changed by requests served in parallel
+        self.lock = threading.RLock()
+        self.allocated = {}
+        # Resource ID -> (stop event, thread) of the output pump of a connection
+        self.pumps = {}
+        self.write_error = None
+
+    def send(self, kind, document=None, blob=b""):
+        """Send a frame to the client, from any thread."""
+        frame = protocol.encode_frame(kind, document, blob)
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def run(self):
+        """Serve requests until the client disconnects."""
+        try:
+            while True:
+                kind, document, blob = protocol.recv_frame(self.stream)
+                if kind == protocol.WRITE:
+                    self._write(document["resource"], blob)
+                elif kind == protocol.REQUEST:
+                    # A slow request (e.g. flashing one resource) must not hold
+                    # up writes to and requests for the other resources
+                    thread = threading.Thread(
+                        target=self._request, args=(document, blob)
+                    )
+                    thread.daemon = True
+                    thread.start()
+                else:
+                    raise protocol.ProtocolError("unexpected frame kind %d" % kind)
+        except (IOError, OSError, ValueError, protocol.ProtocolError) as e:
+            self.logger.prn_inf("client disconnected: %s" % str(e))
+        finally:
+            with self.lock:
+                allocated = list(self.allocated)
+            for resource_id in allocated:
+                self.release(resource_id)
+            self.sock.close()
+
+    def _request(self, document, blob):
+        method = getattr(self, "rpc_" + document.get("method", ""), None)
+        response = {"id": document.get("id")}
+        if self.write_error:
+            response["error"] = self.write_error
+            self.write_error = None
+        elif method is None:
+            response["error"] = "unknown method '%s'" % document.get("method")
+        else:
+            try:
+                response["result"] = method(blob=blob, **document.get("params", {}))
+            except Exception as e:
+                response["error"] = str(e)
+        self.send(protocol.RESPONSE, response)
+
+    def _resource(self, resource_id):
+        try:
+            return self.allocated[resource_id]
+        except KeyError:
+            raise Exception("resource '%s' not allocated" % resource_id)
+
+    def _write(self, resource_id, data):
+        try:
+            self._resource(resource_id).write(data)
+        except Exception as e:
+            self.write_error = "write to '%s' failed: %s" % (resource_id, e)
+
+    def _pump(self, resource, stop):
+        """Push the DUT output to the client in chunks, as it is read."""
+        while not stop.is_set():
+            try:
+                data = resource.read(self.READ_TIMEOUT)
+            except Exception as e:
+                self.logger.prn_err("read from '%s' failed: %s" % (resource.id, e))
+                break
+            if data and not stop.is_set():
+                try:
+                    self.send(protocol.DATA, {"resource": resource.id}, data)
+                except (IOError, OSError):
+                    break
+
+    def rpc_get_resources(self, blob):
+        """Return the descriptions of all resources."""
+        return [
+            dict(resource.info(), allocated=resource.id not in self.server.index.free)
+            for resource in self.server.index.resources.values()
+        ]
+
+    def rpc_allocate(self, blob, requirements):
+        """Allocate a resource matching requirements."""
+        resource = self.server.index.allocate(requirements)
+        with self.lock:
+            self.allocated[resource.id] = resource
+        self.logger.prn_inf("allocated '%s'" % resource.id)
+        return resource.info()
+
+    def rpc_release(self, blob, resource):
+        """Release an allocated resource."""
+        with self.lock:
+            self._resource(resource)
+            self.release(resource)
+
+    def release(self, resource_id):
+        """Close the connection to a resource and return it to the pool.
+
+        Resources which aren't allocated, e.g. released meanwhile, are ignored.
+        """
+        with self.lock:
+            if resource_id not in self.allocated:
+                return
+            self.rpc_close_connection(None, resource_id)
+            self.allocated.pop(resource_id, None)
+            self.server.index.release(resource_id)
+        self.logger.prn_inf("released '%s'" % resource_id)
+
+    def rpc_open_connection(self, blob, resource, baudrate):
+        """Open the connection to a resource and start pushing its output."""
+        with self.lock:
+            target = self._resource(resource)
+            if resource in self.pumps:
+                return
+            target.open(baudrate)
+            stop = threading.Event()
+            thread = threading.Thread(target=self._pump, args=(target, stop))
+            thread.daemon = True
+            thread.start()
+            self.pumps[resource] = (stop, thread)
+
+    def rpc_close_connection(self, blob, resource):
+        """Stop pushing the output of a resource."""
+        with self.lock:
+            pump = self.pumps.pop(resource, None)
+            if pump is not None:
+                stop, thread = pump
+                stop.set()
+                self._resource(resource).close()
+                # Output read after this belongs to the next connection
+                thread.join()
+
+    def rpc_flash(self, blob, resource, filename, forceflash=False):
+        """Flash the image sent as blob."""
+        self._resource(resource).flash(blob, filename, forceflash=forceflash)
+
+    def rpc_reset(self, blob, resource):
+        """Reset a resource."""
+        self._resource(resource).reset()
+
+
+class ResourceServer(object):
+    """TCP server sharing resources with clients."""
+
+    def __init__(self, resources, host="", port=protocol.DEFAULT_PORT):
+        """Listen for clients.
+
+        Args:
+            resources: List of Resource objects.
+            host: Address to listen on.
+            port: Port to listen on, 0 for any free port.
+        """
+        self.logger = HtrunLogger("GRMS")
+        self.index = ResourceIndex(resources)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(16)
+        self.address = self.listener.getsockname()
+
+    def serve_forever(self):
+        """Accept clients until close() is called."""
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except (IOError, OSError):
+                # Closed
+                return
+            self.logger.prn_inf("client connected from %s:%d" % address[:2])
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            thread = threading.Thread(target=ClientSession(self, sock).run)
+            thread.daemon = True
+            thread.start()
+
+    def start(self):
+        """Accept clients in a background thread."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def close(self):
+        """Stop accepting clients."""
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+        self.listener.close()
+
+
+def main():
+    """Run the resource server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT)
+    parser.add_argument(
+        "--virtual",
+        type=int,
+        default=0,
+        help="Share this many virtual DUTs instead of the attached boards.",
+    )
+    parser.add_argument(
+        "--platform", default="VIRTUAL", help="Platform name of the virtual DUTs."
+    )
+    parser.add_argument(
+        "--tags", default="", help="Comma separated tags of the virtual DUTs."
+    )
+    parser.add_argument(
+        "--flash-time",
+        type=float,
+        default=0,
+        help="Time flashing a virtual DUT takes, in seconds.",
+    )
+    args = parser.parse_args()
+
+    if args.virtual:
+        tags = [tag for tag in args.tags.split(",") if tag]
+        resources = virtual_resources(
+            args.virtual, args.platform, tags, flash_time=args.flash_time
+        )
+    else:
+        resources = serial_resources()
+    server = ResourceServer(resources, args.host, args.port)
+    server.logger.prn_inf(
+        "sharing %d resources on %s:%d" % ((len(resources),) + server.address[:2])
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,18 @@ class BaseHostTestAbstract(object):
         if self.__event_queue:
             self.__event_queue.put(("__notify_complete", result, time()))
 
+    def notify_callbacks_updated(self):
+        """Notify the main event loop that host test callbacks were registered.
+
+        Returns:
+            True if the main event loop was notified, False before
+            setup_communication().
+        """
+        if self.__event_queue:
+            self.__event_queue.put(("__callbacks_updated", None, time()))
+            return True
+        return False
+
     def reset_dut(self, value):
         """Reset the device under test.
 
@@ -163,6 +175,10 @@ class HostTestCallbackBase(BaseHostTestAbstract):
             "__rxd_line",
         ]
 
+        # A '__callbacks_updated' event was sent and get_callbacks() wasn't
+        # called since, callbacks registered meanwhile need no other event
+        self.__callbacks_update_pending = False
+
         self.__assign_default_callbacks()
         self.__assign_decorated_callbacks()
 
@@ -265,10 +281,36 @@ class HostTestCallbackBase(BaseHostTestAbstract):
                 )
 
         self.__callbacks[key] = callback
+        if not self.__callbacks_update_pending:
+            # One event for all the callbacks registered by setup(), or by a
+            # callback, until the main event loop reads them
+            self.__callbacks_update_pending = self.notify_callbacks_updated()
 
     def get_callbacks(self):
+        """Return the callbacks by event key.
+
+        The main event loop calls it to update its callbacks, callbacks
+        registered afterwards are notified with a new '__callbacks_updated'
+        event.
+        """
+        self.__callbacks_update_pending = False
         return self.__callbacks
 
+    def get_consumed_keys(self):
+        """Return the keys of events with a callback doing something.
+
+        Events which only have the default callback, which ignores them, are not
+        included. They do not need to be sent to the host test.
+
+        Returns:
+            List of event keys.
+        """
+        return [
+            key
+            for key, callback in self.__callbacks.items()
+            if callback != self.__callback_default
+        ]
+
     def setup(self):
         pass
 
@@ -5,6 +5,7 @@
 """Test device echo."""
 
 import uuid
+from collections import deque
 from .. import BaseHostTest
 
 
@@ -14,18 +15,20 @@ class EchoTest(BaseHostTest):
     __result = None
     echo_count = 0
     count = 0
-    uuid_sent = []
-    uuid_recv = []
+    # UUIDs sent and not echoed back yet, echoes are checked as they arrive
+    uuid_pending = deque()
+    uuid_mismatch = False
 
     def __send_echo_uuid(self):
         if self.echo_count:
             str_uuid = str(uuid.uuid4())
             self.send_kv("echo", str_uuid)
-            self.uuid_sent.append(str_uuid)
+            self.uuid_pending.append(str_uuid)
             self.echo_count -= 1
 
     def _callback_echo(self, key, value, timestamp):
-        self.uuid_recv.append(value)
+        if not self.uuid_pending or self.uuid_pending.popleft() != value:
+            self.uuid_mismatch = True
         self.__send_echo_uuid()
 
     def _callback_echo_count(self, key, value, timestamp):
@@ -37,12 +40,14 @@ class EchoTest(BaseHostTest):
 
     def setup(self):
         """Set up the test."""
+        self.uuid_pending = deque()
+        self.uuid_mismatch = False
         self.register_callback("echo", self._callback_echo)
         self.register_callback("echo_count", self._callback_echo_count)
 
     def result(self):
         """Report test result."""
-        self.__result = self.uuid_sent == self.uuid_recv
+        self.__result = not self.uuid_mismatch and not self.uuid_pending
         return self.__result
 
     def teardown(self):
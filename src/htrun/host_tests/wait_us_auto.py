@@ -12,7 +12,10 @@ class WaitusTest(BaseHostTest):
 
     __result = None
     DEVIATION = 0.10  # +/-10%
-    ticks = []
+    # Only the last tick is kept, ticks are checked as they arrive
+    tick_count = 0
+    last_timestamp = None
+    ticks_accurate = True
 
     def _callback_exit(self, key, value, timeout):
         self.notify_complete()
@@ -20,32 +23,27 @@ class WaitusTest(BaseHostTest):
     def _callback_tick(self, key, value, timestamp):
         """{{tick;%d}}}."""
         self.log("tick! " + str(timestamp))
-        self.ticks.append((key, value, timestamp))
+        if self.last_timestamp is not None:
+            deviation = abs(timestamp - self.last_timestamp - 1.0)
+            if deviation > self.DEVIATION:
+                self.log("tick deviation %.3f sec" % deviation)
+                self.ticks_accurate = False
+        self.last_timestamp = timestamp
+        self.tick_count += 1
 
     def setup(self):
         """Set up the test case."""
+        self.tick_count = 0
+        self.last_timestamp = None
+        self.ticks_accurate = True
         self.register_callback("exit", self._callback_exit)
         self.register_callback("tick", self._callback_tick)
 
     def result(self):
         """Report test result."""
-
-        def sub_timestamps(t1, t2):
-            delta = t1 - t2
-            deviation = abs(delta - 1.0)
-            # return True if delta > 0 and deviation <= self.DEVIATION else False
-            return deviation <= self.DEVIATION
-
         # Check if time between ticks was accurate
-        if self.ticks:
-            # If any ticks were recorded
-            timestamps = [timestamp for _, _, timestamp in self.ticks]
-            self.log(str(timestamps))
-            m = map(sub_timestamps, timestamps[1:], timestamps[:-1])
-            self.log(str(m))
-            self.__result = all(m)
-        else:
-            self.__result = False
+        self.log("%d ticks received" % self.tick_count)
+        self.__result = self.tick_count > 0 and self.ticks_accurate
         return self.__result
 
     def teardown(self):
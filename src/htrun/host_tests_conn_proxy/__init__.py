@@ -4,4 +4,5 @@
 #
 """conn_proxy package."""
 
-from .conn_proxy import conn_process
+from .conn_proxy import conn_process, ConnectionThread
+from .event_lanes import EventLanes
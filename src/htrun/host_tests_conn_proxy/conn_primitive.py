@@ -3,6 +3,8 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 """Module defines ConnectorPrimitive base class for device connection and comms."""
+import time
+
 from ..host_tests_logger import HtrunLogger
 
 
@@ -13,7 +15,26 @@ class ConnectorPrimitiveException(Exception):
 
 
 class ConnectorPrimitive(object):
-    """Base class for communicating with DUT."""
+    """Base class for communicating with DUT.
+
+    The connection process reads the DUT output with poll(), which adapts the
+    read size to the output rate and backs off while the DUT is idle.
+    """
+
+    # Read size of poll() when the DUT output starts, in bytes. At the maximum
+    # baud rate up to 2304 bytes are received between two reads.
+    READ_SIZE = 2304
+
+    # Largest read size of poll() while the DUT output streams, in bytes
+    MAX_READ_SIZE = 65536
+
+    # Shortest and longest wait of poll() after a read returned no data, in
+    # seconds. Waits double with each empty read.
+    POLL_MIN_INTERVAL = 0.001
+    POLL_MAX_INTERVAL = 0.02
+
+    # True if read() waits for data itself, poll() then doesn't wait
+    BLOCKING_READ = False
 
     def __init__(self, name):
         """Initialise object.
@@ -24,6 +45,8 @@ class ConnectorPrimitive(object):
         self.LAST_ERROR = None
         self.logger = HtrunLogger(name)
         self.polling_timeout = 60
+        self.read_size = self.READ_SIZE
+        self.poll_interval = 0
 
     def write_kv(self, key, value):
         """Write a Key-Value protocol message.
@@ -59,6 +82,43 @@ class ConnectorPrimitive(object):
         """
         raise NotImplementedError
 
+    def poll(self):
+        """Read data from the DUT, adapting the read size and polling rate.
+
+        Reads grow up to MAX_READ_SIZE while they return full buffers. After an
+        empty read the read size is reset and, unless read() waits for data
+        itself, poll() waits with wait() for up to twice as long as after the
+        previous empty read. Any data resets the wait.
+
+        Returns:
+            Bytes read.
+        """
+        data = self.read(self.read_size)
+        if data:
+            self.poll_interval = 0
+            if len(data) >= self.read_size:
+                self.read_size = min(self.read_size * 2, self.MAX_READ_SIZE)
+            return data
+        self.read_size = self.READ_SIZE
+        if not self.BLOCKING_READ:
+            self.poll_interval = min(
+                max(self.poll_interval * 2, self.POLL_MIN_INTERVAL),
+                self.POLL_MAX_INTERVAL,
+            )
+            self.wait(self.poll_interval)
+        return data
+
+    def wait(self, timeout):
+        """Wait for data from the DUT.
+
+        Connectors which can be notified of incoming data override this to return
+        as soon as data arrives.
+
+        Args:
+            timeout: Longest wait, in seconds.
+        """
+        time.sleep(timeout)
+
     def write(self, payload, log=False):
         """Write data to the DUT.
 
@@ -5,6 +5,36 @@
 """Connect to fast models."""
 
 from .conn_primitive import ConnectorPrimitive, ConnectorPrimitiveException
+from .resource_pool import IdleResourcePool
+
+
+class FastmodelSimulatorPool(IdleResourcePool):
+    """Running FastModel simulators kept between test runs.
+
+    A test run which ends without a simulator error can leave its simulator
+    here, as a (fm_agent module, FastmodelAgent) tuple, instead of shutting it
+    down. The next run of the same process with the same platform and
+    FastModel config, the key, resets it and loads its own image, which skips
+    the model launch.
+    """
+
+    def alive(self, resource):
+        """Check if a simulator is running, False if the check fails."""
+        try:
+            return bool(resource.is_simulator_alive)
+        except Exception:
+            return False
+
+    def shutdown(self, resource):
+        """Shut a simulator down, ignoring errors."""
+        try:
+            resource.shutdown_simulator()
+        except Exception:
+            # Nothing left to do with a broken simulator
+            pass
+
+
+SIMULATOR_POOL = FastmodelSimulatorPool()
 
 
 class FastmodelConnectorPrimitive(ConnectorPrimitive):
@@ -26,13 +56,18 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
         self.platform_name = config.get("platform_name", None)
         self.image_path = config.get("image_path", None)
         self.polling_timeout = int(config.get("polling_timeout", 60))
+        self.keep_warm = float(config.get("fm_keep_warm") or 0)
+        # Simulators kept running are only reused for the same model
+        self.pool_key = (self.platform_name, self.fm_config)
 
         # FastModel Agent tool-kit
         self.fm_agent_module = None
         self.resource = None
 
-        # Initialize FastModel
-        if self.__fastmodel_init():
+        # Reuse a simulator kept running by an earlier test, launch one otherwise
+        if self.__fastmodel_reuse():
+            pass
+        elif self.__fastmodel_init():
 
             # FastModel Launch load and run, equivalent to DUT connection, flashing and
             # reset...
@@ -72,6 +107,38 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
 
         return True
 
+    def __fastmodel_reuse(self):
+        """Take a running FastModel from the pool and load the image to it.
+
+        A simulator which fails to reset or load is shut down.
+
+        Returns:
+            True if a running FastModel was reused.
+        """
+        warm = SIMULATOR_POOL.take(self.pool_key)
+        if warm is None:
+            return False
+        self.fm_agent_module, self.resource = warm
+        self.logger.prn_inf("Reusing running FastModel...")
+        try:
+            if not self.resource.reset_simulator():
+                raise ConnectorPrimitiveException(
+                    "FastModel reset failed, reset_simulator() return False!"
+                )
+            self.__fastmodel_load(self.image_path)
+            self.__fastmodel_run()
+        except ConnectorPrimitiveException as e:
+            self.logger.prn_wrn("%s, relaunching FastModel" % str(e))
+        except self.fm_agent_module.SimulatorError as e:
+            self.logger.prn_wrn(
+                "reset_simulator() failed: %s, relaunching FastModel" % str(e)
+            )
+        else:
+            return True
+        SIMULATOR_POOL.shutdown(self.resource)
+        self.resource = None
+        return False
+
     def __fastmodel_launch(self):
         """Start the FastModel.
 
@@ -158,6 +225,7 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
             self.logger.prn_err(
                 "FastmodelConnectorPrimitive.read() failed: %s" % str(e)
             )
+            self.LAST_ERROR = "read failed: %s" % str(e)
 
     def write(self, payload, log=False):
         """Send text to the FastModel.
@@ -175,6 +243,7 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
                 self.logger.prn_err(
                     "FastmodelConnectorPrimitive.write() failed: %s" % str(e)
                 )
+                self.LAST_ERROR = "write failed: %s" % str(e)
             else:
                 return True
         else:
@@ -192,8 +261,22 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
             return False
 
     def finish(self):
-        """Shut down the FastModel."""
+        """Shut down the FastModel, or keep it running for the next test.
+
+        With a keep warm time the simulator is left running in the pool, unless
+        it failed during this test.
+        """
         if self.__resource_allocated():
+            if (
+                self.keep_warm
+                and self.LAST_ERROR is None
+                and SIMULATOR_POOL.alive(self.resource)
+            ):
+                SIMULATOR_POOL.put(
+                    self.pool_key, (self.fm_agent_module, self.resource), self.keep_warm
+                )
+                self.resource = None
+                return
             try:
                 self.resource.shutdown_simulator()
                 self.resource = None
@@ -210,10 +293,12 @@ class FastmodelConnectorPrimitive(ConnectorPrimitive):
                     self.logger.prn_err(
                         "FastModel reset failed, reset_simulator() return False!"
                     )
+                    self.LAST_ERROR = "reset failed"
             except self.fm_agent_module.SimulatorError as e:
                 self.logger.prn_err(
                     "FastmodelConnectorPrimitive.reset() failed: %s" % str(e)
                 )
+                self.LAST_ERROR = "reset failed: %s" % str(e)
 
     def __del__(self):
         """Shut down the FastModel when garbage collected."""
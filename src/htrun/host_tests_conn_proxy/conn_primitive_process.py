@@ -0,0 +1,209 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Connect to a test binary running as a local process."""
+
+import os
+import select
+import shlex
+import signal
+import subprocess
+import threading
+from queue import Empty as QueueEmpty, Queue
+from time import sleep
+
+from .conn_primitive import ConnectorPrimitive
+
+
+class ProcessConnectorPrimitive(ConnectorPrimitive):
+    """ConnectorPrimitive talking to a local process over its stdin and stdout.
+
+    The process is e.g. a test binary built for the host or an emulator command
+    line running a test binary for the target. Its stdout and stderr are read as
+    the target output, KV pairs from the host are written to its stdin. Resetting
+    the DUT restarts the process.
+    """
+
+    # Time read() waits for output, in seconds
+    READ_TIMEOUT = 0.01
+    BLOCKING_READ = True
+
+    # Time the process has to exit after SIGTERM, before it is killed
+    TERMINATE_TIMEOUT = 2
+
+    def __init__(self, name, config):
+        """Start the process.
+
+        Args:
+            name: Name to display in the log.
+            config: Map of config parameters, 'process' is the command line of
+                the process. '{image_path}' in it is replaced with the 'image_path'.
+        """
+        ConnectorPrimitive.__init__(self, name)
+        self.config = config
+        image_path = config.get("image_path") or ""
+        self.args = [
+            arg.replace("{image_path}", image_path)
+            for arg in shlex.split(config["process"], posix=os.name == "posix")
+        ]
+        self.process = None
+        self.output = None
+        self.eof = False
+        self.start()
+
+    def start(self):
+        """Start the process, connected() is False if it could not be started."""
+        self.logger.prn_inf("starting process: %s" % " ".join(self.args))
+        try:
+            self.process = subprocess.Popen(
+                self.args,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+                # Own process group, so reset() also stops the process' children
+                start_new_session=os.name == "posix",
+            )
+        except OSError as e:
+            self.process = None
+            self.LAST_ERROR = "unable to start process '%s': %s" % (self.args[0], e)
+            self.logger.prn_err(self.LAST_ERROR)
+            return
+        self.eof = False
+        if os.name == "posix":
+            os.set_blocking(self.process.stdout.fileno(), False)
+        else:
+            # Pipes can't be polled on Windows, read them in a thread instead
+            self.output = Queue()
+            thread = threading.Thread(
+                target=self._read_output, args=(self.process.stdout, self.output)
+            )
+            thread.daemon = True
+            thread.start()
+
+    @staticmethod
+    def _read_output(stdout, output):
+        data = True
+        while data:
+            try:
+                data = stdout.read(4096)
+            except (IOError, OSError, ValueError):
+                # Closed by stop()
+                data = b""
+            output.put(data)
+
+    def read(self, count):
+        """Read output of the process.
+
+        Args:
+            count: Maximum number of bytes to read.
+
+        Returns:
+            Bytes read, empty if there was no output.
+        """
+        if self.process is None or self.eof:
+            sleep(self.READ_TIMEOUT)
+            return b""
+        if self.output is None:
+            fd = self.process.stdout.fileno()
+            readable, _, _ = select.select([fd], [], [], self.READ_TIMEOUT)
+            if not readable:
+                return b""
+            try:
+                data = os.read(fd, count)
+            except BlockingIOError:
+                return b""
+        else:
+            try:
+                data = self.output.get(timeout=self.READ_TIMEOUT)
+            except QueueEmpty:
+                return b""
+        if not data:
+            # The output of a process which ended is read like the output of a
+            # target which stopped printing, the test ends with '__exit' or times
+            # out.
+            self.eof = True
+            # The process may have closed its output and still run, it is
+            # reaped by finish()
+            code = self.process.poll()
+            if code is None:
+                self.logger.prn_inf("process closed its output")
+            else:
+                self.logger.prn_inf("process exited with code %d" % code)
+        return data
+
+    def write(self, payload, log=False):
+        """Write data to the stdin of the process.
+
+        Args:
+            payload: Data to write.
+            log: Log the payload.
+        """
+        if self.process is None:
+            return False
+        try:
+            self.process.stdin.write(payload.encode("utf-8"))
+            self.process.stdin.flush()
+        except (IOError, OSError) as e:
+            if self.process.poll() is not None:
+                # Written to a process which finished, like to a silent target
+                return True
+            self.LAST_ERROR = "connection lost, process stdin write: %s" % str(e)
+            self.logger.prn_err(self.LAST_ERROR)
+            return False
+        if log:
+            self.logger.prn_txd(payload)
+        return True
+
+    def flush(self):
+        """Nothing to flush, writes are unbuffered."""
+        pass
+
+    def reset(self):
+        """Restart the process."""
+        self.logger.prn_inf("resetting by restarting the process")
+        self.stop()
+        self.start()
+
+    def stop(self):
+        """Stop the process and its children."""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                if os.name == "posix":
+                    os.killpg(self.process.pid, signal.SIGTERM)
+                else:
+                    self.process.terminate()
+                self.process.wait(self.TERMINATE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                if os.name == "posix":
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+                self.process.wait()
+            except OSError:
+                # Exited meanwhile
+                self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except (IOError, OSError):
+                pass
+
+    def connected(self):
+        """Return True if the process was started."""
+        return self.process is not None
+
+    def finish(self):
+        """Stop the process and reap it."""
+        self.stop()
+        if self.process is not None:
+            self.logger.prn_inf(
+                "process finished with code %s" % self.process.returncode
+            )
+
+    def __del__(self):
+        """Release resources when garbage collected."""
+        self.finish()
@@ -0,0 +1,78 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Record the traffic of a connection to a session log."""
+
+from time import time
+
+from .conn_primitive import ConnectorPrimitive
+from .session_log import SessionLogWriter, OPEN, RX, TX, RESET
+
+
+class RecordingConnectorPrimitive(ConnectorPrimitive):
+    """ConnectorPrimitive wrapper writing the traffic to a session log.
+
+    Bytes read from and written to the DUT and resets of the DUT are recorded, so
+    the session can be replayed later with ReplayConnectorPrimitive.
+    """
+
+    def __init__(self, connector, path, append=False):
+        """Start recording.
+
+        Args:
+            connector: ConnectorPrimitive to record.
+            path: Path to the session log.
+            append: Append to the session log, for connections after the first one.
+        """
+        ConnectorPrimitive.__init__(self, connector.logger.logger.name)
+        self.connector = connector
+        self.session_log = SessionLogWriter(path, append=append)
+        self.session_log.write(OPEN, time())
+        self.logger.prn_inf("recording session to '%s'" % path)
+
+    def read(self, count):
+        """Read data from the DUT and record it."""
+        data = self.connector.read(count)
+        if data:
+            self.session_log.write(RX, time(), bytes(data))
+        return data
+
+    @property
+    def BLOCKING_READ(self):
+        """Return True if the recorded connector waits for data in read()."""
+        return self.connector.BLOCKING_READ
+
+    def wait(self, timeout):
+        """Wait for data from the recorded connection."""
+        self.connector.wait(timeout)
+
+    def write(self, payload, log=False):
+        """Write data to the DUT and record it."""
+        result = self.connector.write(payload, log=log)
+        if result:
+            self.session_log.write(TX, time(), payload.encode("utf-8"))
+        return result
+
+    def flush(self):
+        """Flush the connection and the session log."""
+        self.connector.flush()
+        self.session_log.flush()
+
+    def reset(self):
+        """Reset the DUT and record the reset."""
+        self.session_log.write(RESET, time())
+        return self.connector.reset()
+
+    def connected(self):
+        """Check if the recorded connection is open."""
+        return self.connector.connected()
+
+    def error(self):
+        """Return the last error of the recorded connection."""
+        return self.connector.error()
+
+    def finish(self):
+        """Close the connection and the session log."""
+        self.connector.finish()
+        self.session_log.close()
@@ -3,9 +3,106 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 """ConnectorPrimitive enabling remote communication with a DUT."""
+
+import importlib
+import threading
 import time
 from .. import DEFAULT_BAUD_RATE
 from .conn_primitive import ConnectorPrimitive
+from .resource_pool import IdleResourcePool
+
+
+class RemoteResourcePool(IdleResourcePool):
+    """Remote resources kept allocated and connected between test runs.
+
+    A test run which ends normally can leave its resource here, as a (remote
+    module, client, resource) tuple, instead of releasing it. The next run of
+    the same process with the same requirements, the key, takes it and skips
+    allocation and connection.
+
+    A run can also have the resource of the next run prepared in the background
+    (allocated, flashed and connected), see prefetch().
+    """
+
+    def __init__(self):
+        """Create an empty pool, released when the process exits."""
+        # (Key, image path) -> [event set when prepared, result of prepare()]
+        self.prefetched = {}
+        IdleResourcePool.__init__(self)
+
+    def alive(self, resource):
+        """Check if a resource is still allocated and connected."""
+        return resource.is_allocated and resource.is_connected
+
+    def shutdown(self, resource):
+        """Disconnect and release a resource, ignoring errors."""
+        try:
+            if resource.is_connected:
+                resource.close_connection()
+            if resource.is_allocated:
+                resource.release()
+        except Exception:
+            # Released by the resource manager when the client disconnects
+            pass
+
+    def prefetch(self, key, image_path, prepare):
+        """Prepare a resource for a later run in a background thread.
+
+        Args:
+            key: Requirements of the resource.
+            image_path: Image the later run flashes.
+            prepare: Callable taking the image path, returning a tuple of (remote
+                module, client, resource) with the image flashed and the
+                connection open, or None if it failed.
+        """
+        waiter = [threading.Event(), None]
+        with self.lock:
+            if (key, image_path) in self.prefetched:
+                return
+            self.prefetched[(key, image_path)] = waiter
+
+        def run():
+            try:
+                waiter[1] = prepare(image_path)
+            finally:
+                waiter[0].set()
+
+        thread = threading.Thread(target=run, name="grm_prefetch")
+        thread.daemon = True
+        thread.start()
+
+    def take_prefetched(self, key, image_path):
+        """Return the resource prepared for image_path, waiting for it if needed.
+
+        Returns:
+            Tuple of (remote module, client, resource) or None.
+        """
+        with self.lock:
+            waiter = self.prefetched.pop((key, image_path), None)
+        if waiter is None:
+            return None
+        waiter[0].wait()
+        if waiter[1] is None:
+            return None
+        resource = waiter[1][2]
+        if self.alive(resource):
+            return waiter[1]
+        self.shutdown(resource)
+        return None
+
+    def clear(self):
+        """Release all resources, including the prefetched ones."""
+        with self.lock:
+            waiters = list(self.prefetched.values())
+            self.prefetched = {}
+        for waiter in waiters:
+            waiter[0].wait()
+            if waiter[1] is not None:
+                self.shutdown(waiter[1][-1])
+        IdleResourcePool.clear(self)
+
+
+REMOTE_RESOURCE_POOL = RemoteResourcePool()
 
 
 class RemoteConnectorPrimitive(ConnectorPrimitive):
@@ -16,7 +113,7 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
     address and port to be specified in the `config` dictionary passed to __init__.
     """
 
-    def __init__(self, name, config, importer=__import__):
+    def __init__(self, name, config, importer=importlib.import_module):
         """Populate instance attributes with device and grm data."""
         ConnectorPrimitive.__init__(self, name)
         self.config = config
@@ -30,6 +127,9 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
         self.baudrate = config.get("baudrate", DEFAULT_BAUD_RATE)
         self.image_path = config.get("image_path", None)
         self.forced_reset_timeout = config.get("forced_reset_timeout", 0)
+        self.keep_warm = float(config.get("grm_keep_warm") or 0)
+        # Image of the next test, its resource is prepared while this test runs
+        self.prefetch = config.get("grm_prefetch")
         self.allocate_requirements = {
             "platform_name": self.platform_name,
             "power_on": True,
@@ -41,13 +141,26 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
             for tag in config["tags"].split(","):
                 self.allocate_requirements["tags"][tag] = True
 
+        # Resources kept warm are only reused for the same requirements
+        self.pool_key = (
+            self.grm_module,
+            self.grm_host,
+            self.grm_port,
+            self.platform_name,
+            tuple(sorted(self.allocate_requirements.get("tags", {}))),
+            self.baudrate,
+        )
+
         # Global Resource Mgr tool-kit
         self.remote_module = None
         self.selected_resource = None
         self.client = None
 
         # Initialize remote resource manager
-        self.__remote_init(importer)
+        if self.__remote_init(importer) and self.prefetch:
+            REMOTE_RESOURCE_POOL.prefetch(
+                self.pool_key, self.prefetch, self.__remote_prepare
+            )
 
     def __remote_init(self, importer):
         """Import the "remote client" module, use it to connect to the DUT.
@@ -55,6 +168,26 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
         Args:
             importer: Callable that will import the module by name.
         """
+        prefetched = REMOTE_RESOURCE_POOL.take_prefetched(
+            self.pool_key, self.image_path
+        )
+        if prefetched is not None:
+            self.remote_module, self.client, self.selected_resource = prefetched
+            self.logger.prn_inf(
+                "using prefetched remote resource, already flashed with '%s'"
+                % self.image_path
+            )
+            return self.__remote_reuse(flash=False)
+
+        if self.keep_warm:
+            warm = REMOTE_RESOURCE_POOL.take(self.pool_key)
+            if warm is not None:
+                self.remote_module, self.client, self.selected_resource = warm
+                self.logger.prn_inf(
+                    "reusing warm remote resource, allocation and connection skipped"
+                )
+                return self.__remote_reuse()
+
         # We want to load global resource manager module by name from command line
         # (switch --grm)
         try:
@@ -75,10 +208,6 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
         # Connect to remote global resource manager
         self.client = self.remote_module.create(host=self.grm_host, port=self.grm_port)
 
-        # First get the resources
-        resources = self.client.get_resources()
-        self.logger.prn_inf("remote resources count: %d" % len(resources))
-
         # Query for available resource
         # Automatic selection and allocation of a resource
         try:
@@ -97,10 +226,66 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
             self.__remote_reset(delay=self.forced_reset_timeout)
         except Exception as error:
             self.logger.prn_err(str(error))
-            self.__remote_release()
+            self.__remoterelease()
             return False
         return True
 
+    def __remote_reuse(self, flash=True):
+        """Flash and reset a resource already allocated and connected.
+
+        Args:
+            flash: Flash the image, False if it is already flashed.
+        """
+        try:
+            if flash:
+                self.__remote_flashing(self.image_path, forceflash=True)
+            self.__remote_reset(delay=self.forced_reset_timeout)
+        except Exception as error:
+            self.logger.prn_err(str(error))
+            self.__remoterelease()
+            return False
+        return True
+
+    def __remote_prepare(self, image_path):
+        """Allocate, flash and connect a resource for the next test.
+
+        Runs in a background thread while this test runs, a resource kept warm
+        by an earlier test is used if there is one.
+
+        Args:
+            image_path: Image of the next test.
+
+        Returns:
+            Tuple of (remote module, client, resource), None if it failed.
+        """
+        warm = REMOTE_RESOURCE_POOL.take(self.pool_key)
+        if warm is not None:
+            remote_module, client, resource = warm
+        else:
+            remote_module, client = self.remote_module, self.client
+            try:
+                resource = client.allocate(self.allocate_requirements)
+            except Exception as error:
+                self.logger.prn_wrn(
+                    "no resource prefetched for '%s': %s" % (image_path, str(error))
+                )
+                return None
+        self.logger.prn_inf("prefetching remote resource for '%s'" % image_path)
+        try:
+            if resource.flash(image_path, forceflash=True) is False:
+                raise Exception("remote resource flashing failed!")
+            if not resource.is_connected:
+                resource.open_connection(
+                    parameters=remote_module.SerialParameters(baudrate=self.baudrate)
+                )
+        except Exception as error:
+            self.logger.prn_wrn(
+                "prefetching for '%s' failed: %s" % (image_path, str(error))
+            )
+            REMOTE_RESOURCE_POOL.shutdown(resource)
+            return None
+        return remote_module, client, resource
+
     def __remote_connect(self, baudrate=DEFAULT_BAUD_RATE):
         """Open a remote connection to the DUT.
 
@@ -181,11 +366,27 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
         try:
             data = self.selected_resource.read(count)
         except Exception as error:
+            self.LAST_ERROR = "remote read error: %s" % str(error)
             self.logger.prn_err(
                 "RemoteConnectorPrimitive.read(%d): %s" % (count, str(error))
             )
         return data
 
+    def wait(self, timeout):
+        """Wait for data from the DUT.
+
+        Uses the wait() of the resource if it has one, e.g. the resources of
+        htrun.grm return as soon as the server pushed DUT output.
+
+        Args:
+            timeout: Longest wait, in seconds.
+        """
+        wait = getattr(self.selected_resource, "wait", None)
+        if wait is not None:
+            wait(timeout)
+        else:
+            time.sleep(timeout)
+
     def write(self, payload, log=False):
         """Send some text to the DUT.
 
@@ -220,7 +421,7 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
         """Check if the selected resource is connected."""
         return self.allocated() and self.selected_resource.is_connected
 
-    def __remote_release(self):
+    def __remoterelease(self):
         """Release the remote resource."""
         try:
             if self.allocated():
@@ -232,10 +433,22 @@ class RemoteConnectorPrimitive(ConnectorPrimitive):
             )
 
     def finish(self):
-        """Disconnect the resource and release the allocation."""
+        """Disconnect the resource and release the allocation.
+
+        With 'grm_keep_warm' set, a resource still connected is kept in
+        REMOTE_RESOURCE_POOL for the next run instead.
+        """
+        if self.keep_warm and self.connected() and not self.LAST_ERROR:
+            REMOTE_RESOURCE_POOL.put(
+                self.pool_key,
+                (self.remote_module, self.client, self.selected_resource),
+                self.keep_warm,
+            )
+            self.selected_resource = None
+            return
         if self.allocated():
             self.__remote_disconnect()
-            self.__remote_release()
+            self.__remoterelease()
 
     def reset(self):
         """Reset the selected resource."""
@@ -0,0 +1,188 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Replay a recorded session log in place of a DUT."""
+
+import re
+from collections import deque
+from time import sleep, time
+
+from .conn_primitive import ConnectorPrimitive
+from .session_log import (
+    read_session_log,
+    split_connections,
+    SessionLogError,
+    RX,
+    TX,
+    RESET,
+)
+
+SYNC_REGEX = re.compile(rb"\{\{__sync;([^\}]+)\}\}")
+
+
+class ReplayConnectorPrimitive(ConnectorPrimitive):
+    """ConnectorPrimitive playing back a session log recorded with --record.
+
+    The recorded DUT output is returned by read() in the recorded order. Output
+    the DUT sent after a write or reset by the host is only returned once the host
+    made the write or reset again, so the host test sees the same conversation as
+    in the recorded session. '__sync' UUIDs are random, the recorded ones are
+    replaced with the UUIDs sent by the host in the DUT output.
+
+    With a replay speed of 0 the output is returned as fast as htrun reads it,
+    otherwise the recorded timing is kept, scaled by the speed.
+    """
+
+    # Time read() waits when no output is due, in seconds
+    IDLE_TIMEOUT = 0.01
+    BLOCKING_READ = True
+
+    def __init__(self, name, config):
+        """Load the session log.
+
+        Args:
+            name: Name to display in the log.
+            config: Map of config parameters, 'replay' is the path of the session
+                log, 'replay_speed' the replay speed and 'conn_index' the index of
+                the connection to replay (one for each conn_process started).
+        """
+        ConnectorPrimitive.__init__(self, name)
+        self.path = config.get("replay")
+        self.speed = float(config.get("replay_speed") or 0)
+        self.conn_index = int(config.get("conn_index", 0))
+        self.steps = None
+        # Recorded DUT output of the whole connection, steps refer to its slices
+        self.rx = bytearray()
+        self.recorded_syncs = []
+        self.syncs_sent = 0
+        # Recorded time matching the current time, see _due()
+        self.clock = None
+
+        try:
+            connections = split_connections(read_session_log(self.path))
+        except (IOError, OSError, SessionLogError) as e:
+            self.LAST_ERROR = "unable to load session log: %s" % str(e)
+            self.logger.prn_err(self.LAST_ERROR)
+            return
+        if self.conn_index >= len(connections):
+            self.LAST_ERROR = (
+                "session log '%s' has %d connections, connection #%d not recorded"
+                % (self.path, len(connections), self.conn_index + 1)
+            )
+            self.logger.prn_err(self.LAST_ERROR)
+            return
+
+        self.steps = deque()
+        for kind, timestamp, payload in connections[self.conn_index]:
+            if kind == RX:
+                start = len(self.rx)
+                self.rx += payload
+                self.steps.append((kind, timestamp, start, len(self.rx)))
+            else:
+                if kind == TX:
+                    self.recorded_syncs.extend(SYNC_REGEX.findall(payload))
+                self.steps.append((kind, timestamp, None, None))
+        if self.steps:
+            self.clock = (self.steps[0][1], time())
+        self.logger.prn_inf(
+            "replaying connection #%d of '%s', %d bytes of DUT output, speed %s"
+            % (
+                self.conn_index + 1,
+                self.path,
+                len(self.rx),
+                self.speed or "unlimited",
+            )
+        )
+
+    def _due(self, timestamp):
+        if not self.speed:
+            return 0
+        return self.clock[1] + (timestamp - self.clock[0]) / self.speed - time()
+
+    def _consume(self, kind):
+        """Remove the next recorded write or reset, restart the clock from it."""
+        for index, step in enumerate(self.steps):
+            if step[0] == kind:
+                del self.steps[index]
+                self.clock = (step[1], time())
+                return True
+        return False
+
+    def read(self, count):
+        """Return the recorded DUT output which is due.
+
+        Args:
+            count: Maximum number of bytes returned.
+        """
+        chunks = []
+        size = 0
+        wait = self.IDLE_TIMEOUT
+        while self.steps and size < count:
+            kind, timestamp, start, end = self.steps[0]
+            if kind != RX:
+                # Waiting for the host to write or reset
+                break
+            due = self._due(timestamp)
+            if due > 0:
+                wait = min(wait, due)
+                break
+            take = min(end - start, count - size)
+            chunks.append(bytes(self.rx[start : start + take]))
+            size += take
+            if start + take == end:
+                self.steps.popleft()
+            else:
+                self.steps[0] = (kind, timestamp, start + take, end)
+        if not chunks:
+            sleep(wait)
+        return b"".join(chunks)
+
+    def write(self, payload, log=False):
+        """Take a write of the host, it lets the DUT output recorded after it go.
+
+        Args:
+            payload: Data written by the host.
+            log: Log the payload.
+        """
+        for sync_uuid in SYNC_REGEX.findall(payload.encode("utf-8")):
+            self._rewrite_sync(sync_uuid)
+        if not self._consume(TX):
+            self.logger.prn_wrn("write not in the recorded session: %s" % payload)
+        if log:
+            self.logger.prn_txd(payload)
+        return True
+
+    def _rewrite_sync(self, sync_uuid):
+        index = self.syncs_sent
+        self.syncs_sent += 1
+        if index >= len(self.recorded_syncs):
+            return
+        recorded = self.recorded_syncs[index]
+        if len(recorded) != len(sync_uuid):
+            # Steps refer to slices of the DUT output, which must not move
+            self.logger.prn_wrn(
+                "recorded __sync UUID '%s' can't be replaced with '%s'"
+                % (recorded.decode("utf-8", "replace"), sync_uuid.decode("utf-8"))
+            )
+            return
+        self.rx = self.rx.replace(recorded, sync_uuid)
+
+    def flush(self):
+        """Nothing to flush."""
+        pass
+
+    def reset(self):
+        """Take a reset of the host, it lets the DUT output recorded after it go."""
+        if self._consume(RESET):
+            self.logger.prn_inf("replaying reset")
+        else:
+            self.logger.prn_wrn("reset not in the recorded session")
+
+    def connected(self):
+        """Return True if the session log was loaded."""
+        return self.steps is not None
+
+    def finish(self):
+        """Nothing to release."""
+        pass
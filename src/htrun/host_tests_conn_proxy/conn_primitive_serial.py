@@ -15,6 +15,9 @@ from .conn_primitive import ConnectorPrimitive, ConnectorPrimitiveException
 class SerialConnectorPrimitive(ConnectorPrimitive):
     """ConnectorPrimitive implementation using serial IO."""
 
+    # read() sleeps for read_timeout before reading
+    BLOCKING_READ = True
+
     def __init__(self, name, port, baudrate, config):
         """Initialise with serial params.
 
@@ -0,0 +1,319 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Connect to a device's serial port exported by a serial-over-Ethernet server."""
+
+import select
+import socket
+import struct
+import time
+
+from .conn_primitive import ConnectorPrimitive
+
+# Telnet (RFC 854) commands and options used by RFC 2217
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+BINARY = 0
+SGA = 3
+COM_PORT_OPTION = 44
+
+# RFC 2217 client to server sub-negotiation commands
+SET_BAUDRATE = 1
+SET_DATASIZE = 2
+SET_PARITY = 3
+SET_STOPSIZE = 4
+SET_CONTROL = 5
+
+# SET_CONTROL values
+BREAK_ON = 5
+BREAK_OFF = 6
+
+PARITY_NONE = 1
+STOPSIZE_1 = 1
+
+# Options htrun asks the server to enable, on either side
+_OPTIONS_WILL = (BINARY, SGA, COM_PORT_OPTION)
+_OPTIONS_DO = (BINARY, SGA)
+
+
+def parse_socket_url(url):
+    """Split a --socket URL into protocol, host and port.
+
+    Args:
+        url: 'tcp://HOST:PORT', 'rfc2217://HOST:PORT' or 'HOST:PORT' for TCP.
+
+    Returns:
+        Tuple of (protocol, host, port), protocol is 'tcp' or 'rfc2217'.
+
+    Raises:
+        ValueError: The URL is not valid.
+    """
+    protocol, sep, address = url.partition("://")
+    if not sep:
+        protocol, address = "tcp", url
+    if protocol not in ("tcp", "rfc2217"):
+        raise ValueError("unknown socket protocol '%s'" % protocol)
+    host, sep, port = address.rpartition(":")
+    if not sep or not host or not port.isdigit():
+        raise ValueError("socket address '%s' should be HOST:PORT" % address)
+    return protocol, host.strip("[]"), int(port)
+
+
+class TelnetDecoder(object):
+    """Strip Telnet commands from the bytes received from an RFC 2217 server."""
+
+    def __init__(self):
+        """Start with an empty buffer."""
+        # Incomplete command at the end of the last received bytes
+        self.pending = b""
+
+    def decode(self, data):
+        """Split received bytes into target output and Telnet commands.
+
+        Args:
+            data: Bytes received from the server.
+
+        Returns:
+            Tuple of (target output, list of (command, option) negotiations).
+            Sub-negotiations (server notifications) are skipped.
+        """
+        data = self.pending + data
+        self.pending = b""
+        output = bytearray()
+        negotiations = []
+        pos = 0
+        while True:
+            iac = data.find(b"\xff", pos)
+            if iac < 0:
+                output += data[pos:]
+                break
+            output += data[pos:iac]
+            if iac + 1 >= len(data):
+                self.pending = data[iac:]
+                break
+            command = data[iac + 1]
+            if command == IAC:
+                # Escaped 0xff data byte
+                output.append(IAC)
+                pos = iac + 2
+            elif command in (WILL, WONT, DO, DONT):
+                if iac + 2 >= len(data):
+                    self.pending = data[iac:]
+                    break
+                negotiations.append((command, data[iac + 2]))
+                pos = iac + 3
+            elif command == SB:
+                end = data.find(b"\xff\xf0", iac + 2)
+                if end < 0:
+                    self.pending = data[iac:]
+                    break
+                pos = end + 2
+            else:
+                # NOP, data mark, etc.
+                pos = iac + 2
+        return bytes(output), negotiations
+
+
+class SocketConnectorPrimitive(ConnectorPrimitive):
+    """ConnectorPrimitive for a serial port exported over TCP, raw or RFC 2217.
+
+    Writes are coalesced: they are buffered and sent with a single send() before
+    the next read, so the sync preamble and KV pairs written in one iteration of
+    the connection loop go out in one TCP segment. Nagle's algorithm is disabled,
+    so that segment is sent right away.
+    """
+
+    # Time read() waits for data, in seconds
+    READ_TIMEOUT = 0.01
+    BLOCKING_READ = True
+
+    # Time sends may block, in seconds
+    WRITE_TIMEOUT = 5
+
+    # Duration of the break sent to reset the target, in seconds
+    BREAK_DURATION = 0.25
+
+    def __init__(self, name, url, baudrate, config):
+        """Connect to the serial-over-Ethernet server.
+
+        Args:
+            name: Name to display in the log.
+            url: Server address, see parse_socket_url().
+            baudrate: Baud rate set on the serial port of an RFC 2217 server.
+            config: Map of config parameters describing the state of the DUT.
+        """
+        ConnectorPrimitive.__init__(self, name)
+        self.url = url
+        self.baudrate = int(baudrate)
+        self.config = config
+        self.polling_timeout = int(config.get("polling_timeout", 60))
+        self.forced_reset_timeout = config.get("forced_reset_timeout", 1)
+        self.skip_reset = config.get("skip_reset", False)
+        self.sock = None
+        self.tx_buffer = bytearray()
+        self.decoder = TelnetDecoder()
+
+        try:
+            self.protocol, host, port = parse_socket_url(url)
+        except ValueError as e:
+            self.LAST_ERROR = str(e)
+            self.logger.prn_err(self.LAST_ERROR)
+            return
+
+        start_time = time.time()
+        self.logger.prn_inf(
+            "socket(%s://%s:%d, baudrate=%d)" % (self.protocol, host, port, baudrate)
+        )
+        while time.time() - start_time < self.polling_timeout:
+            try:
+                self.sock = socket.create_connection(
+                    (host, port), timeout=self.WRITE_TIMEOUT
+                )
+            except (IOError, OSError) as e:
+                self.LAST_ERROR = "connection lost, socket(%s): %s" % (url, str(e))
+                self.logger.prn_err(str(e))
+                self.logger.prn_err(
+                    "Retry after 1 sec until %s seconds" % self.polling_timeout
+                )
+                time.sleep(1)
+                continue
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.protocol == "rfc2217":
+                self._negotiate()
+            if not self.skip_reset:
+                self.reset()
+            break
+
+    def _negotiate(self):
+        """Enable the RFC 2217 option and configure the serial port."""
+        for option in _OPTIONS_WILL:
+            self.tx_buffer += bytes([IAC, WILL, option])
+        for option in _OPTIONS_DO:
+            self.tx_buffer += bytes([IAC, DO, option])
+        self._subnegotiate(SET_BAUDRATE, struct.pack(">I", self.baudrate))
+        self._subnegotiate(SET_DATASIZE, bytes([8]))
+        self._subnegotiate(SET_PARITY, bytes([PARITY_NONE]))
+        self._subnegotiate(SET_STOPSIZE, bytes([STOPSIZE_1]))
+        self._send()
+
+    def _subnegotiate(self, command, value):
+        value = value.replace(b"\xff", b"\xff\xff")
+        self.tx_buffer += (
+            bytes([IAC, SB, COM_PORT_OPTION, command]) + value + bytes([IAC, SE])
+        )
+
+    def _reply(self, negotiations):
+        """Refuse options the server offers or asks for which htrun did not."""
+        for command, option in negotiations:
+            if command == DO and option not in _OPTIONS_WILL:
+                self.tx_buffer += bytes([IAC, WONT, option])
+            elif command == WILL and option not in _OPTIONS_DO:
+                self.tx_buffer += bytes([IAC, DONT, option])
+
+    def _send(self):
+        """Send the coalesced writes."""
+        if not self.tx_buffer or self.sock is None:
+            return self.sock is not None
+        try:
+            self.sock.sendall(self.tx_buffer)
+        except (IOError, OSError) as e:
+            self._lost("send(%d bytes): %s" % (len(self.tx_buffer), str(e)))
+            return False
+        del self.tx_buffer[:]
+        return True
+
+    def _lost(self, error):
+        self.LAST_ERROR = "connection lost, socket %s" % error
+        self.logger.prn_err(self.LAST_ERROR)
+        del self.tx_buffer[:]
+        self.finish()
+
+    def read(self, count):
+        """Send pending writes, then read data received from the server.
+
+        Args:
+            count: Maximum number of bytes to read.
+        """
+        if not self._send():
+            return b""
+        try:
+            readable, _, _ = select.select([self.sock], [], [], self.READ_TIMEOUT)
+            if not readable:
+                return b""
+            data = self.sock.recv(count)
+        except (IOError, OSError) as e:
+            self._lost("recv(%d): %s" % (count, str(e)))
+            return b""
+        if not data:
+            self._lost("closed by the server")
+            return b""
+        if self.protocol == "rfc2217":
+            data, negotiations = self.decoder.decode(data)
+            self._reply(negotiations)
+        return data
+
+    def write(self, payload, log=False):
+        """Queue data for the server, it is sent before the next read.
+
+        Args:
+            payload: Data to write.
+            log: Log the payload.
+        """
+        if self.sock is None:
+            return False
+        data = payload.encode("utf-8")
+        if self.protocol == "rfc2217":
+            data = data.replace(b"\xff", b"\xff\xff")
+        self.tx_buffer += data
+        if log:
+            self.logger.prn_txd(payload)
+        return True
+
+    def flush(self):
+        """Send pending writes now."""
+        self._send()
+
+    def reset(self):
+        """Reset the target with a break, only possible with RFC 2217."""
+        if self.sock is None:
+            return
+        if self.protocol != "rfc2217":
+            self.logger.prn_wrn("reset not supported by raw TCP connections")
+            return
+        self.logger.prn_inf("reset device using RFC 2217 break...")
+        self._subnegotiate(SET_CONTROL, bytes([BREAK_ON]))
+        self._send()
+        time.sleep(self.BREAK_DURATION)
+        self._subnegotiate(SET_CONTROL, bytes([BREAK_OFF]))
+        self._send()
+        if self.forced_reset_timeout:
+            self.logger.prn_inf(
+                "waiting %.2f sec after reset" % self.forced_reset_timeout
+            )
+            time.sleep(self.forced_reset_timeout)
+
+    def connected(self):
+        """Return True if connected to the server."""
+        return self.sock is not None
+
+    def finish(self):
+        """Send pending writes and close the connection."""
+        if self.sock is not None:
+            try:
+                if self.tx_buffer:
+                    self.sock.sendall(self.tx_buffer)
+            except (IOError, OSError):
+                pass
+            finally:
+                self.sock.close()
+                self.sock = None
+
+    def __del__(self):
+        """Release resources when garbage collected."""
+        self.finish()
@@ -4,14 +4,21 @@
 #
 """Create and manage connection to the DUT."""
 
+import os
 import re
 import sys
+import threading
 import uuid
+from collections import deque
 from time import time
 from ..host_tests_logger import HtrunLogger
 from .conn_primitive_serial import SerialConnectorPrimitive
 from .conn_primitive_remote import RemoteConnectorPrimitive
 from .conn_primitive_fastmodel import FastmodelConnectorPrimitive
+from .conn_primitive_record import RecordingConnectorPrimitive
+from .conn_primitive_replay import ReplayConnectorPrimitive
+from .conn_primitive_process import ProcessConnectorPrimitive
+from .conn_primitive_socket import SocketConnectorPrimitive
 
 if sys.version_info > (3, 0):
     from queue import (
@@ -28,12 +35,21 @@ class KiViBufferWalker:
     an object to just parse them from another buffer.
     """
 
-    def __init__(self):
-        """Initialise the object."""
+    # Longest line kept in the buffer while waiting for its end, in characters
+    MAX_LINE_LENGTH = 65536
+
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        """Initialise the object.
+
+        Args:
+            max_line_length: Longest incomplete line kept in the buffer. Longer
+                lines are returned without waiting for their end.
+        """
         self.KIVI_REGEX = r"\{\{([\w\d_-]+);([^\}]+)\}\}"
         self.buff = str()
-        self.kvl = []
+        self.kvl = deque()
         self.re_kv = re.compile(self.KIVI_REGEX)
+        self.max_line_length = max_line_length
 
     def append(self, payload):
         """Append a KV pair to the buffer.
@@ -56,6 +72,10 @@ class KiViBufferWalker:
         lines = self.buff.split("\n")
         self.buff = lines[-1]  # remaining
         lines.pop(-1)
+        if len(self.buff) > self.max_line_length:
+            # Don't let a target which never sends a new line fill the memory
+            lines.append(self.buff)
+            self.buff = str()
         # List of line or strings that did not match K,V pair.
         discarded = []
 
@@ -86,7 +106,7 @@ class KiViBufferWalker:
     def pop_kv(self):
         """Pop a KV pair from the buffer."""
         if len(self.kvl):
-            return self.kvl.pop(0)
+            return self.kvl.popleft()
         return None, None, time()
 
 
@@ -95,7 +115,8 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
 
     Args:
         conn_resource: Name of connection primitive (e.g. 'serial' for
-           local serial port connection or 'grm' for global resource manager).
+           local serial port connection, 'grm' for global resource manager or
+           'process' for a test binary running as a local process).
         event_queue: Event queue of Key-Value protocol messages.
         config: Global configuration map describing the connection target.
         logger: Host Test logger instance.
@@ -120,6 +141,12 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
 
         logger.prn_inf("initializing serial port listener... ")
         connector = SerialConnectorPrimitive("SERI", port, baudrate, config=config)
+    elif conn_resource == "socket":
+        # Serial port exported by a serial-over-Ethernet server
+        logger.prn_inf("initializing socket listener... ")
+        connector = SocketConnectorPrimitive(
+            "SOCK", config.get("socket"), config.get("baudrate"), config=config
+        )
     elif conn_resource == "grm":
         # Start GRM (Gloabal Resource Mgr) collection
         logger.prn_inf("initializing global resource mgr listener... ")
@@ -128,6 +155,14 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
         # Start Fast Model Connection collection
         logger.prn_inf("initializing fast model connection")
         connector = FastmodelConnectorPrimitive("FSMD", config=config)
+    elif conn_resource == "replay":
+        # Play back a session recorded with --record
+        logger.prn_inf("initializing session replay")
+        connector = ReplayConnectorPrimitive("RPLY", config=config)
+    elif conn_resource == "process":
+        # Test binary running as a local process
+        logger.prn_inf("initializing process connection")
+        connector = ProcessConnectorPrimitive("PROC", config=config)
     else:
         logger.pn_err("unknown connection resource!")
         raise NotImplementedError(
@@ -135,6 +170,12 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
             % conn_resource
         )
 
+    if config.get("record"):
+        # Connections after the first one are added to the same session
+        connector = RecordingConnectorPrimitive(
+            connector, config["record"], append=config.get("conn_index", 0) > 0
+        )
+
     return connector
 
 
@@ -182,6 +223,27 @@ def conn_process(event_queue, dut_event_queue, config):
     # Create simple buffer we will use for Key-Value protocol data
     kv_buffer = KiViBufferWalker()
 
+    # Keys of the events the host process handles, all events are forwarded until
+    # the host test subscribes
+    subscribed_keys = None
+
+    # Number of events not forwarded to the host process, by key
+    dropped_events = {}
+
+    def __forward(key, value, timestamp):
+        if subscribed_keys is None or key in subscribed_keys:
+            event_queue.put((key, value, timestamp))
+            return True
+        dropped_events[key] = dropped_events.get(key, 0) + 1
+        return False
+
+    def __log_dropped_events():
+        for key in sorted(dropped_events):
+            logger.prn_inf(
+                "%d '%s' events not forwarded to host test, no subscriber"
+                % (dropped_events[key], key)
+            )
+
     # List of all sent to target UUIDs (if multiple found)
     sync_uuid_list = []
 
@@ -275,7 +337,14 @@ def conn_process(event_queue, dut_event_queue, config):
                     "received special event '%s' value='%s', finishing" % (key, value)
                 )
                 connector.finish()
+                __log_dropped_events()
                 return 0
+            elif key == "__subscribe":
+                subscribed_keys = frozenset(value)
+                logger.prn_inf(
+                    "received special event '%s', forwarding %d event keys"
+                    % (key, len(subscribed_keys))
+                )
             elif key == "__reset":
                 logger.prn_inf("received special event '%s', resetting dut" % (key))
                 connector.reset()
@@ -285,23 +354,28 @@ def conn_process(event_queue, dut_event_queue, config):
                 __notify_conn_lost()
                 break
 
-        # Since read is done every 0.2 sec, with maximum baud rate we can receive 2304
-        # bytes in one read in worst case.
-        data = connector.read(2304)
+        # Read sizes and waits while the DUT is idle adapt to the output rate
+        data = connector.poll()
         if data:
             # Stream data stream KV parsing
             print_lines = kv_buffer.append(data)
             for line in print_lines:
                 logger.prn_rxd(line)
-                event_queue.put(("__rxd_line", line, time()))
+                __forward("__rxd_line", line, time())
             while kv_buffer.search():
                 key, value, timestamp = kv_buffer.pop_kv()
 
                 if sync_uuid_discovered:
-                    event_queue.put((key, value, timestamp))
-                    logger.prn_inf(
-                        "found KV pair in stream: {{%s;%s}}, queued..." % (key, value)
-                    )
+                    if __forward(key, value, timestamp):
+                        logger.prn_inf(
+                            "found KV pair in stream: {{%s;%s}}, queued..."
+                            % (key, value)
+                        )
+                    else:
+                        logger.prn_inf(
+                            "found KV pair in stream: {{%s;%s}}, not subscribed..."
+                            % (key, value)
+                        )
                 else:
                     if key == "__sync":
                         if value in sync_uuid_list:
@@ -357,4 +431,36 @@ def conn_process(event_queue, dut_event_queue, config):
                 __notify_sync_failed()
                 break
 
+    __log_dropped_events()
     return 0
+
+
+class ConnectionThread(threading.Thread):
+    """Run conn_process() in a thread of the host process.
+
+    Connectors then live as long as the host process, so resources they keep
+    warm between tests (see RemoteResourcePool) can be used by the next test run
+    by the same process. The thread has the parts of the multiprocessing.Process
+    interface used by the host test.
+    """
+
+    def __init__(self, args):
+        """Create the thread.
+
+        Args:
+            args: Arguments of conn_process().
+        """
+        threading.Thread.__init__(self, name="conn_process")
+        self.daemon = True
+        self.args = args
+        self.exitcode = None
+        self.pid = os.getpid()
+
+    def run(self):
+        """Run conn_process(), exitcode is 1 if it raised an exception."""
+        self.exitcode = 1
+        self.exitcode = conn_process(*self.args)
+
+    def terminate(self):
+        """Ask conn_process() to finish, threads can't be killed."""
+        self.args[1].put(("__host_test_finished", True, time()))
@@ -0,0 +1,345 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Prioritised event queue between the connection process and the host process."""
+
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+from multiprocessing import Queue, Semaphore
+from time import time
+
+if sys.version_info > (3, 0):
+    from queue import Empty as QueueEmpty, Full as QueueFull, Queue as ThreadQueue
+else:
+    from Queue import Empty as QueueEmpty, Full as QueueFull, Queue as ThreadQueue
+
+
+# Out of band events which must never wait behind other events. '__exit' and
+# '__timeout' are sent by the DUT and stay in order with the DUT's other KV
+# events, as does '__exit_event_queue' which marks the end of the events queued
+# before it. Resets requested by the host test ('__reset', '__reset_dut') stay
+# behind the DUT events queued before them, so those are handled before the
+# DUT reboots.
+CONTROL_EVENTS = frozenset(
+    [
+        "__conn_process_start",
+        "__notify_conn_lost",
+        "__notify_sync_failed",
+        "__notify_complete",
+    ]
+)
+
+RXD_EVENT = "__rxd_line"
+
+# Event after which target output is interleaved with coverage KV events
+COVERAGE_EVENT = "__coverage_start"
+
+# Event queued in the KV lane in place of the events written to a spill file
+SPILL_EVENT = "__spilled"
+
+_RECORD_HEADER = struct.Struct("<I")
+
+
+class SpillWriter(object):
+    """Producer side of a spill file, KV events which did not fit in memory."""
+
+    def __init__(self, spill_dir):
+        """Create the spill file.
+
+        Args:
+            spill_dir: Directory the spill file is created in.
+        """
+        try:
+            os.makedirs(spill_dir)
+        except OSError:
+            # Created by another producer
+            pass
+        fd, self.path = tempfile.mkstemp(suffix=".spill", dir=spill_dir)
+        self.file = os.fdopen(fd, "wb", 0)
+        self.count = 0
+
+    def write(self, event):
+        """Append an event to the spill file."""
+        payload = pickle.dumps(event, pickle.HIGHEST_PROTOCOL)
+        # Single write, so the reader never sees half of a record
+        self.file.write(_RECORD_HEADER.pack(len(payload)) + payload)
+        self.count += 1
+
+    def close(self):
+        """Mark the end of the spill file."""
+        self.file.write(_RECORD_HEADER.pack(0))
+        self.file.close()
+
+
+class SpillReader(object):
+    """Consumer side of a spill file."""
+
+    END = object()
+
+    def __init__(self, path):
+        """Open the spill file."""
+        self.path = path
+        self.file = open(path, "rb")
+
+    def read(self):
+        """Read the next event from the spill file.
+
+        Returns:
+            The event, END when the spill file is finished or None when the next
+            event was not written yet.
+        """
+        header = self.file.read(_RECORD_HEADER.size)
+        if len(header) == _RECORD_HEADER.size:
+            (length,) = _RECORD_HEADER.unpack(header)
+            if not length:
+                self.file.close()
+                os.remove(self.path)
+                return self.END
+            payload = self.file.read(length)
+            if len(payload) == length:
+                return pickle.loads(payload)
+            header += payload
+        self.file.seek(-len(header), os.SEEK_CUR)
+        return None
+
+    def finished(self):
+        """Check if all events were read and the spill file is finished."""
+        header = self.file.read(_RECORD_HEADER.size)
+        if header == _RECORD_HEADER.pack(0):
+            self.file.close()
+            os.remove(self.path)
+            return True
+        self.file.seek(-len(header), os.SEEK_CUR)
+        return False
+
+
+class EventLanes(object):
+    """Event queue with separate control, KV and bulk target output lanes.
+
+    Drop-in replacement for the multiprocessing.Queue used for events sent to the
+    host process. get() always returns control events first, then KV events and
+    only then '__rxd_line' events.
+
+    The bulk lane holding '__rxd_line' events is bounded. When it is full new
+    lines are dropped and the number of dropped lines is reported with a
+    '__notify_rxd_dropped' event. When the host process needs every line, for
+    example to capture or compare the target output, 'ordered_rxd' routes
+    '__rxd_line' events to the KV lane instead, in order with the KV events. The
+    producer also does so from the first '__coverage_start' event on, as code
+    coverage is read from target output and KV events in turn.
+
+    The KV lane never drops events, but only keeps a bounded number of them in
+    memory. When it is full, the producer writes events to a temporary spill file
+    and queues a '__spilled' reference to the file in their place. get() reads
+    the spilled events back in order and removes the file.
+    """
+
+    CONTROL = 0
+    KV = 1
+    BULK = 2
+
+    # Time get_nowait() waits for an event which is counted but still in flight
+    # from the producer, in seconds
+    IN_FLIGHT_TIMEOUT = 1
+
+    # Number of events written to a spill file before the producer checks if
+    # there is room in the KV lane again
+    SPILL_CHUNK = 1000
+
+    def __init__(self, bulk_size=10000, ordered_rxd=False, kv_size=10000):
+        """Create the lanes.
+
+        Args:
+            bulk_size: Maximum number of queued '__rxd_line' events.
+            ordered_rxd: Queue '__rxd_line' events with KV events, never drop them.
+            kv_size: Maximum number of KV events kept in memory.
+        """
+        self.lanes = (Queue(), Queue(maxsize=kv_size), Queue(maxsize=bulk_size))
+        # Target output left in the bulk lane when the test is over is not read,
+        # the producer must not wait for it to be flushed when it exits.
+        self.lanes[self.BULK].cancel_join_thread()
+        # Count events in each lane, so get() never polls an empty lane
+        self.counts = (Semaphore(0), Semaphore(0), Semaphore(0))
+        # Counts events in all lanes, so get() can block on all of them at once
+        self.ready = Semaphore(0)
+        self.ordered_rxd = ordered_rxd
+        # Producer side count of dropped '__rxd_line' events not reported yet
+        self.dropped = 0
+        # Producer side spill state, see _put_kv()
+        self.spill_pid = None
+        # Consumer side spill files being read, oldest first
+        self.readers = []
+        # Created by the first producer which spills, removed by close()
+        self.spill_dir = os.path.join(
+            tempfile.gettempdir(), "htrun-events-%d-%d" % (os.getpid(), id(self))
+        )
+
+    def __getstate__(self):
+        """Leave out the spill state, it is local to each process."""
+        state = dict(self.__dict__)
+        for name in ("spill", "spill_refs", "spill_refs_pending", "spill_lock"):
+            state.pop(name, None)
+        state["spill_pid"] = None
+        state["readers"] = []
+        return state
+
+    def lane_of(self, key):
+        """Return the lane an event with the given key is queued in."""
+        if key in CONTROL_EVENTS:
+            return self.CONTROL
+        if key == RXD_EVENT and not self.ordered_rxd:
+            return self.BULK
+        return self.KV
+
+    def put(self, event):
+        """Queue an event.
+
+        Args:
+            event: Tuple of (key, value, timestamp).
+        """
+        if event[0] == COVERAGE_EVENT:
+            self.ordered_rxd = True
+        lane = self.lane_of(event[0])
+        if lane == self.BULK:
+            try:
+                self.lanes[lane].put_nowait(event)
+            except QueueFull:
+                self.dropped += 1
+                return
+            self._count(lane)
+        elif lane == self.KV:
+            self._put_kv(event)
+        else:
+            self.lanes[lane].put(event)
+            self._count(lane)
+        if self.dropped:
+            # Report lines dropped since the last event which made it
+            dropped, self.dropped = self.dropped, 0
+            self._put_kv(("__notify_rxd_dropped", dropped, time()))
+
+    def _count(self, lane):
+        self.counts[lane].release()
+        self.ready.release()
+
+    def _put_kv(self, event):
+        if self.spill_pid != os.getpid():
+            # First KV event from this process
+            self.spill_pid = os.getpid()
+            self.spill = None
+            self.spill_refs = None
+            self.spill_refs_pending = 0
+            self.spill_lock = threading.Lock()
+        with self.spill_lock:
+            # KV events must not overtake a spill file reference waiting for room
+            # in the KV lane, they are spilled too until it is queued.
+            if self.spill is None and not self.spill_refs_pending:
+                try:
+                    self.lanes[self.KV].put_nowait(event)
+                except QueueFull:
+                    pass
+                else:
+                    self._count(self.KV)
+                    return
+            if self.spill is None:
+                self._start_spill()
+            self.spill.write(event)
+            self._count(self.KV)
+            if self.spill.count >= self.SPILL_CHUNK:
+                self.spill.close()
+                self.spill = None
+
+    def _start_spill(self):
+        self.spill = SpillWriter(self.spill_dir)
+        if self.spill_refs is None:
+            self.spill_refs = ThreadQueue()
+            thread = threading.Thread(target=self._queue_spill_refs)
+            thread.daemon = True
+            thread.start()
+        self.spill_refs_pending += 1
+        self.spill_refs.put((self.spill, (SPILL_EVENT, self.spill.path, time())))
+
+    def _queue_spill_refs(self):
+        # Waits for room in the KV lane, the producer carries on meanwhile
+        while True:
+            spill, ref = self.spill_refs.get()
+            self.lanes[self.KV].put(ref)
+            with self.spill_lock:
+                self.spill_refs_pending -= 1
+                if self.spill is spill:
+                    # There is room in the KV lane again, stop spilling
+                    spill.close()
+                    self.spill = None
+
+    def get(self, block=True, timeout=None):
+        """Remove and return the event with the highest priority.
+
+        Args:
+            block: Wait for an event if there is none.
+            timeout: Maximum time to wait for an event, in seconds.
+
+        Returns:
+            Tuple of (key, value, timestamp).
+
+        Raises:
+            queue.Empty: No event was available.
+        """
+        if not self.ready.acquire(block, timeout):
+            raise QueueEmpty
+        # Each event is counted in its lane before it is counted in 'ready', so
+        # one of the lanes holds the event. It may still be in flight from the
+        # producer, get() on the lane waits for it.
+        if not block:
+            timeout = self.IN_FLIGHT_TIMEOUT
+        for index, count in enumerate(self.counts):
+            if count.acquire(False):
+                try:
+                    if index == self.KV:
+                        return self._get_kv(timeout)
+                    return self.lanes[index].get(timeout=timeout)
+                except QueueEmpty:
+                    # Still in flight, the next get() reads it
+                    count.release()
+                    self.ready.release()
+                    raise
+        # Taken by another consumer
+        self.ready.release()
+        raise QueueEmpty
+
+    def _get_kv(self, timeout):
+        while True:
+            for reader in list(self.readers):
+                event = reader.read()
+                if event is SpillReader.END:
+                    self.readers.remove(reader)
+                elif event is not None:
+                    return event
+            # Not spilled, or the reference to the spill file is not read yet
+            event = self.lanes[self.KV].get(timeout=timeout)
+            if event[0] != SPILL_EVENT:
+                return event
+            self.readers.append(SpillReader(event[1]))
+
+    def get_nowait(self):
+        """Remove and return an event without blocking."""
+        return self.get(block=False)
+
+    def close(self):
+        """Remove the spill files of events which were not read.
+
+        Called by the consumer once the producers are finished.
+        """
+        for reader in self.readers:
+            reader.file.close()
+        self.readers = []
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def empty(self):
+        """Return True if there are no events in any lane."""
+        self.readers = [reader for reader in self.readers if not reader.finished()]
+        return not self.readers and all(lane.empty() for lane in self.lanes)
@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Resources kept between test runs of one htrun process."""
+
+import atexit
+import threading
+import time
+
+
+class IdleResourcePool(object):
+    """Resources a test run leaves for the next run with the same key.
+
+    Items are tuples ending with the resource, e.g. (module, resource), which
+    take() returns as they were put. Resources left idle longer than their idle
+    timeout, or found dead when taken, are shut down, as are all resources when
+    the process exits. Subclasses define alive() and shutdown().
+    """
+
+    def __init__(self):
+        """Create an empty pool, shut down when the process exits."""
+        # Key -> list of [item, expiry time]
+        self.entries = {}
+        self.lock = threading.Lock()
+        atexit.register(self.clear)
+
+    def alive(self, resource):
+        """Check if a resource can be used, False if the check fails."""
+        raise NotImplementedError
+
+    def shutdown(self, resource):
+        """Shut a resource down, ignoring errors."""
+        raise NotImplementedError
+
+    def put(self, key, item, idle_timeout):
+        """Keep a resource for the next run.
+
+        Args:
+            key: Runs with the same key can use the resource.
+            item: Tuple ending with the resource.
+            idle_timeout: Time after which the resource is shut down if no run
+                took it, in seconds.
+        """
+        with self.lock:
+            self.entries.setdefault(key, []).append([item, time.time() + idle_timeout])
+        timer = threading.Timer(idle_timeout, self.reap)
+        timer.daemon = True
+        timer.start()
+
+    def take(self, key):
+        """Return a live item matching key, None if there is none."""
+        self.reap()
+        while True:
+            with self.lock:
+                entries = self.entries.get(key)
+                if not entries:
+                    return None
+                item, _ = entries.pop()
+            if self.alive(item[-1]):
+                return item
+            self.shutdown(item[-1])
+
+    def reap(self):
+        """Shut down the resources idle for longer than their idle timeout."""
+        now = time.time()
+        expired = []
+        with self.lock:
+            for entries in self.entries.values():
+                expired.extend(entry for entry in entries if entry[1] <= now)
+                entries[:] = [entry for entry in entries if entry[1] > now]
+        for item, _ in expired:
+            self.shutdown(item[-1])
+
+    def clear(self):
+        """Shut down all resources."""
+        with self.lock:
+            entries = [e for entries in self.entries.values() for e in entries]
+            self.entries = {}
+        for item, _ in entries:
+            self.shutdown(item[-1])
@@ -0,0 +1,120 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Binary log of the traffic between htrun and a DUT.
+
+A session log starts with a short header followed by records. Each record has a
+one byte type, a timestamp (seconds since the epoch, double) and the length of
+its payload (unsigned 32 bit), all little endian, followed by the payload:
+
+- OPEN: a connection to the DUT was opened, no payload
+- RX: bytes read from the DUT
+- TX: bytes written to the DUT
+- RESET: the DUT was reset, no payload
+
+A session holds one OPEN record for each connection process started by htrun,
+e.g. the initial connection and one more after each '__reset_dut' request.
+"""
+
+import struct
+
+MAGIC = b"HTRS\x01"
+
+OPEN = 0
+RX = 1
+TX = 2
+RESET = 3
+
+RECORD_NAMES = {OPEN: "OPEN", RX: "RX", TX: "TX", RESET: "RESET"}
+
+_RECORD_HEADER = struct.Struct("<BdI")
+
+
+class SessionLogError(Exception):
+    """File is not a valid session log."""
+
+    pass
+
+
+class SessionLogWriter(object):
+    """Append records to a session log."""
+
+    def __init__(self, path, append=False):
+        """Open the session log.
+
+        Args:
+            path: Path to the session log.
+            append: Append to an existing session log instead of starting a new one.
+        """
+        self.path = path
+        self.file = open(path, "ab" if append else "wb")
+        if not self.file.tell():
+            self.file.write(MAGIC)
+
+    def write(self, kind, timestamp, payload=b""):
+        """Append a record.
+
+        Args:
+            kind: Record type, one of OPEN, RX, TX or RESET.
+            timestamp: Time of the event.
+            payload: Bytes read or written.
+        """
+        self.file.write(_RECORD_HEADER.pack(kind, timestamp, len(payload)) + payload)
+
+    def flush(self):
+        """Write buffered records to the file."""
+        self.file.flush()
+
+    def close(self):
+        """Close the session log."""
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_session_log(path):
+    """Read the records of a session log.
+
+    A record truncated by a crash of the recording htrun is ignored.
+
+    Args:
+        path: Path to the session log.
+
+    Returns:
+        List of (type, timestamp, payload) tuples.
+
+    Raises:
+        SessionLogError: The file is not a session log.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise SessionLogError("'%s' is not an htrun session log" % path)
+    records = []
+    offset = len(MAGIC)
+    while offset + _RECORD_HEADER.size <= len(data):
+        kind, timestamp, length = _RECORD_HEADER.unpack_from(data, offset)
+        offset += _RECORD_HEADER.size
+        if offset + length > len(data):
+            break
+        records.append((kind, timestamp, data[offset : offset + length]))
+        offset += length
+    return records
+
+
+def split_connections(records):
+    """Split session log records into the records of each connection.
+
+    Args:
+        records: Records returned by read_session_log().
+
+    Returns:
+        List with a list of records for each connection, without the OPEN records.
+    """
+    connections = []
+    for record in records:
+        if record[0] == OPEN:
+            connections.append([])
+        elif connections:
+            connections[-1].append(record)
+    return connections
@@ -80,6 +80,19 @@ def call_plugin(type, capability, *args, **kwargs):
     return HOST_TEST_PLUGIN_REGISTRY.call_plugin(type, capability, *args, **kwargs)
 
 
+def get_plugin(type, capability):
+    """Get a plugin from the HOST_TEST_PLUGIN_REGISTRY.
+
+    Args:
+        type: Type of a plugin.
+        capability: Plugin capability.
+
+    Returns:
+        The first plugin with this type and capability, or None.
+    """
+    return HOST_TEST_PLUGIN_REGISTRY.get_plugin(type, capability)
+
+
 def get_plugin_caps(type):
     """Get a list of all capabilities for a plugin type.
 
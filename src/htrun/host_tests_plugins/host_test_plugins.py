@@ -3,18 +3,138 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 """Base class for plugins."""
+import asyncio
+import errno
+import functools
 import os
+import signal
 import sys
 import platform
+import threading
 
 from os import access, F_OK
 from sys import stdout
-from time import sleep
-from subprocess import call
+from time import sleep, time
+from subprocess import call, DEVNULL, PIPE, STDOUT, Popen, TimeoutExpired
 
 from mbed_lstools.main import create
 from ..host_tests_logger import HtrunLogger
 
+# Bytes copied per system call by copy_file()
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Smallest copy copy_file() prints its progress for
+COPY_PROGRESS_SIZE = 1024 * 1024
+
+# Errors of a copy method not supported for a pair of files, the next one is tried
+COPY_UNSUPPORTED_ERRNOS = set(
+    getattr(errno, name)
+    for name in ("EXDEV", "ENOSYS", "EINVAL", "ENOTSUP", "EOPNOTSUPP", "ENOTSOCK")
+    if hasattr(errno, name)
+)
+
+# Seconds the output of a command is still logged for once it has exited
+COMMAND_OUTPUT_TIMEOUT = 5
+
+# Commands run in a process group of their own, so they can be killed with the
+# processes they start
+if os.name == "nt":
+    NEW_PROCESS_GROUP = {"creationflags": 0x00000200}  # CREATE_NEW_PROCESS_GROUP
+else:
+    NEW_PROCESS_GROUP = {"start_new_session": True}
+
+
+def kill_process_tree(process):
+    """Kill a process started with NEW_PROCESS_GROUP and the processes it started.
+
+    Args:
+        process: subprocess.Popen object.
+    """
+    if os.name == "nt":
+        call(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # Already gone
+            pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _read_write(src_fd, dst_fd, offset, count):
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    data = os.read(src_fd, count)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(dst_fd, view) :]
+    return len(data)
+
+
+def copy_fd(src_fd, dst_fd, size, chunk_size=COPY_CHUNK_SIZE, progress=None):
+    """Copy a file between file descriptors, in the kernel when possible.
+
+    os.copy_file_range() is tried first, then os.sendfile() on Linux, then
+    reading and writing. A method not supported for the pair of files hands
+    over to the next one where it stopped.
+
+    Args:
+        src_fd: File descriptor to read, from offset 0.
+        dst_fd: File descriptor to write, from offset 0.
+        size: Number of bytes to copy.
+        chunk_size: Bytes copied per system call.
+        progress: Function called with the bytes copied and size after each
+            chunk, or None.
+
+    Returns:
+        Number of bytes copied, less than size if the source was shorter.
+
+    Raises:
+        OSError: Reading or writing failed.
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(_copy_file_range)
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        methods.append(_sendfile)
+    methods.append(_read_write)
+
+    copied = 0
+    for method in methods:
+        try:
+            while copied < size:
+                count = method(src_fd, dst_fd, copied, min(chunk_size, size - copied))
+                if not count:
+                    break
+                copied += count
+                if progress:
+                    progress(copied, size)
+        except OSError as e:
+            if e.errno not in COPY_UNSUPPORTED_ERRNOS:
+                raise
+            continue
+        # Some file systems report 0 bytes copied instead of an error, and
+        # read() returns nothing at the end of the source
+        if copied >= size or method is _read_write:
+            break
+    return copied
+
 
 class HostTestPluginBase:
     """Base class for all plugins used with host tests."""
@@ -34,6 +154,11 @@ class HostTestPluginBase:
         []
     )  # Parameters required for 'kwargs' in plugin APIs: e.g. self.execute()
     stable = False  # Determine if plugin is stable and can be used
+    # True if the plugin programs a binary at the address passed as base_address,
+    # it is then given binaries converted from hex and elf images
+    binary_images = False
+    # Seconds commands run by run_command() may take, None for no limit
+    command_timeout = None
 
     def __init__(self):
         """Initialise the object."""
@@ -278,31 +403,154 @@ class HostTestPluginBase:
             return False
         return True
 
-    def run_command(self, cmd, shell=True, stdin=None):
+    def copy_file(self, image_path, destination_path, progress=False):
+        """Copy a file in this process and flush it to the device.
+
+        The data is copied in the kernel when possible, without going through
+        user space, and the destination is synced before returning. The time
+        taken is printed, so it is the throughput of the device that shows.
+
+        Args:
+            image_path: Path of the file to copy.
+            destination_path: Path of the copy.
+            progress: True to print a dot per tenth of copies from
+                COPY_PROGRESS_SIZE bytes, or a function called with the bytes
+                copied and the size of the file after each chunk.
+
+        Returns:
+            True if the file was copied, otherwise False.
+        """
+        start = time()
+        try:
+            size = os.path.getsize(image_path)
+            if progress is True:
+                progress = self.__dot_progress() if size >= COPY_PROGRESS_SIZE else None
+            binary = getattr(os, "O_BINARY", 0)
+            src_fd = os.open(image_path, os.O_RDONLY | binary)
+            try:
+                dst_fd = os.open(
+                    destination_path,
+                    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binary,
+                    0o666,
+                )
+                try:
+                    copied = copy_fd(src_fd, dst_fd, size, progress=progress)
+                    os.fsync(dst_fd)
+                finally:
+                    os.close(dst_fd)
+            finally:
+                os.close(src_fd)
+        except (IOError, OSError) as e:
+            self.print_plugin_error(
+                "Error: copy of '%s' to '%s' failed: %s"
+                % (image_path, destination_path, e)
+            )
+            return False
+
+        elapsed = time() - start
+        self.print_plugin_info(
+            "Copied %d bytes to '%s' in %.2f s (%.1f KiB/s)"
+            % (copied, destination_path, elapsed, copied / 1024.0 / (elapsed or 1e-6))
+        )
+        return True
+
+    def __dot_progress(self):
+        """Return a progress function printing a dot per tenth of a copy."""
+        printed = [0]
+
+        def progress(copied, size):
+            tenths = copied * 10 // size
+            if tenths > printed[0]:
+                self.print_plugin_char("." * (tenths - printed[0]))
+                printed[0] = tenths
+                if tenths == 10:
+                    self.print_plugin_char("\n")
+
+        return progress
+
+    def run_command(self, cmd, shell=True, stdin=None, timeout=None):
         """Run a shell command as a subprocess.
 
-        Prints 'cmd' return code if execution failed.
+        The output of the command is logged line by line. Prints 'cmd' return code
+        if execution failed. A command still running after 'timeout' seconds is
+        killed, with the processes it started.
 
         Args:
             cmd: Command to execute.
             shell: True if shell command should be executed (eg. ls, ps).
             stdin: A custom stdin for the process running the command (defaults
             to None).
+            timeout: Seconds the command may run, self.command_timeout if None.
 
         Returns:
             True if command successfully executed, otherwise False.
         """
-        result = True
+        if timeout is None:
+            timeout = self.command_timeout
         try:
-            ret = call(cmd, shell=shell, stdin=stdin)
-            if ret:
-                self.print_plugin_error("[ret=%d] Command: %s" % (int(ret), cmd))
-                return False
+            process = Popen(
+                cmd,
+                shell=shell,
+                stdin=stdin,
+                stdout=PIPE,
+                stderr=STDOUT,
+                **NEW_PROCESS_GROUP
+            )
         except Exception as e:
-            result = False
-            self.print_plugin_error("[ret=%d] Command: %s" % (int(ret), cmd))
+            self.print_plugin_error("Command: %s" % (cmd,))
             self.print_plugin_error(str(e))
-        return result
+            return False
+
+        output = threading.Thread(target=self.__log_output, args=(process.stdout,))
+        output.daemon = True
+        output.start()
+        ret = None
+        try:
+            ret = process.wait(timeout=timeout)
+        except TimeoutExpired:
+            self.print_plugin_error(
+                "Command timed out after %.1f sec, killing it: %s" % (timeout, cmd)
+            )
+        finally:
+            # Also when htrun is interrupted, the command runs in its own session
+            if process.poll() is None:
+                kill_process_tree(process)
+                process.wait()
+        # Processes started by the command may keep its output open
+        output.join(COMMAND_OUTPUT_TIMEOUT)
+
+        if ret is None:
+            return False
+        if ret:
+            self.print_plugin_error("[ret=%d] Command: %s" % (ret, cmd))
+            return False
+        return True
+
+    async def run_command_async(self, cmd, shell=True, stdin=None, timeout=None):
+        """Run a command like run_command() without blocking the event loop.
+
+        The command runs from the default executor of the running event loop, so
+        commands of several plugins can run at the same time. Cancelling the
+        coroutine doesn't stop the command, its timeout does.
+
+        Args:
+            cmd: Command to execute.
+            shell: True if shell command should be executed (eg. ls, ps).
+            stdin: A custom stdin for the process running the command.
+            timeout: Seconds the command may run, self.command_timeout if None.
+
+        Returns:
+            True if command successfully executed, otherwise False.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.run_command, cmd, shell, stdin, timeout)
+        )
+
+    def __log_output(self, stream):
+        with stream:
+            for line in iter(stream.readline, b""):
+                self.plugin_logger.prn_txt(line.decode("utf-8", "replace").rstrip())
 
     def host_os_info(self):
         """Return information about host OS.
@@ -3,14 +3,32 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 """Registry of available host test plugins."""
+import threading
+import time
+
+from ..host_tests_logger import HtrunLogger
+from .plugin_stats import PluginStats
 
 
 class HostTestRegistry:
-    """Register and store host test plugins for further usage."""
+    """Register and store host test plugins for further usage.
+
+    The registry can be used from several threads at once. Plugins are looked up
+    under a lock, but run outside of it so they can run concurrently.
+    """
 
     # Here we actually store all the plugins
     PLUGINS = {}  # 'Plugin Name' : Plugin Object
 
+    # Guards PLUGINS
+    LOCK = threading.RLock()
+
+    # PluginStats of the plugin runs, created on first use
+    STATS = None
+
+    # Capability choosing a plugin from the statistics of earlier runs
+    AUTO = "auto"
+
     def print_error(self, text):
         """Print an error message to the console.
 
@@ -19,6 +37,14 @@ class HostTestRegistry:
         """
         print("Plugin load failed. Reason: %s" % text)
 
+    def print_plugin_error(self, text):
+        """Print an error of a plugin call to the console, as plugins do.
+
+        Args:
+            text: Error message.
+        """
+        HtrunLogger("PLGN").prn_err(text)
+
     def register_plugin(self, plugin):
         """Store a plugin in the registry.
 
@@ -33,19 +59,33 @@ class HostTestRegistry:
         """
         # TODO:
         # - check for unique caps for specified type
-        if plugin.name not in self.PLUGINS:
-            if plugin.setup():  # Setup plugin can be completed without errors
-                self.PLUGINS[plugin.name] = plugin
-                return True
+        with self.LOCK:
+            if plugin.name not in self.PLUGINS:
+                if plugin.setup():  # Setup plugin can be completed without errors
+                    self.PLUGINS[plugin.name] = plugin
+                    return True
+                else:
+                    self.print_error("%s setup failed" % plugin.name)
             else:
-                self.print_error("%s setup failed" % plugin.name)
-        else:
-            self.print_error("%s already loaded" % plugin.name)
+                self.print_error("%s already loaded" % plugin.name)
         return False
 
+    def plugins(self):
+        """Return a snapshot of the registered plugins.
+
+        Returns:
+            List of (plugin name, plugin) tuples.
+        """
+        with self.LOCK:
+            return list(self.PLUGINS.items())
+
     def call_plugin(self, type, capability, *args, **kwargs):
         """Execute the first plugin found with a particular 'type' and 'capability'.
 
+        Capability "auto" runs the plugin expected to succeed fastest for the
+        target type, passed as 'mcu'. The duration and outcome of the run are
+        recorded for the next choice.
+
         Args:
             type: Plugin type.
             capability: Plugin capability name.
@@ -55,11 +95,86 @@ class HostTestRegistry:
         Returns:
             True if a plugin was found and execution succeeded, otherwise False.
         """
-        for plugin_name in self.PLUGINS:
-            plugin = self.PLUGINS[plugin_name]
+        target_type = kwargs.get("mcu")
+        auto = capability == self.AUTO
+        if auto:
+            if target_type is None:
+                # Without statistics, the same plugin would be chosen each time
+                self.print_plugin_error(
+                    "%s '%s' needs a target type (mcu)" % (type, capability)
+                )
+                return False
+            capability = self.stats().choose(
+                type, target_type, self.auto_capabilities(type, **kwargs)
+            )
+            if capability is None:
+                self.print_plugin_error(
+                    "No %s plugin can run with these parameters" % type
+                )
+                return False
+
+        plugin = self.get_plugin(type, capability)
+        if plugin is None:
+            return False
+        if not auto:
+            return plugin.execute(capability, *args, **kwargs)
+
+        plugin.print_plugin_info("auto %s: '%s'" % (type, capability))
+
+        start = time.time()
+        result = False
+        try:
+            result = plugin.execute(capability, *args, **kwargs)
+        finally:
+            self.stats().record(
+                type, target_type, capability, bool(result), time.time() - start
+            )
+        return result
+
+    def stats(self):
+        """Return the PluginStats of the plugin runs."""
+        with self.LOCK:
+            if self.STATS is None:
+                type(self).STATS = PluginStats()
+            return self.STATS
+
+    def auto_capabilities(self, type, **kwargs):
+        """List the capabilities "auto" chooses from.
+
+        That is the first capability of each stable plugin of the type which
+        supports this OS and has all its required parameters.
+
+        Args:
+            type: Plugin type.
+            kwargs: Parameters the plugin would run with.
+
+        Returns:
+            List of capabilities.
+        """
+        return [
+            plugin.capabilities[0]
+            for _, plugin in sorted(self.plugins())
+            if plugin.type == type
+            and plugin.stable
+            and plugin.capabilities
+            and plugin.is_os_supported()
+            and all(kwargs.get(name) for name in plugin.required_parameters)
+        ]
+
+    def get_plugin(self, type, capability):
+        """Return the first plugin with a particular 'type' and 'capability'.
+
+        Args:
+            type: Plugin type.
+            capability: Plugin capability name.
+
+        Returns:
+            The plugin, or None if there is none.
+        """
+        for _, plugin in self.plugins():
             if plugin.type == type and capability in plugin.capabilities:
-                return plugin.execute(capability, *args, **kwargs)
-        return False
+                return plugin
+        return None
 
     def get_plugin_caps(self, type):
         """List all capabilities for plugins with the specified type.
@@ -72,8 +187,7 @@ class HostTestRegistry:
             list is returned.
         """
         result = []
-        for plugin_name in self.PLUGINS:
-            plugin = self.PLUGINS[plugin_name]
+        for _, plugin in self.plugins():
             if plugin.type == type:
                 result.extend(plugin.capabilities)
         return sorted(result)
@@ -113,15 +227,13 @@ class HostTestRegistry:
         pt = PrettyTable(column_names, junction_char="|", hrules=HEADER)
         for column in column_names:
             pt.align[column] = "l"
-        for plugin_name in sorted(self.PLUGINS.keys()):
-            name = self.PLUGINS[plugin_name].name
-            type = self.PLUGINS[plugin_name].type
-            stable = self.PLUGINS[plugin_name].stable
-            capabilities = ", ".join(self.PLUGINS[plugin_name].capabilities)
-            is_os_supported = self.PLUGINS[plugin_name].is_os_supported()
-            required_parameters = ", ".join(
-                self.PLUGINS[plugin_name].required_parameters
-            )
+        for plugin_name, plugin in sorted(self.plugins()):
+            name = plugin.name
+            type = plugin.type
+            stable = plugin.stable
+            capabilities = ", ".join(plugin.capabilities)
+            is_os_supported = plugin.is_os_supported()
+            required_parameters = ", ".join(plugin.required_parameters)
             row = [
                 name,
                 type,
@@ -136,13 +248,13 @@ class HostTestRegistry:
     def get_dict(self):
         """Return a dictionary of registered plugins."""
         result = {}
-        for plugin_name in sorted(self.PLUGINS.keys()):
-            name = self.PLUGINS[plugin_name].name
-            type = self.PLUGINS[plugin_name].type
-            stable = self.PLUGINS[plugin_name].stable
-            capabilities = self.PLUGINS[plugin_name].capabilities
-            is_os_supported = self.PLUGINS[plugin_name].is_os_supported()
-            required_parameters = self.PLUGINS[plugin_name].required_parameters
+        for plugin_name, plugin in sorted(self.plugins()):
+            name = plugin.name
+            type = plugin.type
+            stable = plugin.stable
+            capabilities = plugin.capabilities
+            is_os_supported = plugin.is_os_supported()
+            required_parameters = plugin.required_parameters
             result[plugin_name] = {
                 "name": name,
                 "type": type,
@@ -15,6 +15,7 @@ class HostTestPluginCopyMethod_JN51xx(HostTestPluginBase):
     type = "CopyMethod"
     capabilities = ["jn51xx"]
     required_parameters = ["image_path", "serial"]
+    command_timeout = 300
 
     def __init__(self):
         """Initialise plugin."""
@@ -5,7 +5,6 @@
 """MPS2 specific flashing / binary setup functions."""
 
 import os
-from shutil import copy
 from .host_test_plugins import HostTestPluginBase
 
 
@@ -25,8 +24,8 @@ class HostTestPluginCopyMethod_MPS2(HostTestPluginBase):
     def mps2_copy(self, image_path, destination_disk):
         """mps2 copy method for "mbed enabled" devices.
 
-        Copies the file to the MPS2, using shutil.copy. Prepends the file
-        extension with 'mbed'.
+        Copies the file to the MPS2 in this process and syncs it. Prepends the
+        file extension with 'mbed'.
 
         Args:
             image_path: Path to file to be copied.
@@ -35,23 +34,10 @@ class HostTestPluginCopyMethod_MPS2(HostTestPluginBase):
         Returns;
             True if copy (flashing) was successful, otherwise False.
         """
-        result = True
         # Keep the same extension in the test spec and on the MPS2
         _, extension = os.path.splitext(image_path)
         destination_path = os.path.join(destination_disk, "mbed" + extension)
-        try:
-            copy(image_path, destination_path)
-            # sync command on mac ignores command line arguments.
-            if os.name == "posix":
-                result = self.run_command("sync -f %s" % destination_path, shell=True)
-        except Exception as e:
-            self.print_plugin_error(
-                "shutil.copy('%s', '%s')" % (image_path, destination_path)
-            )
-            self.print_plugin_error("Error: %s" % str(e))
-            result = False
-
-        return result
+        return self.copy_file(image_path, destination_path, progress=True)
 
     def setup(self, *args, **kwargs):
         """Configure plugin.
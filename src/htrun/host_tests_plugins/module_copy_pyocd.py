@@ -4,18 +4,149 @@
 #
 """Flash a firmware image to a device using PyOCD."""
 
+import io
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .host_test_plugins import HostTestPluginBase
+from . import pyocd_clock
+from ..host_tests_runner.image_cache import ImageFormatError, parse_elf
+from .pyocd_session import PYOCD_SESSIONS
 
 try:
-    from pyocd.core.helpers import ConnectHelper
+    from pyocd.core.exceptions import ProbeError, TransferError
     from pyocd.flash.file_programmer import FileProgrammer
+    from pyocd.flash.loader import FlashLoader
 
+    # Errors of the link with the target, retried at a slower tuned clock
+    LINK_ERRORS = (ProbeError, TransferError)
     PYOCD_PRESENT = True
 except ImportError:
+    LINK_ERRORS = ()
     PYOCD_PRESENT = False
 
 
+class ParsedImage(object):
+    """Firmware image read and parsed once, shared read-only between threads.
+
+    Attributes:
+        path: Path of the image file.
+        format: Image format: 'bin', 'hex', 'elf' or 'axf'.
+        data: Content of the file.
+        segments: List of (address, bytes) tuples to program. The address of a
+            binary image is None, it goes to the boot memory of the target.
+        size: Number of bytes programmed.
+    """
+
+    def __init__(self, path, format=None, base_address=None):
+        """Read and parse an image.
+
+        Args:
+            path: Path of the image file.
+            format: Image format, guessed from the file extension if None.
+            base_address: Address of a binary image, the boot memory if None.
+
+        Raises:
+            IOError: The file can't be read.
+            ValueError: The file can't be parsed.
+        """
+        self.path = path
+        self.format = (format or os.path.splitext(path)[1][1:] or "bin").lower()
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if self.format == "bin":
+            self.segments = [(base_address, self.data)]
+        elif self.format == "hex":
+            from intelhex import IntelHex
+
+            ihex = IntelHex(io.StringIO(self.data.decode("ascii")))
+            self.segments = [
+                (start, ihex.tobinstr(start=start, size=end - start))
+                for start, end in ihex.segments()
+            ]
+        elif self.format in ("elf", "axf"):
+            self.segments = parse_elf(self.data)
+        else:
+            raise ImageFormatError("unknown image format '%s'" % self.format)
+        self.size = sum(len(data) for _, data in self.segments)
+
+
+class ImageCache(object):
+    """Parsed images, each file is read and parsed once per version."""
+
+    def __init__(self):
+        """Create an empty cache."""
+        # (path, format, mtime, size) -> [lock, ParsedImage or None]
+        self.images = {}
+        self.lock = threading.Lock()
+
+    def get(self, image_path, format=None):
+        """Return the parsed image of a file.
+
+        Threads asking for the same image wait for the first one to parse it.
+
+        Args:
+            image_path: Path of the image file.
+            format: Image format, guessed from the file extension if None.
+
+        Raises:
+            IOError: The file can't be read.
+            ValueError: The file can't be parsed.
+        """
+        image_path = os.path.abspath(image_path)
+        stat = os.stat(image_path)
+        key = (image_path, format, stat.st_mtime, stat.st_size)
+        with self.lock:
+            entry = self.images.setdefault(key, [threading.Lock(), None])
+        with entry[0]:
+            if entry[1] is None:
+                entry[1] = ParsedImage(image_path, format)
+            return entry[1]
+
+
+class FlashResult(object):
+    """Outcome of flashing an image to a board.
+
+    Attributes:
+        target_id: Target ID of the board.
+        image_path: Path of the image.
+        ok: True if the image was programmed.
+        error: Reason of the failure, None if ok.
+        size: Number of bytes programmed.
+        seconds: Time taken, including connection to the probe.
+    """
+
+    def __init__(self, target_id, image_path):
+        """Create the result of a flash not done yet."""
+        self.target_id = target_id
+        self.image_path = image_path
+        self.ok = False
+        self.error = None
+        self.size = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Bytes programmed per second."""
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        """Return a one line report."""
+        if self.ok:
+            return "%s: %d bytes in %.2f s (%.1f KiB/s)" % (
+                self.target_id,
+                self.size,
+                self.seconds,
+                self.throughput / 1024,
+            )
+        return "%s: failed after %.2f s: %s" % (
+            self.target_id,
+            self.seconds,
+            self.error,
+        )
+
+
 class HostTestPluginCopyMethod_pyOCD(HostTestPluginBase):
     """Plugin interface adaptor for pyOCD."""
 
@@ -24,6 +155,7 @@ class HostTestPluginCopyMethod_pyOCD(HostTestPluginBase):
     stable = True
     capabilities = ["pyocd"]
     required_parameters = ["image_path", "target_id"]
+    binary_images = True
 
     def __init__(self):
         """Initialise plugin."""
@@ -44,7 +176,11 @@ class HostTestPluginCopyMethod_pyOCD(HostTestPluginBase):
         Args:
             capability: Capability name.
             args: Additional arguments.
-            kwargs: Additional arguments.
+            kwargs: Additional arguments. Set verify to read the image back
+                after programming it, swd_clock to the SWD clock in Hz or
+                "auto" to tune it, base_address to the address of a binary
+                image, keep_session to leave the session with the probe open
+                for the pyOCD reset plugin.
 
         Returns:
             True if flashing succeeded, otherwise False.
@@ -67,32 +203,198 @@ class HostTestPluginCopyMethod_pyOCD(HostTestPluginBase):
             self.print_plugin_error("Error: Target ID")
             return False
 
+        swd_clock = kwargs.get("swd_clock")
+        if swd_clock not in (None, "auto"):
+            try:
+                swd_clock = int(swd_clock)
+            except ValueError:
+                self.print_plugin_error("Error: invalid SWD clock '%s'" % swd_clock)
+                return False
+
         target_id = kwargs["target_id"]
         image_path = os.path.normpath(kwargs["image_path"])
-        with ConnectHelper.session_with_chosen_probe(
-            unique_id=target_id, resume_on_disconnect=False
-        ) as session:
-            # Performance hack!
-            # Eventually pyOCD will know default clock speed
-            # per target
-            test_clock = 10000000
-            target_type = session.board.target_type
-            if target_type == "nrf51":
-                # Override clock since 10MHz is too fast
-                test_clock = 1000000
-            if target_type == "ncs36510":
-                # Override clock since 10MHz is too fast
-                test_clock = 1000000
-
-            # Configure link
-            session.probe.set_clock(test_clock)
-
-            # Program the file
-            programmer = FileProgrammer(session)
-            programmer.program(image_path, format=kwargs["format"])
+        base_address = kwargs.get("base_address")
+        program_kwargs = {"format": kwargs["format"]}
+        if base_address is not None:
+            program_kwargs["base_address"] = base_address
+        keep = bool(kwargs.get("keep_session"))
+        with PYOCD_SESSIONS.session(target_id, keep=keep) as session:
+
+            def program():
+                FileProgrammer(session).program(image_path, **program_kwargs)
+                return not kwargs.get("verify") or self.verify(
+                    session, ParsedImage(image_path, kwargs["format"], base_address)
+                )
+
+            if not self.program(session, target_id, swd_clock, program):
+                self.print_plugin_error("Error: image read back differs")
+                return False
+
+        return True
+
+    @staticmethod
+    def set_clock(session, clock=None):
+        """Configure the link clock of a session.
+
+        Args:
+            session: Open pyOCD session.
+            clock: Clock in Hz, the default clock of the target type if None.
+        """
+        if clock is None:
+            # Eventually pyOCD will know default clock speed per target
+            clock = pyocd_clock.default_clock(session.board.target_type)
+
+        # Configure link
+        session.probe.set_clock(clock)
 
+    def program(self, session, target_id, swd_clock, program):
+        """Program a target, falling back to a slower clock if tuned.
+
+        With a tuned clock, a link error or an image read back wrong programs
+        the target again once, a clock step slower. The slower clock is
+        recorded for the board if it works.
+
+        Args:
+            session: Open pyOCD session.
+            target_id: Target ID of the board.
+            swd_clock: Clock in Hz, "auto" to tune it, the default clock of the
+                target type if None.
+            program: Function programming the target, returning False if the
+                image read back differs.
+
+        Returns:
+            Result of program.
+
+        Raises:
+            Exception: The error of program.
+        """
+        if swd_clock != "auto":
+            self.set_clock(session, swd_clock)
+            return program()
+
+        tuner = pyocd_clock.CLOCK_TUNER
+        clock = tuner.clock(session, target_id)
+        self.set_clock(session, clock)
+        error = None
+        try:
+            if program():
+                return True
+        except LINK_ERRORS as e:
+            error = e
+        lower = tuner.lower(clock)
+        if lower is None:
+            if error is not None:
+                raise error
+            return False
+
+        self.print_plugin_info(
+            "%s: programming failed at %d Hz, retrying at %d Hz"
+            % (target_id, clock, lower)
+        )
+        self.set_clock(session, lower)
+        if not program():
+            return False
+        tuner.record(target_id, lower)
+        return True
+
+    @staticmethod
+    def verify(session, image):
+        """Read an image back from the target and compare it.
+
+        Args:
+            session: Open pyOCD session.
+            image: ParsedImage programmed.
+
+        Returns:
+            False if the memory of the target differs from the image.
+        """
+        for address, data in image.segments:
+            if address is None:
+                address = session.target.memory_map.get_boot_memory().start
+            if bytes(session.target.read_memory_block8(address, len(data))) != data:
+                return False
         return True
 
+    def flash_many(
+        self,
+        jobs,
+        workers=None,
+        format=None,
+        image_cache=None,
+        verify=False,
+        swd_clock=None,
+    ):
+        """Flash images to many boards at once.
+
+        Boards are flashed from a thread pool, with one pyOCD session per probe.
+        Each image file is read and parsed once and shared by all boards
+        flashing it. Images for the same board are flashed one after another in
+        one session, closed after the last image.
+
+        Args:
+            jobs: List of (target_id, image_path) tuples.
+            workers: Number of boards flashed at once, one per board if None.
+            format: Image format, guessed from the file extensions if None.
+            image_cache: ImageCache to take the images from, a new one if None.
+            verify: Read the images back after programming them.
+            swd_clock: SWD clock in Hz, "auto" to tune it per board, the default
+                clock of the target type if None.
+
+        Returns:
+            List of FlashResult, in the order of jobs.
+        """
+        results = [FlashResult(target_id, path) for target_id, path in jobs]
+        if not PYOCD_PRESENT:
+            self.print_plugin_error(
+                'The "pyocd" feature is not installed. Please run '
+                '"pip install mbed-os-tools[pyocd]" to enable the "pyocd" copy plugin.'
+            )
+            for result in results:
+                result.error = "pyocd not installed"
+            return results
+
+        image_cache = image_cache or ImageCache()
+        by_board = {}
+        for result in results:
+            by_board.setdefault(result.target_id, []).append(result)
+
+        def flash_board(board_results):
+            for i, result in enumerate(board_results, 1):
+                keep = i < len(board_results)
+                self.__flash_one(result, format, image_cache, verify, swd_clock, keep)
+                self.print_plugin_info(str(result))
+
+        with ThreadPoolExecutor(max_workers=workers or len(by_board) or 1) as pool:
+            # Re-raise errors of the workers themselves
+            list(pool.map(flash_board, by_board.values()))
+        return results
+
+    def __flash_one(self, result, format, image_cache, verify, swd_clock, keep):
+        """Flash an image to a board, recording the outcome in result."""
+        start = time.time()
+        try:
+            image = image_cache.get(result.image_path, format)
+            with PYOCD_SESSIONS.session(
+                result.target_id, blocking=False, keep=keep
+            ) as session:
+
+                def program():
+                    boot = session.target.memory_map.get_boot_memory().start
+                    loader = FlashLoader(session)
+                    for address, data in image.segments:
+                        loader.add_data(boot if address is None else address, data)
+                    loader.commit()
+                    return not verify or self.verify(session, image)
+
+                if not self.program(session, result.target_id, swd_clock, program):
+                    raise IOError("image read back differs")
+        except Exception as e:
+            result.error = str(e) or e.__class__.__name__
+        else:
+            result.ok = True
+            result.size = image.size
+        result.seconds = time.time() - start
+
 
 def load_plugin():
     """Return plugin available in this module."""
@@ -17,6 +17,7 @@ class HostTestPluginCopyMethod_Shell(HostTestPluginBase):
     stable = True
     capabilities = ["shell", "cp", "copy", "xcopy"]
     required_parameters = ["image_path", "destination_disk"]
+    command_timeout = 300
 
     def __init__(self):
         """Initialise the plugin."""
@@ -33,7 +34,8 @@ class HostTestPluginCopyMethod_Shell(HostTestPluginBase):
         """Copy an image to a destination disk using a shell copy command.
 
         "capability" is used to select which command to invoke, valid
-        capabilities are "shell", "cp", "copy" and "xcopy".
+        capabilities are "shell", "cp", "copy" and "xcopy". "shell" copies the
+        image in this process and syncs it, without running a command.
 
         Args:
             capability: Capability name.
@@ -72,11 +74,8 @@ class HostTestPluginCopyMethod_Shell(HostTestPluginBase):
                 image_base_name = basename(image_path)
                 destination_path = join(destination_disk, image_base_name)
                 if capability == "shell":
-                    if os.name == "nt":
-                        capability = "copy"
-                    elif os.name == "posix":
-                        capability = "cp"
-                if capability == "cp" or capability == "copy" or capability == "copy":
+                    result = self.copy_file(image_path, destination_path, progress=True)
+                elif capability == "cp" or capability == "copy" or capability == "copy":
                     copy_method = capability
                     cmd = [copy_method, image_path, destination_path]
                     if os.name == "posix":
@@ -15,6 +15,7 @@ class HostTestPluginCopyMethod_Silabs(HostTestPluginBase):
     type = "CopyMethod"
     capabilities = ["eACommander", "eACommander-usb"]
     required_parameters = ["image_path", "destination_disk"]
+    command_timeout = 300
     stable = True
 
     def __init__(self):
@@ -16,6 +16,7 @@ class HostTestPluginCopyMethod_Stlink(HostTestPluginBase):
     type = "CopyMethod"
     capabilities = ["stlink"]
     required_parameters = ["image_path"]
+    command_timeout = 300
 
     def __init__(self):
         """Initialise the object."""
@@ -20,6 +20,7 @@ class HostTestPluginCopyMethod_STProgrammer(HostTestPluginBase):
     type = "CopyMethod"
     capabilities = ["stprog"]
     required_parameters = ["image_path"]
+    command_timeout = 300
 
     def __init__(self):
         """Initialise the object."""
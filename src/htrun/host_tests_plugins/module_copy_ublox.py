@@ -15,6 +15,7 @@ class HostTestPluginCopyMethod_ublox(HostTestPluginBase):
     type = "CopyMethod"
     capabilities = ["ublox"]
     required_parameters = ["image_path"]
+    command_timeout = 300
 
     def is_os_supported(self, os_name=None):
         """Plugin only works on Windows.
@@ -12,7 +12,12 @@ from .host_test_plugins import HostTestPluginBase
 
 
 class HostTestPluginPowerCycleResetMethod(HostTestPluginBase):
-    """Plugin interface adaptor for Mbed TAS RM REST API."""
+    """Plugin interface adaptor for Mbed TAS RM REST API.
+
+    Requests go over one keep-alive HTTP session. Several targets can be power
+    cycled together with power_cycle_targets(), switching and polling all of
+    them with one request each time.
+    """
 
     name = "HostTestPluginPowerCycleResetMethod"
     type = "ResetMethod"
@@ -20,9 +25,21 @@ class HostTestPluginPowerCycleResetMethod(HostTestPluginBase):
     capabilities = ["power_cycle"]
     required_parameters = ["target_id", "device_info"]
 
+    # First and longest wait between two STATE requests, in seconds. Waits double
+    # while the targets didn't reach the required state.
+    POLL_MIN_INTERVAL = 0.05
+    POLL_MAX_INTERVAL = 2
+
+    # Time the targets may take to reach the required state, in seconds
+    POLL_TIMEOUT = 300
+
+    # Timeout of the HTTP requests, in seconds
+    REQUEST_TIMEOUT = 30
+
     def __init__(self):
         """Initialise plugin."""
         HostTestPluginBase.__init__(self)
+        self.session = None
 
     def setup(self, *args, **kwargs):
         """Configure plugin.
@@ -60,12 +77,26 @@ class HostTestPluginPowerCycleResetMethod(HostTestPluginBase):
             if capability in HostTestPluginPowerCycleResetMethod.capabilities:
                 target_id = kwargs["target_id"]
                 device_info = kwargs["device_info"]
-                ret = self.__get_mbed_tas_rm_addr()
-                if ret:
-                    ip, port = ret
-                    result = self.__hw_reset(ip, port, target_id, device_info)
+                result = self.power_cycle_targets({target_id: device_info})[target_id]
         return result
 
+    def power_cycle_targets(self, device_infos):
+        """Power cycle several targets at once.
+
+        Args:
+            device_infos: Map of target ID to the device info dict of the target,
+                updated with the state reported by the resource manager.
+
+        Returns:
+            Map of target ID to True if the target was power cycled.
+        """
+        results = dict.fromkeys(device_infos, False)
+        ret = self.__get_mbed_tas_rm_addr()
+        if ret:
+            ip, port = ret
+            results.update(self.__hw_reset(ip, port, device_infos))
+        return results
+
     def __get_mbed_tas_rm_addr(self):
         """Get IP and Port of mbed tas rm service."""
         try:
@@ -81,97 +112,135 @@ class HostTestPluginPowerCycleResetMethod(HostTestPluginBase):
 
         return None
 
-    def __hw_reset(self, ip, port, target_id, device_info):
-        """Reset target device using TAS RM API."""
-        switch_off_req = {
-            "name": "switchResource",
-            "sub_requests": [
-                {
-                    "resource_type": "mbed_platform",
-                    "resource_id": target_id,
-                    "switch_command": "OFF",
-                }
-            ],
-        }
-
-        switch_on_req = {
-            "name": "switchResource",
-            "sub_requests": [
-                {
-                    "resource_type": "mbed_platform",
-                    "resource_id": target_id,
-                    "switch_command": "ON",
-                }
-            ],
-        }
+    def __hw_reset(self, ip, port, device_infos):
+        """Reset target devices using TAS RM API.
 
-        result = False
+        Returns:
+            Map of target ID to True if the target was power cycled.
+        """
+        results = {}
+        target_ids = list(device_infos)
+
+        # reset targets
+        target_ids = self.__switch(ip, port, target_ids, "OFF")
+        self.__poll_state(ip, port, target_ids, "OFF")
+        target_ids = self.__switch(ip, port, target_ids, "ON")
+        states = self.__poll_state(ip, port, target_ids, "ON")
+
+        for target_id in device_infos:
+            state = states.get(target_id)
+            if state and self.__reached(state, "ON"):
+                for k, v in state.items():
+                    device_infos[target_id][k] = v
+                results[target_id] = True
+            else:
+                self.print_plugin_error("HOST: Failed to reset device %s" % target_id)
+                results[target_id] = False
+        return results
+
+    def __switch(self, ip, port, target_ids, command):
+        """Send a switch command to targets.
 
-        # reset target
-        switch_off_req = self.__run_request(ip, port, switch_off_req)
-        if switch_off_req is None:
+        Returns:
+            List of the IDs of the targets which accepted the command.
+        """
+        if not target_ids:
+            return []
+        resp = self.__run_request(ip, port, self.__switch_request(target_ids, command))
+        if resp is None:
             self.print_plugin_error("HOST: Failed to communicate with TAS RM!")
-            return result
-
-        if "error" in switch_off_req["sub_requests"][0]:
-            self.print_plugin_error(
-                "HOST: Failed to reset target. error = %s"
-                % switch_off_req["sub_requests"][0]["error"]
-            )
-            return result
-
-        def poll_state(required_state):
-            switch_state_req = {
-                "name": "switchResource",
-                "sub_requests": [
-                    {
-                        "resource_type": "mbed_platform",
-                        "resource_id": target_id,
-                        "switch_command": "STATE",
-                    }
-                ],
-            }
-            resp = self.__run_request(ip, port, switch_state_req)
-            start = time.time()
-            while (
-                resp
-                and (
-                    resp["sub_requests"][0]["state"] != required_state
-                    or (
-                        required_state == "ON"
-                        and resp["sub_requests"][0]["mount_point"] == "Not Connected"
-                    )
+            return []
+        switched = []
+        for target_id, sub_response in zip(target_ids, resp.get("sub_requests", [])):
+            if "error" in sub_response:
+                self.print_plugin_error(
+                    "HOST: Failed to reset target. error = %s" % sub_response["error"]
                 )
-                and (time.time() - start) < 300
-            ):
-                time.sleep(2)
-                resp = self.__run_request(ip, port, resp)
-            return resp
+            else:
+                switched.append(target_id)
+        return switched
 
-        poll_state("OFF")
-
-        self.__run_request(ip, port, switch_on_req)
-        resp = poll_state("ON")
-        if (
-            resp
-            and resp["sub_requests"][0]["state"] == "ON"
-            and resp["sub_requests"][0]["mount_point"] != "Not Connected"
-        ):
-            for k, v in resp["sub_requests"][0].viewitems():
-                device_info[k] = v
-            result = True
-        else:
-            self.print_plugin_error("HOST: Failed to reset device %s" % target_id)
+    def __poll_state(self, ip, port, target_ids, required_state):
+        """Wait until targets reach a state, or POLL_TIMEOUT expires.
 
-        return result
+        Polling starts after POLL_MIN_INTERVAL and backs off up to
+        POLL_MAX_INTERVAL.
+
+        Returns:
+            Map of target ID to the last STATE sub-response of the target.
+        """
+        states = {}
+        pending = list(target_ids)
+        interval = self.POLL_MIN_INTERVAL
+        start = time.time()
+        while pending:
+            time.sleep(interval)
+            interval = min(interval * 2, self.POLL_MAX_INTERVAL)
+            resp = self.__run_request(ip, port, self.__switch_request(pending, "STATE"))
+            if resp is None:
+                break
+            for target_id, sub_response in zip(pending, resp.get("sub_requests", [])):
+                states[target_id] = sub_response
+            pending = [
+                target_id
+                for target_id in pending
+                if target_id in states
+                and "error" not in states[target_id]
+                and not self.__reached(states[target_id], required_state)
+            ]
+            if time.time() - start >= self.POLL_TIMEOUT:
+                break
+        return states
 
     @staticmethod
-    def __run_request(ip, port, request):
-        headers = {"Content-type": "application/json", "Accept": "text/plain"}
-        get_resp = requests.get(
-            "http://%s:%s/" % (ip, port), data=json.dumps(request), headers=headers
+    def __reached(state, required_state):
+        """Check if a STATE sub-response is in the required state.
+
+        A target switched on must also be mounted.
+        """
+        return state.get("state") == required_state and (
+            required_state != "ON" or state.get("mount_point") != "Not Connected"
         )
-        resp = get_resp.json()
+
+    @staticmethod
+    def __switch_request(target_ids, command):
+        """Return a 'switchResource' request for targets.
+
+        Args:
+            target_ids: IDs of the targets.
+            command: Switch command: 'ON', 'OFF' or 'STATE'.
+        """
+        sub_requests = [
+            {
+                "resource_type": "mbed_platform",
+                "resource_id": target_id,
+                "switch_command": command,
+            }
+            for target_id in target_ids
+        ]
+        return {"name": "switchResource", "sub_requests": sub_requests}
+
+    def __run_request(self, ip, port, request):
+        """Send a request to the resource manager.
+
+        Returns:
+            The response, None if the request failed.
+        """
+        if self.session is None:
+            # Reuse the connection for the following requests
+            self.session = requests.Session()
+        headers = {"Content-type": "application/json", "Accept": "text/plain"}
+        try:
+            get_resp = self.session.get(
+                "http://%s:%s/" % (ip, port),
+                data=json.dumps(request),
+                headers=headers,
+                timeout=self.REQUEST_TIMEOUT,
+            )
+            resp = get_resp.json()
+        except (requests.RequestException, ValueError) as e:
+            self.print_plugin_error("HOST: TAS RM request failed: %s" % str(e))
+            return None
         if get_resp.status_code == 200:
             return resp
         else:
@@ -14,6 +14,7 @@ class HostTestPluginResetMethod_JN51xx(HostTestPluginBase):
     type = "ResetMethod"
     capabilities = ["jn51xx"]
     required_parameters = ["serial"]
+    command_timeout = 60
     stable = False
 
     def __init__(self):
@@ -23,6 +23,7 @@ class HostTestPluginResetMethod_MPS2(HostTestPluginBase):
     type = "ResetMethod"
     capabilities = ["reboot.txt"]
     required_parameters = ["disk"]
+    command_timeout = 60
 
     def __init__(self):
         """Initialise the plugin."""
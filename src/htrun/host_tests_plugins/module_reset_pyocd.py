@@ -5,13 +5,7 @@
 """Use PyOCD to reset a target."""
 
 from .host_test_plugins import HostTestPluginBase
-
-try:
-    from pyocd.core.helpers import ConnectHelper
-
-    PYOCD_PRESENT = True
-except ImportError:
-    PYOCD_PRESENT = False
+from .pyocd_session import PYOCD_PRESENT, PYOCD_SESSIONS
 
 
 class HostTestPluginResetMethod_pyOCD(HostTestPluginBase):
@@ -38,6 +32,7 @@ class HostTestPluginResetMethod_pyOCD(HostTestPluginBase):
         """Reset a target using pyOCD.
 
         The "capability" name must be "pyocd". If it isn't this method will just fail.
+        The session opened to flash the target is reused if it is still open.
 
         Args:
             capability: Capability name.
@@ -61,9 +56,7 @@ class HostTestPluginResetMethod_pyOCD(HostTestPluginBase):
             if kwargs["target_id"]:
                 if capability == "pyocd":
                     target_id = kwargs["target_id"]
-                    with ConnectHelper.session_with_chosen_probe(
-                        unique_id=target_id, resume_on_disconnect=False
-                    ) as session:
+                    with PYOCD_SESSIONS.session(target_id) as session:
                         session.target.reset()
                         session.target.resume()
                         result = True
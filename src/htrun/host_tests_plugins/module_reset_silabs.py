@@ -15,6 +15,7 @@ class HostTestPluginResetMethod_SiLabs(HostTestPluginBase):
     type = "ResetMethod"
     capabilities = ["eACommander", "eACommander-usb"]
     required_parameters = ["disk"]
+    command_timeout = 60
     stable = True
 
     def __init__(self):
@@ -20,6 +20,7 @@ class HostTestPluginResetMethod_Stlink(HostTestPluginBase):
     type = "ResetMethod"
     capabilities = ["stlink"]
     required_parameters = []
+    command_timeout = 60
     stable = False
 
     def __init__(self):
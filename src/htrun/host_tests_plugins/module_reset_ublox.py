@@ -14,6 +14,7 @@ class HostTestPluginResetMethod_ublox(HostTestPluginBase):
     type = "ResetMethod"
     capabilities = ["ublox"]
     required_parameters = []
+    command_timeout = 60
     stable = False
 
     def is_os_supported(self, os_name=None):
@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Durations and outcomes of plugin runs, by plugin type and target type.
+
+The registry records the plugin runs of the "auto" copy and reset methods for a
+target type ('mcu' argument) in a JSON file shared by htrun processes. They pick
+a plugin from these records: the one with the lowest expected time, counting
+retries of failed runs, and now and then another one to keep learning.
+"""
+
+import json
+import random
+import threading
+
+from ..cache import atomic_write, cache_path, file_lock
+
+# Share of "auto" runs using a plugin other than the best one
+EXPLORE_RATE = 0.1
+
+# Weight of the last run in the average duration of a plugin
+DURATION_WEIGHT = 0.3
+
+# Runs after which older runs count half, so a plugin can recover
+MAX_RUNS = 100
+
+
+def default_stats_path():
+    """Return the path of the statistics file in the user's cache directory."""
+    return cache_path("plugin_stats.json")
+
+
+class PluginStats(object):
+    """Plugin run statistics, kept in a JSON file.
+
+    Statistics are stored as {type: {target type: {capability: entry}}} where
+    an entry has the number of runs, the number of failures and the average
+    duration of successful runs in seconds.
+    """
+
+    def __init__(self, path=None):
+        """Use a statistics file, read on each change.
+
+        Args:
+            path: Path of the JSON file, default_stats_path() if None.
+        """
+        self.path = path or default_stats_path()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Return the statistics, empty if the file can't be read."""
+        try:
+            with open(self.path) as f:
+                stats = json.load(f)
+            if isinstance(stats, dict):
+                return stats
+        except (IOError, OSError, ValueError):
+            pass
+        return {}
+
+    def entries(self, type, target_type):
+        """Return the entries of a plugin type and target type by capability."""
+        return self.load().get(type, {}).get(target_type, {})
+
+    def record(self, type, target_type, capability, ok, seconds):
+        """Record a plugin run.
+
+        The file is read again and written under a lock, so runs recorded by
+        other htrun processes are kept.
+
+        Args:
+            type: Plugin type.
+            target_type: Target type the plugin ran for.
+            capability: Capability the plugin ran with.
+            ok: True if the run succeeded.
+            seconds: Duration of the run.
+        """
+        try:
+            with self.lock, file_lock(self.path + ".lock"):
+                stats = self.load()
+                entry = (
+                    stats.setdefault(type, {})
+                    .setdefault(target_type, {})
+                    .setdefault(capability, {"runs": 0, "failures": 0, "seconds": None})
+                )
+                if entry["runs"] >= MAX_RUNS:
+                    entry["runs"] //= 2
+                    entry["failures"] //= 2
+                entry["runs"] += 1
+                if not ok:
+                    entry["failures"] += 1
+                elif entry["seconds"] is None:
+                    entry["seconds"] = seconds
+                else:
+                    entry["seconds"] += DURATION_WEIGHT * (seconds - entry["seconds"])
+                self.save(stats)
+        except (IOError, OSError):
+            # Statistics are a hint, a read-only cache isn't an error
+            pass
+
+    def save(self, stats):
+        """Write statistics to the file, replacing it atomically."""
+        atomic_write(self.path, json.dumps(stats, indent=1, sort_keys=True))
+
+    @staticmethod
+    def expected_seconds(entry):
+        """Return the expected time to a successful run, retries included.
+
+        Plugins without a successful run cost infinite time.
+        """
+        successes = entry["runs"] - entry["failures"]
+        if entry["seconds"] is None or not successes:
+            return float("inf")
+        # Laplace estimate of the success rate
+        return entry["seconds"] * (entry["runs"] + 2.0) / (successes + 1.0)
+
+    def choose(self, type, target_type, capabilities, rng=random):
+        """Choose the capability to run.
+
+        Capabilities never run for the target type come first, in order. Then
+        the one with the lowest expected time is chosen, or EXPLORE_RATE of the
+        time another one at random among those which succeeded before.
+
+        Args:
+            type: Plugin type.
+            target_type: Target type to run the plugin for.
+            capabilities: Candidate capabilities.
+            rng: Random number generator.
+
+        Returns:
+            A capability, None if there are no candidates.
+        """
+        if not capabilities:
+            return None
+        entries = self.entries(type, target_type)
+        for capability in capabilities:
+            if capability not in entries:
+                return capability
+        best = min(capabilities, key=lambda cap: self.expected_seconds(entries[cap]))
+        # Capabilities which never succeeded would only fail again
+        others = [
+            capability
+            for capability in capabilities
+            if capability != best
+            and self.expected_seconds(entries[capability]) != float("inf")
+        ]
+        if others and rng.random() < EXPLORE_RATE:
+            return rng.choice(others)
+        return best
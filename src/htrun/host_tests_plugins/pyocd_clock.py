@@ -0,0 +1,196 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""SWD clock of pyOCD sessions, tuned per board and cached.
+
+The fastest clock a board handles reliably depends on the probe, the wiring and
+the target. The tuner reads a block of the boot memory at the slowest clock,
+then at each clock from the fastest down until two reads match it. The clock
+found is kept in a JSON file by target ID. When programming at it fails on a
+link error, the board is programmed again a step slower, and that clock is kept
+if it works. Boards of a type aren't assumed alike: the probe and the wiring
+matter as much as the target.
+"""
+
+import json
+import threading
+
+from ..cache import atomic_write, cache_path, file_lock
+
+# SWD clocks tried, in Hz, fastest first
+CLOCK_STEPS = [
+    50000000,
+    24000000,
+    16000000,
+    12000000,
+    10000000,
+    8000000,
+    4000000,
+    2000000,
+    1000000,
+]
+
+# Clock of targets not tuned
+DEFAULT_CLOCK = 10000000
+
+# Targets too slow for the default clock
+TARGET_CLOCKS = {
+    "nrf51": 1000000,
+    "ncs36510": 1000000,
+}
+
+# Bytes read to check a clock
+PROBE_SIZE = 1024
+
+
+def default_cache_path():
+    """Return the path of the clock cache in the user's cache directory."""
+    return cache_path("swd_clocks.json")
+
+
+def default_clock(target_type):
+    """Return the clock of a target type that wasn't tuned."""
+    return TARGET_CLOCKS.get(target_type, DEFAULT_CLOCK)
+
+
+def lower_clock(clock, steps=CLOCK_STEPS):
+    """Return the step below a clock, None if it's the slowest."""
+    lower = [step for step in steps if step < clock]
+    return max(lower) if lower else None
+
+
+class ClockCache(object):
+    """Tuned clocks, kept in a JSON file and keyed by target ID.
+
+    Processes tuning different boards share the file: updates are merged into
+    it under a lock.
+    """
+
+    def __init__(self, path):
+        """Load the clocks, starting empty if the file can't be read.
+
+        Args:
+            path: Path of the JSON file.
+        """
+        self.path = path
+        self.clocks = self.__load()
+
+    def get(self, target_id):
+        """Return the clock of a board in Hz, None if unknown."""
+        return self.clocks.get(target_id)
+
+    def update(self, target_id, clock):
+        """Record the clock of a board and write it to the file.
+
+        The file is read again under a lock, so the clocks other processes
+        recorded since it was loaded are kept.
+
+        Args:
+            target_id: Target ID of the board.
+            clock: Fastest reliable clock in Hz.
+
+        Raises:
+            IOError, OSError: The file can't be written, the clock is only
+                recorded in memory.
+        """
+        self.clocks[target_id] = clock
+        with file_lock(self.path + ".lock"):
+            clocks = self.__load()
+            clocks[target_id] = clock
+            atomic_write(self.path, json.dumps(clocks, indent=1, sort_keys=True))
+        self.clocks = clocks
+
+    def __load(self):
+        try:
+            with open(self.path) as f:
+                clocks = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return clocks if isinstance(clocks, dict) else {}
+
+
+class ClockTuner(object):
+    """Find and remember the fastest reliable SWD clock of each board."""
+
+    def __init__(self, cache_path=None, steps=CLOCK_STEPS):
+        """Create a tuner, the cache is loaded on first use.
+
+        Args:
+            cache_path: Path of the clock cache, default_cache_path() if None.
+            steps: Clocks tried in Hz.
+        """
+        self.cache_path = cache_path
+        self.steps = sorted(steps, reverse=True)
+        self.lock = threading.Lock()
+        self.__cache = None
+
+    @property
+    def cache(self):
+        """Clock cache of the tuner, loaded on first use."""
+        with self.lock:
+            if self.__cache is None:
+                self.__cache = ClockCache(self.cache_path or default_cache_path())
+            return self.__cache
+
+    def clock(self, session, target_id):
+        """Return the clock of a board, tuning it if unknown.
+
+        Args:
+            session: Open pyOCD session with the board.
+            target_id: Target ID of the board.
+        """
+        clock = self.cache.get(target_id)
+        if clock is None:
+            clock = self.tune(session)
+            self.record(target_id, clock)
+        return clock
+
+    def tune(self, session):
+        """Return the fastest clock reading the boot memory reliably.
+
+        Args:
+            session: Open pyOCD session with the board.
+
+        Raises:
+            Exception: The memory can't be read at the slowest clock.
+        """
+        reference = self.__read(session, self.steps[-1])
+        for clock in self.steps[:-1]:
+            try:
+                if all(self.__read(session, clock) == reference for _ in range(2)):
+                    return clock
+            except Exception:
+                # Too fast for the link, try slower
+                pass
+        return self.steps[-1]
+
+    def lower(self, clock):
+        """Return the clock a step below, None if clock is the slowest."""
+        return lower_clock(clock, self.steps)
+
+    def record(self, target_id, clock):
+        """Record the clock of a board.
+
+        The clock is only kept in memory if the cache can't be written.
+
+        Args:
+            target_id: Target ID of the board.
+            clock: Clock in Hz the board works at.
+        """
+        cache = self.cache
+        with self.lock:
+            try:
+                cache.update(target_id, clock)
+            except (IOError, OSError):
+                # Tuned again next time
+                pass
+
+    @staticmethod
+    def __read(session, clock):
+        session.probe.set_clock(clock)
+        start = session.target.memory_map.get_boot_memory().start
+        return bytes(session.target.read_memory_block8(start, PROBE_SIZE))
+
+
+CLOCK_TUNER = ClockTuner()
@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""pyOCD sessions kept open between plugin calls.
+
+Opening a session enumerates the probes, detects the target and sets up the link.
+The pyOCD copy and reset plugins take their sessions from PYOCD_SESSIONS, so
+flashing, verifying and resetting a target in one process open its probe once.
+The copy plugin closes its session unless a pyOCD reset follows.
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from pyocd.core.helpers import ConnectHelper
+
+    PYOCD_PRESENT = True
+except ImportError:
+    PYOCD_PRESENT = False
+
+
+class PyOCDSessionCache(object):
+    """Open pyOCD sessions by target ID, closed after an idle timeout.
+
+    A session is used by one thread at a time. A session used by a failing
+    operation is closed, the next operation opens a new one. Sessions aren't
+    shared with forked processes: a child process starts with an empty cache
+    and leaves the sessions of its parent alone.
+    """
+
+    # Time a session stays open after its last use, in seconds
+    IDLE_TIMEOUT = 30
+
+    def __init__(self, idle_timeout=None):
+        """Create an empty cache, closed when the process exits.
+
+        Args:
+            idle_timeout: Time a session stays open after its last use, in
+                seconds. IDLE_TIMEOUT if None.
+        """
+        self.idle_timeout = self.IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.__reset()
+        atexit.register(self.clear)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.__reset)
+
+    def __reset(self):
+        # Target ID -> [lock held while the session is used, session or None,
+        # time of the last use]
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Serialises probe enumeration and opening, which pyOCD doesn't guard
+        self.probe_lock = threading.Lock()
+
+    @contextmanager
+    def session(self, target_id, blocking=True, keep=True):
+        """Use the open session of a target, opening it if needed.
+
+        Args:
+            target_id: Unique ID of the probe.
+            blocking: Wait for the probe to be connected.
+            keep: Keep the session open after use, until the idle timeout.
+                Close it at once if False.
+
+        Yields:
+            Open pyOCD session.
+
+        Raises:
+            IOError: No probe with this ID was found.
+        """
+        with self.lock:
+            entry = self.entries.setdefault(target_id, [threading.Lock(), None, 0])
+        with entry[0]:
+            if entry[1] is not None and not entry[1].is_open:
+                entry[1] = None
+            if entry[1] is None:
+                entry[1] = self.open(target_id, blocking)
+            try:
+                yield entry[1]
+            except BaseException:
+                self.close_session(entry[1])
+                entry[1] = None
+                raise
+            if not keep:
+                self.close_session(entry[1])
+                entry[1] = None
+                return
+            entry[2] = time.time()
+        self.__arm_reaper()
+
+    def open(self, target_id, blocking=True):
+        """Open a session with a probe.
+
+        Raises:
+            IOError: No probe with this ID was found.
+        """
+        with self.probe_lock:
+            session = ConnectHelper.session_with_chosen_probe(
+                unique_id=target_id, resume_on_disconnect=False, blocking=blocking
+            )
+            if session is None:
+                raise IOError("probe not found")
+            session.open()
+        return session
+
+    @staticmethod
+    def close_session(session):
+        """Close a session, ignoring errors."""
+        try:
+            session.close()
+        except Exception:
+            # The probe may be gone already
+            pass
+
+    def __arm_reaper(self):
+        if self.idle_timeout > 0:
+            timer = threading.Timer(self.idle_timeout, self.reap)
+            timer.daemon = True
+            timer.start()
+        else:
+            self.reap()
+
+    def reap(self):
+        """Close the sessions unused for longer than the idle timeout."""
+        self.__close(lambda entry: time.time() - entry[2] >= self.idle_timeout)
+
+    def clear(self):
+        """Close all sessions not in use."""
+        self.__close(lambda entry: True)
+
+    def __close(self, expired):
+        with self.lock:
+            entries = list(self.entries.values())
+        for entry in entries:
+            # Sessions in use are left alone
+            if entry[0].acquire(False):
+                try:
+                    if entry[1] is not None and expired(entry):
+                        self.close_session(entry[1])
+                        entry[1] = None
+                finally:
+                    entry[0].release()
+
+
+PYOCD_SESSIONS = PyOCDSessionCache()
@@ -0,0 +1,285 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Leases of boards shared by htrun processes, granted in request order.
+
+A lease is an exclusive flock() of a file in a directory named after the board
+(target ID or serial port). A process waiting for a board holds the lock of a
+ticket file of its own, numbered in request order, and waits on the lock of the
+closest live ticket before it, or on the lease once it is first. When the board
+is released, or a process ahead gives up, the next one wakes up at once. Locks
+of a process which dies are released by the OS, so a crashed job never keeps a
+board.
+"""
+
+import errno
+import json
+import os
+import re
+import tempfile
+import time
+
+from ..cache import atomic_write, cache_path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, leases aren't supported
+    fcntl = None
+
+# Seconds between attempts to lock a file when waiting with a timeout
+POLL_INTERVAL = 0.05
+
+TICKET_SUFFIX = ".ticket"
+
+
+class LeaseTimeout(Exception):
+    """A board wasn't leased in time."""
+
+
+def default_lease_dir():
+    """Return the lease directory in the user's cache directory."""
+    return cache_path("leases")
+
+
+def _lock(fd, deadline=None):
+    """Lock a file, waiting until 'deadline' (time.time()) if not None.
+
+    Returns:
+        True if the file was locked, False on timeout.
+    """
+    if deadline is None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return True
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+        if time.time() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        # Removed by another process
+        pass
+
+
+def lease_usage(directory=None):
+    """Return the usage of all boards with a lease directory.
+
+    Args:
+        directory: Lease directory, default_lease_dir() if None.
+
+    Returns:
+        Dictionary of BoardLease.usage() dictionaries by board.
+    """
+    directory = directory or default_lease_dir()
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return {}
+    return dict(
+        (name, BoardLease(name, directory).usage())
+        for name in names
+        if os.path.isdir(os.path.join(directory, name))
+    )
+
+
+def usage_table(directory=None):
+    """Return a table of the usage of all boards with a lease directory.
+
+    Args:
+        directory: Lease directory, default_lease_dir() if None.
+    """
+    from prettytable import PrettyTable, HEADER
+
+    column_names = ["board", "leases", "held [s]", "waited [s]", "utilisation"]
+    pt = PrettyTable(column_names, junction_char="|", hrules=HEADER)
+    pt.align["board"] = "l"
+    for board, usage in sorted(lease_usage(directory).items()):
+        pt.add_row(
+            [
+                board,
+                usage["leases"],
+                "%.1f" % usage["held"],
+                "%.1f" % usage["waited"],
+                "%.0f%%" % (usage["utilisation"] * 100),
+            ]
+        )
+    return pt.get_string()
+
+
+class BoardLease(object):
+    """Exclusive use of a board by one htrun process at a time."""
+
+    def __init__(self, board, directory=None):
+        """Describe the lease of a board, not acquired yet.
+
+        Args:
+            board: Target ID or serial port of the board.
+            directory: Lease directory, default_lease_dir() if None.
+        """
+        self.board = board
+        self.directory = os.path.join(
+            directory or default_lease_dir(), re.sub(r"[^\w.-]", "_", board)
+        )
+        self.lease_fd = None
+        self.acquired = None
+        self.waited = None
+
+    @property
+    def supported(self):
+        """True if leases can be taken on this OS."""
+        return fcntl is not None
+
+    def acquire(self, timeout=None):
+        """Wait for the board, after processes which asked for it earlier.
+
+        Args:
+            timeout: Seconds to wait, None to wait until the board is free.
+
+        Raises:
+            LeaseTimeout: The board is still used after 'timeout' seconds.
+        """
+        if not self.supported or self.lease_fd is not None:
+            return
+        start = time.time()
+        deadline = None if timeout is None else start + timeout
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+        ticket, ticket_path, ticket_fd = self.__take_ticket()
+        try:
+            while True:
+                ahead = self.__waiter_ahead(ticket)
+                if ahead is None:
+                    break
+                # Wait until the waiter ahead is done waiting
+                ahead_path, ahead_fd = ahead
+                try:
+                    if not _lock(ahead_fd, deadline):
+                        raise LeaseTimeout(self.board)
+                finally:
+                    os.close(ahead_fd)
+                # Its process died if the ticket is still there
+                _remove(ahead_path)
+
+            lease_fd = os.open(
+                os.path.join(self.directory, "lease"), os.O_RDWR | os.O_CREAT, 0o666
+            )
+            if not _lock(lease_fd, deadline):
+                os.close(lease_fd)
+                raise LeaseTimeout(self.board)
+        finally:
+            # The next waiter goes first in the queue
+            _remove(ticket_path)
+            os.close(ticket_fd)
+
+        self.lease_fd = lease_fd
+        self.acquired = time.time()
+        self.waited = self.acquired - start
+        os.ftruncate(lease_fd, 0)
+        os.write(lease_fd, ("%d %.3f\n" % (os.getpid(), self.acquired)).encode())
+
+    def release(self):
+        """Release the board and record how long it was held."""
+        if self.lease_fd is None:
+            return
+        try:
+            self.__record(time.time())
+        except (IOError, OSError, ValueError):
+            # Usage is informative, failing to record it isn't an error
+            pass
+        finally:
+            fcntl.flock(self.lease_fd, fcntl.LOCK_UN)
+            os.close(self.lease_fd)
+            self.lease_fd = None
+
+    def usage(self):
+        """Return the recorded usage of the board.
+
+        Returns:
+            Dictionary with the number of leases, the seconds the board was
+            held and waited for, the time of the first lease and of the last
+            release, and the utilisation of the board over that period.
+        """
+        try:
+            with open(os.path.join(self.directory, "usage.json")) as f:
+                usage = json.load(f)
+        except (IOError, OSError, ValueError):
+            usage = {"leases": 0, "held": 0.0, "waited": 0.0}
+        period = usage.get("released", 0) - usage.get("first", 0)
+        usage["utilisation"] = usage["held"] / period if period > 0 else 0.0
+        return usage
+
+    def __enter__(self):
+        """Acquire the lease, waiting as long as needed."""
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        """Release the lease."""
+        self.release()
+
+    def __take_ticket(self):
+        """Return a new ticket number, the path of its file and its locked fd."""
+        counter_fd = os.open(
+            os.path.join(self.directory, "tickets"), os.O_RDWR | os.O_CREAT, 0o666
+        )
+        try:
+            fcntl.flock(counter_fd, fcntl.LOCK_EX)
+            ticket = int(os.read(counter_fd, 32) or 0) + 1
+            os.lseek(counter_fd, 0, os.SEEK_SET)
+            os.ftruncate(counter_fd, 0)
+            os.write(counter_fd, b"%d" % ticket)
+        finally:
+            os.close(counter_fd)
+
+        # Locked before it is named, so a ticket file without lock is dead
+        ticket_fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        fcntl.flock(ticket_fd, fcntl.LOCK_EX)
+        ticket_path = os.path.join(self.directory, "%d%s" % (ticket, TICKET_SUFFIX))
+        os.rename(tmp_path, ticket_path)
+        return ticket, ticket_path, ticket_fd
+
+    def __waiter_ahead(self, ticket):
+        """Return the (path, fd) of the closest live ticket before 'ticket'.
+
+        Tickets of dead processes are removed on the way.
+        """
+        tickets = []
+        for name in os.listdir(self.directory):
+            if name.endswith(TICKET_SUFFIX):
+                number = int(name[: -len(TICKET_SUFFIX)])
+                if number < ticket:
+                    tickets.append(number)
+        for number in sorted(tickets, reverse=True):
+            path = os.path.join(self.directory, "%d%s" % (number, TICKET_SUFFIX))
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except OSError:
+                continue
+            if not _lock(fd, deadline=0):
+                return path, fd
+            os.close(fd)
+            _remove(path)
+        return None
+
+    def __record(self, released):
+        path = os.path.join(self.directory, "usage.json")
+        usage = self.usage()
+        usage.pop("utilisation")
+        usage["leases"] += 1
+        usage["held"] += released - self.acquired
+        usage["waited"] += self.waited
+        usage.setdefault("first", self.acquired)
+        usage["released"] = released
+        atomic_write(path, json.dumps(usage, indent=1, sort_keys=True))
@@ -0,0 +1,303 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Match target serial output against a templated compare log.
+
+A compare log is a text file with one expected line of target output per line.
+Each line is matched either as a plain substring or as a regular expression. Lines
+are matched in order, one after the other.
+
+Lines placed between an ``@any-of`` line and an ``@end`` line form an unordered
+section: every line of the section must be seen in the target output, in any
+order, before matching continues with the line following ``@end``.
+"""
+
+import mmap
+import re
+
+ANY_OF_START = "@any-of"
+ANY_OF_END = "@end"
+
+# Characters which make a compare log line a (potential) regular expression.
+_REGEX_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+class LinePattern(object):
+    """A single compare log line, compiled once."""
+
+    __slots__ = ("text", "regex")
+
+    def __init__(self, text):
+        """Compile the compare log line.
+
+        Lines without regular expression metacharacters only use the substring
+        check. Lines which are not valid regular expressions are matched as plain
+        text.
+
+        Args:
+            text: Compare log line.
+        """
+        self.text = text
+        self.regex = None
+        if _REGEX_META.search(text):
+            try:
+                self.regex = re.compile(text)
+            except re.error:
+                pass
+
+    def match(self, line):
+        """Check if a line of target output matches this pattern.
+
+        Args:
+            line: Line of target output.
+
+        Returns:
+            True if the line matches.
+        """
+        if self.text in line:
+            return True
+        return self.regex is not None and self.regex.search(line) is not None
+
+
+def _trie_regex(words):
+    """Build a regular expression matching any of the given literal words.
+
+    Words are merged into a prefix tree so the regular expression engine only
+    walks shared prefixes once. The text of a match is the matched word.
+
+    Args:
+        words: List of literal strings.
+
+    Returns:
+        Compiled regular expression.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = None
+
+    def emit(node):
+        alternatives = []
+        for char in sorted(k for k in node if k):
+            child = node[char]
+            chunk = [char]
+            # Collapse chains without branches into a single literal run
+            while len(child) == 1 and "" not in child:
+                (next_char,) = child
+                chunk.append(next_char)
+                child = child[next_char]
+            alternatives.append(re.escape("".join(chunk)) + emit(child))
+        if "" in node:
+            # Word end is the last alternative so longer words are preferred
+            alternatives.append("")
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:%s)" % "|".join(alternatives)
+
+    return re.compile(emit(trie))
+
+
+class AnyOfSection(object):
+    """Unordered compare log section.
+
+    The text of every line of the section, regular expression or not, is
+    matched with a single combined prefix tree automaton, so lines found as they
+    are in the target output, version strings with a "." included, are matched
+    at a cost which does not grow with the number of pending lines. Regular
+    expression lines without groups are combined in one more regular expression,
+    which rejects most lines of target output with a single search.
+    """
+
+    MAX_STALE_HITS = 256
+
+    def __init__(self, patterns):
+        """Create the section.
+
+        Args:
+            patterns: List of LinePattern objects in the section.
+        """
+        # Number of outstanding matches for each distinct line text
+        self.pending_literals = {}
+        self.pending_regexes = []
+        for pattern in patterns:
+            count = self.pending_literals.get(pattern.text, 0)
+            self.pending_literals[pattern.text] = count + 1
+            if pattern.regex is not None:
+                self.pending_regexes.append(pattern)
+        self._automaton = None
+        self._combined = None
+        self._stale_hits = 0
+        self._rebuild()
+
+    def _rebuild(self):
+        words = list(self.pending_literals)
+        self._automaton = _trie_regex(words) if words else None
+        # Group numbers, and backreferences to them, change when combined
+        combinable = [p for p in self.pending_regexes if not p.regex.groups]
+        self._combined = None
+        if len(combinable) == len(self.pending_regexes) and combinable:
+            try:
+                self._combined = re.compile(
+                    "|".join("(?:%s)" % p.text for p in combinable)
+                )
+            except re.error:
+                pass
+        self._stale_hits = 0
+
+    def _stale_hit(self):
+        # Compiling the automatons is expensive, they are only rebuilt when
+        # output keeps repeating lines which were already matched
+        self._stale_hits += 1
+        if self._stale_hits > self.MAX_STALE_HITS:
+            self._rebuild()
+
+    @property
+    def complete(self):
+        """True when every line of the section was matched."""
+        return not self.pending_literals
+
+    def pending(self):
+        """Return the text of the lines which were not matched yet."""
+        return list(self.pending_literals)
+
+    def _consume(self, text):
+        count = self.pending_literals[text] - 1
+        if count:
+            self.pending_literals[text] = count
+        else:
+            del self.pending_literals[text]
+        for index, pattern in enumerate(self.pending_regexes):
+            if pattern.text == text:
+                del self.pending_regexes[index]
+                break
+
+    def match(self, line):
+        """Match a line of target output against the pending section lines.
+
+        A single line of output satisfies at most one line of the section.
+
+        Args:
+            line: Line of target output.
+
+        Returns:
+            True if the line matched one of the pending lines.
+        """
+        if self._automaton is not None:
+            m = self._automaton.search(line)
+            if m:
+                text = m.group()
+                if text in self.pending_literals:
+                    self._consume(text)
+                    return True
+                # Automaton hit a line which was already matched, check the
+                # remaining lines one by one
+                self._stale_hit()
+                for text in self.pending_literals:
+                    if text in line:
+                        self._consume(text)
+                        return True
+        if not self.pending_regexes:
+            return False
+        if self._combined is not None and not self._combined.search(line):
+            return False
+        for pattern in self.pending_regexes:
+            if pattern.regex.search(line):
+                self._consume(pattern.text)
+                return True
+        if self._combined is not None:
+            self._stale_hit()
+        return False
+
+
+def _read_lines(path):
+    """Stream lines of a text file through a memory map.
+
+    Args:
+        path: Path to the file.
+
+    Yields:
+        Lines of the file without line endings.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            return
+        try:
+            for raw_line in iter(mm.readline, b""):
+                yield raw_line.decode("utf-8", "replace").rstrip("\r\n")
+        finally:
+            mm.close()
+
+
+class CompareLog(object):
+    """Compare log matcher.
+
+    The compare log file is streamed and compiled lazily: only the entry which is
+    currently expected is kept in memory.
+    """
+
+    def __init__(self, path):
+        """Open the compare log.
+
+        Args:
+            path: Path to the compare log file.
+        """
+        self.path = path
+        self._lines = _read_lines(path)
+        self.matched = 0
+        self.current = self._next_entry()
+
+    def _next_entry(self):
+        """Compile the next ordered line or unordered section of the compare log."""
+        for text in self._lines:
+            if text.strip() != ANY_OF_START:
+                return LinePattern(text)
+            patterns = []
+            for text in self._lines:
+                if text.strip() == ANY_OF_END:
+                    break
+                patterns.append(LinePattern(text))
+            if patterns:
+                return AnyOfSection(patterns)
+        return None
+
+    @property
+    def complete(self):
+        """True when all compare log lines were matched."""
+        return self.current is None
+
+    def pending(self):
+        """Return the text of the compare log line(s) currently expected."""
+        if self.current is None:
+            return []
+        if isinstance(self.current, AnyOfSection):
+            return self.current.pending()
+        return [self.current.text]
+
+    def match(self, line):
+        """Match a line of target output with the compare log.
+
+        Args:
+            line: Line of target output.
+
+        Returns:
+            True if all compare log lines are matched.
+        """
+        current = self.current
+        if current is None:
+            return True
+        if current.match(line):
+            self.matched += 1
+            if isinstance(current, AnyOfSection) and not current.complete:
+                return False
+            self.current = self._next_entry()
+        return self.current is None
+
+    def close(self):
+        """Release the compare log file."""
+        self._lines.close()
@@ -0,0 +1,225 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Run a batch of FastModel tests on several simulator instances at once.
+
+Each instance is a worker process running tests one after another, like a
+--batch run, so every test has its own connection and KV stream. Tests are
+started longest first, using the durations recorded by earlier runs.
+"""
+
+import copy
+import json
+import multiprocessing
+import os
+import time
+from queue import Empty as QueueEmpty
+
+from ..cache import atomic_write, cache_path, file_lock
+from ..host_tests_logger import HtrunLogger
+
+# Exit code of a test whose worker process died before reporting its result
+WORKER_ERROR = 1
+
+
+def default_durations_path():
+    """Return the path of the durations file in the user's cache directory."""
+    return cache_path("fm_durations.json")
+
+
+def instance_count(instances=0, memory_budget=0, instance_memory=1024):
+    """Return the number of simulator instances to run at once.
+
+    Args:
+        instances: Number of instances, 0 for one per CPU core.
+        memory_budget: Memory all instances may use together in MiB, 0 for no
+            limit.
+        instance_memory: Memory used by one instance in MiB.
+
+    Returns:
+        Number of instances, at least 1.
+    """
+    count = instances or multiprocessing.cpu_count()
+    if memory_budget and instance_memory:
+        count = min(count, int(memory_budget // instance_memory))
+    return max(1, count)
+
+
+def schedule(image_paths, durations):
+    """Order tests longest first.
+
+    Tests without a recorded duration go first, in batch order, as they might be
+    the longest.
+
+    Args:
+        image_paths: Images of the tests, in batch order.
+        durations: DurationStore with the durations of earlier runs.
+
+    Returns:
+        List of indices into image_paths, in the order the tests start.
+    """
+    unknown = [i for i, path in enumerate(image_paths) if durations.get(path) is None]
+    known = [i for i, path in enumerate(image_paths) if durations.get(path) is not None]
+    known.sort(key=lambda i: durations.get(image_paths[i]), reverse=True)
+    return unknown + known
+
+
+class DurationStore(object):
+    """Test durations of earlier runs, kept in a JSON file.
+
+    Durations are keyed by the absolute path of the test image. Batches running
+    at the same time share the file: the durations they record are merged into
+    it under a lock.
+    """
+
+    def __init__(self, path):
+        """Load the durations, starting empty if the file can't be read.
+
+        Args:
+            path: Path of the JSON file.
+        """
+        self.path = path
+        self.durations = self.__load()
+        # Durations recorded since the last save()
+        self.updated = {}
+
+    def get(self, image_path):
+        """Return the last duration of a test in seconds, None if unknown."""
+        return self.durations.get(os.path.abspath(image_path))
+
+    def update(self, image_path, duration):
+        """Record the duration of a test.
+
+        Args:
+            image_path: Image of the test.
+            duration: Wall time of the test in seconds.
+        """
+        self.durations[os.path.abspath(image_path)] = duration
+        self.updated[os.path.abspath(image_path)] = duration
+
+    def save(self):
+        """Merge the recorded durations into the file, replacing it atomically.
+
+        The file is read again under a lock, so the durations other batches
+        saved since it was loaded are kept.
+        """
+        with file_lock(self.path + ".lock"):
+            durations = self.__load()
+            durations.update(self.updated)
+            atomic_write(self.path, json.dumps(durations, indent=1, sort_keys=True))
+        self.durations = durations
+        self.updated = {}
+
+    def __load(self):
+        try:
+            with open(self.path) as f:
+                durations = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return durations if isinstance(durations, dict) else {}
+
+
+def _worker(run_test, options, tasks, results):
+    """Run tests until a None task is taken.
+
+    Args:
+        run_test: Function running a test, taking the options.
+        options: Command line options, the image path is set for each test.
+        tasks: Queue of (index, image path) tuples.
+        results: Queue the (index, exit code, duration) of each test is put on.
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        index, image_path = task
+        test_options = copy.copy(options)
+        test_options.image_path = image_path
+        test_options.next_image_path = None
+        start = time.time()
+        result = run_test(test_options)
+        results.put((index, result, time.time() - start))
+
+
+class FastmodelExecutor(object):
+    """Run the tests of a batch on several FastModel instances at once."""
+
+    def __init__(self, options, image_paths, run_test):
+        """Prepare the batch.
+
+        Args:
+            options: Command line options, see --fm-instances,
+                --fm-memory-budget, --fm-instance-memory and --fm-durations.
+            image_paths: Images of the tests, in batch order.
+            run_test: Function running a test, taking the options.
+        """
+        self.options = options
+        self.image_paths = image_paths
+        self.run_test = run_test
+        self.logger = HtrunLogger("FMEX")
+        self.instances = min(
+            max(1, len(image_paths)),
+            instance_count(
+                options.fm_instances,
+                options.fm_memory_budget,
+                options.fm_instance_memory,
+            ),
+        )
+        self.durations = DurationStore(options.fm_durations or default_durations_path())
+
+    def run(self):
+        """Run all tests.
+
+        Returns:
+            Exit code of the first test in batch order which did not pass, 0 if
+            all passed.
+        """
+        order = schedule(self.image_paths, self.durations)
+        self.logger.prn_inf(
+            "running %d tests on %d FastModel instances" % (len(order), self.instances)
+        )
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        for index in order:
+            tasks.put((index, self.image_paths[index]))
+        for _ in range(self.instances):
+            tasks.put(None)
+        workers = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(self.run_test, self.options, tasks, results),
+                name="fm_instance_%d" % instance,
+            )
+            for instance in range(self.instances)
+        ]
+        for worker in workers:
+            worker.start()
+
+        exit_codes = {}
+        while len(exit_codes) < len(order):
+            try:
+                index, result, duration = results.get(timeout=1)
+            except QueueEmpty:
+                if any(worker.is_alive() for worker in workers):
+                    continue
+                # Results are flushed before a worker exits
+                try:
+                    index, result, duration = results.get(timeout=0.1)
+                except QueueEmpty:
+                    break
+            exit_codes[index] = result
+            self.durations.update(self.image_paths[index], duration)
+        for worker in workers:
+            worker.join()
+
+        try:
+            self.durations.save()
+        except (IOError, OSError) as e:
+            self.logger.prn_wrn("unable to save test durations: %s" % str(e))
+
+        for index, image_path in enumerate(self.image_paths):
+            if index not in exit_codes:
+                self.logger.prn_err("no result for '%s'" % image_path)
+        codes = [exit_codes.get(i, WORKER_ERROR) for i in range(len(self.image_paths))]
+        return next((code for code in codes if code), 0)
@@ -4,13 +4,13 @@
 #
 """Default host test."""
 
-import re
+import os
 import sys
 import traceback
 from time import time
-from sre_compile import error
 
 from multiprocessing import Process, Queue
+from mbed_lstools.main import create
 from .. import host_tests_plugins, BaseHostTest
 from ..host_tests_registry import HostRegistry
 
@@ -24,8 +24,11 @@ from ..host_tests.default_auto import DefaultAuto
 from ..host_tests.dev_null_auto import DevNullTest
 
 from .host_test import DefaultTestSelectorBase
+from .board_lease import BoardLease, LeaseTimeout, usage_table
+from .compare_log import CompareLog
+from .rss import get_rss
 from ..host_tests_logger import HtrunLogger
-from ..host_tests_conn_proxy import conn_process
+from ..host_tests_conn_proxy import conn_process, ConnectionThread, EventLanes
 
 if sys.version_info > (3, 0):
     from queue import Empty as QueueEmpty
@@ -69,21 +72,27 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                 host_tests_plugins.print_plugin_info()
                 sys.exit(0)
 
-            if options.global_resource_mgr or options.fast_model_connection:
+            if options.lease_usage:  # --lease-usage option
+                print(usage_table(options.lease_dir))
+                sys.exit(0)
+
+            if (
+                options.global_resource_mgr
+                or options.fast_model_connection
+                or options.replay
+                or options.process
+            ):
                 # If Global/Simulator Resource Mgr is working it will handle
-                # reset/flashing workflow
+                # reset/flashing workflow, a replayed session has no DUT at all
+                # and a local process is reset by restarting it
                 # So local plugins are offline
                 self.options.skip_reset = True
                 self.options.skip_flashing = True
 
+        self.compare_log = None
         if options.compare_log:
-            with open(options.compare_log, "r") as f:
-                self.compare_log = f.read().splitlines()
-
-        else:
-            self.compare_log = None
+            self.compare_log = CompareLog(options.compare_log)
         self.serial_output_file = options.serial_output_file
-        self.compare_log_idx = 0
         DefaultTestSelectorBase.__init__(self, options)
 
     def is_host_test_obj_compatible(self, obj_instance):
@@ -134,7 +143,13 @@ class DefaultTestSelector(DefaultTestSelectorBase):
         result = None
         timeout_duration = 10  # Default test case timeout
         coverage_idle_timeout = 10  # Default coverage idle timeout
-        event_queue = Queue()  # Events from DUT to host
+        # Events from DUT to host, target output lines are only kept in order
+        # with other events (and never dropped) when they are captured
+        event_queue = EventLanes(
+            bulk_size=self.options.rxd_lane_size,
+            ordered_rxd=bool(self.compare_log or self.serial_output_file),
+            kv_size=self.options.kv_lane_size,
+        )
         dut_event_queue = Queue()  # Events from host to DUT {k;v}
 
         def callback__notify_prn(key, value, timestamp):
@@ -183,6 +198,12 @@ class DefaultTestSelector(DefaultTestSelectorBase):
         if self.options.global_resource_mgr:
             grm_config = self._parse_grm(self.options.global_resource_mgr)
             grm_config["conn_resource"] = "grm"
+            grm_config["grm_keep_warm"] = self.options.grm_keep_warm
+            if self.options.grm_prefetch:
+                # Set by --batch when another test follows this one
+                grm_config["grm_prefetch"] = getattr(
+                    self.options, "next_image_path", None
+                )
             config.update(grm_config)
 
         if self.options.fast_model_connection:
@@ -191,14 +212,46 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                 {
                     "conn_resource": "fmc",
                     "fm_config": self.options.fast_model_connection,
+                    "fm_keep_warm": self.options.fm_keep_warm,
                 }
             )
 
+        if self.options.replay:
+            config.update(
+                {
+                    "conn_resource": "replay",
+                    "replay": self.options.replay,
+                    "replay_speed": self.options.replay_speed,
+                }
+            )
+
+        if self.options.socket:
+            config.update({"conn_resource": "socket", "socket": self.options.socket})
+
+        if self.options.process:
+            config.update({"conn_resource": "process", "process": self.options.process})
+
+        if self.options.record:
+            config["record"] = self.options.record
+
         def start_conn_process():
-            # DUT-host communication process
+            # DUT-host communication process, connections are counted so a
+            # recorded or replayed session can tell them apart
+            config["conn_index"] = config.get("conn_index", -1) + 1
             args = (event_queue, dut_event_queue, config)
-            p = Process(target=conn_process, args=args)
-            p.deamon = True
+            if (
+                config.get("grm_keep_warm")
+                or config.get("grm_prefetch")
+                or config.get("fm_keep_warm")
+                or config.get("reset_type") == "pyocd"
+            ):
+                # Warm and prefetched resources must outlive the connection, keep
+                # the connector in this process. So must pyOCD resets, to reuse
+                # the session opened to flash the target.
+                p = ConnectionThread(args)
+            else:
+                p = Process(target=conn_process, args=args)
+                p.deamon = True
             p.start()
             return p
 
@@ -215,7 +268,8 @@ class DefaultTestSelector(DefaultTestSelectorBase):
 
             Returns:
                 The elapsed time taken by the processing of code coverage, and
-                the (key, value, and timestamp) of the next event.
+                the (key, value, and timestamp) of the next event or None if the
+                idle timeout expired.
             """
             original_start_time = time()
             start_time = time()
@@ -241,171 +295,392 @@ class DefaultTestSelector(DefaultTestSelectorBase):
 
                 elapsed_time = time() - original_start_time
                 return elapsed_time, (key, value, timestamp)
+            return time() - original_start_time, None
+
+        # System event handlers. All handlers take the same (key, value, timestamp)
+        # arguments as host test callbacks, so both can be dispatched with a single
+        # dictionary lookup.
+
+        def stop_consuming(key, value, new_result):
+            nonlocal callbacks_consume, result
+            self.logger.prn_err(value)
+            self.logger.prn_wrn("stopped to consume events due to %s event" % key)
+            callbacks_consume = False
+            result = new_result
+            event_queue.put(("__exit_event_queue", 0, time()))
+
+        def handle__timeout(key, value, timestamp):
+            # Override default timeout for this event queue
+            nonlocal start_time, timeout_duration
+            start_time = time()
+            timeout_duration = int(value)  # New timeout
+            self.logger.prn_inf("setting timeout to: %d sec" % int(value))
+
+        def handle__version(key, value, timestamp):
+            self.client_version = value
+            self.logger.prn_inf("DUT greentea-client version: " + self.client_version)
+
+        def handle__host_test_name(key, value, timestamp):
+            nonlocal result
+            # Load dynamically requested host test
+            self.test_supervisor = self.registry.get_host_test(value)
+
+            # Check if host test object loaded is actually host test class
+            # derived from 'htrun.BaseHostTest()'
+            # Additionaly if host test class implements custom ctor it
+            # should call BaseHostTest().__Init__()
+            if self.test_supervisor and self.is_host_test_obj_compatible(
+                self.test_supervisor
+            ):
+                # Pass communication queues and setup() host test
+                self.test_supervisor.setup_communication(
+                    event_queue, dut_event_queue, config
+                )
+                try:
+                    # After setup() user should already register all
+                    # callbacks
+                    self.test_supervisor.setup()
+                except (TypeError, ValueError):
+                    # setup() can throw in normal circumstances TypeError
+                    # and ValueError
+                    self.logger.prn_err("host test setup() failed, reason:")
+                    self.logger.prn_inf("==== Traceback start ====")
+                    for line in traceback.format_exc().splitlines():
+                        print(line)
+                    self.logger.prn_inf("==== Traceback end ====")
+                    result = self.RESULT_ERROR
+                    event_queue.put(("__exit_event_queue", 0, time()))
+
+                self.logger.prn_inf("host test setup() call...")
+                if self.test_supervisor.get_callbacks():
+                    callbacks.update(self.test_supervisor.get_callbacks())
+                    self.logger.prn_inf("CALLBACKs updated")
+                else:
+                    self.logger.prn_wrn("no CALLBACKs specified by host test")
+                self.logger.prn_inf("host test detected: %s" % value)
+                enter_main_phase()
+                subscribe()
+            else:
+                self.logger.prn_err("host test not detected: %s" % value)
+                result = self.RESULT_ERROR
+                event_queue.put(("__exit_event_queue", 0, time()))
+                enter_main_phase()
 
-        p = start_conn_process()
-        conn_process_started = False
-        try:
-            # Wait for the start event. Process start timeout does not apply in
-            # Global resource manager case as it may take a while for resource
-            # to be available.
-            (key, value, timestamp) = event_queue.get(
-                timeout=None
-                if self.options.global_resource_mgr
-                else self.options.process_start_timeout
+        def handle__sync(key, value, timestamp):
+            # This is DUT-Host Test handshake event
+            self.logger.prn_inf(
+                "sync KV found, uuid=%s, timestamp=%f" % (str(value), timestamp)
+            )
+
+        def handle__notify_sync_failed(key, value, timestamp):
+            # This event is sent by conn_process, SYNC failed
+            stop_consuming(key, value, self.RESULT_SYNC_FAILED)
+
+        def handle__notify_conn_lost(key, value, timestamp):
+            # This event is sent by conn_process, DUT connection was lost
+            stop_consuming(key, value, self.RESULT_IO_SERIAL)
+
+        def handle__notify_rxd_dropped(key, value, timestamp):
+            # This event is sent by conn_process, target output was dropped
+            self.logger.prn_wrn(
+                "%d lines of target output dropped, host test is not keeping up"
+                % int(value)
             )
 
-            if key == "__conn_process_start":
-                conn_process_started = True
+        def handle__exit_event_queue(key, value, timestamp):
+            # This event is sent by the host test indicating no more events
+            # expected
+            nonlocal callbacks__exit_event_queue, finished
+            self.logger.prn_inf("%s received" % (key))
+            callbacks__exit_event_queue = True
+            finished = True
+
+        def handle_preamble_default(key, value, timestamp):
+            if not key.startswith("__"):
+                self.logger.prn_err(
+                    "orphan event in preamble phase: {{%s;%s}}, timestamp=%f"
+                    % (key, str(value), timestamp)
+                )
+            # Consume other system level events
+
+        def handle__coverage_start(key, value, timestamp):
+            # If coverage detected switch to idle loop
+            nonlocal timeout_duration, coverage_started
+            if not coverage_started:
+                # The coverage idle loop is kept alive by target output
+                coverage_started = True
+                subscribe()
+            self.logger.prn_inf("starting coverage idle timeout loop...")
+            elapsed_time, event = process_code_coverage(key, value, timestamp)
+
+            # Ignore the time taken by the code coverage
+            timeout_duration += elapsed_time
+            self.logger.prn_inf(
+                "exiting coverage idle timeout loop (elapsed_time: %.2f" % elapsed_time
+            )
+            if event is not None:
+                (key, value, timestamp) = event
+                handlers.get(key, default_handler)(key, value, timestamp)
+
+        def handle__notify_complete(key, value, timestamp):
+            # This event is sent by Host Test, test result is in value
+            # or if value is None, value will be retrieved from
+            # HostTest.result() method
+            nonlocal result
+            self.logger.prn_inf("%s(%s)" % (key, str(value)))
+            result = value
+            event_queue.put(("__exit_event_queue", 0, time()))
+
+        def handle__reset(key, value, timestamp):
+            # This event only resets the dut, not the host test
+            dut_event_queue.put(("__reset", True, time()))
+
+        def handle__reset_dut(key, value, timestamp):
+            nonlocal p
+            # Disconnect to avoid connection lost event
+            dut_event_queue.put(("__host_test_finished", True, time()))
+            p.join()
+
+            if value == DefaultTestSelector.RESET_TYPE_SW_RST:
+                self.logger.prn_inf("Performing software reset.")
+                # Just disconnecting and re-connecting comm process will
+                # soft reset DUT
+            elif value == DefaultTestSelector.RESET_TYPE_HW_RST:
+                self.logger.prn_inf("Performing hard reset.")
+                # request hardware reset
+                self.target.hw_reset()
             else:
                 self.logger.prn_err(
-                    "First expected event was '__conn_process_start', received '%s' "
-                    "instead" % key
+                    "Invalid reset type (%s). Supported types [%s]."
+                    % (
+                        value,
+                        ", ".join(
+                            [
+                                DefaultTestSelector.RESET_TYPE_HW_RST,
+                                DefaultTestSelector.RESET_TYPE_SW_RST,
+                            ]
+                        ),
+                    )
                 )
+                self.logger.prn_inf("Software reset will be performed.")
+
+            # connect to the device
+            p = start_conn_process()
+            subscribe(force=True)
+
+        def handle__exit(key, value, timestamp):
+            # This event is sent by DUT, test suite exited
+            nonlocal callbacks__exit
+            self.logger.prn_inf("%s(%s)" % (key, str(value)))
+            callbacks__exit = True
+            event_queue.put(("__exit_event_queue", 0, time()))
+
+        def handle__timeout_set(key, value, timestamp):
+            # Dynamic timeout set
+            nonlocal timeout_duration
+            timeout_duration = int(value)  # New timeout
+            self.logger.prn_inf("setting timeout to: %d sec" % int(value))
+
+        def handle__timeout_adjust(key, value, timestamp):
+            # Dynamic timeout adjust
+            nonlocal timeout_duration
+            timeout_duration = timeout_duration + int(value)  # adjust time
+            self.logger.prn_inf(
+                "adjusting timeout with %d sec (now %d)"
+                % (int(value), timeout_duration)
+            )
+
+        def handle__callbacks_updated(key, value, timestamp):
+            # This event is sent by the host test when it registers a callback
+            callbacks.update(self.test_supervisor.get_callbacks())
+            enter_main_phase()
+            subscribe()
 
-        except QueueEmpty:
+        def handle_main_default(key, value, timestamp):
             self.logger.prn_err(
-                "Conn process failed to start in %f sec"
-                % self.options.process_start_timeout
+                "orphan event in main phase: {{%s;%s}}, timestamp=%f"
+                % (key, str(value), timestamp)
             )
 
-        if not conn_process_started:
-            p.terminate()
-            return self.RESULT_TIMEOUT
+        preamble_handlers = {
+            "__timeout": handle__timeout,
+            "__version": handle__version,
+            "__host_test_name": handle__host_test_name,
+            "__sync": handle__sync,
+            "__notify_sync_failed": handle__notify_sync_failed,
+            "__notify_conn_lost": handle__notify_conn_lost,
+            "__notify_rxd_dropped": handle__notify_rxd_dropped,
+            "__exit_event_queue": handle__exit_event_queue,
+        }
+
+        main_handlers = {
+            "__coverage_start": handle__coverage_start,
+            "__notify_complete": handle__notify_complete,
+            "__reset": handle__reset,
+            "__reset_dut": handle__reset_dut,
+            "__notify_conn_lost": handle__notify_conn_lost,
+            "__notify_rxd_dropped": handle__notify_rxd_dropped,
+            "__exit": handle__exit,
+            "__exit_event_queue": handle__exit_event_queue,
+            "__timeout_set": handle__timeout_set,
+            "__timeout_adjust": handle__timeout_adjust,
+            "__callbacks_updated": handle__callbacks_updated,
+        }
 
-        start_time = time()
+        # Dispatch table of the current phase and the handler used for events
+        # which are not in it
+        handlers = preamble_handlers
+        default_handler = handle_preamble_default
+
+        def enter_main_phase():
+            nonlocal handlers, default_handler
+            # Host test callbacks are merged with system handlers, system handlers
+            # take precedence.
+            handlers = dict(callbacks)
+            handlers.update(main_handlers)
+            default_handler = handle_main_default
+
+        # Event keys conn_process was last asked to forward
+        subscribed_keys = None
+        # Set once the DUT started sending code coverage
+        coverage_started = False
+
+        def subscribe(force=False):
+            # Ask conn_process to only forward events which are handled
+            nonlocal subscribed_keys
+            consumed_keys = self.test_supervisor.get_consumed_keys()
+            keys = set(preamble_handlers)
+            keys.update(main_handlers)
+            keys.update(consumed_keys)
+            # Target output is captured, compared, or read with code coverage
+            if (
+                self.compare_log
+                or self.serial_output_file
+                or coverage_started
+                or "__coverage_start" in consumed_keys
+            ):
+                keys.add("__rxd_line")
+            if force or keys != subscribed_keys:
+                subscribed_keys = keys
+                dut_event_queue.put(("__subscribe", sorted(keys), time()))
 
         try:
-            consume_preamble_events = True
+            p = start_conn_process()
+            conn_process_started = False
+            try:
+                # Wait for the start event. Process start timeout does not apply in
+                # Global resource manager case as it may take a while for resource
+                # to be available.
+                (key, value, timestamp) = event_queue.get(
+                    timeout=None
+                    if self.options.global_resource_mgr
+                    else self.options.process_start_timeout
+                )
 
-            while (time() - start_time) < timeout_duration:
-                # Handle default events like timeout, host_test_name, ...
-                try:
-                    (key, value, timestamp) = event_queue.get(timeout=1)
-                except QueueEmpty:
-                    continue
+                if key == "__conn_process_start":
+                    conn_process_started = True
+                else:
+                    self.logger.prn_err(
+                        "First expected event was '__conn_process_start', "
+                        "received '%s' instead" % key
+                    )
 
-                # Write serial output to the file if specified in options.
-                if self.serial_output_file:
-                    if key == "__rxd_line":
-                        with open(self.serial_output_file, "a") as f:
-                            f.write("%s\n" % value)
-
-                # In this mode we only check serial output against compare log.
-                if self.compare_log:
-                    if key == "__rxd_line":
-                        if self.match_log(value):
-                            self.logger.prn_inf("Target log matches compare log!")
-                            result = True
-                            break
+            except QueueEmpty:
+                self.logger.prn_err(
+                    "Conn process failed to start in %f sec"
+                    % self.options.process_start_timeout
+                )
 
-                if consume_preamble_events:
-                    if key == "__timeout":
-                        # Override default timeout for this event queue
-                        start_time = time()
-                        timeout_duration = int(value)  # New timeout
-                        self.logger.prn_inf("setting timeout to: %d sec" % int(value))
-                    elif key == "__version":
-                        self.client_version = value
-                        self.logger.prn_inf(
-                            "DUT greentea-client version: " + self.client_version
-                        )
-                    elif key == "__host_test_name":
-                        # Load dynamically requested host test
-                        self.test_supervisor = self.registry.get_host_test(value)
-
-                        # Check if host test object loaded is actually host test class
-                        # derived from 'htrun.BaseHostTest()'
-                        # Additionaly if host test class implements custom ctor it
-                        # should call BaseHostTest().__Init__()
-                        if self.test_supervisor and self.is_host_test_obj_compatible(
-                            self.test_supervisor
-                        ):
-                            # Pass communication queues and setup() host test
-                            self.test_supervisor.setup_communication(
-                                event_queue, dut_event_queue, config
-                            )
-                            try:
-                                # After setup() user should already register all
-                                # callbacks
-                                self.test_supervisor.setup()
-                            except (TypeError, ValueError):
-                                # setup() can throw in normal circumstances TypeError
-                                # and ValueError
-                                self.logger.prn_err("host test setup() failed, reason:")
-                                self.logger.prn_inf("==== Traceback start ====")
-                                for line in traceback.format_exc().splitlines():
-                                    print(line)
-                                self.logger.prn_inf("==== Traceback end ====")
-                                result = self.RESULT_ERROR
-                                event_queue.put(("__exit_event_queue", 0, time()))
-
-                            self.logger.prn_inf("host test setup() call...")
-                            if self.test_supervisor.get_callbacks():
-                                callbacks.update(self.test_supervisor.get_callbacks())
-                                self.logger.prn_inf("CALLBACKs updated")
-                            else:
-                                self.logger.prn_wrn(
-                                    "no CALLBACKs specified by host test"
-                                )
-                            self.logger.prn_inf("host test detected: %s" % value)
-                        else:
-                            self.logger.prn_err("host test not detected: %s" % value)
+            if not conn_process_started:
+                p.terminate()
+                return self.RESULT_TIMEOUT
+
+            start_time = time()
+            # Set by handlers when no more events are expected
+            finished = False
+            # Time of the next resident memory check (--max-rss)
+            next_rss_check = start_time
+
+            try:
+                while not finished and (time() - start_time) < timeout_duration:
+                    if self.options.max_rss and time() >= next_rss_check:
+                        next_rss_check = time() + 1
+                        if self.rss_exceeded(p.pid):
                             result = self.RESULT_ERROR
-                            event_queue.put(("__exit_event_queue", 0, time()))
-
-                        consume_preamble_events = False
-                    elif key == "__sync":
-                        # This is DUT-Host Test handshake event
-                        self.logger.prn_inf(
-                            "sync KV found, uuid=%s, timestamp=%f"
-                            % (str(value), timestamp)
-                        )
-                    elif key == "__notify_sync_failed":
-                        # This event is sent by conn_process, SYNC failed
-                        self.logger.prn_err(value)
-                        self.logger.prn_wrn(
-                            "stopped to consume events due to %s event" % key
-                        )
-                        callbacks_consume = False
-                        result = self.RESULT_SYNC_FAILED
-                        event_queue.put(("__exit_event_queue", 0, time()))
-                    elif key == "__notify_conn_lost":
-                        # This event is sent by conn_process, DUT connection was lost
-                        self.logger.prn_err(value)
-                        self.logger.prn_wrn(
-                            "stopped to consume events due to %s event" % key
-                        )
-                        callbacks_consume = False
-                        result = self.RESULT_IO_SERIAL
-                        event_queue.put(("__exit_event_queue", 0, time()))
-                    elif key == "__exit_event_queue":
-                        # This event is sent by the host test indicating no more events
-                        # expected
-                        self.logger.prn_inf("%s received" % (key))
-                        callbacks__exit_event_queue = True
-                        break
-                    elif key.startswith("__"):
-                        # Consume other system level events
-                        pass
-                    else:
-                        self.logger.prn_err(
-                            "orphan event in preamble phase: {{%s;%s}}, timestamp=%f"
-                            % (key, str(value), timestamp)
-                        )
-                else:
-                    # If coverage detected switch to idle loop
-                    if key == "__coverage_start":
-                        self.logger.prn_inf("starting coverage idle timeout loop...")
-                        elapsed_time, (key, value, timestamp) = process_code_coverage(
-                            key, value, timestamp
-                        )
+                            break
 
-                        # Ignore the time taken by the code coverage
-                        timeout_duration += elapsed_time
-                        self.logger.prn_inf(
-                            "exiting coverage idle timeout loop (elapsed_time: %.2f"
-                            % elapsed_time
-                        )
+                    # Handle default events like timeout, host_test_name, ...
+                    try:
+                        (key, value, timestamp) = event_queue.get(timeout=1)
+                    except QueueEmpty:
+                        continue
+
+                    # Write serial output to the file if specified in options.
+                    if self.serial_output_file:
+                        if key == "__rxd_line":
+                            with open(self.serial_output_file, "a") as f:
+                                f.write("%s\n" % value)
+
+                    # In this mode we only check serial output against compare log.
+                    if self.compare_log:
+                        if key == "__rxd_line":
+                            if self.match_log(value):
+                                self.logger.prn_inf("Target log matches compare log!")
+                                result = True
+                                break
+
+                    handlers.get(key, default_handler)(key, value, timestamp)
+            except Exception:
+                self.logger.prn_err("something went wrong in event main loop!")
+                self.logger.prn_inf("==== Traceback start ====")
+                for line in traceback.format_exc().splitlines():
+                    print(line)
+                self.logger.prn_inf("==== Traceback end ====")
+                result = self.RESULT_ERROR
+
+            time_duration = time() - start_time
+            self.logger.prn_inf(
+                "test suite run finished after %.2f sec..." % time_duration
+            )
+
+            if self.compare_log and result is None:
+                pending = self.compare_log.pending()
+                for expected in pending[:10]:
+                    self.logger.prn_err(
+                        "Expected output [%s] not received in log." % expected
+                    )
+                if len(pending) > 10:
+                    self.logger.prn_err(
+                        "... and %d more expected lines not received"
+                        % (len(pending) - 10)
+                    )
+
+            # Force conn_proxy process to return
+            dut_event_queue.put(("__host_test_finished", True, time()))
+            p.join()
+            self.logger.prn_inf("CONN exited with code: %s" % str(p.exitcode))
+
+            # Callbacks...
+            self.logger.prn_inf(
+                "No events in queue" if event_queue.empty() else "Some events in queue"
+            )
+
+            # If host test was used we will:
+            # 1. Consume all existing events in queue if consume=True
+            # 2. Check result from host test and call teardown()
+
+            # NOTE: with the introduction of the '__exit_event_queue' event, there
+            # should never be left events assuming the DUT has stopped sending data
+            # over the serial data. Leaving this for now to catch anything that slips
+            # through.
+
+            if callbacks_consume:
+                # We are consuming all remaining events if requested
+                while not event_queue.empty():
+                    try:
+                        (key, value, timestamp) = event_queue.get(timeout=1)
+                    except QueueEmpty:
+                        break
 
                     if key == "__notify_complete":
                         # This event is sent by Host Test, test result is in value
@@ -413,172 +688,76 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                         # HostTest.result() method
                         self.logger.prn_inf("%s(%s)" % (key, str(value)))
                         result = value
-                        event_queue.put(("__exit_event_queue", 0, time()))
-                    elif key == "__reset":
-                        # This event only resets the dut, not the host test
-                        dut_event_queue.put(("__reset", True, time()))
-                    elif key == "__reset_dut":
-                        # Disconnect to avoid connection lost event
-                        dut_event_queue.put(("__host_test_finished", True, time()))
-                        p.join()
-
-                        if value == DefaultTestSelector.RESET_TYPE_SW_RST:
-                            self.logger.prn_inf("Performing software reset.")
-                            # Just disconnecting and re-connecting comm process will
-                            # soft reset DUT
-                        elif value == DefaultTestSelector.RESET_TYPE_HW_RST:
-                            self.logger.prn_inf("Performing hard reset.")
-                            # request hardware reset
-                            self.target.hw_reset()
-                        else:
-                            self.logger.prn_err(
-                                "Invalid reset type (%s). Supported types [%s]."
-                                % (
-                                    value,
-                                    ", ".join(
-                                        [
-                                            DefaultTestSelector.RESET_TYPE_HW_RST,
-                                            DefaultTestSelector.RESET_TYPE_SW_RST,
-                                        ]
-                                    ),
-                                )
-                            )
-                            self.logger.prn_inf("Software reset will be performed.")
-
-                        # connect to the device
-                        p = start_conn_process()
-                    elif key == "__notify_conn_lost":
-                        # This event is sent by conn_process, DUT connection was lost
-                        self.logger.prn_err(value)
-                        self.logger.prn_wrn(
-                            "stopped to consume events due to %s event" % key
-                        )
-                        callbacks_consume = False
-                        result = self.RESULT_IO_SERIAL
-                        event_queue.put(("__exit_event_queue", 0, time()))
-                    elif key == "__exit":
-                        # This event is sent by DUT, test suite exited
-                        self.logger.prn_inf("%s(%s)" % (key, str(value)))
-                        callbacks__exit = True
-                        event_queue.put(("__exit_event_queue", 0, time()))
-                    elif key == "__exit_event_queue":
-                        # This event is sent by the host test indicating no more events
-                        # expected
-                        self.logger.prn_inf("%s received" % (key))
-                        callbacks__exit_event_queue = True
-                        break
-                    elif key == "__timeout_set":
-                        # Dynamic timeout set
-                        timeout_duration = int(value)  # New timeout
-                        self.logger.prn_inf("setting timeout to: %d sec" % int(value))
-                    elif key == "__timeout_adjust":
-                        # Dynamic timeout adjust
-                        timeout_duration = timeout_duration + int(value)  # adjust time
-                        self.logger.prn_inf(
-                            "adjusting timeout with %d sec (now %d)"
-                            % (int(value), timeout_duration)
-                        )
+                    elif key.startswith("__"):
+                        # Consume other system level events
+                        pass
                     elif key in callbacks:
-                        # Handle callback
                         callbacks[key](key, value, timestamp)
                     else:
-                        self.logger.prn_err(
-                            "orphan event in main phase: {{%s;%s}}, timestamp=%f"
+                        self.logger.prn_wrn(
+                            ">>> orphan event: {{%s;%s}}, timestamp=%f"
                             % (key, str(value), timestamp)
                         )
-        except Exception:
-            self.logger.prn_err("something went wrong in event main loop!")
-            self.logger.prn_inf("==== Traceback start ====")
-            for line in traceback.format_exc().splitlines():
-                print(line)
-            self.logger.prn_inf("==== Traceback end ====")
-            result = self.RESULT_ERROR
-
-        time_duration = time() - start_time
-        self.logger.prn_inf("test suite run finished after %.2f sec..." % time_duration)
-
-        if self.compare_log and result is None:
-            if self.compare_log_idx < len(self.compare_log):
-                self.logger.prn_err(
-                    "Expected output [%s] not received in log."
-                    % self.compare_log[self.compare_log_idx]
-                )
+                self.logger.prn_inf("stopped consuming events")
 
-        # Force conn_proxy process to return
-        dut_event_queue.put(("__host_test_finished", True, time()))
-        p.join()
-        self.logger.prn_inf("CONN exited with code: %s" % str(p.exitcode))
-
-        # Callbacks...
-        self.logger.prn_inf(
-            "No events in queue" if event_queue.empty() else "Some events in queue"
-        )
+            if result is not None:  # We must compare here against None!
+                # Here for example we've received some error code like IOERR_COPY
+                self.logger.prn_inf(
+                    "host test result() call skipped, received: %s" % str(result)
+                )
+            else:
+                if self.test_supervisor:
+                    result = self.test_supervisor.result()
+                self.logger.prn_inf("host test result(): %s" % str(result))
 
-        # If host test was used we will:
-        # 1. Consume all existing events in queue if consume=True
-        # 2. Check result from host test and call teardown()
+            if not callbacks__exit:
+                self.logger.prn_wrn("missing __exit event from DUT")
 
-        # NOTE: with the introduction of the '__exit_event_queue' event, there
-        # should never be left events assuming the DUT has stopped sending data
-        # over the serial data. Leaving this for now to catch anything that slips
-        # through.
+            if not callbacks__exit_event_queue:
+                self.logger.prn_wrn("missing __exit_event_queue event from host test")
 
-        if callbacks_consume:
-            # We are consuming all remaining events if requested
-            while not event_queue.empty():
-                try:
-                    (key, value, timestamp) = event_queue.get(timeout=1)
-                except QueueEmpty:
-                    break
-
-                if key == "__notify_complete":
-                    # This event is sent by Host Test, test result is in value
-                    # or if value is None, value will be retrieved from
-                    # HostTest.result() method
-                    self.logger.prn_inf("%s(%s)" % (key, str(value)))
-                    result = value
-                elif key.startswith("__"):
-                    # Consume other system level events
-                    pass
-                elif key in callbacks:
-                    callbacks[key](key, value, timestamp)
-                else:
-                    self.logger.prn_wrn(
-                        ">>> orphan event: {{%s;%s}}, timestamp=%f"
-                        % (key, str(value), timestamp)
-                    )
-            self.logger.prn_inf("stopped consuming events")
+            # if not callbacks__exit_event_queue and not result:
+            if not callbacks__exit_event_queue and result is None:
+                self.logger.prn_err(
+                    "missing __exit_event_queue event from "
+                    + "host test and no result from host test, timeout..."
+                )
+                result = self.RESULT_TIMEOUT
 
-        if result is not None:  # We must compare here against None!
-            # Here for example we've received some error code like IOERR_COPY
-            self.logger.prn_inf(
-                "host test result() call skipped, received: %s" % str(result)
-            )
-        else:
+            self.logger.prn_inf("calling blocking teardown()")
             if self.test_supervisor:
-                result = self.test_supervisor.result()
-            self.logger.prn_inf("host test result(): %s" % str(result))
+                self.test_supervisor.teardown()
+            self.logger.prn_inf("teardown() finished")
 
-        if not callbacks__exit:
-            self.logger.prn_wrn("missing __exit event from DUT")
+            return result
+        finally:
+            # Spill files of events which were not read
+            event_queue.close()
 
-        if not callbacks__exit_event_queue:
-            self.logger.prn_wrn("missing __exit_event_queue event from host test")
-
-        # if not callbacks__exit_event_queue and not result:
-        if not callbacks__exit_event_queue and result is None:
-            self.logger.prn_err(
-                "missing __exit_event_queue event from "
-                + "host test and no result from host test, timeout..."
-            )
-            result = self.RESULT_TIMEOUT
+    def rss_exceeded(self, conn_pid):
+        """Check the resident memory of the htrun processes against --max-rss.
 
-        self.logger.prn_inf("calling blocking teardown()")
-        if self.test_supervisor:
-            self.test_supervisor.teardown()
-        self.logger.prn_inf("teardown() finished")
+        Args:
+            conn_pid: Process ID of the connection process, the host's own when
+                the connection runs in a thread of the host process.
 
-        return result
+        Returns:
+            True if a process uses more memory than allowed.
+        """
+        max_rss = self.options.max_rss * 1024 * 1024
+        processes = [("host", None)]
+        if conn_pid != os.getpid():
+            processes.append(("connection", conn_pid))
+        for name, pid in processes:
+            rss = get_rss(pid)
+            if rss is not None and rss > max_rss:
+                self.logger.prn_err(
+                    "%s process resident memory %d MB exceeds --max-rss %d MB, "
+                    "stopping the test"
+                    % (name, rss // (1024 * 1024), self.options.max_rss)
+                )
+                return True
+        return False
 
     def execute(self):
         """Test runner for host test.
@@ -602,7 +781,28 @@ class DefaultTestSelector(DefaultTestSelectorBase):
         # hello sting with htrun version, for debug purposes
         self.logger.prn_inf(self.get_hello_string())
 
+        lease = self.board_lease()
         try:
+            if lease is not None:
+                self.logger.prn_inf("waiting for board '%s'..." % lease.board)
+                try:
+                    lease.acquire(timeout=self.options.lease_timeout)
+                except LeaseTimeout:
+                    self.logger.prn_err(
+                        "board '%s' still used after %s sec"
+                        % (lease.board, self.options.lease_timeout)
+                    )
+                    return self.get_test_result_int(self.RESULT_IO_SERIAL)
+                except OSError as e:
+                    self.logger.prn_err(
+                        "can't lease board '%s' in '%s': %s"
+                        % (lease.board, lease.directory, e)
+                    )
+                    return self.get_test_result_int(self.RESULT_IO_SERIAL)
+                self.logger.prn_inf(
+                    "board '%s' leased after %.2f sec" % (lease.board, lease.waited)
+                )
+
             # Copy image to device
             if self.options.skip_flashing:
                 self.logger.prn_inf("copy image onto target... SKIPPED!")
@@ -631,26 +831,75 @@ class DefaultTestSelector(DefaultTestSelectorBase):
 
         except KeyboardInterrupt:
             return -3  # Keyboard interrupt
+        finally:
+            if lease is not None and lease.acquired is not None:
+                lease.release()
+                self.logger.prn_inf(
+                    "board '%s' released after %.2f sec"
+                    % (lease.board, time() - lease.acquired)
+                )
+
+    def board_lease(self):
+        """Return the lease of the board used with --lease, None if not used.
+
+        The board is identified by its target ID, looked up with mbedls when
+        only its serial port is given, so runs naming the same board either way
+        share the lease. The serial port identifies boards mbedls doesn't know.
+        Runs without a local board (global resource manager, Fast Model, replay,
+        local process) don't lease one.
+        """
+        if not self.options.lease or (
+            self.options.global_resource_mgr
+            or self.options.fast_model_connection
+            or self.options.replay
+            or self.options.process
+        ):
+            return None
+        board = self.options.target_id
+        if not board and self.options.port:
+            port = self.options.port.split(":")[0]
+            board = self.port_target_id(port) or port
+        if not board:
+            return None
+        lease = BoardLease(board.split(":")[0], self.options.lease_dir)
+        if not lease.supported:
+            self.logger.prn_wrn("board leases aren't supported on this OS")
+            return None
+        return lease
+
+    def port_target_id(self, port):
+        """Return the target ID of the board on a serial port, None if unknown."""
+        try:
+            mbed_list = create().list_mbeds()
+        except Exception as e:
+            self.logger.prn_wrn("can't list boards with mbedls: %s" % str(e))
+            return None
+        for mbed in mbed_list:
+            serial_port = mbed.get("serial_port")
+            if serial_port and os.path.realpath(serial_port) == os.path.realpath(port):
+                return mbed.get("target_id")
+        return None
+
+    def finish(self):
+        """Close the compare log, if one was used."""
+        if self.compare_log:
+            self.compare_log.close()
+        DefaultTestSelectorBase.finish(self)
 
     def match_log(self, line):
         """Match lines from compare log with the target serial output.
 
-        Compare log lines are matched in seq using index self.compare_log_idx. Lines can
-        be strings to be matched as is or regular expressions.
+        Compare log lines are matched in sequence and can be strings to be matched
+        as is or regular expressions. Lines in an '@any-of' section are matched in
+        any order. See CompareLog for details.
 
         Args:
             line: Line of text to search.
+
+        Returns:
+            True if all lines of the compare log were matched.
         """
-        if self.compare_log_idx < len(self.compare_log):
-            regex = self.compare_log[self.compare_log_idx]
-            # Either the line is matched as is or it is checked as a regular expression.
-            try:
-                if regex in line or re.search(regex, line):
-                    self.compare_log_idx += 1
-            except error:
-                # May not be a regular expression
-                return False
-        return self.compare_log_idx == len(self.compare_log)
+        return self.compare_log.match(line)
 
     @staticmethod
     def _parse_grm(grm_arg):
@@ -0,0 +1,261 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Firmware images converted to binaries once, cached by content.
+
+Intel HEX and ELF images are flattened to a binary starting at their lowest
+load address, gaps filled with 0xFF. Binaries are kept in a directory under the
+SHA-256 of the image they come from, so an artifact flashed to many boards, or
+by many htrun processes, is parsed once. The least recently used binaries are
+removed when the directory grows over its size limit.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+
+from ..cache import atomic_write, cache_path
+
+# Changes whenever conversion results change, so old binaries aren't used
+CONVERTER_VERSION = 1
+
+# Largest gap between the segments of an image filled in its binary, in bytes
+MAX_GAP = 1024 * 1024
+
+# Size limit of the cache directory, in bytes
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# Age after which a temporary file is left over from a crashed process, in
+# seconds
+STALE_TMP_AGE = 3600
+
+ELF_MAGIC = b"\x7fELF"
+PT_LOAD = 1
+
+
+class ImageFormatError(ValueError):
+    """An image can't be converted to a binary."""
+
+
+def default_cache_dir():
+    """Return the image cache directory in the user's cache directory."""
+    return cache_path("images")
+
+
+def parse_hex(data):
+    """Return the (address, bytes) segments of an Intel HEX image.
+
+    Raises:
+        ImageFormatError: The image is malformed.
+    """
+    segments = []
+    base = 0
+    for number, line in enumerate(data.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if line[:1] != b":":
+                raise ValueError("no start code")
+            record = bytearray.fromhex(line[1:].decode("ascii"))
+            if len(record) < 5 or len(record) != record[0] + 5:
+                raise ValueError("bad length")
+            if sum(record) & 0xFF:
+                raise ValueError("bad checksum")
+        except ValueError as e:
+            raise ImageFormatError("line %d: %s" % (number, e))
+        count, address, kind = record[0], (record[1] << 8) | record[2], record[3]
+        value = bytes(record[4 : 4 + count])
+        if kind == 0:
+            segments.append((base + address, value))
+        elif kind == 1:
+            break
+        elif kind == 2:
+            base = int.from_bytes(value, "big") << 4
+        elif kind == 4:
+            base = int.from_bytes(value, "big") << 16
+    return segments
+
+
+def parse_elf(data):
+    """Return the (load address, bytes) segments of an ELF image.
+
+    Raises:
+        ImageFormatError: The image is malformed.
+    """
+    if data[:4] != ELF_MAGIC or len(data) < 52:
+        raise ImageFormatError("not an ELF file")
+    if data[4] not in (1, 2) or data[5] not in (1, 2):
+        raise ImageFormatError("unknown ELF class or data encoding")
+    is_64 = data[4] == 2
+    order = "<" if data[5] == 1 else ">"
+    try:
+        if is_64:
+            (phoff,) = struct.unpack_from(order + "Q", data, 32)
+            phentsize, phnum = struct.unpack_from(order + "HH", data, 54)
+            phdr = order + "IIQQQQQQ"
+        else:
+            (phoff,) = struct.unpack_from(order + "I", data, 28)
+            phentsize, phnum = struct.unpack_from(order + "HH", data, 42)
+            phdr = order + "IIIIIIII"
+        segments = []
+        for i in range(phnum):
+            fields = struct.unpack_from(phdr, data, phoff + i * phentsize)
+            if is_64:
+                p_type, _, p_offset, _, p_paddr, p_filesz = fields[:6]
+            else:
+                p_type, p_offset, _, p_paddr, p_filesz = fields[:5]
+            if p_type == PT_LOAD and p_filesz:
+                if p_offset + p_filesz > len(data):
+                    raise ImageFormatError("segment %d out of the file" % i)
+                segments.append((p_paddr, data[p_offset : p_offset + p_filesz]))
+    except struct.error as e:
+        raise ImageFormatError("truncated ELF file: %s" % e)
+    return segments
+
+
+def flatten(segments, max_gap=MAX_GAP):
+    """Lay out segments in a binary.
+
+    Args:
+        segments: List of (address, bytes) tuples, later ones overwrite
+            earlier ones.
+        max_gap: Largest gap between segments filled with 0xFF.
+
+    Returns:
+        (base address, binary) tuple.
+
+    Raises:
+        ImageFormatError: There is no data, or segments are too far apart.
+    """
+    if not segments:
+        raise ImageFormatError("no data")
+    end = None
+    for address, data in sorted(segments, key=lambda segment: segment[0]):
+        if end is not None and address - end > max_gap:
+            raise ImageFormatError("%d bytes gap at 0x%08x" % (address - end, end))
+        end = max(end or 0, address + len(data))
+    base = min(address for address, _ in segments)
+    binary = bytearray(b"\xff" * (end - base))
+    for address, data in segments:
+        binary[address - base : address - base + len(data)] = data
+    return base, bytes(binary)
+
+
+class ConvertedImage(object):
+    """Binary converted from an image.
+
+    Attributes:
+        path: Path of the binary in the cache.
+        base_address: Address the binary is programmed at.
+        source_path: Path of the image it was converted from.
+    """
+
+    def __init__(self, path, base_address, source_path):
+        """Describe a converted binary."""
+        self.path = path
+        self.base_address = base_address
+        self.source_path = source_path
+
+
+class ParsedImageCache(object):
+    """Binaries converted from images, kept in a directory."""
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        """Use a cache directory, created on the first conversion.
+
+        Args:
+            directory: Cache directory, default_cache_dir() if None.
+            max_size: Size limit of the directory in bytes.
+        """
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+
+    def convert(self, image_path, format=None):
+        """Return the binary of a hex or ELF image, converting it if needed.
+
+        Args:
+            image_path: Path of the image.
+            format: Image format, guessed from the file if None.
+
+        Returns:
+            ConvertedImage, or None if the image isn't hex or ELF.
+
+        Raises:
+            IOError: The image can't be read or the cache written.
+            ImageFormatError: The image can't be converted.
+        """
+        with open(image_path, "rb") as f:
+            data = f.read()
+        format = (format or os.path.splitext(image_path)[1][1:]).lower()
+        if data[:4] == ELF_MAGIC:
+            format = "elf"
+        if format not in ("hex", "elf", "axf"):
+            return None
+
+        digest = hashlib.sha256(data)
+        digest.update(b"htrun-image-converter-%d" % CONVERTER_VERSION)
+        name = digest.hexdigest()
+        bin_path = os.path.join(self.directory, name + ".bin")
+        meta_path = os.path.join(self.directory, name + ".json")
+        try:
+            with open(meta_path) as f:
+                base_address = json.load(f)["base_address"]
+            # Most recently used
+            os.utime(bin_path, None)
+            return ConvertedImage(bin_path, base_address, image_path)
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        segments = parse_hex(data) if format == "hex" else parse_elf(data)
+        base_address, binary = flatten(segments)
+        # The binary goes first, a binary without its metadata is ignored
+        atomic_write(bin_path, binary)
+        atomic_write(meta_path, json.dumps({"base_address": base_address}))
+        self.evict(keep=bin_path)
+        return ConvertedImage(bin_path, base_address, image_path)
+
+    def evict(self, keep=None):
+        """Remove the least recently used binaries over the size limit.
+
+        Temporary files older than STALE_TMP_AGE, left by processes which died
+        while writing them, are removed too.
+
+        Args:
+            keep: Path of a binary never removed.
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith((".bin", ".tmp")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TMP_AGE:
+                    _remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            _remove(path[: -len(".bin")] + ".json")
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        # Removed by another process
+        pass
@@ -0,0 +1,39 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Resident set size of htrun processes."""
+
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def get_rss(pid=None):
+    """Return the resident set size of a process.
+
+    The current size is read from /proc. Where /proc is not available only the
+    current process can be measured, and its peak resident set size is returned.
+
+    Args:
+        pid: Process ID, the current process if None.
+
+    Returns:
+        Resident set size in bytes, None if it can't be measured.
+    """
+    try:
+        with open("/proc/%s/statm" % (pid or "self")) as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    if resource is None or pid not in (None, os.getpid()):
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -11,6 +11,7 @@ from .. import host_tests_plugins as ht_plugins
 from mbed_lstools.main import create
 from .. import DEFAULT_BAUD_RATE
 from ..host_tests_logger import HtrunLogger
+from .image_cache import ParsedImageCache, ImageFormatError
 
 
 class TargetBase:
@@ -43,6 +44,8 @@ class TargetBase:
             else 2.0
         )
         self.polling_timeout = self.options.polling_timeout
+        # Binaries converted from hex and elf images, created on first use
+        self.image_cache = None
 
         # Serial port settings
         self.serial_baud = DEFAULT_BAUD_RATE
@@ -252,10 +255,16 @@ class TargetBase:
             self.logger.prn_err("Error: image file (%s) not found" % image_path)
             return False
 
+        base_address = None
+        if self.options.convert_image:
+            image_path, base_address = self.convert_image(image_path, copy_method)
+
         for count in range(0, retry_copy):
             initial_remount_count = get_remount_count(disk)
             # Call proper copy method
-            result = self.copy_image_raw(image_path, disk, copy_method, port, mcu)
+            result = self.copy_image_raw(
+                image_path, disk, copy_method, port, mcu, base_address
+            )
             sleep(self.program_cycle_s)
             if not result:
                 continue
@@ -264,8 +273,51 @@ class TargetBase:
                 break
         return result
 
+    def convert_image(self, image_path, copy_method):
+        """Convert a hex or elf image to a binary, if the copy method takes one.
+
+        Binaries are kept in a cache by the content of the image, so each
+        artifact is converted once.
+
+        Args:
+            image_path: Path to the firmware image.
+            copy_method: Copy plugin name to use.
+
+        Returns:
+            (image path, base address) tuple: the path of the binary and its
+            address, or the image path and None if it wasn't converted.
+        """
+        plugin = ht_plugins.get_plugin("CopyMethod", copy_method)
+        if plugin is None or not plugin.binary_images:
+            return image_path, None
+
+        if self.image_cache is None:
+            self.image_cache = ParsedImageCache(
+                self.options.image_cache_dir,
+                self.options.image_cache_size * 1024 * 1024,
+            )
+        try:
+            converted = self.image_cache.convert(image_path, self.options.format)
+        except (IOError, OSError, ImageFormatError) as e:
+            self.logger.prn_wrn("image %s not converted: %s" % (image_path, e))
+            return image_path, None
+        if converted is None:
+            return image_path, None
+
+        self.logger.prn_inf(
+            "using %s converted from %s, base address 0x%08x"
+            % (converted.path, image_path, converted.base_address)
+        )
+        return converted.path, converted.base_address
+
     def copy_image_raw(
-        self, image_path=None, disk=None, copy_method=None, port=None, mcu=None
+        self,
+        image_path=None,
+        disk=None,
+        copy_method=None,
+        port=None,
+        mcu=None,
+        base_address=None,
     ):
         """Copy a firmware image to disk with the given copy_method.
 
@@ -277,6 +329,8 @@ class TargetBase:
             copy_method: Copy plugin name to use.
             port: Serial COM port.
             mcu: Name of the MCU being targeted.
+            base_address: Address of a binary converted by convert_image(),
+                None for images passed as they are.
 
         Returns:
             True if copy succeeded, otherwise False.
@@ -290,6 +344,10 @@ class TargetBase:
             "default": "shell",
         }.get(copy_method, copy_method)
 
+        kwargs = {"format": self.options.format}
+        if base_address is not None:
+            # Binary converted by convert_image()
+            kwargs.update(format="bin", base_address=base_address)
         result = ht_plugins.call_plugin(
             "CopyMethod",
             copy_method,
@@ -299,7 +357,10 @@ class TargetBase:
             destination_disk=disk,
             target_id=self.target_id,
             pooling_timeout=self.polling_timeout,
-            format=self.options.format,
+            swd_clock=self.options.swd_clock,
+            # A pyOCD reset reuses the session of a pyOCD copy
+            keep_session=self.options.forced_reset_type == "pyocd",
+            **kwargs
         )
         return result
 
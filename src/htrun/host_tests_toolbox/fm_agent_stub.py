@@ -0,0 +1,134 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Stand-in for the fm_agent module of mbed-fastmodel-agent.
+
+It implements the FastmodelAgent interface htrun's FastModel connector uses, with
+a virtual DUT (see virtual_dut.py) instead of a Fast Model simulator, so the
+connector can be tested and benchmarked without the Fast Models tool-kit.
+Install it in place of fm_agent before the connector imports it:
+
+    import sys
+    from htrun.host_tests_toolbox import fm_agent_stub
+    sys.modules["fm_agent"] = fm_agent_stub
+
+Like for the grm virtual resources, the loaded "image" is a JSON object of
+VirtualDut options, e.g. {"testcases": 3}. Other images run the default script.
+"""
+
+import json
+import time
+
+from .virtual_dut import VirtualDut
+
+# Time start_simulator() takes to launch a model, in seconds
+LAUNCH_TIME = 0
+
+
+class SimulatorError(Exception):
+    """Error raised by the simulator."""
+
+    pass
+
+
+class FastmodelAgent(object):
+    """Simulated Fast Model running a virtual DUT."""
+
+    # Number of models launched by all agents, for tests and benchmarks
+    launches = 0
+
+    def __init__(self, logger=None):
+        """Create an agent without a model.
+
+        Args:
+            logger: Logger of the caller, not used.
+        """
+        self.logger = logger
+        self.model_name = None
+        self.model_config = None
+        self.launched = False
+        self.running = False
+        self.dut_config = None
+        self.dut = None
+
+    def setup_simulator(self, model_name, model_config):
+        """Select the model to launch.
+
+        Args:
+            model_name: Platform name of the model.
+            model_config: Name of the model configuration.
+        """
+        self.model_name = model_name
+        self.model_config = model_config
+
+    def start_simulator(self):
+        """Launch the model, taking LAUNCH_TIME seconds."""
+        if self.launched:
+            raise SimulatorError("simulator already launched")
+        time.sleep(LAUNCH_TIME)
+        FastmodelAgent.launches += 1
+        self.launched = True
+        return True
+
+    def load_simulator(self, image_path):
+        """Load an image, the DUT starts once the model runs.
+
+        Args:
+            image_path: Path of the image.
+        """
+        self.__check_launched()
+        try:
+            with open(image_path) as f:
+                self.dut_config = json.load(f)
+        except ValueError:
+            self.dut_config = {}
+        except (IOError, OSError) as e:
+            raise SimulatorError("cannot load %s: %s" % (image_path, e))
+        self.dut = VirtualDut(**self.dut_config)
+        return True
+
+    def run_simulator(self):
+        """Run the loaded image."""
+        self.__check_launched()
+        self.running = True
+        return True
+
+    def reset_simulator(self):
+        """Restart the loaded image."""
+        self.__check_launched()
+        if self.dut_config is not None:
+            self.dut = VirtualDut(**self.dut_config)
+        return True
+
+    def read(self):
+        """Return the output of the DUT, empty if there is none."""
+        self.__check_launched()
+        if not self.running or self.dut is None:
+            return b""
+        return self.dut.read()
+
+    def write(self, payload):
+        """Send text to the DUT.
+
+        Args:
+            payload: Text to send.
+        """
+        self.__check_launched()
+        if self.running and self.dut is not None:
+            self.dut.feed(payload.encode("utf-8"))
+
+    @property
+    def is_simulator_alive(self):
+        """True if the model is launched."""
+        return self.launched
+
+    def shutdown_simulator(self):
+        """Shut the model down."""
+        self.launched = False
+        self.running = False
+        self.dut = None
+
+    def __check_launched(self):
+        if not self.launched:
+            raise SimulatorError("simulator not launched")
@@ -0,0 +1,212 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Local stand-in for the Mbed TAS resource manager (RM) REST API.
+
+It serves the 'switchResource' requests of the power cycle reset plugin
+(module_power_cycle_target.py) for simulated targets, so the plugin can be
+tested and benchmarked without a lab. A target switches --switch-time seconds
+after an OFF or ON command, and its mount point appears --mount-time seconds
+after it switched on.
+
+Usage:
+    python -m htrun.host_tests_toolbox.tas_rm_mock --port 8000 --targets A,B
+
+Then set MBED_TAS_RM_IP=127.0.0.1 and MBED_TAS_RM_PORT=8000 for htrun.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+NOT_CONNECTED = "Not Connected"
+
+
+class SimulatedTarget(object):
+    """Power switch and mount point of a target."""
+
+    def __init__(self, target_id, switch_time, mount_time):
+        """Create a target which is switched on and mounted.
+
+        Args:
+            target_id: Target ID.
+            switch_time: Time the switch takes, in seconds.
+            mount_time: Time the mount point takes to appear after switching on.
+        """
+        self.target_id = target_id
+        self.switch_time = switch_time
+        self.mount_time = mount_time
+        self.command = "ON"
+        self.command_time = time.time() - switch_time - mount_time
+
+    def switch(self, command):
+        """Start switching the target 'ON' or 'OFF'."""
+        if command != self.command:
+            self.command = command
+            self.command_time = time.time()
+
+    def state(self, now=None):
+        """Return the sub-response describing the target now."""
+        now = time.time() if now is None else now
+        elapsed = now - self.command_time
+        if elapsed >= self.switch_time:
+            state = self.command
+        else:
+            state = "ON" if self.command == "OFF" else "OFF"
+        mounted = state == "ON" and elapsed >= self.switch_time + self.mount_time
+        return {
+            "resource_type": "mbed_platform",
+            "resource_id": self.target_id,
+            "state": state,
+            "mount_point": "/mnt/%s" % self.target_id if mounted else NOT_CONNECTED,
+            "serial_port": "/dev/tty_%s" % self.target_id,
+        }
+
+
+class MockResourceManager(ThreadingMixIn, HTTPServer):
+    """HTTP server answering 'switchResource' requests for simulated targets."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        target_ids,
+        switch_time=0.2,
+        mount_time=0.1,
+        host="127.0.0.1",
+        port=0,
+    ):
+        """Bind the server, call start() or serve_forever() to serve requests.
+
+        Args:
+            target_ids: IDs of the simulated targets.
+            switch_time: Time a switch takes, in seconds.
+            mount_time: Time the mount point takes to appear after switching on.
+            host: Address to listen on.
+            port: Port to listen on, 0 for any free port.
+        """
+        HTTPServer.__init__(self, (host, port), RequestHandler)
+        self.targets = {
+            target_id: SimulatedTarget(target_id, switch_time, mount_time)
+            for target_id in target_ids
+        }
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0, "sub_requests": 0}
+        self.thread = None
+
+    @property
+    def address(self):
+        """Tuple of (host, port) the server listens on."""
+        return self.server_address[:2]
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), name="tas_rm_mock"
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        """Stop serving and close the socket."""
+        if self.thread:
+            self.shutdown()
+            self.thread.join()
+        self.server_close()
+
+    def handle_switch(self, request):
+        """Answer a 'switchResource' request.
+
+        Args:
+            request: The request, decoded from JSON.
+
+        Returns:
+            The response, to be encoded to JSON.
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["sub_requests"] += len(request.get("sub_requests", []))
+        response = dict(request)
+        response["sub_requests"] = []
+        for sub in request.get("sub_requests", []):
+            target = self.targets.get(sub.get("resource_id"))
+            command = sub.get("switch_command")
+            if target is None:
+                answer = dict(sub, error="unknown resource")
+            elif command in ("ON", "OFF"):
+                target.switch(command)
+                answer = dict(sub, **target.state())
+            elif command == "STATE":
+                answer = dict(sub, **target.state())
+            else:
+                answer = dict(sub, error="unknown switch command")
+            response["sub_requests"].append(answer)
+        return response
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handler of the JSON requests sent in the body of GET requests."""
+
+    # Keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        """Count the new connection."""
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+
+    def do_GET(self):
+        """Answer a request."""
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+            if request.get("name") != "switchResource":
+                raise ValueError("unknown request %s" % request.get("name"))
+            status, response = 200, self.server.handle_switch(request)
+        except ValueError as e:
+            status, response = 400, {"error": str(e)}
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Don't log requests."""
+        pass
+
+
+def main():
+    """Run a mock resource manager."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--targets", required=True, help="Comma separated target IDs.")
+    parser.add_argument("--switch-time", type=float, default=0.2)
+    parser.add_argument("--mount-time", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = MockResourceManager(
+        args.targets.split(","),
+        switch_time=args.switch_time,
+        mount_time=args.mount_time,
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Virtual device under test implementing the greentea-client side of the KV protocol.
+
+The virtual DUT runs without any hardware, so htrun itself can be tested and
+benchmarked end to end. The protocol state machine (VirtualDut) is separate from
+the transports which attach it to a pseudo-terminal or to stdin/stdout.
+
+Usage:
+    python -m htrun.host_tests_toolbox.virtual_dut --pty [options]
+
+With --pty the path of the pseudo-terminal is printed on the first line of
+stdout, pass it to htrun with -p together with --skip-flashing and --skip-reset.
+"""
+
+import argparse
+import json
+import os
+import re
+import select
+import sys
+from collections import deque
+from time import time
+
+KIVI_REGEX = re.compile(r"\{\{([\w\d_-]+);([^\}]+)\}\}")
+
+
+class VirtualDut(object):
+    """Greentea-client protocol state machine.
+
+    Bytes received from the host are passed to feed(), bytes to send to the host
+    are taken from read(). Once the host test preamble is done the DUT runs its
+    script: a number of test cases, each printing lines of output, and optionally
+    an echo exchange like the one of the built-in 'echo' host test.
+    """
+
+    CLIENT_VERSION = "1.3.0"
+
+    def __init__(
+        self,
+        host_test_name="default_auto",
+        timeout=10,
+        testcases=1,
+        lines_per_case=0,
+        line_length=64,
+        line_rate=0,
+        echo_count=0,
+        result="success",
+    ):
+        """Configure the virtual DUT.
+
+        Args:
+            host_test_name: Host test requested with '__host_test_name'.
+            timeout: Test timeout sent with '__timeout', in seconds.
+            testcases: Number of test cases run.
+            lines_per_case: Lines of output printed by each test case.
+            line_length: Length of the output lines.
+            line_rate: Maximum output rate in lines per second, 0 for no limit.
+            echo_count: Number of KV pairs echoed back to the host.
+            result: Value of the final 'end' event.
+        """
+        self.host_test_name = host_test_name
+        self.timeout = timeout
+        self.testcases = testcases
+        self.lines_per_case = lines_per_case
+        self.line_length = line_length
+        self.line_rate = line_rate
+        self.echo_count = echo_count
+        self.result = result
+
+        self.rx_buffer = ""
+        # Lines to send, paced by line_rate
+        self.outbox = deque()
+        self.output_start = None
+        self.output_lines = 0
+        self.echoes_left = 0
+        self.echo_sent = None
+        self.finished = False
+        self.stats = {
+            "wakeup_time": None,
+            "sync_time": None,
+            # Time the last line was written
+            "finish_time": None,
+            "round_trips": [],
+        }
+
+    def feed(self, data):
+        """Handle bytes received from the host.
+
+        Args:
+            data: Bytes received from the host.
+        """
+        if self.stats["wakeup_time"] is None:
+            self.stats["wakeup_time"] = time()
+        self.rx_buffer += data.decode("utf-8", "replace")
+        while True:
+            m = KIVI_REGEX.search(self.rx_buffer)
+            if not m:
+                break
+            self.rx_buffer = self.rx_buffer[m.end() :]
+            self.on_kv(m.group(1), m.group(2))
+        # Drop everything but a partial KV pair, e.g. the 'mbed' wake-up string
+        start = self.rx_buffer.rfind("{{")
+        if start < 0:
+            start = len(self.rx_buffer) - self.rx_buffer.endswith("{")
+        self.rx_buffer = self.rx_buffer[start:]
+
+    def on_kv(self, key, value):
+        """Handle a KV pair received from the host.
+
+        Args:
+            key: Key of the KV pair.
+            value: Value of the KV pair.
+        """
+        if key == "__sync":
+            # A new sync restarts the test, like a reset target would
+            self.outbox.clear()
+            self.finished = False
+            self.stats["sync_time"] = time()
+            self.send_kv("__sync", value)
+            self.send_kv("__version", self.CLIENT_VERSION)
+            self.send_kv("__timeout", self.timeout)
+            self.send_kv("__host_test_name", self.host_test_name)
+            self.run_script()
+        elif key == "echo_count" and self.echo_count:
+            self.echoes_left = self.echo_count
+        elif key == "echo" and self.echoes_left:
+            if self.echo_sent is not None:
+                self.stats["round_trips"].append(time() - self.echo_sent)
+            self.echo_sent = time()
+            self.send_kv("echo", value)
+            self.echoes_left -= 1
+            if not self.echoes_left:
+                self.finish()
+
+    def run_script(self):
+        """Queue the output of the scripted test cases."""
+        names = ["case %d" % i for i in range(self.testcases)]
+        if names:
+            self.send_kv("__testcase_count", len(names))
+            for name in names:
+                self.send_kv("__testcase_name", name)
+        for name in names:
+            self.send_kv("__testcase_start", name)
+            for line in range(self.lines_per_case):
+                prefix = "[%s] line %d " % (name, line)
+                self.outbox.append(
+                    (prefix + "x" * max(0, self.line_length - len(prefix))).encode()
+                )
+            self.send_kv("__testcase_finish", "%s;1;0" % name)
+        if names:
+            self.send_kv("__testcase_summary", "%d;0" % len(names))
+        if self.echo_count:
+            # The host test drives the rest of the test
+            self.send_kv("echo_count", self.echo_count)
+        else:
+            self.finish()
+
+    def finish(self):
+        """Queue the end of the test."""
+        self.send_kv("end", self.result)
+        self.send_kv("__exit", 0)
+        self.outbox.append(None)
+
+    def send_kv(self, key, value):
+        """Queue a KV pair for the host."""
+        self.outbox.append(("{{%s;%s}}" % (key, value)).encode())
+
+    def read(self, now=None, max_lines=256):
+        """Return the bytes to send to the host now.
+
+        Args:
+            now: Current time, for pacing the output.
+            max_lines: Maximum number of lines returned.
+
+        Returns:
+            Bytes to send, empty if nothing is due.
+        """
+        if not self.outbox:
+            return b""
+        now = time() if now is None else now
+        if self.output_start is None:
+            self.output_start = now
+        count = min(len(self.outbox), max_lines)
+        if self.line_rate:
+            due = int((now - self.output_start) * self.line_rate) + 1
+            count = min(count, max(0, due - self.output_lines))
+        chunks = []
+        for _ in range(count):
+            line = self.outbox.popleft()
+            if line is None:
+                self.finished = True
+                break
+            chunks.append(line + b"\r\n")
+        self.output_lines += len(chunks)
+        return b"".join(chunks)
+
+    def next_output_time(self):
+        """Return the time the next line is due, None if nothing is queued."""
+        if not self.outbox:
+            return None
+        if not self.line_rate or self.output_start is None:
+            return time()
+        return self.output_start + float(self.output_lines) / self.line_rate
+
+
+def serve(dut, read_fd, write_fd, exit_when_finished=False):
+    """Connect a virtual DUT to a pair of file descriptors.
+
+    Args:
+        dut: VirtualDut object.
+        read_fd: File descriptor bytes from the host are read from.
+        write_fd: File descriptor bytes to the host are written to.
+        exit_when_finished: Return once the DUT sent its last line.
+    """
+    pending = b""
+    while not (exit_when_finished and dut.finished and not pending):
+        if not pending:
+            pending = dut.read()
+        timeout = None
+        if pending:
+            timeout = 0
+        else:
+            due = dut.next_output_time()
+            if due is not None:
+                timeout = max(0.0, due - time())
+        writers = [write_fd] if pending else []
+        readable, writable, _ = select.select([read_fd], writers, [], timeout)
+        if readable:
+            try:
+                data = os.read(read_fd, 4096)
+            except OSError:
+                # Host closed the pseudo-terminal
+                data = b""
+            if not data:
+                if write_fd == read_fd:
+                    # Pseudo-terminal has no reader, wait for the host to open it
+                    select.select([], [], [], 0.05)
+                    continue
+                return
+            dut.feed(data)
+        if writable:
+            written = os.write(write_fd, pending)
+            pending = pending[written:]
+            if dut.finished and not pending and not dut.stats["finish_time"]:
+                dut.stats["finish_time"] = time()
+
+
+def open_pty():
+    """Open a raw pseudo-terminal.
+
+    Returns:
+        Tuple of (master file descriptor, slave device path).
+    """
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    # Keep the slave open, so reads from the master don't fail while the host
+    # reopens the port.
+    return master, path
+
+
+def main():
+    """Run a virtual DUT."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument(
+        "--pty", action="store_true", help="Attach to a new pseudo-terminal."
+    )
+    transport.add_argument(
+        "--stdio", action="store_true", help="Attach to stdin and stdout."
+    )
+    parser.add_argument("--host-test-name", default="default_auto")
+    parser.add_argument("--timeout", type=int, default=10)
+    parser.add_argument("--testcases", type=int, default=1)
+    parser.add_argument("--lines-per-case", type=int, default=0)
+    parser.add_argument("--line-length", type=int, default=64)
+    parser.add_argument(
+        "--line-rate", type=float, default=0, help="Lines per second, 0: no limit."
+    )
+    parser.add_argument("--echo-count", type=int, default=0)
+    parser.add_argument("--result", default="success")
+    parser.add_argument(
+        "--stats", help="Write timing statistics to this JSON file on exit."
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="Exit after the first test finished."
+    )
+    args = parser.parse_args()
+
+    dut = VirtualDut(
+        host_test_name=args.host_test_name,
+        timeout=args.timeout,
+        testcases=args.testcases,
+        lines_per_case=args.lines_per_case,
+        line_length=args.line_length,
+        line_rate=args.line_rate,
+        echo_count=args.echo_count,
+        result=args.result,
+    )
+    try:
+        if args.pty:
+            master, path = open_pty()
+            print(path)
+            sys.stdout.flush()
+            serve(dut, master, master, exit_when_finished=args.once)
+        else:
+            serve(
+                dut,
+                sys.stdin.fileno(),
+                sys.stdout.fileno(),
+                exit_when_finished=args.once,
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.stats:
+            with open(args.stats, "w") as f:
+                json.dump(dut.stats, f)
+
+
+if __name__ == "__main__":
+    main()
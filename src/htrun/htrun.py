@@ -4,9 +4,11 @@
 #
 """Greentea Host Tests Runner."""
 
+import copy
 from multiprocessing import freeze_support
 from htrun import init_host_test_cli_params
 from htrun.host_tests_runner.host_test_default import DefaultTestSelector
+from htrun.host_tests_runner.fastmodel_executor import FastmodelExecutor
 from htrun.host_tests_toolbox.host_functional import handle_send_break_cmd
 
 
@@ -33,18 +35,65 @@ def main():
             baudrate=cli_params.baud_rate,
             verbose=cli_params.verbose,
         )
+    elif cli_params.batch:  # --batch FILE
+        result = run_batch(cli_params)
     else:
-        test_selector = DefaultTestSelector(cli_params)
-        try:
-            result = test_selector.execute()
-            # Ensure we don't return a negative value
-            if result < 0 or result > 255:
-                result = 1
-        except (KeyboardInterrupt, SystemExit):
-            test_selector.finish()
+        result = run_test(cli_params)
+
+    return result
+
+
+def run_test(options):
+    """Run a test with DefaultTestSelector.
+
+    Args:
+        options: Command line options.
+
+    Returns:
+        Exit code of the test, between 0 and 255.
+    """
+    test_selector = DefaultTestSelector(options)
+    try:
+        result = test_selector.execute()
+        # Ensure we don't return a negative value
+        if result < 0 or result > 255:
             result = 1
-            raise
-        else:
-            test_selector.finish()
+    except (KeyboardInterrupt, SystemExit):
+        test_selector.finish()
+        raise
+    else:
+        test_selector.finish()
+    return result
+
+
+def run_batch(options):
+    """Run a test for each image listed in the --batch file, one after another.
+
+    Tests run in this process, so connections kept warm by a test (e.g. with
+    --grm-keep-warm) are reused by the next one. FastModel tests run on several
+    simulators at once with --fm-instances, see FastmodelExecutor.
 
+    Args:
+        options: Command line options, the image path is set for each test.
+
+    Returns:
+        Exit code of the first test which did not pass, 0 if all passed.
+    """
+    with open(options.batch) as f:
+        image_paths = [
+            line.strip() for line in f if line.strip() and not line.startswith("#")
+        ]
+    if options.fast_model_connection and options.fm_instances != 1:
+        return FastmodelExecutor(options, image_paths, run_test).run()
+    result = 0
+    for index, image_path in enumerate(image_paths):
+        test_options = copy.copy(options)
+        test_options.image_path = image_path
+        # Lets connections prepare the DUT of the next test, see --grm-prefetch
+        test_options.next_image_path = (
+            image_paths[index + 1] if index + 1 < len(image_paths) else None
+        )
+        test_result = run_test(test_options)
+        if test_result and not result:
+            result = test_result
     return result
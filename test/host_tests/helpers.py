@@ -0,0 +1,60 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Helpers shared by the tests."""
+
+import struct
+import time
+
+
+def read_until(connector, text, timeout=10):
+    """Read from a connector until 'text' was read or 'timeout' expires.
+
+    Args:
+        connector: Object with read(count) and wait(timeout) methods, such as a
+            connector primitive or a remote resource.
+        text: Bytes to wait for.
+        timeout: Longest time to read for, in seconds.
+
+    Returns:
+        Bytes read.
+    """
+    output = b""
+    end = time.time() + timeout
+    while text not in output and time.time() < end:
+        data = connector.read(2304)
+        if not data:
+            connector.wait(0.01)
+        output += data
+    return output
+
+
+def make_elf(segments, is_64=False, order="<"):
+    """Return an ELF file with a PT_LOAD segment per (address, bytes) tuple."""
+    if is_64:
+        header_size, phentsize, phdr = 64, 56, order + "IIQQQQQQ"
+    else:
+        header_size, phentsize, phdr = 52, 32, order + "IIIIIIII"
+    ident = b"\x7fELF" + bytes([2 if is_64 else 1, 1 if order == "<" else 2, 1])
+    header = bytearray(ident.ljust(16, b"\0") + b"\0" * (header_size - 16))
+    offset = header_size + phentsize * (len(segments) + 1)
+    headers = b""
+    contents = b""
+    # A segment without file content, like .bss
+    for address, data in [(0x20000000, b"")] + segments:
+        if is_64:
+            fields = (1, 5, offset, address, address, len(data), len(data) + 4, 4)
+        else:
+            fields = (1, offset, address, address, len(data), len(data) + 4, 5, 4)
+        headers += struct.pack(phdr, *fields)
+        contents += data
+        offset += len(data)
+    count = len(segments) + 1
+    if is_64:
+        struct.pack_into(order + "Q", header, 32, header_size)
+        struct.pack_into(order + "HH", header, 54, phentsize, count)
+    else:
+        struct.pack_into(order + "I", header, 28, header_size)
+        struct.pack_into(order + "HH", header, 42, phentsize, count)
+    return bytes(header) + headers + contents
@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Fake pyOCD sessions and flash loader shared by the pyOCD plugin tests."""
+
+import threading
+import time
+
+import mock
+
+# Start of the boot memory of the fake targets
+BOOT_ADDRESS = 0x1000
+
+
+class FakeTransferError(Exception):
+    """Link error, patched in as the LINK_ERRORS of the copy plugin."""
+
+
+class FakeProbe(object):
+    def __init__(self):
+        self.clock = None
+
+    def set_clock(self, clock):
+        self.clock = clock
+
+
+class FakeSession(object):
+    """Session with a board reading garbage and failing to program too fast.
+
+    Attributes:
+        memory: Memory of all the targets, address -> bytes.
+        max_clock: Fastest clock of the boards by target ID, boards not listed
+            work at any clock.
+        opened: Number of sessions opened.
+    """
+
+    memory = {}
+    max_clock = {}
+    opened = 0
+
+    def __init__(self, target_id):
+        self.target_id = target_id
+        self.board = mock.Mock(target_type="k64f")
+        self.probe = FakeProbe()
+        self.target = mock.Mock()
+        self.target.memory_map.get_boot_memory.return_value.start = BOOT_ADDRESS
+        self.target.read_memory_block8.side_effect = self.read
+        self.is_open = False
+
+    @property
+    def too_fast(self):
+        max_clock = self.max_clock.get(self.target_id)
+        return max_clock is not None and self.probe.clock > max_clock
+
+    def read(self, address, size):
+        if self.too_fast:
+            return [0xFF] * size
+        return list(self.memory[address][:size])
+
+    def open(self):
+        FakeSession.opened += 1
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeFlashLoader(object):
+    """Flash loader recording what it programs, at which clock.
+
+    Attributes:
+        programmed: List of (target ID, list of (address, bytes)) tuples.
+        clocks: List of (target ID, clock) tuples.
+        max_active: Largest number of boards programmed at once.
+    """
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    programmed = []
+    clocks = []
+
+    def __init__(self, session):
+        self.session = session
+        self.data = []
+
+    def add_data(self, address, data):
+        self.data.append((address, data))
+
+    def commit(self):
+        cls = FakeFlashLoader
+        with cls.lock:
+            cls.clocks.append((self.session.target_id, self.session.probe.clock))
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        if self.session.too_fast:
+            raise FakeTransferError("transfer fault")
+        with cls.lock:
+            cls.programmed.append((self.session.target_id, self.data))
+
+
+def session_with_chosen_probe(unique_id, **kwargs):
+    """Open a FakeSession, no probe has the ID "missing"."""
+    if unique_id == "missing":
+        return None
+    return FakeSession(unique_id)
+
+
+def reset_fakes():
+    """Forget the sessions, memory and images of the previous test."""
+    FakeSession.memory = {}
+    FakeSession.max_clock = {}
+    FakeSession.opened = 0
+    FakeFlashLoader.active = 0
+    FakeFlashLoader.max_active = 0
+    FakeFlashLoader.programmed = []
+    FakeFlashLoader.clocks = []
@@ -0,0 +1,88 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from htrun.host_tests_runner.board_lease import (
+    BoardLease,
+    LeaseTimeout,
+    lease_usage,
+    usage_table,
+)
+
+
+def wait_for_board(directory, index, events):
+    with BoardLease("0240000032044e45", directory):
+        events.put((index, time.time()))
+
+
+@unittest.skipIf(os.name == "nt", "POSIX only")
+class BoardLeaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def tickets(self, lease):
+        return [name for name in os.listdir(lease.directory) if ".ticket" in name]
+
+    def test_fifo(self):
+        lease = BoardLease("0240000032044e45", self.tmpdir)
+        lease.acquire()
+        events = multiprocessing.Queue()
+        waiters = []
+        for index in range(3):
+            waiter = multiprocessing.Process(
+                target=wait_for_board, args=(self.tmpdir, index, events)
+            )
+            waiter.start()
+            waiters.append(waiter)
+            # Queued before the next one starts
+            while len(self.tickets(lease)) <= index:
+                time.sleep(0.01)
+
+        released = time.time()
+        lease.release()
+        order = [events.get(timeout=10) for _ in waiters]
+        for waiter in waiters:
+            waiter.join()
+        self.assertEqual([index for index, _ in order], [0, 1, 2])
+        self.assertLess(order[0][1] - released, 0.5)
+        self.assertEqual(self.tickets(lease), [])
+        self.assertEqual(lease_usage(self.tmpdir)["0240000032044e45"]["leases"], 4)
+
+    def test_timeout(self):
+        with BoardLease("/dev/ttyACM0", self.tmpdir) as lease:
+            self.assertEqual(os.path.basename(lease.directory), "_dev_ttyACM0")
+            start = time.time()
+            with self.assertRaises(LeaseTimeout):
+                BoardLease("/dev/ttyACM0", self.tmpdir).acquire(timeout=0.2)
+            self.assertGreaterEqual(time.time() - start, 0.2)
+            self.assertEqual(self.tickets(lease), [])
+
+        usage = lease.usage()
+        self.assertEqual(usage["leases"], 1)
+        self.assertGreater(usage["held"], 0.2)
+        self.assertGreater(usage["utilisation"], 0.9)
+        self.assertIn("_dev_ttyACM0", usage_table(self.tmpdir))
+
+    def test_dead_waiter(self):
+        lease = BoardLease("K64F_1", self.tmpdir)
+        os.makedirs(lease.directory)
+        with open(os.path.join(lease.directory, "tickets"), "w") as f:
+            f.write("5")
+        # Left by a process killed while waiting, nobody holds its lock
+        open(os.path.join(lease.directory, "3.ticket"), "w").close()
+        lease.acquire(timeout=1)
+        self.assertLess(lease.waited, 0.5)
+        self.assertEqual(self.tickets(lease), [])
+        lease.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+import mock
+
+from htrun.host_tests.echo import EchoTest
+from htrun.host_tests.rtc_auto import RTCTest
+from htrun.host_tests.wait_us_auto import WaitusTest
+
+
+class WaitusTestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.host_test = WaitusTest()
+        self.host_test.setup()
+
+    def test_accurate_ticks(self):
+        for i in range(100):
+            self.host_test._callback_tick("tick", str(i), 1000.0 + i * 1.01)
+        self.assertTrue(self.host_test.result())
+
+    def test_inaccurate_tick(self):
+        for timestamp in (1000.0, 1001.0, 1002.5, 1003.5):
+            self.host_test._callback_tick("tick", "0", timestamp)
+        self.assertFalse(self.host_test.result())
+
+    def test_no_ticks(self):
+        self.assertFalse(self.host_test.result())
+
+    def test_setup_resets_ticks(self):
+        self.host_test._callback_tick("tick", "0", 1000.0)
+        self.host_test._callback_tick("tick", "1", 1005.0)
+        self.host_test.setup()
+        self.host_test._callback_tick("tick", "0", 1000.0)
+        self.assertTrue(self.host_test.result())
+
+
+class EchoTestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.host_test = EchoTest()
+        self.host_test.setup()
+        self.sent = []
+        self.host_test.send_kv = mock.Mock(
+            side_effect=lambda key, value: self.sent.append(value)
+        )
+
+    def test_all_echoed(self):
+        self.host_test._callback_echo_count("echo_count", "100", 0)
+        for i in range(100):
+            self.host_test._callback_echo("echo", self.sent[-1], 0)
+        self.assertTrue(self.host_test.result())
+
+    def test_wrong_echo(self):
+        self.host_test._callback_echo_count("echo_count", "2", 0)
+        self.host_test._callback_echo("echo", "not sent", 0)
+        self.host_test._callback_echo("echo", self.sent[-1], 0)
+        self.assertFalse(self.host_test.result())
+
+    def test_missing_echo(self):
+        self.host_test._callback_echo_count("echo_count", "2", 0)
+        self.host_test._callback_echo("echo", self.sent[-1], 0)
+        self.assertFalse(self.host_test.result())
+
+
+class RTCTestTestCase(unittest.TestCase):
+    def test_rtc_reads_counted(self):
+        host_test = RTCTest()
+        host_test.setup()
+        host_test._callback_rtc("rtc", "[0] [1970-01-01 00:00:00 AM]", 0)
+        host_test._callback_rtc("rtc", "garbage", 0)
+        self.assertEqual(host_test.rtc_read_count, 2)
+        self.assertEqual(host_test.rtc_read_errors, 2)
+        self.assertTrue(host_test.result())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from htrun.cache import atomic_write, cache_path, file_lock
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_cache_path(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmpdir}):
+            self.assertEqual(
+                cache_path("images", "a.bin"),
+                os.path.join(self.tmpdir, "htrun", "images", "a.bin"),
+            )
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": ""}):
+            self.assertEqual(
+                cache_path(),
+                os.path.join(os.path.expanduser("~"), ".cache", "htrun"),
+            )
+
+    def test_atomic_write(self):
+        path = os.path.join(self.tmpdir, "htrun", "data.json")
+        atomic_write(path, "{}")
+        atomic_write(path, b"[]")
+        with open(path) as f:
+            self.assertEqual(f.read(), "[]")
+
+        # A failed write leaves the old file and no temporary file
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                atomic_write(path, "{}")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["data.json"])
+        with open(path) as f:
+            self.assertEqual(f.read(), "[]")
+
+    @unittest.skipIf(os.name == "nt", "files aren't locked on Windows")
+    def test_file_lock(self):
+        path = os.path.join(self.tmpdir, "htrun", "data.json.lock")
+        locked = threading.Event()
+
+        def lock():
+            with file_lock(path):
+                locked.set()
+
+        with file_lock(path):
+            thread = threading.Thread(target=lock)
+            thread.start()
+            self.assertFalse(locked.wait(0.2))
+        thread.join(5)
+        self.assertTrue(locked.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+from htrun.host_tests_runner.compare_log import CompareLog, LinePattern
+
+
+class CompareLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def compare_log(self, text):
+        path = os.path.join(self.tmpdir, "compare.log")
+        with open(path, "w") as f:
+            f.write(text)
+        compare_log = CompareLog(path)
+        self.addCleanup(compare_log.close)
+        return compare_log
+
+    def test_literal_line_uses_substring_path(self):
+        pattern = LinePattern("Hello world!")
+        self.assertIsNone(pattern.regex)
+        self.assertTrue(pattern.match(">> Hello world! <<"))
+
+    def test_regex_line(self):
+        pattern = LinePattern(r"SHA-256\s*:\s*\d+ Kb/s")
+        self.assertIsNotNone(pattern.regex)
+        self.assertTrue(pattern.match("  SHA-256     :   1922 Kb/s,  61 cycles/byte"))
+        self.assertFalse(pattern.match("  SHA-256     :   n/a"))
+
+    def test_invalid_regex_matched_as_text(self):
+        pattern = LinePattern("value (unterminated")
+        self.assertIsNone(pattern.regex)
+        self.assertTrue(pattern.match("value (unterminated group"))
+
+    def test_lines_matched_in_order(self):
+        compare_log = self.compare_log("first\nsecond\n")
+        self.assertFalse(compare_log.match("second"))
+        self.assertFalse(compare_log.match("first"))
+        self.assertEqual(compare_log.pending(), ["second"])
+        self.assertTrue(compare_log.match("second"))
+        self.assertTrue(compare_log.complete)
+
+    def test_any_of_section(self):
+        compare_log = self.compare_log(
+            "start\n@any-of\nalpha\nbeta\nbeta\n\\d+ items\n@end\nstop\n"
+        )
+        self.assertFalse(compare_log.match("start"))
+        self.assertFalse(compare_log.match("beta"))
+        self.assertFalse(compare_log.match("42 items"))
+        self.assertFalse(compare_log.match("stop"))
+        self.assertFalse(compare_log.match("alpha"))
+        self.assertEqual(compare_log.pending(), ["beta"])
+        self.assertFalse(compare_log.match("beta"))
+        self.assertTrue(compare_log.match("stop"))
+
+    def test_any_of_prefixes(self):
+        compare_log = self.compare_log("@any-of\nab\nabc\nabd\n@end\n")
+        self.assertFalse(compare_log.match("xabcx"))
+        self.assertFalse(compare_log.match("xabcx"))
+        self.assertEqual(compare_log.pending(), ["abd"])
+        self.assertTrue(compare_log.match("abd"))
+
+    def test_any_of_lines_with_metacharacters(self):
+        compare_log = self.compare_log(
+            "@any-of\nmbed-os 6.15.1\nmbed-os 6.15.1\n\\d+ items\n(ab)\\1\n@end\n"
+        )
+        section = compare_log.current
+        self.assertIsNone(section._combined)
+        self.assertFalse(compare_log.match("mbed-os 6.15.1"))
+        self.assertFalse(compare_log.match("mbed-os 6-15-1"))
+        self.assertEqual(compare_log.pending(), ["\\d+ items", "(ab)\\1"])
+        self.assertFalse(compare_log.match("xababx"))
+        self.assertTrue(compare_log.match("3 items"))
+
+        section = self.compare_log("@any-of\nv1.2\n\\d+ items\n@end\n").current
+        self.assertIsNotNone(section._combined)
+        self.assertFalse(section.match("nothing here"))
+        self.assertTrue(section.match("build v1.2 ok"))
+        self.assertTrue(section.complete is False and section.match("7 items"))
+
+    def test_empty_compare_log_is_complete(self):
+        self.assertTrue(self.compare_log("").complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
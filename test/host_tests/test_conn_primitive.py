@@ -0,0 +1,58 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+from htrun.host_tests_conn_proxy.conn_primitive import ConnectorPrimitive
+
+
+class ScriptedConnector(ConnectorPrimitive):
+    """Connector returning scripted reads and recording poll() behaviour."""
+
+    def __init__(self, reads):
+        ConnectorPrimitive.__init__(self, "TEST")
+        self.reads = list(reads)
+        self.read_sizes = []
+        self.waits = []
+
+    def read(self, count):
+        self.read_sizes.append(count)
+        data = self.reads.pop(0) if self.reads else b""
+        return data[:count]
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+
+
+class ConnectorPrimitivePollTestCase(unittest.TestCase):
+    def test_read_size_grows_while_streaming(self):
+        full = b"x" * ConnectorPrimitive.MAX_READ_SIZE
+        connector = ScriptedConnector([full] * 7 + [b"", full])
+        for _ in range(9):
+            connector.poll()
+        self.assertEqual(
+            connector.read_sizes,
+            [2304, 4608, 9216, 18432, 36864, 65536, 65536, 65536, 2304],
+        )
+        self.assertEqual(connector.waits, [ConnectorPrimitive.POLL_MIN_INTERVAL])
+
+    def test_back_off_while_idle(self):
+        connector = ScriptedConnector([b""] * 8 + [b"data", b""])
+        for _ in range(10):
+            connector.poll()
+        self.assertEqual(
+            connector.waits,
+            [0.001, 0.002, 0.004, 0.008, 0.016, 0.02, 0.02, 0.02, 0.001],
+        )
+
+    def test_no_wait_when_read_blocks(self):
+        connector = ScriptedConnector([b""] * 3)
+        connector.BLOCKING_READ = True
+        for _ in range(3):
+            self.assertEqual(connector.poll(), b"")
+        self.assertEqual(connector.waits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_conn_proxy.conn_primitive_fastmodel import (
+    FastmodelConnectorPrimitive,
+    SIMULATOR_POOL,
+)
+from htrun.host_tests_toolbox import fm_agent_stub
+
+from .helpers import read_until
+
+
+class FastmodelConnectorPrimitiveTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules, {"fm_agent": fm_agent_stub})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(SIMULATOR_POOL.clear)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.launches = fm_agent_stub.FastmodelAgent.launches
+
+    def make_image(self, name, **dut_config):
+        image_path = os.path.join(self.tmpdir, name)
+        with open(image_path, "w") as f:
+            json.dump(dut_config, f)
+        return image_path
+
+    def make_connector(self, image_path, **kwargs):
+        config = {
+            "platform_name": "FVP_MPS2",
+            "fm_config": "DEFAULT",
+            "image_path": image_path,
+        }
+        config.update(kwargs)
+        return FastmodelConnectorPrimitive("FSMD", config)
+
+    def test_sync(self):
+        connector = self.make_connector(self.make_image("a.bin", testcases=2))
+        self.assertTrue(connector.connected())
+        self.assertTrue(connector.write_kv("__sync", "0123"))
+        output = read_until(connector, b"{{__exit;0}}")
+        self.assertIn(b"{{__sync;0123}}", output)
+        self.assertIn(b"{{__testcase_count;2}}", output)
+        resource = connector.resource
+        connector.finish()
+        self.assertFalse(resource.is_simulator_alive)
+
+    def test_keep_warm(self):
+        connector = self.make_connector(self.make_image("a.bin"), fm_keep_warm=5)
+        resource = connector.resource
+        connector.finish()
+        self.assertTrue(resource.is_simulator_alive)
+        # The next test gets the running model with its own image loaded
+        connector = self.make_connector(
+            self.make_image("b.bin", testcases=3), fm_keep_warm=5
+        )
+        self.assertIs(connector.resource, resource)
+        self.assertEqual(resource.dut_config, {"testcases": 3})
+        self.assertEqual(fm_agent_stub.FastmodelAgent.launches, self.launches + 1)
+        connector.write_kv("__sync", "4567")
+        self.assertIn(b"{{__testcase_count;3}}", read_until(connector, b"{{__exit;0}}"))
+        connector.finish()
+        # Models of other configs are not reused
+        connector = self.make_connector(
+            self.make_image("c.bin"), fm_keep_warm=5, fm_config="OTHER"
+        )
+        self.assertIsNot(connector.resource, resource)
+        connector.finish()
+        SIMULATOR_POOL.clear()
+        self.assertFalse(resource.is_simulator_alive)
+
+    def test_relaunch_after_error(self):
+        image_path = self.make_image("a.bin")
+        connector = self.make_connector(image_path, fm_keep_warm=5)
+        resource = connector.resource
+        with mock.patch.object(
+            resource, "read", side_effect=fm_agent_stub.SimulatorError("crashed")
+        ):
+            connector.read(2304)
+        self.assertIsNotNone(connector.LAST_ERROR)
+        connector.finish()
+        self.assertFalse(resource.is_simulator_alive)
+
+        # A model which fails to reset is shut down and replaced
+        connector = self.make_connector(image_path, fm_keep_warm=5)
+        resource = connector.resource
+        connector.finish()
+        with mock.patch.object(resource, "reset_simulator", return_value=False):
+            connector = self.make_connector(image_path, fm_keep_warm=5)
+        self.assertIsNot(connector.resource, resource)
+        self.assertFalse(resource.is_simulator_alive)
+        self.assertTrue(connector.connected())
+        connector.keep_warm = 0
+        connector.finish()
+
+    def test_keep_warm_expiry(self):
+        connector = self.make_connector(self.make_image("a.bin"), fm_keep_warm=0.1)
+        resource = connector.resource
+        connector.finish()
+        end = time.time() + 5
+        while resource.is_simulator_alive and time.time() < end:
+            time.sleep(0.01)
+        self.assertFalse(resource.is_simulator_alive)
+
+
+if __name__ == "__main__":
+    unittest.main()
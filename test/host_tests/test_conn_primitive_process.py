@@ -0,0 +1,83 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import sys
+import time
+import unittest
+
+from htrun.host_tests_conn_proxy.conn_primitive_process import (
+    ProcessConnectorPrimitive,
+)
+
+from .helpers import read_until
+
+VIRTUAL_DUT = '"%s" -m htrun.host_tests_toolbox.virtual_dut --stdio --once' % (
+    sys.executable
+)
+
+
+class ProcessConnectorPrimitiveTestCase(unittest.TestCase):
+    def make_connector(self, command=VIRTUAL_DUT, **config):
+        config["process"] = command
+        connector = ProcessConnectorPrimitive("PROC", config)
+        self.addCleanup(connector.finish)
+        return connector
+
+    def test_kv_exchange(self):
+        connector = self.make_connector()
+        self.assertTrue(connector.connected())
+        self.assertTrue(connector.write("mbed" * 10))
+        self.assertTrue(connector.write_kv("__sync", "1234"))
+        output = read_until(connector, b"{{__exit;0}}")
+        self.assertIn(b"{{__sync;1234}}", output)
+        self.assertIn(b"{{end;success}}", output)
+
+    def test_reset_restarts_process(self):
+        connector = self.make_connector()
+        pid = connector.process.pid
+        connector.reset()
+        self.assertNotEqual(connector.process.pid, pid)
+        connector.write_kv("__sync", "5678")
+        self.assertIn(b"{{__sync;5678}}", read_until(connector, b"{{__exit;0}}"))
+
+    def test_image_path_replaced(self):
+        connector = self.make_connector(
+            '"%s" -c "print(\'{image_path}\')"' % sys.executable,
+            image_path="build/test.bin",
+        )
+        self.assertIn(b"build/test.bin", read_until(connector, b"\n"))
+
+    def test_process_exit(self):
+        connector = self.make_connector('"%s" -c "print(1)"' % sys.executable)
+        read_until(connector, b"1")
+        end = time.time() + 10
+        while not connector.eof and time.time() < end:
+            connector.read(2304)
+        self.assertTrue(connector.eof)
+        # A finished process is like a silent target, not a lost connection
+        self.assertTrue(connector.connected())
+        self.assertEqual(connector.read(2304), b"")
+        self.assertTrue(connector.write("mbed"))
+
+    @unittest.skipIf(sys.platform == "win32", "POSIX shell only")
+    def test_output_closed_by_running_process(self):
+        connector = self.make_connector("sh -c 'echo 1; exec >&- 2>&-; sleep 30'")
+        read_until(connector, b"1")
+        start = time.time()
+        while not connector.eof and time.time() - start < 10:
+            connector.read(2304)
+        self.assertTrue(connector.eof)
+        self.assertLess(time.time() - start, 5)
+        self.assertIsNone(connector.process.poll())
+        connector.finish()
+        self.assertIsNotNone(connector.process.returncode)
+
+    def test_missing_command(self):
+        connector = self.make_connector("no-such-command-for-htrun")
+        self.assertFalse(connector.connected())
+        self.assertIn("unable to start process", connector.error())
+
+
+if __name__ == "__main__":
+    unittest.main()
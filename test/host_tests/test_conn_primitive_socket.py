@@ -0,0 +1,154 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import socket
+import struct
+import threading
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_conn_proxy.conn_primitive_socket import (
+    parse_socket_url,
+    SocketConnectorPrimitive,
+    TelnetDecoder,
+)
+
+from .helpers import read_until
+
+
+class LoopbackServer(object):
+    """Single connection TCP server sending canned bytes, recording what it gets."""
+
+    def __init__(self, greeting=b"", echo=False):
+        self.greeting = greeting
+        self.echo = echo
+        self.received = b""
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.conn = None
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        self.conn, _ = self.listener.accept()
+        self.conn.sendall(self.greeting)
+        while True:
+            data = self.conn.recv(4096)
+            if not data:
+                break
+            self.received += data
+            if self.echo:
+                self.conn.sendall(data)
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+        self.listener.close()
+
+
+class ParseSocketUrlTestCase(unittest.TestCase):
+    def test_urls(self):
+        self.assertEqual(parse_socket_url("host:23"), ("tcp", "host", 23))
+        self.assertEqual(
+            parse_socket_url("rfc2217://10.0.0.1:7000"), ("rfc2217", "10.0.0.1", 7000)
+        )
+        self.assertEqual(parse_socket_url("tcp://[::1]:4000"), ("tcp", "::1", 4000))
+        self.assertRaises(ValueError, parse_socket_url, "telnet://host:23")
+        self.assertRaises(ValueError, parse_socket_url, "host")
+
+
+class TelnetDecoderTestCase(unittest.TestCase):
+    def test_escaped_data_and_commands(self):
+        decoder = TelnetDecoder()
+        output, negotiations = decoder.decode(
+            b"a\xff\xffb\xff\xfd\x2c\xff\xfa\x2c\x6b\x00\xff\xf0c"
+        )
+        self.assertEqual(output, b"a\xffbc")
+        self.assertEqual(negotiations, [(0xFD, 0x2C)])
+
+    def test_commands_split_across_reads(self):
+        decoder = TelnetDecoder()
+        self.assertEqual(decoder.decode(b"a\xff"), (b"a", []))
+        self.assertEqual(decoder.decode(b"\xfb"), (b"", []))
+        self.assertEqual(decoder.decode(b"\x03b\xff\xfa\x2c"), (b"b", [(0xFB, 3)]))
+        self.assertEqual(decoder.decode(b"\x01\xff\xf0c"), (b"c", []))
+
+
+class SocketConnectorPrimitiveTestCase(unittest.TestCase):
+    def make_connector(self, url, **config):
+        config.setdefault("skip_reset", True)
+        config.setdefault("polling_timeout", 5)
+        connector = SocketConnectorPrimitive("SOCK", url, 115200, config)
+        self.addCleanup(connector.finish)
+        return connector
+
+    def start_server(self, **kwargs):
+        server = LoopbackServer(**kwargs)
+        self.addCleanup(server.close)
+        return server
+
+    def test_raw_tcp_round_trip(self):
+        server = self.start_server(echo=True)
+        connector = self.make_connector("tcp://127.0.0.1:%d" % server.port)
+        self.assertTrue(connector.connected())
+        self.assertEqual(
+            connector.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1
+        )
+        connector.write("mbed" * 10)
+        connector.write_kv("__sync", "1234")
+        # Writes are coalesced until the next read
+        self.assertEqual(len(connector.tx_buffer), 40 + len("{{__sync;1234}}\n"))
+        output = read_until(connector, b"{{__sync;1234}}")
+        self.assertEqual(output, b"mbed" * 10 + b"{{__sync;1234}}\n")
+        self.assertEqual(len(connector.tx_buffer), 0)
+
+    def test_rfc2217_negotiation_and_reset(self):
+        server = self.start_server(
+            greeting=b"\xff\xfd\x2c\xff\xfd\x18boot\xff\xff\n"
+            b"\xff\xfa\x2c\x6b\x10\xff\xf0done\n"
+        )
+        patcher = mock.patch.object(SocketConnectorPrimitive, "BREAK_DURATION", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        connector = self.make_connector(
+            "rfc2217://127.0.0.1:%d" % server.port,
+            skip_reset=False,
+            forced_reset_timeout=0,
+        )
+        self.assertEqual(read_until(connector, b"done\n"), b"boot\xff\ndone\n")
+        connector.flush()
+        end = time.time() + 5
+        while b"\xff\xfc\x18" not in server.received and time.time() < end:
+            time.sleep(0.01)
+        received = server.received
+        self.assertIn(b"\xff\xfb\x2c", received)
+        self.assertIn(
+            b"\xff\xfa\x2c\x01" + struct.pack(">I", 115200) + b"\xff\xf0", received
+        )
+        # Break on, break off
+        self.assertIn(b"\xff\xfa\x2c\x05\x05\xff\xf0", received)
+        self.assertIn(b"\xff\xfa\x2c\x05\x06\xff\xf0", received)
+        # Terminal type is refused
+        self.assertIn(b"\xff\xfc\x18", received)
+
+    def test_connection_closed_by_server(self):
+        server = self.start_server(greeting=b"bye\n")
+        connector = self.make_connector("127.0.0.1:%d" % server.port)
+        self.assertEqual(read_until(connector, b"bye\n"), b"bye\n")
+        server.thread.join(0.1)
+        server.conn.shutdown(socket.SHUT_RDWR)
+        end = time.time() + 5
+        while connector.connected() and time.time() < end:
+            connector.read(2304)
+        self.assertFalse(connector.connected())
+        self.assertIn("closed by the server", connector.error())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import queue
+import unittest
+from time import time
+
+import mock
+
+from htrun.host_tests_conn_proxy.conn_primitive import ConnectorPrimitive
+from htrun.host_tests_conn_proxy.conn_proxy import conn_process, KiViBufferWalker
+
+
+class FakeConnector(ConnectorPrimitive):
+    """Connector replying to the first sync with canned target output."""
+
+    def __init__(self, output):
+        ConnectorPrimitive.__init__(self, "FAKE")
+        self.output = output
+        self.sync_uuid = None
+
+    def connected(self):
+        return True
+
+    def write(self, payload, log=False):
+        return True
+
+    def write_kv(self, key, value):
+        if key == "__sync" and self.sync_uuid is None:
+            self.sync_uuid = value
+        return True
+
+    def read(self, count):
+        if self.sync_uuid is None or self.output is None:
+            return b""
+        data = "{{__sync;%s}}\n%s" % (self.sync_uuid, self.output)
+        self.output = None
+        return data.encode("utf-8")
+
+    def reset(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def error(self):
+        return ""
+
+
+def run_conn_process(output, dut_events):
+    event_queue = queue.Queue()
+    dut_event_queue = queue.Queue()
+    for key, value in dut_events:
+        dut_event_queue.put((key, value, time()))
+    with mock.patch(
+        "htrun.host_tests_conn_proxy.conn_proxy.conn_primitive_factory",
+        return_value=FakeConnector(output),
+    ):
+        conn_process(event_queue, dut_event_queue, {"sync_behavior": 1})
+    keys = []
+    while not event_queue.empty():
+        keys.append(event_queue.get()[0])
+    return keys
+
+
+class KiViBufferWalkerTestCase(unittest.TestCase):
+    def test_kv_pairs_in_order(self):
+        kv_buffer = KiViBufferWalker()
+        lines = kv_buffer.append(b"{{a;1}}\nline\n{{b;2}}\n{{c;")
+        self.assertEqual(lines, ["line"])
+        self.assertEqual(kv_buffer.pop_kv()[:2], ("a", "1"))
+        self.assertEqual(kv_buffer.pop_kv()[:2], ("b", "2"))
+        self.assertFalse(kv_buffer.search())
+        kv_buffer.append(b"3}}\n")
+        self.assertEqual(kv_buffer.pop_kv()[:2], ("c", "3"))
+
+    def test_long_line_not_buffered(self):
+        kv_buffer = KiViBufferWalker(max_line_length=100)
+        self.assertEqual(kv_buffer.append(b"x" * 60), [])
+        self.assertEqual(kv_buffer.append(b"x" * 60), ["x" * 120])
+        self.assertEqual(kv_buffer.buff, "")
+
+
+class ConnProcessSubscriptionTestCase(unittest.TestCase):
+    OUTPUT = "{{used;1}}\n{{unused;2}}\nsome output\n{{__exit;0}}\n"
+
+    def test_all_events_forwarded_without_subscription(self):
+        keys = run_conn_process(
+            self.OUTPUT, [(None, None), ("__host_test_finished", True)]
+        )
+        self.assertEqual(
+            keys,
+            [
+                "__conn_process_start",
+                "__rxd_line",
+                "__sync",
+                "used",
+                "unused",
+                "__exit",
+            ],
+        )
+
+    def test_only_subscribed_events_forwarded(self):
+        keys = run_conn_process(
+            self.OUTPUT,
+            [
+                ("__subscribe", ["__exit", "used"]),
+                ("__host_test_finished", True),
+            ],
+        )
+        self.assertEqual(keys, ["__conn_process_start", "__sync", "used", "__exit"])
+
+
+if __name__ == "__main__":
+    unittest.main()
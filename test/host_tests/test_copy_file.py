@@ -0,0 +1,122 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins import host_test_plugins
+from htrun.host_tests_plugins.host_test_plugins import copy_fd
+from htrun.host_tests_plugins.module_copy_mps2 import HostTestPluginCopyMethod_MPS2
+from htrun.host_tests_plugins.module_copy_shell import HostTestPluginCopyMethod_Shell
+
+
+class CopyFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.data = os.urandom(300000)
+        self.image_path = os.path.join(self.tmpdir, "image.bin")
+        with open(self.image_path, "wb") as f:
+            f.write(self.data)
+        self.disk = os.path.join(self.tmpdir, "disk")
+        os.mkdir(self.disk)
+
+    def copy_fd(self, **kwargs):
+        destination_path = os.path.join(self.disk, "copy.bin")
+        src_fd = os.open(self.image_path, os.O_RDONLY)
+        dst_fd = os.open(destination_path, os.O_WRONLY | os.O_CREAT)
+        try:
+            copied = copy_fd(src_fd, dst_fd, len(self.data), **kwargs)
+        finally:
+            os.close(src_fd)
+            os.close(dst_fd)
+        with open(destination_path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        return copied
+
+    def test_copy_fd_progress(self):
+        progress = mock.Mock()
+        self.assertEqual(self.copy_fd(chunk_size=100000, progress=progress), 300000)
+        self.assertEqual(
+            progress.call_args_list,
+            [mock.call(n, 300000) for n in (100000, 200000, 300000)],
+        )
+
+    def test_copy_fd_fallback(self):
+        calls = []
+
+        def unsupported_after_one_chunk(src_fd, dst_fd, count, *args):
+            calls.append(count)
+            if len(calls) > 1:
+                raise OSError(errno.EXDEV, "cross-device link")
+            return os.write(dst_fd, self.data[:count])
+
+        with mock.patch.object(
+            os, "copy_file_range", unsupported_after_one_chunk, create=True
+        ), mock.patch.object(
+            os,
+            "sendfile",
+            mock.Mock(side_effect=OSError(errno.EINVAL, "")),
+            create=True,
+        ):
+            self.assertEqual(self.copy_fd(chunk_size=100000), 300000)
+        self.assertEqual(len(calls), 2)
+
+    def test_copy_fd_error(self):
+        with mock.patch.object(
+            host_test_plugins,
+            "_read_write",
+            mock.Mock(side_effect=OSError(errno.ENOSPC, "no space left")),
+        ), mock.patch.object(
+            os, "copy_file_range", mock.Mock(return_value=0), create=True
+        ), mock.patch.object(
+            os,
+            "sendfile",
+            mock.Mock(side_effect=OSError(errno.EINVAL, "")),
+            create=True,
+        ):
+            with self.assertRaises(OSError):
+                self.copy_fd()
+
+    def test_shell_copy_in_process(self):
+        plugin = HostTestPluginCopyMethod_Shell()
+        with mock.patch.object(
+            plugin, "check_mount_point_ready", return_value=(True, self.disk)
+        ), mock.patch.object(plugin, "run_command") as run_command:
+            self.assertTrue(
+                plugin.execute(
+                    "shell", image_path=self.image_path, destination_disk=self.disk
+                )
+            )
+        run_command.assert_not_called()
+        with open(os.path.join(self.disk, "image.bin"), "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_mps2_copy_missing_image(self):
+        plugin = HostTestPluginCopyMethod_MPS2()
+        self.assertFalse(
+            plugin.mps2_copy(os.path.join(self.tmpdir, "none.bin"), self.disk)
+        )
+        self.assertEqual(os.listdir(self.disk), [])
+
+    def test_progress_dots(self):
+        plugin = HostTestPluginCopyMethod_Shell()
+        destination_path = os.path.join(self.disk, "copy.bin")
+        with mock.patch.object(
+            host_test_plugins, "COPY_PROGRESS_SIZE", 1
+        ), mock.patch.object(plugin, "print_plugin_char") as print_char:
+            self.assertTrue(
+                plugin.copy_file(self.image_path, destination_path, progress=True)
+            )
+        printed = "".join(c[0][0] for c in print_char.call_args_list)
+        self.assertEqual(printed, "." * 10 + "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
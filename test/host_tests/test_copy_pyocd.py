@@ -0,0 +1,196 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins import module_copy_pyocd, pyocd_session
+from htrun.host_tests_plugins.host_test_plugins import HostTestPluginBase
+from htrun.host_tests_plugins.host_test_registry import HostTestRegistry
+from htrun.host_tests_plugins.module_copy_pyocd import (
+    HostTestPluginCopyMethod_pyOCD,
+    ImageCache,
+)
+from htrun.host_tests_plugins.pyocd_session import PyOCDSessionCache
+
+from .helpers import make_elf
+from .pyocd_fakes import (
+    FakeFlashLoader,
+    FakeSession,
+    reset_fakes,
+    session_with_chosen_probe,
+)
+
+HEX_IMAGE = ":0400000001020304F2\n:02001000AABB89\n:00000001FF\n"
+
+
+class CopyPyOCDTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        reset_fakes()
+        self.sessions = PyOCDSessionCache()
+        self.addCleanup(self.sessions.clear)
+        patcher = mock.patch.multiple(
+            module_copy_pyocd,
+            FlashLoader=FakeFlashLoader,
+            FileProgrammer=mock.Mock(),
+            PYOCD_PRESENT=True,
+            PYOCD_SESSIONS=self.sessions,
+            create=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            pyocd_session,
+            "ConnectHelper",
+            mock.Mock(session_with_chosen_probe=session_with_chosen_probe),
+            create=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_image_cache(self):
+        cache = ImageCache()
+        bin_path = self.write("a.bin", b"\x00" * 100)
+        image = cache.get(bin_path)
+        self.assertIs(cache.get(bin_path), image)
+        self.assertEqual(image.segments, [(None, image.data)])
+        self.assertEqual(image.size, 100)
+
+        hex_image = cache.get(self.write("b.hex", HEX_IMAGE.encode()))
+        self.assertEqual(
+            hex_image.segments, [(0, b"\x01\x02\x03\x04"), (0x10, b"\xaa\xbb")]
+        )
+        self.assertEqual(hex_image.size, 6)
+
+        elf_image = cache.get(self.write("c.elf", make_elf([(0x100, b"\x05\x06")])))
+        self.assertEqual(elf_image.segments, [(0x100, b"\x05\x06")])
+        self.assertEqual(elf_image.size, 2)
+
+        with self.assertRaises(ValueError):
+            cache.get(self.write("d.srec", b"S0"))
+
+        # A rebuilt image is parsed again
+        self.write("a.bin", b"\x00" * 200)
+        self.assertIsNot(cache.get(bin_path), image)
+
+    def test_flash_many(self):
+        bin_path = self.write("a.bin", b"\x55" * 4096)
+        hex_path = self.write("b.hex", HEX_IMAGE.encode())
+        elf_path = self.write("c.elf", make_elf([(0x100, b"\x05" * 64)]))
+        jobs = [
+            ("0240", bin_path),
+            ("0241", bin_path),
+            ("0242", hex_path),
+            ("0243", bin_path),
+            ("0245", elf_path),
+            ("0246", elf_path),
+            ("missing", bin_path),
+            ("0244", os.path.join(self.tmpdir, "none.bin")),
+        ]
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        results = plugin.flash_many(jobs)
+
+        self.assertEqual([r.target_id for r in results], [t for t, _ in jobs])
+        self.assertEqual([r.ok for r in results], [True] * 6 + [False] * 2)
+        self.assertEqual(results[6].error, "probe not found")
+        self.assertEqual(results[0].size, 4096)
+        self.assertGreater(results[0].throughput, 0)
+        self.assertGreater(FakeFlashLoader.max_active, 1)
+
+        programmed = dict(FakeFlashLoader.programmed)
+        self.assertEqual(
+            programmed["0242"], [(0, b"\x01\x02\x03\x04"), (0x10, b"\xaa\xbb")]
+        )
+        # One buffer for all the boards flashing the same image
+        self.assertEqual(programmed["0240"][0][0], 0x1000)
+        self.assertIs(programmed["0240"][0][1], programmed["0241"][0][1])
+        # ELF segments are parsed once too
+        self.assertEqual(programmed["0245"], [(0x100, b"\x05" * 64)])
+        self.assertIs(programmed["0245"][0][1], programmed["0246"][0][1])
+
+    def test_flash_many_verify(self):
+        hex_path = self.write("b.hex", HEX_IMAGE.encode())
+        FakeSession.memory = {0: b"\x01\x02\x03\x04", 0x10: b"\xaa\xbb"}
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        self.assertTrue(plugin.flash_many([("0240", hex_path)], verify=True)[0].ok)
+
+        FakeSession.memory[0x10] = b"\xaa\xff"
+        result = plugin.flash_many([("0240", hex_path)], verify=True)[0]
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, "image read back differs")
+
+    def test_flash_many_same_board(self):
+        bin_path = self.write("a.bin", b"\x55" * 16)
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        results = plugin.flash_many([("0240", bin_path), ("0240", bin_path)])
+        self.assertTrue(all(r.ok for r in results))
+        # A probe has one session at a time
+        self.assertEqual(FakeFlashLoader.max_active, 1)
+        # Kept open for the second image, closed after it
+        self.assertEqual(FakeSession.opened, 1)
+        self.assertIsNone(self.sessions.entries["0240"][1])
+
+
+class SlowPlugin(HostTestPluginBase):
+    type = "CopyMethod"
+    capabilities = ["slow"]
+
+    def __init__(self, name):
+        HostTestPluginBase.__init__(self)
+        self.name = name
+
+    def setup(self, *args, **kwargs):
+        return True
+
+    def execute(self, capability, *args, **kwargs):
+        time.sleep(0.1)
+        return True
+
+
+class ConcurrentRegistryTestCase(unittest.TestCase):
+    def test_concurrent_calls(self):
+        class Registry(HostTestRegistry):
+            PLUGINS = {}
+
+        registry = Registry()
+        registry.register_plugin(SlowPlugin("slow"))
+        results = []
+
+        def call():
+            results.append(registry.call_plugin("CopyMethod", "slow"))
+
+        def register():
+            for i in range(100):
+                registry.register_plugin(SlowPlugin("extra%d" % i))
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        threads.append(threading.Thread(target=register))
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Plugins run outside the registry lock
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(len(registry.plugins()), 101)
+        self.assertNotIn("slow", HostTestRegistry.PLUGINS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import glob
+import os
+import pickle
+import unittest
+from time import time
+
+from htrun.host_tests_conn_proxy import EventLanes
+from htrun.host_tests_runner.host_test_default import QueueEmpty
+
+
+def drain(lanes):
+    events = []
+    while True:
+        try:
+            events.append(lanes.get(timeout=0.5))
+        except QueueEmpty:
+            return events
+
+
+class EventLanesTestCase(unittest.TestCase):
+    def test_control_events_first(self):
+        lanes = EventLanes()
+        for i in range(100):
+            lanes.put(("__rxd_line", "line %d" % i, time()))
+        lanes.put(("key", "value", time()))
+        lanes.put(("__notify_conn_lost", "lost", time()))
+        keys = [key for key, _, _ in drain(lanes)]
+        self.assertEqual(keys[:2], ["__notify_conn_lost", "key"])
+        self.assertEqual(keys[2:], ["__rxd_line"] * 100)
+        self.assertTrue(lanes.empty())
+
+    def test_dut_exit_in_order_with_kv_events(self):
+        lanes = EventLanes()
+        lanes.put(("end", "success", time()))
+        lanes.put(("__exit", 0, time()))
+        lanes.put(("__exit_event_queue", 0, time()))
+        keys = [key for key, _, _ in drain(lanes)]
+        self.assertEqual(keys, ["end", "__exit", "__exit_event_queue"])
+
+    def test_resets_in_order_with_kv_events(self):
+        lanes = EventLanes()
+        lanes.put(("key", "before reset", time()))
+        lanes.put(("__reset_dut", None, time()))
+        keys = [key for key, _, _ in drain(lanes)]
+        self.assertEqual(keys, ["key", "__reset_dut"])
+
+    def test_rxd_in_order_during_coverage(self):
+        lanes = EventLanes()
+        lanes.put(("__rxd_line", "boot", time()))
+        lanes.put(("__coverage_start", "gcov", time()))
+        lanes.put(("__rxd_line", "coverage data", time()))
+        lanes.put(("__coverage_start", "gcov", time()))
+        values = [value for _, value, _ in drain(lanes)]
+        self.assertEqual(values, ["gcov", "coverage data", "gcov", "boot"])
+
+    def test_event_in_flight_not_lost(self):
+        lanes = EventLanes()
+        lanes.IN_FLIGHT_TIMEOUT = 0.01
+        # Counted, but not in the lane yet
+        lanes._count(lanes.KV)
+        self.assertRaises(QueueEmpty, lanes.get_nowait)
+        lanes.lanes[lanes.KV].put(("key", "late", time()))
+        lanes.put(("key", "next", time()))
+        values = [value for _, value, _ in drain(lanes)]
+        self.assertEqual(values, ["late", "next"])
+
+    def test_bulk_lane_drops_and_reports(self):
+        lanes = EventLanes(bulk_size=3)
+        for i in range(10):
+            lanes.put(("__rxd_line", "line %d" % i, time()))
+        lanes.put(("__exit", 0, time()))
+        events = drain(lanes)
+        self.assertEqual(events[0][0], "__exit")
+        self.assertEqual(events[1][:2], ("__notify_rxd_dropped", 7))
+        self.assertEqual([e[1] for e in events[2:]], ["line 0", "line 1", "line 2"])
+
+    def test_ordered_rxd_never_dropped(self):
+        lanes = EventLanes(bulk_size=3, ordered_rxd=True)
+        for i in range(10):
+            lanes.put(("__rxd_line", "line %d" % i, time()))
+        lanes.put(("__exit", 0, time()))
+        events = drain(lanes)
+        self.assertEqual(len(events), 11)
+        self.assertEqual(events[9][1], "line 9")
+        self.assertEqual(events[10][0], "__exit")
+
+    def test_kv_lane_spills_in_order(self):
+        lanes = EventLanes(kv_size=5)
+        lanes.SPILL_CHUNK = 7
+        for i in range(50):
+            lanes.put(("key", i, time()))
+        spill_files = glob.glob(os.path.join(lanes.spill_dir, "*"))
+        self.assertTrue(spill_files)
+        lanes.put(("__notify_complete", True, time()))
+        events = drain(lanes)
+        self.assertEqual(events[0][0], "__notify_complete")
+        self.assertEqual([e[1] for e in events[1:]], list(range(50)))
+        self.assertTrue(lanes.empty())
+        for path in spill_files:
+            self.assertFalse(os.path.exists(path))
+        lanes.close()
+        self.assertFalse(os.path.exists(lanes.spill_dir))
+
+    def test_close_removes_unread_spill_files(self):
+        lanes = EventLanes(kv_size=1)
+        for i in range(10):
+            lanes.put(("key", i, time()))
+        self.assertTrue(os.listdir(lanes.spill_dir))
+        lanes.close()
+        self.assertFalse(os.path.exists(lanes.spill_dir))
+
+    def test_pickle_without_spill_state(self):
+        lanes = EventLanes()
+        lanes.put(("key", "value", time()))
+        state = lanes.__getstate__()
+        self.assertNotIn("spill_lock", state)
+        self.assertIsNone(state["spill_pid"])
+        self.assertRaises(RuntimeError, pickle.dumps, lanes)
+
+    def test_get_timeout(self):
+        lanes = EventLanes()
+        self.assertRaises(QueueEmpty, lanes.get, timeout=0.01)
+        self.assertRaises(QueueEmpty, lanes.get_nowait)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from optparse import Values
+
+import mock
+
+from htrun.host_tests_runner.fastmodel_executor import (
+    DurationStore,
+    FastmodelExecutor,
+    default_durations_path,
+    instance_count,
+    schedule,
+)
+
+
+def fake_run_test(options):
+    # Image names are "<exit code>_<duration in ms>"
+    code, duration = os.path.basename(options.image_path).split("_")
+    time.sleep(int(duration) / 1000.0)
+    return int(code)
+
+
+class FastmodelExecutorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.durations_path = os.path.join(self.tmpdir, "cache", "durations.json")
+
+    def test_instance_count(self):
+        self.assertEqual(instance_count(4), 4)
+        with mock.patch("multiprocessing.cpu_count", return_value=64):
+            self.assertEqual(instance_count(0), 64)
+            self.assertEqual(instance_count(0, 8192, 1024), 8)
+            self.assertEqual(instance_count(0, 512, 1024), 1)
+        self.assertEqual(instance_count(4, 65536, 1024), 4)
+
+    def test_schedule(self):
+        durations = DurationStore(self.durations_path)
+        for path, duration in (("a", 1.0), ("b", 30.0), ("d", 5.0)):
+            durations.update(path, duration)
+        # Unknown tests first, then the longest
+        self.assertEqual(
+            schedule(["a", "b", "c", "d", "e"], durations), [2, 4, 1, 3, 0]
+        )
+
+    def test_duration_store(self):
+        durations = DurationStore(self.durations_path)
+        self.assertIsNone(durations.get("a.bin"))
+        durations.update("a.bin", 2.5)
+        durations.save()
+        self.assertEqual(DurationStore(self.durations_path).get("a.bin"), 2.5)
+        with open(self.durations_path, "w") as f:
+            f.write("{corrupt")
+        self.assertIsNone(DurationStore(self.durations_path).get("a.bin"))
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmpdir}):
+            self.assertEqual(
+                default_durations_path(),
+                os.path.join(self.tmpdir, "htrun", "fm_durations.json"),
+            )
+
+    def test_concurrent_batches_merged(self):
+        first = DurationStore(self.durations_path)
+        second = DurationStore(self.durations_path)
+        first.update("a.bin", 1.0)
+        first.save()
+        second.update("b.bin", 2.0)
+        second.save()
+        durations = DurationStore(self.durations_path)
+        self.assertEqual(durations.get("a.bin"), 1.0)
+        self.assertEqual(durations.get("b.bin"), 2.0)
+        self.assertEqual(second.get("a.bin"), 1.0)
+
+    def test_run(self):
+        image_paths = [
+            os.path.join(self.tmpdir, name)
+            for name in ("0_10", "3_10", "0_200", "5_10", "0_50")
+        ]
+        options = Values(
+            {
+                "fm_instances": 2,
+                "fm_memory_budget": 0,
+                "fm_instance_memory": 1024,
+                "fm_durations": self.durations_path,
+            }
+        )
+        executor = FastmodelExecutor(options, image_paths, fake_run_test)
+        self.assertEqual(executor.instances, 2)
+        # First failure in batch order, whatever order the tests ran in
+        self.assertEqual(executor.run(), 3)
+        durations = DurationStore(self.durations_path)
+        for path in image_paths:
+            self.assertIsNotNone(durations.get(path))
+        self.assertEqual(
+            [image_paths[i] for i in schedule(image_paths, durations)][0],
+            image_paths[2],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from htrun.grm import client as grm_client
+from htrun.grm.backends import Resource, virtual_resources
+from htrun.grm.server import (
+    AllocationError,
+    ClientSession,
+    ResourceIndex,
+    ResourceServer,
+)
+from htrun.host_tests_conn_proxy.conn_primitive_remote import (
+    RemoteConnectorPrimitive,
+    REMOTE_RESOURCE_POOL,
+)
+
+from .helpers import read_until
+
+
+class ResourceIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ResourceIndex(
+            [
+                Resource("a", "K64F", ["wifi"]),
+                Resource("b", "K64F", ["wifi", "ble"]),
+                Resource("c", "NUCLEO_F429ZI", ["ble"]),
+            ]
+        )
+
+    def test_match(self):
+        self.assertEqual(self.index.match({}), {"a", "b", "c"})
+        self.assertEqual(self.index.match({"platform_name": "K64F"}), {"a", "b"})
+        self.assertEqual(self.index.match({"tags": {"ble": True}}), {"b", "c"})
+        self.assertEqual(
+            self.index.match({"platform_name": "K64F", "tags": {"ble": False}}),
+            {"a"},
+        )
+        self.assertEqual(self.index.match({"platform_name": "LPC1768"}), set())
+
+    def test_allocate_release(self):
+        requirements = {"platform_name": "K64F", "tags": {"wifi": True}}
+        first = self.index.allocate(requirements)
+        second = self.index.allocate(requirements)
+        self.assertEqual({first.id, second.id}, {"a", "b"})
+        with self.assertRaises(AllocationError):
+            self.index.allocate(requirements)
+        self.index.release(first.id)
+        self.assertIs(self.index.allocate(requirements), first)
+
+
+class GrmServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ResourceServer(
+            virtual_resources(2, "VIRTUAL", ["grm"]), "127.0.0.1", 0
+        )
+        self.server.start()
+        self.port = self.server.address[1]
+        self.tmpdir = tempfile.mkdtemp()
+        self.image_path = os.path.join(self.tmpdir, "image.bin")
+        with open(self.image_path, "w") as f:
+            json.dump({"testcases": 2, "lines_per_case": 3}, f)
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_session(self):
+        client = grm_client.GrmClient("127.0.0.1", self.port)
+        self.assertEqual(len(client.get_resources()), 2)
+        resource = client.allocate({"platform_name": "VIRTUAL"})
+        self.assertTrue(resource.flash(self.image_path))
+        resource.open_connection(grm_client.SerialParameters(baudrate=115200))
+        self.assertTrue(resource.is_connected)
+        resource.write("{{__sync;0123}}")
+        output = read_until(resource, b"{{end;success}}")
+        self.assertIn(b"{{__sync;0123}}", output)
+        self.assertIn(b"{{__testcase_count;2}}", output)
+        resource.close_connection()
+        resource.release()
+        self.assertFalse(resource.is_allocated)
+        self.assertEqual(self.server.index.free, {"VIRTUAL-0", "VIRTUAL-1"})
+        client.close()
+
+    def test_allocation_errors(self):
+        client = grm_client.GrmClient("127.0.0.1", self.port)
+        with self.assertRaises(Exception):
+            client.allocate({"tags": {"missing": True}})
+        client.allocate({})
+        client.allocate({})
+        with self.assertRaises(Exception):
+            client.allocate({})
+        # Resources of a client which disconnects go back to the pool
+        client.close()
+        end = time.time() + 5
+        while len(self.server.index.free) < 2 and time.time() < end:
+            time.sleep(0.01)
+        self.assertEqual(len(self.server.index.free), 2)
+
+    def test_concurrent_release(self):
+        server_sock, client_sock = socket.socketpair()
+        self.addCleanup(client_sock.close)
+        self.addCleanup(server_sock.close)
+        session = ClientSession(self.server, server_sock)
+        for _ in range(20):
+            resource = session.rpc_allocate(None, {})["id"]
+            session.rpc_open_connection(None, resource, 115200)
+            errors = []
+
+            def release(release):
+                try:
+                    release(resource)
+                except Exception as e:
+                    if "not allocated" not in str(e):
+                        errors.append(e)
+
+            threads = [
+                threading.Thread(target=release, args=(session.release,)),
+                threading.Thread(
+                    target=release,
+                    args=(lambda r: session.rpc_release(None, r),),
+                ),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            # Released twice, like on disconnect after a release request
+            session.release(resource)
+            self.assertEqual(session.allocated, {})
+            self.assertEqual(session.pumps, {})
+        self.assertEqual(len(self.server.index.free), 2)
+
+    def test_create_reuses_connection(self):
+        first = grm_client.create("127.0.0.1", self.port)
+        self.assertIs(grm_client.create("127.0.0.1", self.port), first)
+        first.close()
+
+    def remote_config(self, **kwargs):
+        config = {
+            "grm_module": "htrun.grm",
+            "grm_host": "127.0.0.1",
+            "grm_port": str(self.port),
+            "platform_name": "VIRTUAL",
+            "tags": "grm",
+            "image_path": self.image_path,
+            "baudrate": 115200,
+        }
+        config.update(kwargs)
+        return config
+
+    def test_remote_connector_primitive(self):
+        remote = RemoteConnectorPrimitive("REMOTE", self.remote_config())
+        self.assertTrue(remote.connected())
+        self.assertTrue(remote.write("{{__sync;4567}}"))
+        self.assertIn(b"{{__sync;4567}}", read_until(remote, b"{{__sync;4567}}"))
+        remote.finish()
+        self.assertFalse(remote.allocated())
+        self.assertEqual(len(self.server.index.free), 2)
+
+    def test_keep_warm(self):
+        config = self.remote_config(grm_keep_warm=5)
+        remote = RemoteConnectorPrimitive("REMOTE", config)
+        resource = remote.selected_resource
+        remote.finish()
+        # Still allocated, kept for the next run
+        self.assertEqual(len(self.server.index.free), 1)
+        remote = RemoteConnectorPrimitive("REMOTE", config)
+        self.assertIs(remote.selected_resource, resource)
+        self.assertTrue(remote.write("{{__sync;89ab}}"))
+        self.assertIn(b"{{__sync;89ab}}", read_until(remote, b"{{__sync;89ab}}"))
+        remote.finish()
+        REMOTE_RESOURCE_POOL.clear()
+        self.assertEqual(len(self.server.index.free), 2)
+
+    def test_keep_warm_expiry_and_health_check(self):
+        config = self.remote_config(grm_keep_warm=0.1)
+        remote = RemoteConnectorPrimitive("REMOTE", config)
+        remote.finish()
+        end = time.time() + 5
+        while len(self.server.index.free) < 2 and time.time() < end:
+            time.sleep(0.01)
+        self.assertEqual(len(self.server.index.free), 2)
+
+        remote = RemoteConnectorPrimitive("REMOTE", self.remote_config(grm_keep_warm=5))
+        resource = remote.selected_resource
+        remote.finish()
+        resource.close_connection()
+        # Disconnected resources are released, not reused
+        remote = RemoteConnectorPrimitive("REMOTE", self.remote_config(grm_keep_warm=5))
+        self.assertIsNot(remote.selected_resource, resource)
+        self.assertEqual(len(self.server.index.free), 1)
+        remote.keep_warm = 0
+        remote.finish()
+
+    def test_prefetch(self):
+        next_image_path = os.path.join(self.tmpdir, "next.bin")
+        with open(next_image_path, "w") as f:
+            json.dump({"testcases": 5}, f)
+        remote = RemoteConnectorPrimitive(
+            "REMOTE", self.remote_config(grm_prefetch=next_image_path)
+        )
+        first = remote.selected_resource
+        remote.finish()
+        remote = RemoteConnectorPrimitive(
+            "REMOTE", self.remote_config(image_path=next_image_path)
+        )
+        self.assertIsNot(remote.selected_resource, first)
+        server_resource = self.server.index.resources[remote.selected_resource.id]
+        self.assertEqual(server_resource.dut_config, {"testcases": 5})
+        self.assertTrue(remote.write("{{__sync;cdef}}"))
+        output = read_until(remote, b"{{__testcase_count;5}}")
+        self.assertIn(b"{{__testcase_count;5}}", output)
+        remote.finish()
+        self.assertEqual(len(self.server.index.free), 2)
+
+    def test_prefetch_failure(self):
+        remote = RemoteConnectorPrimitive(
+            "REMOTE",
+            self.remote_config(grm_prefetch=os.path.join(self.tmpdir, "missing")),
+        )
+        remote.finish()
+        REMOTE_RESOURCE_POOL.clear()
+        self.assertEqual(len(self.server.index.free), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+from time import time
+
+import mock
+
+from htrun import BaseHostTest, init_host_test_cli_parser
+from htrun.host_tests_conn_proxy import EventLanes
+from htrun.host_tests_runner.board_lease import BoardLease, LeaseTimeout
+from htrun.host_tests_runner.host_test_default import DefaultTestSelector
+
+
+class CountingHostTest(BaseHostTest):
+    def __init__(self):
+        BaseHostTest.__init__(self)
+        self.counts = {}
+
+    def setup(self):
+        self.register_callback("count", self._callback_count)
+
+    def _callback_count(self, key, value, timestamp):
+        self.counts[value] = self.counts.get(value, 0) + 1
+
+
+def make_options(**kwargs):
+    options, _ = init_host_test_cli_parser().parse_args([])
+    options.enum_host_tests = []
+    options.micro = "K64F"
+    options.process_start_timeout = 1
+    options.skip_reset = True
+    for name, value in kwargs.items():
+        setattr(options, name, value)
+    return options
+
+
+def run_with_events(selector, events, dut_event_queue=None):
+    """Run the selector's event loop with a queue pre-filled with events."""
+    event_queue = EventLanes()
+    event_queue.put(("__conn_process_start", 1, time()))
+    for key, value in events:
+        event_queue.put((key, value, time()))
+    with mock.patch(
+        "htrun.host_tests_runner.host_test_default.EventLanes",
+        return_value=event_queue,
+    ), mock.patch(
+        "htrun.host_tests_runner.host_test_default.Queue",
+        return_value=dut_event_queue or queue.Queue(),
+    ), mock.patch(
+        "htrun.host_tests_runner.host_test_default.Process"
+    ):
+        return selector.run_test()
+
+
+class HostTestConsumedKeysTestCase(unittest.TestCase):
+    def test_default_callbacks_not_consumed(self):
+        host_test = CountingHostTest()
+        host_test.setup()
+        self.assertEqual(sorted(host_test.get_consumed_keys()), ["count", "end"])
+
+    def test_one_update_for_callbacks_registered_together(self):
+        event_queue = queue.Queue()
+        host_test = CountingHostTest()
+        host_test.setup_communication(event_queue, queue.Queue())
+        host_test.setup()
+        host_test.register_callback("other", host_test._callback_count)
+        host_test.register_callback("third", host_test._callback_count)
+        self.assertEqual(event_queue.qsize(), 1)
+        self.assertIn("third", host_test.get_callbacks())
+        host_test.register_callback("later", host_test._callback_count)
+        self.assertEqual(event_queue.qsize(), 2)
+
+
+class DefaultTestSelectorRunTestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.selector = DefaultTestSelector(make_options())
+        self.host_test = CountingHostTest()
+        self.selector.registry.register_host_test("counting", self.host_test)
+        self.addCleanup(self.selector.registry.unregister_host_test, "counting")
+
+    def test_end_event_sets_result(self):
+        result = run_with_events(
+            self.selector,
+            [
+                ("__timeout", 10),
+                ("__version", "1.3.0"),
+                ("__host_test_name", "default_auto"),
+                ("__rxd_line", "some output"),
+                ("end", "success"),
+                ("__exit", 0),
+            ],
+        )
+        self.assertIs(result, True)
+        self.assertEqual(self.selector.client_version, "1.3.0")
+
+    def test_host_test_callbacks_dispatched(self):
+        result = run_with_events(
+            self.selector,
+            [
+                ("__host_test_name", "counting"),
+                ("count", "a"),
+                ("count", "b"),
+                ("count", "a"),
+                ("__timeout_adjust", 5),
+                ("orphan", 1),
+                ("end", "failure"),
+            ],
+        )
+        self.assertIs(result, False)
+        self.assertEqual(self.host_test.counts, {"a": 2, "b": 1})
+
+    def test_host_test_subscribes_to_consumed_events(self):
+        dut_event_queue = queue.Queue()
+        run_with_events(
+            self.selector,
+            [("__host_test_name", "counting"), ("end", "success")],
+            dut_event_queue,
+        )
+        subscriptions = []
+        while not dut_event_queue.empty():
+            key, value, _ = dut_event_queue.get()
+            if key == "__subscribe":
+                subscriptions.append(value)
+        self.assertEqual(len(subscriptions), 1)
+        self.assertIn("count", subscriptions[0])
+        self.assertIn("end", subscriptions[0])
+        self.assertIn("__exit", subscriptions[0])
+        self.assertNotIn("__rxd_line", subscriptions[0])
+        self.assertNotIn("__testcase_start", subscriptions[0])
+
+    def test_target_output_subscribed_for_coverage(self):
+        dut_event_queue = queue.Queue()
+        run_with_events(
+            self.selector,
+            [
+                ("__host_test_name", "counting"),
+                ("__coverage_start", "gcov"),
+                ("end", "success"),
+            ],
+            dut_event_queue,
+        )
+        subscriptions = []
+        while not dut_event_queue.empty():
+            key, value, _ = dut_event_queue.get()
+            if key == "__subscribe":
+                subscriptions.append(value)
+        self.assertEqual(len(subscriptions), 2)
+        self.assertNotIn("__rxd_line", subscriptions[0])
+        self.assertIn("__rxd_line", subscriptions[1])
+
+    def test_empty_compare_log_matches_first_line(self):
+        compare_log = os.path.join(tempfile.mkdtemp(), "compare.log")
+        self.addCleanup(shutil.rmtree, os.path.dirname(compare_log))
+        open(compare_log, "w").close()
+        selector = DefaultTestSelector(make_options(compare_log=compare_log))
+        self.addCleanup(selector.finish)
+        result = run_with_events(
+            selector, [("__rxd_line", "booting"), ("end", "failure")]
+        )
+        self.assertIs(result, True)
+
+    def test_max_rss_exceeded(self):
+        self.selector.options.max_rss = 1
+        result = run_with_events(
+            self.selector, [("__host_test_name", "counting"), ("count", "a")]
+        )
+        self.assertEqual(result, self.selector.RESULT_ERROR)
+
+    def test_rss_of_connection_thread_not_measured_twice(self):
+        self.selector.options.max_rss = 1
+        with mock.patch(
+            "htrun.host_tests_runner.host_test_default.get_rss",
+            return_value=1024 * 1024,
+        ) as get_rss:
+            self.assertFalse(self.selector.rss_exceeded(os.getpid()))
+            get_rss.assert_called_once_with(None)
+            self.assertFalse(self.selector.rss_exceeded(os.getpid() + 1))
+            self.assertEqual(get_rss.call_count, 3)
+
+    def test_conn_process_not_started(self):
+        event_queue = EventLanes()
+        with mock.patch(
+            "htrun.host_tests_runner.host_test_default.EventLanes",
+            return_value=event_queue,
+        ), mock.patch("htrun.host_tests_runner.host_test_default.Process"):
+            with mock.patch.object(event_queue, "close") as close:
+                self.selector.options.process_start_timeout = 0.01
+                result = self.selector.run_test()
+        self.assertEqual(result, self.selector.RESULT_TIMEOUT)
+        close.assert_called_once_with()
+
+    def test_conn_lost_in_preamble(self):
+        result = run_with_events(
+            self.selector, [("__notify_conn_lost", "connection lost")]
+        )
+        self.assertEqual(result, self.selector.RESULT_IO_SERIAL)
+
+    def test_unknown_host_test(self):
+        result = run_with_events(self.selector, [("__host_test_name", "no_such")])
+        self.assertEqual(result, self.selector.RESULT_ERROR)
+
+
+@unittest.skipIf(os.name == "nt", "POSIX only")
+class DefaultTestSelectorLeaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.selector = DefaultTestSelector(
+            make_options(
+                lease=True,
+                lease_dir=self.tmpdir,
+                lease_timeout=None,
+                target_id="0240000032044e45",
+                skip_flashing=True,
+            )
+        )
+
+    def test_board_held_during_test(self):
+        def run_test():
+            with self.assertRaises(LeaseTimeout):
+                BoardLease("0240000032044e45", self.tmpdir).acquire(timeout=0)
+            return True
+
+        with mock.patch.object(self.selector, "run_test", side_effect=run_test):
+            self.assertEqual(self.selector.execute(), 0)
+        usage = BoardLease("0240000032044e45", self.tmpdir).usage()
+        self.assertEqual(usage["leases"], 1)
+
+    def test_board_named_by_port(self):
+        mbeds = [
+            {"target_id": "0240000032044e45", "serial_port": "/dev/ttyACM0"},
+            {"target_id": "1050000032044e45", "serial_port": None},
+        ]
+        self.selector.options.target_id = None
+        self.selector.options.port = "/dev/ttyACM0:115200"
+        with mock.patch("htrun.host_tests_runner.host_test_default.create") as create:
+            create.return_value.list_mbeds.return_value = mbeds
+            # Same lease as runs naming the board by target ID
+            self.assertEqual(self.selector.board_lease().board, "0240000032044e45")
+            self.selector.options.port = "/dev/ttyACM1"
+            self.assertEqual(self.selector.board_lease().board, "/dev/ttyACM1")
+            create.side_effect = OSError("no mbedls")
+            self.assertEqual(self.selector.board_lease().board, "/dev/ttyACM1")
+
+    def test_lease_dir_not_writable(self):
+        with mock.patch.object(
+            BoardLease, "acquire", side_effect=OSError("permission denied")
+        ):
+            with mock.patch.object(self.selector, "run_test") as run_test:
+                self.assertEqual(
+                    self.selector.execute(),
+                    self.selector.get_test_result_int(self.selector.RESULT_IO_SERIAL),
+                )
+        run_test.assert_not_called()
+
+    def test_no_lease_without_local_board(self):
+        self.assertIsNotNone(self.selector.board_lease())
+        self.selector.options.process = "./app"
+        self.assertIsNone(self.selector.board_lease())
+
+
+if __name__ == "__main__":
+    unittest.main()
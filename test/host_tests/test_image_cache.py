@@ -0,0 +1,134 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from htrun.host_tests_runner import image_cache
+from htrun.host_tests_runner.image_cache import (
+    ParsedImageCache,
+    ImageFormatError,
+    flatten,
+    parse_elf,
+    parse_hex,
+)
+
+from .helpers import make_elf
+
+HEX_IMAGE = (
+    b":020000040800F2\n"
+    b":0400000001020304F2\n"
+    b":02001000AABB89\n"
+    b":0400000508000101ED\n"
+    b":00000001FF\n"
+)
+
+
+class ImageConversionTestCase(unittest.TestCase):
+    def test_parse_hex(self):
+        self.assertEqual(
+            parse_hex(HEX_IMAGE),
+            [(0x08000000, b"\x01\x02\x03\x04"), (0x08000010, b"\xaa\xbb")],
+        )
+        with self.assertRaises(ImageFormatError):
+            parse_hex(b":0400000001020304F3\n")
+
+    def test_parse_elf(self):
+        segments = [(0x1000, b"\x01\x02"), (0x1004, b"\x03")]
+        for is_64 in (False, True):
+            for order in "<>":
+                self.assertEqual(parse_elf(make_elf(segments, is_64, order)), segments)
+        with self.assertRaises(ImageFormatError):
+            parse_elf(make_elf(segments)[:80])
+
+    def test_flatten(self):
+        self.assertEqual(
+            flatten([(0x14, b"\x03"), (0x10, b"\x01\x02")]),
+            (0x10, b"\x01\x02\xff\xff\x03"),
+        )
+        with self.assertRaises(ImageFormatError):
+            flatten([(0, b"\x01"), (0x100, b"\x02")], max_gap=0x10)
+        with self.assertRaises(ImageFormatError):
+            flatten([])
+
+
+class ParsedImageCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_convert_once(self):
+        cache = ParsedImageCache(self.cache_dir)
+        hex_path = self.write("a.hex", HEX_IMAGE)
+        with mock.patch.object(
+            image_cache, "parse_hex", wraps=image_cache.parse_hex
+        ) as parse:
+            converted = cache.convert(hex_path)
+            # Same content under another name
+            again = cache.convert(self.write("b.hex", HEX_IMAGE))
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(again.path, converted.path)
+        self.assertEqual(converted.base_address, 0x08000000)
+        with open(converted.path, "rb") as f:
+            self.assertEqual(f.read(), b"\x01\x02\x03\x04" + b"\xff" * 12 + b"\xaa\xbb")
+
+        elf = cache.convert(self.write("a.elf", make_elf([(0x400, b"\x55" * 8)])))
+        self.assertEqual(elf.base_address, 0x400)
+        self.assertIsNone(cache.convert(self.write("a.bin", b"\x00" * 16)))
+        with self.assertRaises(ImageFormatError):
+            cache.convert(self.write("bad.hex", b"not hex"))
+
+    def test_lru_eviction(self):
+        cache = ParsedImageCache(self.cache_dir, max_size=2500)
+        paths = [
+            self.write("%d.elf" % i, make_elf([(0, bytes([i]) * 1000)]))
+            for i in range(3)
+        ]
+        first = cache.convert(paths[0]).path
+        os.utime(first, (1, 1))
+        second = cache.convert(paths[1]).path
+        os.utime(second, (2, 2))
+        # Using the first binary makes the second one the least recently used
+        cache.convert(paths[0])
+        third = cache.convert(paths[2]).path
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 4)
+
+    def test_temporary_files(self):
+        cache = ParsedImageCache(self.cache_dir)
+        elf_path = self.write("a.elf", make_elf([(0x400, b"\x55" * 8)]))
+        # A failed write leaves no temporary file
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                cache.convert(elf_path)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+        # Temporary files of processes which died are removed when stale
+        stale = os.path.join(self.cache_dir, "stale.tmp")
+        fresh = os.path.join(self.cache_dir, "fresh.tmp")
+        for path in (stale, fresh):
+            with open(path, "wb") as f:
+                f.write(b"\x00" * 16)
+        os.utime(stale, (1, 1))
+        cache.convert(elf_path)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins.host_test_plugins import HostTestPluginBase
+from htrun.host_tests_plugins.host_test_registry import HostTestRegistry
+from htrun.host_tests_plugins.plugin_stats import PluginStats
+
+
+class TimedPlugin(HostTestPluginBase):
+    type = "CopyMethod"
+    stable = True
+    required_parameters = ["image_path"]
+
+    def __init__(self, name, seconds, ok=True, required_parameters=None):
+        HostTestPluginBase.__init__(self)
+        self.name = name
+        self.capabilities = [name, name + "_alias"]
+        self.seconds = seconds
+        self.ok = ok
+        self.runs = 0
+        if required_parameters is not None:
+            self.required_parameters = required_parameters
+
+    def setup(self, *args, **kwargs):
+        return True
+
+    def execute(self, capability, *args, **kwargs):
+        self.runs += 1
+        time.sleep(self.seconds)
+        return self.ok
+
+
+def record_runs(path, runs):
+    stats = PluginStats(path)
+    for _ in range(runs):
+        stats.record("CopyMethod", "K64F", "shell", True, 1.0)
+
+
+class PluginStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.stats = PluginStats(os.path.join(self.tmpdir, "htrun", "stats.json"))
+
+    def test_record(self):
+        self.stats.record("CopyMethod", "K64F", "shell", True, 2.0)
+        self.stats.record("CopyMethod", "K64F", "shell", True, 1.0)
+        self.stats.record("CopyMethod", "K64F", "shell", False, 9.0)
+        entry = PluginStats(self.stats.path).entries("CopyMethod", "K64F")["shell"]
+        self.assertEqual(entry["runs"], 3)
+        self.assertEqual(entry["failures"], 1)
+        self.assertAlmostEqual(entry["seconds"], 1.7)
+        # 1.7 s a run, 3 runs in 4 to succeed
+        self.assertAlmostEqual(PluginStats.expected_seconds(entry), 1.7 * 5 / 3)
+        self.assertEqual(self.stats.entries("CopyMethod", "NRF51_DK"), {})
+
+    def test_choose(self):
+        caps = ["shell", "pyocd", "mps2"]
+        rng = mock.Mock()
+        rng.random.return_value = 0.5
+        self.assertIsNone(self.stats.choose("CopyMethod", "K64F", [], rng))
+        self.assertEqual(self.stats.choose("CopyMethod", "K64F", caps, rng), "shell")
+        for cap, ok, seconds in [
+            ("shell", True, 3.0),
+            ("pyocd", True, 1.0),
+            ("mps2", False, 0.1),
+        ]:
+            self.stats.record("CopyMethod", "K64F", cap, ok, seconds)
+        self.assertEqual(self.stats.choose("CopyMethod", "K64F", caps, rng), "pyocd")
+
+        # Often failing plugins lose against slower reliable ones
+        for _ in range(8):
+            self.stats.record("CopyMethod", "K64F", "pyocd", False, 1.0)
+        self.assertEqual(self.stats.choose("CopyMethod", "K64F", caps, rng), "shell")
+
+        # Exploring skips plugins which never succeeded
+        rng.random.return_value = 0.01
+        rng.choice.side_effect = lambda others: others[-1]
+        self.assertEqual(self.stats.choose("CopyMethod", "K64F", caps, rng), "pyocd")
+        rng.choice.assert_called_with(["pyocd"])
+
+    @unittest.skipIf(os.name == "nt", "files aren't locked on Windows")
+    def test_record_from_processes(self):
+        processes = [
+            multiprocessing.Process(target=record_runs, args=(self.stats.path, 20))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        entry = self.stats.entries("CopyMethod", "K64F")["shell"]
+        self.assertEqual(entry["runs"], 60)
+
+
+class AutoPluginTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        class Registry(HostTestRegistry):
+            PLUGINS = {}
+            STATS = PluginStats(os.path.join(self.tmpdir, "stats.json"))
+
+        self.registry = Registry()
+        self.plugins = [
+            TimedPlugin("slow", 0.05),
+            TimedPlugin("fast", 0.01),
+            TimedPlugin("broken", 0, ok=False),
+            TimedPlugin("needs_disk", 0, required_parameters=["destination_disk"]),
+        ]
+        for plugin in self.plugins:
+            plugin.print_plugin_info = lambda text, NL=True: None
+            self.registry.register_plugin(plugin)
+
+    def test_auto(self):
+        kwargs = {"image_path": "image.bin", "destination_disk": None, "mcu": "K64F"}
+        self.assertEqual(
+            self.registry.auto_capabilities("CopyMethod", **kwargs),
+            ["broken", "fast", "slow"],
+        )
+        with mock.patch("random.random", return_value=0.5):
+            results = [
+                self.registry.call_plugin("CopyMethod", "auto", **kwargs)
+                for _ in range(6)
+            ]
+        # Each plugin is tried once, then the fastest one runs
+        self.assertEqual(results, [False, True, True, True, True, True])
+        self.assertEqual([p.runs for p in self.plugins], [1, 4, 1, 0])
+
+        # Runs with a pinned plugin aren't recorded
+        self.assertTrue(self.registry.call_plugin("CopyMethod", "slow_alias", **kwargs))
+        entries = self.registry.stats().entries("CopyMethod", "K64F")
+        self.assertNotIn("slow_alias", entries)
+        self.assertEqual(entries["slow"]["runs"], 1)
+        self.assertEqual(entries["fast"]["runs"], 4)
+
+    def test_auto_skips_unsupported_os(self):
+        self.plugins[0].is_os_supported = lambda os_name=None: False
+        kwargs = {"image_path": "image.bin", "mcu": "K64F"}
+        self.assertEqual(
+            self.registry.auto_capabilities("CopyMethod", **kwargs),
+            ["broken", "fast"],
+        )
+
+    def test_auto_without_target_type(self):
+        # Nothing would be learnt, "auto" would always pick the same plugin
+        self.assertFalse(
+            self.registry.call_plugin("CopyMethod", "auto", image_path="image.bin")
+        )
+        self.assertEqual([p.runs for p in self.plugins], [0, 0, 0, 0])
+
+    def test_auto_without_candidates(self):
+        self.assertFalse(
+            self.registry.call_plugin("CopyMethod", "auto", image_path=None, mcu="K64F")
+        )
+        self.assertEqual([p.runs for p in self.plugins], [0, 0, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins.module_power_cycle_target import (
+    HostTestPluginPowerCycleResetMethod,
+)
+from htrun.host_tests_toolbox.tas_rm_mock import MockResourceManager
+
+
+class PowerCycleTargetTestCase(unittest.TestCase):
+    def start_server(self, **kwargs):
+        server = MockResourceManager(["A", "B", "C"], **kwargs)
+        self.requests = []
+        handle_switch = server.handle_switch
+
+        def record(request):
+            self.requests.append(request)
+            return handle_switch(request)
+
+        server.handle_switch = record
+        server.start()
+        self.addCleanup(server.close)
+        host, port = server.address
+        patcher = mock.patch.dict(
+            os.environ, {"MBED_TAS_RM_IP": host, "MBED_TAS_RM_PORT": str(port)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return server
+
+    def setUp(self):
+        self.plugin = HostTestPluginPowerCycleResetMethod()
+
+    def test_power_cycle(self):
+        server = self.start_server(switch_time=0.2, mount_time=0.1)
+        device_info = {}
+        start = time.time()
+        self.assertTrue(
+            self.plugin.execute("power_cycle", target_id="A", device_info=device_info)
+        )
+        # Back-off polling notices the switch soon after it is done
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(device_info["state"], "ON")
+        self.assertEqual(device_info["mount_point"], "/mnt/A")
+        # Only the fields of the TAS RM API are sent
+        for request in self.requests:
+            for sub_request in request["sub_requests"]:
+                self.assertEqual(
+                    sorted(sub_request),
+                    ["resource_id", "resource_type", "switch_command"],
+                )
+        self.plugin.execute("power_cycle", target_id="B", device_info={})
+        self.assertEqual(server.stats["connections"], 1)
+
+    def test_batch(self):
+        server = self.start_server(switch_time=0.2, mount_time=0.1)
+        device_infos = {"A": {}, "B": {}, "missing": {}}
+        results = self.plugin.power_cycle_targets(device_infos)
+        self.assertEqual(results, {"A": True, "B": True, "missing": False})
+        self.assertEqual(device_infos["B"]["serial_port"], "/dev/tty_B")
+        self.assertEqual(device_infos["missing"], {})
+        # All targets share each request
+        for request in self.requests:
+            targets = [sub["resource_id"] for sub in request["sub_requests"]]
+            self.assertEqual(targets[:2], ["A", "B"])
+
+    def test_errors(self):
+        with mock.patch.dict(
+            os.environ, {"MBED_TAS_RM_IP": "127.0.0.1", "MBED_TAS_RM_PORT": "1"}
+        ):
+            self.assertFalse(
+                self.plugin.execute("power_cycle", target_id="A", device_info={})
+            )
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertFalse(
+                self.plugin.execute("power_cycle", target_id="A", device_info={})
+            )
+        self.assertFalse(self.plugin.execute("power_cycle", target_id="A"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins import module_copy_pyocd, pyocd_clock
+from htrun.host_tests_plugins.module_copy_pyocd import HostTestPluginCopyMethod_pyOCD
+from htrun.host_tests_plugins.pyocd_clock import ClockCache, ClockTuner
+from htrun.host_tests_plugins.pyocd_session import PyOCDSessionCache
+
+from .pyocd_fakes import (
+    BOOT_ADDRESS,
+    FakeFlashLoader,
+    FakeSession,
+    FakeTransferError,
+    reset_fakes,
+)
+
+MEMORY = bytes(range(256)) * 4
+
+
+class ClockTunerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_path = os.path.join(self.tmpdir, "htrun", "swd_clocks.json")
+        self.tuner = ClockTuner(self.cache_path)
+        reset_fakes()
+        FakeSession.memory = {BOOT_ADDRESS: MEMORY}
+        FakeSession.max_clock = {"0240": 12000000, "0241": 4000000}
+        sessions = PyOCDSessionCache()
+        self.addCleanup(sessions.clear)
+        patcher = mock.patch.multiple(
+            module_copy_pyocd,
+            FlashLoader=FakeFlashLoader,
+            LINK_ERRORS=(FakeTransferError,),
+            PYOCD_PRESENT=True,
+            PYOCD_SESSIONS=sessions,
+            create=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(pyocd_clock, "CLOCK_TUNER", self.tuner)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(sessions, "open", lambda t, b: FakeSession(t))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tune(self):
+        self.assertEqual(self.tuner.tune(FakeSession("0240")), 12000000)
+        self.assertEqual(self.tuner.tune(FakeSession("0241")), 4000000)
+
+    def test_clock_cached(self):
+        session = FakeSession("0240")
+        self.assertEqual(self.tuner.clock(session, "0240"), 12000000)
+        reads = session.target.read_memory_block8.call_count
+        self.assertEqual(self.tuner.clock(session, "0240"), 12000000)
+        self.assertEqual(session.target.read_memory_block8.call_count, reads)
+
+        cache = ClockCache(self.cache_path)
+        self.assertEqual(cache.get("0240"), 12000000)
+        self.assertIsNone(cache.get("0241"))
+
+    def test_updates_merged(self):
+        # Two processes tuning different boards with the same cache file
+        first = ClockCache(self.cache_path)
+        second = ClockCache(self.cache_path)
+        first.update("0240", 12000000)
+        second.update("0241", 4000000)
+        first.update("0240", 10000000)
+        cache = ClockCache(self.cache_path)
+        self.assertEqual(cache.get("0240"), 10000000)
+        self.assertEqual(cache.get("0241"), 4000000)
+        self.assertEqual(first.get("0241"), 4000000)
+
+    def test_flash_many_auto(self):
+        image_path = os.path.join(self.tmpdir, "a.bin")
+        with open(image_path, "wb") as f:
+            f.write(MEMORY)
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        results = plugin.flash_many([("0240", image_path)], swd_clock="auto")
+        self.assertTrue(results[0].ok)
+        self.assertEqual(FakeFlashLoader.clocks, [("0240", 12000000)])
+
+        results = plugin.flash_many([("0241", image_path)], swd_clock="auto")
+        self.assertTrue(results[0].ok)
+        self.assertEqual(FakeFlashLoader.clocks[1:], [("0241", 4000000)])
+
+        # A board failing at its cached clock is programmed again a step
+        # slower, the slower clock isn't kept if it fails too
+        self.tuner.cache.update("0241", 12000000)
+        FakeFlashLoader.clocks = []
+        result = plugin.flash_many([("0241", image_path)], swd_clock="auto")[0]
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, "transfer fault")
+        self.assertEqual(
+            [clock for _, clock in FakeFlashLoader.clocks], [12000000, 10000000]
+        )
+        self.assertEqual(ClockCache(self.cache_path).get("0241"), 12000000)
+
+        # and is kept if it works
+        self.tuner.cache.update("0241", 8000000)
+        FakeFlashLoader.clocks = []
+        results = plugin.flash_many([("0241", image_path)], swd_clock="auto")
+        self.assertTrue(results[0].ok)
+        self.assertEqual(
+            [clock for _, clock in FakeFlashLoader.clocks], [8000000, 4000000]
+        )
+        self.assertEqual(ClockCache(self.cache_path).get("0241"), 4000000)
+
+    def test_flash_many_auto_other_error(self):
+        image_path = os.path.join(self.tmpdir, "a.bin")
+        with open(image_path, "wb") as f:
+            f.write(MEMORY)
+        self.tuner.cache.update("0240", 12000000)
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        with mock.patch.object(
+            FakeFlashLoader, "commit", side_effect=ValueError("no flash algorithm")
+        ) as commit:
+            result = plugin.flash_many([("0240", image_path)], swd_clock="auto")[0]
+        # Not a link error, not retried slower
+        self.assertEqual(result.error, "no flash algorithm")
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(ClockCache(self.cache_path).get("0240"), 12000000)
+
+    def test_flash_many_fixed_clock(self):
+        image_path = os.path.join(self.tmpdir, "a.bin")
+        with open(image_path, "wb") as f:
+            f.write(MEMORY)
+        plugin = HostTestPluginCopyMethod_pyOCD()
+        result = plugin.flash_many([("0241", image_path)])[0]
+        # No fall back without tuning
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, "transfer fault")
+        self.assertEqual(FakeFlashLoader.clocks, [("0241", 10000000)])
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins import (
+    module_copy_pyocd,
+    module_reset_pyocd,
+    pyocd_session,
+)
+from htrun.host_tests_plugins.module_copy_pyocd import HostTestPluginCopyMethod_pyOCD
+from htrun.host_tests_plugins.module_reset_pyocd import HostTestPluginResetMethod_pyOCD
+from htrun.host_tests_plugins.pyocd_session import PyOCDSessionCache
+
+from .pyocd_fakes import FakeSession, reset_fakes, session_with_chosen_probe
+
+
+class PyOCDSessionCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        reset_fakes()
+        self.sessions = PyOCDSessionCache()
+        self.addCleanup(self.sessions.clear)
+        patcher = mock.patch.object(
+            pyocd_session,
+            "ConnectHelper",
+            mock.Mock(session_with_chosen_probe=session_with_chosen_probe),
+            create=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_copy_and_reset_share_session(self):
+        for module in (module_copy_pyocd, module_reset_pyocd):
+            patcher = mock.patch.multiple(
+                module,
+                FileProgrammer=mock.Mock(),
+                PYOCD_PRESENT=True,
+                PYOCD_SESSIONS=self.sessions,
+                create=True,
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        copy = HostTestPluginCopyMethod_pyOCD()
+        reset = HostTestPluginResetMethod_pyOCD()
+        for _ in range(3):
+            self.assertTrue(
+                copy.execute(
+                    "pyocd",
+                    image_path="image.bin",
+                    target_id="0240",
+                    format=None,
+                    keep_session=True,
+                )
+            )
+            self.assertTrue(reset.execute("pyocd", target_id="0240"))
+        self.assertEqual(FakeSession.opened, 1)
+
+        with self.sessions.session("0240") as session:
+            self.assertEqual(session.target.reset.call_count, 3)
+        with self.sessions.session("0241"):
+            pass
+        self.assertEqual(FakeSession.opened, 2)
+
+        # Without a pyOCD reset after it, the copy closes its session
+        self.assertTrue(
+            copy.execute("pyocd", image_path="image.bin", target_id="0240", format=None)
+        )
+        self.assertIsNone(self.sessions.entries["0240"][1])
+        self.assertEqual(FakeSession.opened, 2)
+
+    def test_error_closes_session(self):
+        with self.assertRaises(ValueError):
+            with self.sessions.session("0240") as session:
+                raise ValueError("lost the target")
+        self.assertFalse(session.is_open)
+
+        with self.sessions.session("0240") as new_session:
+            self.assertIsNot(new_session, session)
+
+        # A session closed under our feet is opened again
+        new_session.close()
+        with self.sessions.session("0240") as session:
+            self.assertIsNot(session, new_session)
+            self.assertTrue(session.is_open)
+        self.assertEqual(FakeSession.opened, 3)
+
+    def test_idle_timeout(self):
+        self.sessions.idle_timeout = 0.05
+        with self.sessions.session("0240") as session:
+            # In use, not reaped
+            time.sleep(0.1)
+            self.sessions.reap()
+            self.assertTrue(session.is_open)
+        self.assertTrue(session.is_open)
+        time.sleep(0.2)
+        self.assertFalse(session.is_open)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_fork(self):
+        with self.sessions.session("0240") as session:
+            pass
+        pid = os.fork()
+        if pid == 0:
+            # The child must not use nor close the session of its parent
+            os._exit(0 if self.sessions.entries == {} else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertTrue(session.is_open)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import time
+import unittest
+
+from htrun.host_tests_conn_proxy.resource_pool import IdleResourcePool
+
+
+class FakePool(IdleResourcePool):
+    def __init__(self):
+        IdleResourcePool.__init__(self)
+        self.dead = set()
+        self.shut_down = []
+
+    def alive(self, resource):
+        return resource not in self.dead
+
+    def shutdown(self, resource):
+        self.shut_down.append(resource)
+
+
+class IdleResourcePoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.addCleanup(self.pool.clear)
+
+    def test_take(self):
+        self.pool.put("K64F", ("module", "a"), 10)
+        self.pool.put("K64F", ("module", "b"), 10)
+        self.pool.dead.add("b")
+        self.assertIsNone(self.pool.take("NRF51"))
+        self.assertEqual(self.pool.take("K64F"), ("module", "a"))
+        self.assertEqual(self.pool.shut_down, ["b"])
+        self.assertIsNone(self.pool.take("K64F"))
+
+    def test_idle_timeout(self):
+        self.pool.put("K64F", ("module", "a"), 0.05)
+        self.pool.put("K64F", ("module", "b"), 10)
+        end = time.time() + 5
+        while not self.pool.shut_down and time.time() < end:
+            time.sleep(0.01)
+        self.assertEqual(self.pool.shut_down, ["a"])
+        self.pool.clear()
+        self.assertEqual(self.pool.shut_down, ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import mock
+
+from htrun.host_tests_plugins.host_test_plugins import HostTestPluginBase
+
+
+def is_running(pid):
+    """Return True if a process exists and isn't a zombie."""
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (IOError, OSError):
+        return False
+
+
+class RunCommandTestCase(unittest.TestCase):
+    def setUp(self):
+        self.plugin = HostTestPluginBase()
+        self.plugin.plugin_logger = mock.Mock()
+
+    def test_output_and_return_code(self):
+        script = "print('line 1'); print('line 2'); raise SystemExit(%d)"
+        self.assertTrue(
+            self.plugin.run_command([sys.executable, "-c", script % 0], shell=False)
+        )
+        self.plugin.plugin_logger.prn_txt.assert_has_calls(
+            [mock.call("line 1"), mock.call("line 2")]
+        )
+        self.assertFalse(
+            self.plugin.run_command([sys.executable, "-c", script % 3], shell=False)
+        )
+        self.plugin.plugin_logger.prn_err.assert_called_with(
+            "[ret=3] Command: %s" % [sys.executable, "-c", script % 3]
+        )
+        self.assertFalse(
+            self.plugin.run_command(["htrun-no-such-command"], shell=False)
+        )
+
+    @unittest.skipIf(os.name == "nt" or not os.path.isdir("/proc"), "POSIX only")
+    def test_timeout_kills_process_tree(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        pid_path = os.path.join(tmpdir, "pid")
+        self.plugin.command_timeout = 0.5
+        start = time.time()
+        self.assertFalse(
+            self.plugin.run_command("sleep 30 & echo $! > %s; wait" % pid_path)
+        )
+        self.assertLess(time.time() - start, 10)
+        with open(pid_path) as f:
+            pid = int(f.read())
+        self.assertFalse(is_running(pid))
+
+    def test_async(self):
+        cmd = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+
+        async def run_both():
+            return await asyncio.gather(
+                self.plugin.run_command_async(cmd, shell=False),
+                self.plugin.run_command_async(cmd, shell=False),
+            )
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        start = time.time()
+        self.assertEqual(loop.run_until_complete(run_both()), [True, True])
+        self.assertLess(time.time() - start, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+from time import time
+
+import mock
+
+from htrun.host_tests_conn_proxy.conn_primitive_record import (
+    RecordingConnectorPrimitive,
+)
+from htrun.host_tests_conn_proxy.conn_primitive_replay import (
+    ReplayConnectorPrimitive,
+)
+from htrun.host_tests_conn_proxy.conn_proxy import conn_process
+from htrun.host_tests_conn_proxy.session_log import (
+    read_session_log,
+    split_connections,
+    SessionLogError,
+    SessionLogWriter,
+    OPEN,
+    RX,
+    TX,
+    RESET,
+)
+
+RECORDED_UUID = "11111111-2222-3333-4444-555555555555"
+
+
+class FakeConnector(object):
+    def __init__(self, output):
+        self.output = list(output)
+        self.logger = mock.Mock()
+        self.logger.logger.name = "FAKE"
+        self.written = []
+
+    def read(self, count):
+        return self.output.pop(0) if self.output else b""
+
+    def write(self, payload, log=False):
+        self.written.append(payload)
+        return True
+
+    def reset(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def connected(self):
+        return True
+
+    def error(self):
+        return None
+
+    def finish(self):
+        pass
+
+
+class FinishAfterEnd(object):
+    """DUT event queue finishing the connection process after the 'end' event."""
+
+    def __init__(self, event_queue):
+        self.event_queue = event_queue
+
+    def get(self, block=True, timeout=None):
+        if any(event[0] == "end" for event in list(self.event_queue.queue)):
+            return ("__host_test_finished", True, time())
+        raise queue.Empty
+
+
+class SessionLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, "session.htrs")
+
+    def write_session(self, connections):
+        writer = SessionLogWriter(self.path)
+        timestamp = 100.0
+        for records in connections:
+            writer.write(OPEN, timestamp)
+            for kind, payload in records:
+                timestamp += 0.5
+                writer.write(kind, timestamp, payload)
+        writer.close()
+
+    def test_records_read_back(self):
+        self.write_session([[(TX, b"mbed"), (RX, b"{{a;1}}\n"), (RESET, b"")]])
+        records = read_session_log(self.path)
+        self.assertEqual([record[0] for record in records], [OPEN, TX, RX, RESET])
+        self.assertEqual(records[2], (RX, 101.0, b"{{a;1}}\n"))
+
+    def test_truncated_record_ignored(self):
+        self.write_session([[(RX, b"first"), (RX, b"second")]])
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        records = read_session_log(self.path)
+        self.assertEqual(records[-1][2], b"first")
+
+    def test_not_a_session_log(self):
+        with open(self.path, "wb") as f:
+            f.write(b"mbed")
+        self.assertRaises(SessionLogError, read_session_log, self.path)
+
+    def test_connections_split(self):
+        self.write_session([[(RX, b"a")], [(RX, b"b"), (RX, b"c")]])
+        connections = split_connections(read_session_log(self.path))
+        self.assertEqual([len(records) for records in connections], [1, 2])
+
+    def test_recording_connector(self):
+        fake = FakeConnector([b"boot\n", b"", b"{{a;1}}\n"])
+        connector = RecordingConnectorPrimitive(fake, self.path)
+        connector.write_kv("__sync", RECORDED_UUID)
+        for _ in range(3):
+            connector.read(2304)
+        connector.reset()
+        connector.finish()
+        connector = RecordingConnectorPrimitive(fake, self.path, append=True)
+        connector.finish()
+        records = read_session_log(self.path)
+        self.assertEqual(
+            [(kind, payload) for kind, _, payload in records],
+            [
+                (OPEN, b""),
+                (TX, b"{{__sync;%s}}\n" % RECORDED_UUID.encode()),
+                (RX, b"boot\n"),
+                (RX, b"{{a;1}}\n"),
+                (RESET, b""),
+                (OPEN, b""),
+            ],
+        )
+
+    def replay(self, **config):
+        config.setdefault("replay", self.path)
+        return ReplayConnectorPrimitive("RPLY", config)
+
+    def test_replay_waits_for_host(self):
+        self.write_session(
+            [[(RX, b"boot\n"), (TX, b"go"), (RX, b"after go\n"), (RESET, b"")]]
+            + [[(RX, b"second\n")]]
+        )
+        connector = self.replay()
+        self.assertEqual(connector.read(2304), b"boot\n")
+        self.assertEqual(connector.read(2304), b"")
+        self.assertTrue(connector.write("go"))
+        self.assertEqual(connector.read(4), b"afte")
+        self.assertEqual(connector.read(2304), b"r go\n")
+        connector.reset()
+        self.assertEqual(len(connector.steps), 0)
+        self.assertEqual(self.replay(conn_index=1).read(2304), b"second\n")
+        self.assertFalse(self.replay(conn_index=2).connected())
+
+    def test_replay_at_recorded_speed(self):
+        self.write_session([[(RX, b"a"), (RX, b"b")]])
+        connector = self.replay(replay_speed=10)
+        with mock.patch(
+            "htrun.host_tests_conn_proxy.conn_primitive_replay.sleep"
+        ) as sleep:
+            self.assertEqual(connector.read(2304), b"a")
+            self.assertEqual(connector.read(2304), b"")
+        self.assertLessEqual(sleep.call_args[0][0], 0.05)
+
+    def test_replay_missing_log(self):
+        connector = self.replay(replay=os.path.join(self.tmpdir, "missing"))
+        self.assertFalse(connector.connected())
+        self.assertIn("unable to load session log", connector.error())
+
+    def test_conn_process_replays_session(self):
+        output = "{{__sync;%s}}\n{{__timeout;5}}\nhello\n{{end;success}}\n"
+        self.write_session(
+            [
+                [
+                    (TX, b"mbed" * 10),
+                    (TX, b"{{__sync;%s}}\n" % RECORDED_UUID.encode()),
+                    (RX, (output % RECORDED_UUID).encode()),
+                ]
+            ]
+        )
+        event_queue = queue.Queue()
+        dut_event_queue = FinishAfterEnd(event_queue)
+        conn_process(
+            event_queue,
+            dut_event_queue,
+            {"conn_resource": "replay", "replay": self.path, "sync_behavior": 1},
+        )
+        events = []
+        while not event_queue.empty():
+            events.append(event_queue.get()[:2])
+        keys = [key for key, _ in events]
+        self.assertEqual(keys[-3:], ["__sync", "__timeout", "end"])
+        self.assertNotEqual(events[-3][1], RECORDED_UUID)
+        self.assertIn(("__rxd_line", "hello"), events)
@@ -45,6 +45,7 @@ class TestTargetBase(unittest.TestCase):
                 program_cycle_s=None,
                 json_test_configuration=None,
                 format="blah",
+                convert_image=False,
             )
 
             mbed = TargetBase(options)
@@ -61,6 +62,8 @@ class TestTargetBase(unittest.TestCase):
                 target_id=options.target_id,
                 pooling_timeout=options.polling_timeout,
                 format=options.format,
+                swd_clock=options.swd_clock,
+                keep_session=False,
             )
 
     def test_discovers_mbed_if_mbed_copy_method_used(
@@ -81,6 +84,7 @@ class TestTargetBase(unittest.TestCase):
                 program_cycle_s=None,
                 json_test_configuration=None,
                 format="blah",
+                convert_image=False,
             )
 
             mbed = TargetBase(options)
@@ -97,8 +101,49 @@ class TestTargetBase(unittest.TestCase):
                 target_id=options.target_id,
                 pooling_timeout=options.polling_timeout,
                 format=options.format,
+                swd_clock=options.swd_clock,
+                keep_session=False,
             )
 
+    def test_converts_image_for_binary_copy_method(self, mock_create, mock_ht_plugins):
+        with TemporaryDirectory() as tmpdir:
+            image_path = os.path.join(tmpdir, "test.hex")
+            with open(image_path, "w") as f:
+                f.write(":0400100001020304E2\n:00000001FF\n")
+            options = mock.Mock(
+                copy_method="pyocd",
+                image_path=image_path,
+                disk=None,
+                port="port",
+                micro="mcu",
+                target_id="BK99",
+                polling_timeout=5,
+                program_cycle_s=0,
+                json_test_configuration=None,
+                format=None,
+                convert_image=True,
+                image_cache_dir=os.path.join(tmpdir, "cache"),
+                image_cache_size=1,
+            )
+            mock_ht_plugins.get_plugin.return_value.binary_images = True
+
+            mbed = TargetBase(options)
+            mbed.copy_image()
+
+            kwargs = mock_ht_plugins.call_plugin.call_args[1]
+            self.assertEqual(kwargs["format"], "bin")
+            self.assertEqual(kwargs["base_address"], 0x10)
+            self.assertTrue(kwargs["image_path"].startswith(options.image_cache_dir))
+            with open(kwargs["image_path"], "rb") as f:
+                self.assertEqual(f.read(), b"\x01\x02\x03\x04")
+
+            # Images are passed as they are to other copy methods
+            mock_ht_plugins.get_plugin.return_value.binary_images = False
+            mbed.copy_image()
+            kwargs = mock_ht_plugins.call_plugin.call_args[1]
+            self.assertEqual(kwargs["image_path"], image_path)
+            self.assertNotIn("base_address", kwargs)
+
 
 if __name__ == "__main__":
     unittest.main()
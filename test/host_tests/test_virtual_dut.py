@@ -0,0 +1,89 @@
+#
+# Copyright (c) 2021 Arm Limited and Contributors. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import re
+import threading
+import unittest
+
+from htrun.host_tests_toolbox.virtual_dut import VirtualDut, serve
+
+KV = re.compile(rb"\{\{([^;]+);([^\}]+)\}\}")
+
+
+def read_kvs(dut, now=None):
+    data = b""
+    while True:
+        chunk = dut.read(now)
+        if not chunk:
+            return [(k.decode(), v.decode()) for k, v in KV.findall(data)], data
+        data += chunk
+
+
+class VirtualDutTestCase(unittest.TestCase):
+    def test_sync_and_script(self):
+        dut = VirtualDut(host_test_name="dummy", testcases=2, lines_per_case=3)
+        dut.feed(b"mbed" * 10)
+        self.assertEqual(dut.read(), b"")
+        dut.feed(b"{{__sync;1234")
+        dut.feed(b"5678}}\n")
+        kvs, data = read_kvs(dut)
+        self.assertEqual(
+            kvs[:4],
+            [
+                ("__sync", "12345678"),
+                ("__version", VirtualDut.CLIENT_VERSION),
+                ("__timeout", "10"),
+                ("__host_test_name", "dummy"),
+            ],
+        )
+        self.assertEqual(
+            kvs[-3:],
+            [("__testcase_summary", "2;0"), ("end", "success"), ("__exit", "0")],
+        )
+        self.assertEqual(data.count(b" line "), 6)
+        self.assertTrue(dut.finished)
+
+    def test_echo(self):
+        dut = VirtualDut(host_test_name="echo", testcases=0, echo_count=2)
+        dut.feed(b"{{__sync;1}}")
+        kvs, _ = read_kvs(dut)
+        self.assertEqual(kvs[-1], ("echo_count", "2"))
+        dut.feed(b"{{echo_count;2}}{{echo;a}}")
+        self.assertEqual(read_kvs(dut)[0], [("echo", "a")])
+        dut.feed(b"{{echo;b}}")
+        kvs, _ = read_kvs(dut)
+        self.assertEqual(kvs, [("echo", "b"), ("end", "success"), ("__exit", "0")])
+        self.assertEqual(len(dut.stats["round_trips"]), 1)
+
+    def test_line_rate(self):
+        dut = VirtualDut(testcases=1, lines_per_case=100, line_rate=10)
+        dut.feed(b"{{__sync;1}}")
+        self.assertEqual(dut.read(now=100.0).count(b"\r\n"), 1)
+        self.assertEqual(dut.read(now=100.05), b"")
+        self.assertEqual(dut.read(now=100.5).count(b"\r\n"), 5)
+        self.assertAlmostEqual(dut.next_output_time(), 100.6)
+
+    def test_serve_over_pipes(self):
+        host_to_dut = os.pipe()
+        dut_to_host = os.pipe()
+        dut = VirtualDut(testcases=1)
+        thread = threading.Thread(
+            target=serve, args=(dut, host_to_dut[0], dut_to_host[1], True)
+        )
+        thread.start()
+        os.write(host_to_dut[1], b"mbedmbed{{__sync;42}}\n")
+        data = b""
+        while b"{{__exit;0}}" not in data:
+            data += os.read(dut_to_host[0], 4096)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIn(b"{{__sync;42}}", data)
+        self.assertIsNotNone(dut.stats["finish_time"])
+        for fd in host_to_dut + dut_to_host:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    unittest.main()